@@ -0,0 +1,132 @@
+"""
+GET condicional (ETag / If-None-Match) por versão de dados (main.py e roi_api.py)
+
+Para cada prefixo de rota, os domínios de dados que ela lê
+(shared.data_versions). Num GET/HEAD desses prefixos o middleware lê as
+versões (um MGET no Redis) antes de chamar a aplicação:
+
+- If-None-Match com o ETag atual -> 304 na hora, sem chegar ao endpoint
+  (nenhuma consulta ao banco ou ao CRM)
+- senão a requisição segue e a resposta 200 leva o ETag e
+  `Cache-Control: private, no-cache` (o navegador guarda e revalida)
+
+O ETag é derivado das versões, do caminho, da query (ordem ignorada), do
+dia (rotas com período relativo a hoje) e de uma janela de
+DATA_VERSION_MAX_AGE_SECONDS, que limita o tempo de um 304 caso alguma
+escrita fora dos fluxos versionados (ex: CRM externo sem o worker) passe
+despercebida; 0 desliga a janela. Redis fora do ar: responde sem ETag e
+tenta de novo depois de alguns segundos.
+"""
+import os
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Awaitable, Callable, Optional, Sequence
+
+import structlog
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+
+from shared.data_versions import etag as build_etag
+
+logger = structlog.get_logger()
+
+MAX_AGE_SECONDS = int(os.getenv("DATA_VERSION_MAX_AGE_SECONDS", "900"))
+BACKOFF_SECONDS = 30.0
+CACHE_CONTROL = "private, no-cache"
+
+Authorizer = Callable[[Request], Awaitable[bool]]
+
+
+@dataclass(frozen=True)
+class VersionedRoute:
+    """
+    Prefixo de rotas versionadas e os domínios que elas leem
+
+    `authorize`: só responde 304 se aprovar a requisição (rotas com login:
+    token válido); sem ele, qualquer cliente com o ETag recebe 304.
+    """
+    prefix: str
+    domains: Sequence[str]
+    authorize: Optional[Authorizer] = None
+
+
+def _matches(if_none_match: str, atual: str) -> bool:
+    """Comparação fraca (RFC 9110): ignora o prefixo W/"""
+    if if_none_match.strip() == "*":
+        return True
+    alvo = atual.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == alvo for t in if_none_match.split(","))
+
+
+class ConditionalGetMiddleware:
+    """
+    Middleware ASGI: ETag por versão de dados e 304 antes do endpoint
+
+    Args:
+        routes: Prefixos versionados (o primeiro que casar vale)
+        store: Fonte das versões (padrão: services.data_versions)
+    """
+
+    def __init__(self, app, routes: Sequence[VersionedRoute], store=None):
+        self.app = app
+        self.routes = list(routes)
+        self._store = store
+        self._pausado_ate = 0.0
+
+    @property
+    def store(self):
+        if self._store is None:
+            from services.data_versions import get_data_versions
+            self._store = get_data_versions()
+        return self._store
+
+    def _route(self, path: str) -> Optional[VersionedRoute]:
+        for route in self.routes:
+            if path.startswith(route.prefix):
+                return route
+        return None
+
+    async def _etag(self, scope, domains: Sequence[str]) -> Optional[str]:
+        if time.monotonic() < self._pausado_ate:
+            return None
+        try:
+            versoes = await self.store.get(domains)
+        except Exception as e:
+            self._pausado_ate = time.monotonic() + BACKOFF_SECONDS
+            logger.warning("Versões de dados indisponíveis; respostas sem ETag", error=str(e))
+            return None
+        janela = int(time.time() // MAX_AGE_SECONDS) if MAX_AGE_SECONDS > 0 else 0
+        query = Request(scope).query_params.multi_items()
+        return build_etag(versoes, "GET", scope["path"], query, extra=f"{date.today()}|{janela}")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        route = self._route(scope["path"])
+        etag = await self._etag(scope, route.domains) if route else None
+        if etag is None:
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            if route.authorize is None or await route.authorize(Request(scope)):
+                await send({
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [(b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL.encode())],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                message["headers"] = list(message.get("headers", []))
+                headers = MutableHeaders(raw=message["headers"])
+                headers["etag"] = etag
+                headers.setdefault("cache-control", CACHE_CONTROL)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -3,6 +3,7 @@ Configurações da aplicação usando Pydantic Settings
 """
 from functools import lru_cache
 from typing import Optional
+from urllib.parse import quote_plus
 from pydantic_settings import BaseSettings
 
 
@@ -10,12 +11,24 @@ class Settings(BaseSettings):
     """Configurações carregadas de variáveis de ambiente"""
     
     # Banco de dados
+    database_backend: str = "sqlite"  # sqlite (dev) ou postgresql (asyncpg)
     postgres_host: str = "localhost"
     postgres_port: int = 5432
     postgres_db: str = "crm_campanhas"
     postgres_user: str = "admin"
     postgres_password: str = "change_me"
     
+    # Pool do PostgreSQL (por processo da API)
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 10.0  # Segundos esperando conexão livre
+    db_pool_recycle: int = 1800
+    db_statement_cache_size: int = 500  # Prepared statements por conexão; 0 com PgBouncer em modo transaction
+    
+    # SQLite (dev)
+    sqlite_path: str = "./crm_ia.db"
+    sqlite_busy_timeout_ms: int = 5000  # Espera pelo lock de escrita antes de "database is locked"
+    
     # Redis
     redis_url: str = "redis://localhost:6379/0"
     
@@ -45,16 +58,28 @@ class Settings(BaseSettings):
     environment: str = "development"
     log_level: str = "INFO"
     
+    @property
+    def is_postgres(self) -> bool:
+        """Backend PostgreSQL? (DATABASE_BACKEND=postgresql|postgres)"""
+        return self.database_backend.lower() in ("postgresql", "postgres")
+    
+    def _postgres_url(self, driver: str) -> str:
+        credenciais = f"{quote_plus(self.postgres_user)}:{quote_plus(self.postgres_password)}"
+        return f"postgresql+{driver}://{credenciais}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
+    
     @property
     def database_url(self) -> str:
         """URL de conexão do banco de dados (async)"""
-        # Usar SQLite por enquanto (mais simples)
-        return "sqlite+aiosqlite:///./crm_ia.db"
+        if self.is_postgres:
+            return self._postgres_url("asyncpg")
+        return f"sqlite+aiosqlite:///{self.sqlite_path}"
     
     @property
     def database_url_sync(self) -> str:
         """URL de conexão do banco de dados (sync - para Alembic)"""
-        return "sqlite:///./crm_ia.db"
+        if self.is_postgres:
+            return self._postgres_url("psycopg2")
+        return f"sqlite:///{self.sqlite_path}"
     
     @property
     def is_google_ads_configured(self) -> bool:
@@ -1,29 +1,86 @@
 """
 Configuração do banco de dados e sessões
 """
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeBase
 from config import get_settings
 
 settings = get_settings()
 
-# Engine assíncrono
-# SQLite não aceita pool_size/max_overflow
-if 'sqlite' in settings.database_url:
-    engine = create_async_engine(
-        settings.database_url,
-        echo=settings.environment == "development",
-        connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_async_engine(
-        settings.database_url,
-        echo=settings.environment == "development",
+
+@compiles(UUID, "sqlite")
+def _uuid_sqlite(type_, compiler, **kw):
+    # Os modelos usam o UUID do PostgreSQL; no SQLite (dev) vira texto
+    return "CHAR(32)"
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    PRAGMAs por conexão do SQLite
+
+    WAL: leituras não esperam a escrita (o sync do CRM não trava o
+    dashboard) e o commit não reescreve o arquivo principal. Com WAL,
+    synchronous=NORMAL só arrisca a última transação numa queda de energia.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.close()
+
+
+def build_engine(database_url: str = None) -> AsyncEngine:
+    """
+    Engine assíncrono com o tuning do backend da URL
+
+    - PostgreSQL (asyncpg): pool de DB_POOL_SIZE + DB_MAX_OVERFLOW conexões
+      e cache de prepared statements por conexão (DB_STATEMENT_CACHE_SIZE;
+      0 desliga, necessário com PgBouncer em modo transaction)
+    - SQLite: WAL, busy_timeout e PRAGMAs em toda conexão nova
+    """
+    database_url = database_url or settings.database_url
+    echo = settings.environment == "development"
+
+    # SQLite não aceita pool_size/max_overflow
+    if database_url.startswith("sqlite"):
+        engine = create_async_engine(
+            database_url,
+            echo=echo,
+            connect_args={
+                "check_same_thread": False,
+                "timeout": settings.sqlite_busy_timeout_ms / 1000
+            }
+        )
+        event.listen(engine.sync_engine, "connect", _sqlite_pragmas)
+        return engine
+
+    connect_args = {
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "server_settings": {"application_name": "crm-ia-api"}
+    }
+    if settings.db_statement_cache_size == 0:
+        connect_args["statement_cache_size"] = 0
+    return create_async_engine(
+        database_url,
+        echo=echo,
         pool_pre_ping=True,
-        pool_size=5,
-        max_overflow=10
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        connect_args=connect_args
     )
 
+
+# Engine assíncrono (DATABASE_BACKEND em config.py)
+engine = build_engine()
+
 # Session factory
 async_session_maker = async_sessionmaker(
     engine,
@@ -2,18 +2,40 @@
 CRM IA Campanhas - API Principal
 FastAPI Application
 """
+import time
+
+INICIO = time.perf_counter()
+
+import startup
+
+TIMER = startup.StartupTimer(INICIO)
+
+import asyncio
 import structlog
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from config import get_settings
-from database import init_db, close_db
-
-# Importar routers
-from routers import crm, campaigns, analytics, ai_analyst, integrations, auth
-from routers import crm_sync, roi_analysis
+from database import engine, init_db, close_db
+from shared import query_metrics
+import profiling
+from responses import CompressionMiddleware, FastJSONResponse
+from conditional import ConditionalGetMiddleware, VersionedRoute
+from shared.data_versions import CRM, ADS, AGENCY
+
+# Routers (importados no registro; com FAST_STARTUP=1, na primeira requisição)
+ROUTERS = startup.LazyRouters([
+    startup.RouterSpec("routers.auth", "/auth", ["Autenticação"]),
+    startup.RouterSpec("routers.crm", "/api/crm", ["CRM"]),
+    startup.RouterSpec("routers.campaigns", "/api/campaigns", ["Campanhas"]),
+    startup.RouterSpec("routers.analytics", "/api/analytics", ["Analytics"]),
+    startup.RouterSpec("routers.ai_analyst", "/api/ai", ["IA Analista"]),
+    startup.RouterSpec("routers.integrations", "/api/integrations", ["Integrações"]),
+    startup.RouterSpec("routers.crm_sync", "/api/crm-sync", ["CRM Sync"]),
+    startup.RouterSpec("routers.roi_analysis", "/api/roi", ["ROI Analysis"]),
+], timer=TIMER)
 
 # Configurar logging estruturado
 structlog.configure(
@@ -36,19 +58,48 @@ structlog.configure(
 
 logger = structlog.get_logger()
 settings = get_settings()
+TIMER.mark("imports")
+
+
+async def is_admin_request(request: Request) -> bool:
+    """Autorização do profiler; routers.auth só é importado quando alguém pede X-Profile"""
+    from routers.auth import is_admin_request as autorizar
+    return await autorizar(request)
+
+
+async def has_valid_token(request: Request) -> bool:
+    """Token válido para o 304 das rotas com login (sem importar routers.auth no boot)"""
+    from routers.auth import has_valid_token as validar
+    return await validar(request)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gerencia ciclo de vida da aplicação"""
-    logger.info("Iniciando CRM IA Campanhas API...")
+    logger.info("Iniciando CRM IA Campanhas API...", fast_startup=startup.FAST_STARTUP)
+    TIMER.mark("server")
     # Startup
-    await init_db()
-    logger.info("Banco de dados inicializado")
+    if startup.FAST_STARTUP and await startup.schema_is_current(engine):
+        TIMER.mark("schema_check")
+        logger.info("Schema no head do Alembic; create_all ignorado")
+    else:
+        import models  # noqa: F401  (create_all precisa de todas as tabelas)
+        await init_db()
+        TIMER.mark("create_all")
+        logger.info("Banco de dados inicializado")
+    
+    tarefas = []
+    if startup.FAST_STARTUP:
+        tarefas.append(asyncio.create_task(ROUTERS.warm(app)))
+    if startup.CRM_CHECK:
+        tarefas.append(asyncio.create_task(startup.check_external_crm(TIMER)))
+    logger.info("Startup concluído", **TIMER.snapshot())
     
     yield
     
     # Shutdown
+    for tarefa in tarefas:
+        tarefa.cancel()
     await close_db()
     logger.info("API encerrada")
 
@@ -72,6 +123,7 @@ app = FastAPI(
     """,
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -85,6 +137,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli acima de COMPRESSION_MIN_BYTES (dentro do profiling: conta como serialize)
+app.add_middleware(CompressionMiddleware)
+
+# ETag por versão de dados; If-None-Match igual -> 304 antes do endpoint
+app.add_middleware(ConditionalGetMiddleware, routes=[
+    VersionedRoute("/api/analytics/", (CRM, ADS), authorize=has_valid_token),
+    VersionedRoute("/api/roi/", (CRM, AGENCY)),
+])
+
+# Fases por rota em /metrics; profiler com X-Profile: 1 (admin) ou PROFILING_SAMPLE_RATE
+app.add_middleware(profiling.ProfilingMiddleware, authorize=is_admin_request)
+profiling.instrument_engine_phases(engine.sync_engine)
+
 
 # Handler de exceções global
 @app.exception_handler(Exception)
@@ -104,10 +169,20 @@ async def health_check():
         "status": "healthy",
         "service": "crm-ia-campanhas-api",
         "version": "1.0.0",
-        "environment": settings.environment
+        "environment": settings.environment,
+        "crm_externo": startup.CRM_STATUS["status"]
     }
 
 
+@app.get("/metrics", tags=["Sistema"], response_class=PlainTextResponse)
+async def metrics():
+    """Métricas das consultas ao CRM externo, fases por rota e do startup (Prometheus)"""
+    return PlainTextResponse(
+        profiling.render_prometheus() + TIMER.render_prometheus(),
+        media_type=query_metrics.CONTENT_TYPE
+    )
+
+
 @app.get("/", tags=["Sistema"])
 async def root():
     """Página inicial da API"""
@@ -118,15 +193,16 @@ async def root():
     }
 
 
-# Registrar routers
-app.include_router(auth.router, prefix="/auth", tags=["Autenticação"])
-app.include_router(crm.router, prefix="/api/crm", tags=["CRM"])
-app.include_router(campaigns.router, prefix="/api/campaigns", tags=["Campanhas"])
-app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
-app.include_router(ai_analyst.router, prefix="/api/ai", tags=["IA Analista"])
-app.include_router(integrations.router, prefix="/api/integrations", tags=["Integrações"])
-app.include_router(crm_sync.router, prefix="/api/crm-sync", tags=["CRM Sync"])
-app.include_router(roi_analysis.router, prefix="/api/roi", tags=["ROI Analysis"])
+TIMER.mark("app")
+
+# Registrar routers (modo rápido: o middleware registra sob demanda)
+if not startup.FAST_STARTUP:
+    ROUTERS.include_all(app)
+app.add_middleware(startup.LazyRoutersMiddleware, routers=ROUTERS)
+
+# Depois de todos os routers: marca rota e fim do endpoint para as fases
+profiling.instrument_routes(app)
+TIMER.mark("routers")
 
 
 if __name__ == "__main__":
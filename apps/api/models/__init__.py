@@ -3,8 +3,8 @@ Modelos SQLAlchemy do sistema
 """
 from .crm import CRMDeal
 from .campaigns import Campaign, CampaignInsight
-from .attribution import AttributionLink
-from .analytics import KPISnapshot
+from .attribution import AttributionLink, AdClick
+from .analytics import KPISnapshot, KPIDirtyDay
 from .ai import AIRecommendation
 from .users import User
 
@@ -13,7 +13,9 @@ __all__ = [
     "Campaign",
     "CampaignInsight",
     "AttributionLink",
+    "AdClick",
     "KPISnapshot",
+    "KPIDirtyDay",
     "AIRecommendation",
     "User"
 ]
@@ -4,7 +4,7 @@ Modelo de snapshots de KPIs
 import uuid
 from datetime import datetime, date
 from typing import Optional
-from sqlalchemy import String, DateTime, Date, Enum as SQLEnum, JSON
+from sqlalchemy import String, DateTime, Date, Enum as SQLEnum, JSON, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 import enum
@@ -26,6 +26,16 @@ class KPISnapshot(Base):
     Pré-calcula KPIs para performance do dashboard
     """
     __tablename__ = "kpi_snapshots"
+    __table_args__ = (
+        # Um snapshot por período e recorte; o worker grava com upsert nessa
+        # chave (dimensões nulas do recorte geral comparadas como '')
+        Index(
+            "uq_kpi_snapshots_recorte", "agregacao", "periodo_inicio",
+            text("coalesce(canal, '')"), text("coalesce(campaign_id, '')"),
+            text("coalesce(vendedor, '')"),
+            unique=True,
+        ),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -75,3 +85,16 @@ class KPISnapshot(Base):
     def __repr__(self) -> str:
         return f"<KPISnapshot {self.periodo_inicio} - {self.periodo_fim} | {self.agregacao.value}>"
 
+
+class KPIDirtyDay(Base):
+    """
+    Dia cujos KPIs precisam ser recalculados
+    Marcado por sync/import de deals; consumido pelo worker (kpi_engine)
+    """
+    __tablename__ = "kpi_dirty_days"
+    
+    dia: Mapped[date] = mapped_column(Date, primary_key=True)
+    marked_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<KPIDirtyDay {self.dia}>"
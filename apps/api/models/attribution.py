@@ -5,12 +5,13 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
-from sqlalchemy import String, Numeric, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Integer, String, Numeric, DateTime, ForeignKey, Index, UniqueConstraint, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
 from database import Base
+from models.campaigns import PlatformEnum
 
 
 class AttributionMethod(str, enum.Enum):
@@ -27,8 +28,16 @@ class AttributionLink(Base):
     """
     Liga um negócio (deal) a uma campanha
     Permite múltiplas atribuições com diferentes métodos e confiança
+    
+    Os métodos UTM/GCLID/FBCLID são gravados pelo motor do worker
+    (shared/attribution.py), que refaz as ligações automáticas de cada deal
+    processado; MANUAL/RULE/AI nunca são tocadas por ele.
     """
     __tablename__ = "attribution_links"
+    __table_args__ = (
+        Index("ix_attribution_links_deal_id", "deal_id"),
+        Index("ix_attribution_links_campaign_id", "campaign_id"),
+    )
     
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
@@ -41,9 +50,9 @@ class AttributionLink(Base):
         UUID(as_uuid=True),
         ForeignKey("crm_deals.id")
     )
-    campaign_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True),
-        ForeignKey("ad_campaigns.id")
+    campaign_id: Mapped[int] = mapped_column(
+        Integer,
+        ForeignKey("campaigns.id")
     )
     
     # Método usado para fazer a atribuição
@@ -68,8 +77,37 @@ class AttributionLink(Base):
     
     # Relacionamentos
     deal = relationship("CRMDeal", back_populates="attributions")
-    campaign = relationship("AdCampaign", back_populates="attributions")
+    campaign = relationship("Campaign", back_populates="attributions")
     
     def __repr__(self) -> str:
         return f"<AttributionLink deal={self.deal_id} campaign={self.campaign_id} method={self.method.value}>"
 
+
+
+class AdClick(Base):
+    """
+    Clique de anúncio identificado (gclid/fbclid -> campanha)
+    
+    Vem de relatórios de clique (Google click_view) ou importações offline;
+    é o índice que permite atribuir deals por click id com confiança 1.0.
+    """
+    __tablename__ = "ad_clicks"
+    __table_args__ = (
+        UniqueConstraint("click_id", name="uq_ad_clicks_click_id"),
+    )
+    
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    click_id: Mapped[str] = mapped_column(String(255))
+    platform: Mapped[PlatformEnum] = mapped_column(SQLEnum(PlatformEnum))
+    campaign_id: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        ForeignKey("campaigns.id"),
+        nullable=True,
+        index=True
+    )
+    external_campaign_id: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    clicked_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<AdClick {self.click_id[:12]} campaign={self.campaign_id}>"
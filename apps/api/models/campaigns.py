@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, Enum, UniqueConstraint, Index
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
 import enum
@@ -56,20 +57,44 @@ class Campaign(Base):
     
     # Dados adicionais (JSON)
     extra_data = Column(Text, nullable=True)  # JSON com dados extras da API
+    
+    # Deals atribuídos (attribution_links)
+    attributions = relationship("AttributionLink", back_populates="campaign")
 
 
 class CampaignInsight(Base):
     """
     Histórico diário de métricas de campanhas
     Para análise de tendências
+    
+    Uma linha por campanha/dia (date = meia-noite); o worker grava com
+    upsert em (campaign_id, date), então reprocessar é idempotente.
+    
+    No PostgreSQL a tabela é particionada por mês em `date` (migração 003,
+    PK passa a ser (id, date)); filtrar sempre por intervalo de `date` para
+    ler só as partições necessárias. Meses além da retenção ficam apenas em
+    campaign_insights_rollup (worker/partitions.py).
     """
     __tablename__ = "campaign_insights"
+    __table_args__ = (
+        UniqueConstraint("campaign_id", "date", name="uq_campaign_insights_campaign_date"),
+        # Analytics: soma das métricas por intervalo de data (com ou sem plataforma)
+        Index(
+            "ix_campaign_insights_date_cover", "date",
+            postgresql_include=["platform", "spend", "impressions", "clicks", "leads"],
+        ),
+        Index(
+            "ix_campaign_insights_platform_date", "platform", "date",
+            postgresql_include=["spend", "impressions", "clicks", "leads"],
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     campaign_id = Column(Integer, index=True)
     external_campaign_id = Column(String(100), index=True)
+    platform = Column(Enum(PlatformEnum), nullable=True)
     
-    date = Column(DateTime, nullable=False, index=True)
+    date = Column(DateTime, nullable=False)
     
     # Snapshot das métricas do dia
     impressions = Column(Integer, default=0)
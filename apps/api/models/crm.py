@@ -5,7 +5,7 @@ import uuid
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional
-from sqlalchemy import String, Text, Numeric, DateTime, Enum as SQLEnum
+from sqlalchemy import String, Text, Numeric, DateTime, Enum as SQLEnum, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
@@ -26,6 +26,20 @@ class CRMDeal(Base):
     Contém informações do cliente, vendedor, valores e rastreamento UTM
     """
     __tablename__ = "crm_deals"
+    __table_args__ = (
+        # Analytics: intervalo de data_criacao agregando status/valor/vendedor/canal.
+        # INCLUDE (PostgreSQL) permite index-only scan; no SQLite vale a chave
+        Index(
+            "ix_crm_deals_data_criacao_status", "data_criacao", "status",
+            postgresql_include=["vendedor", "canal", "valor", "lucro_bruto"],
+        ),
+        # Filtro por status (+ intervalo): motivos de perda, totais ganhos, listagem
+        Index(
+            "ix_crm_deals_status_data_criacao", "status", "data_criacao",
+            postgresql_include=["motivo_perda", "valor", "lucro_bruto"],
+        ),
+        Index("ix_crm_deals_vendedor", "vendedor"),
+    )
     
     # Identificador
     id: Mapped[uuid.UUID] = mapped_column(
@@ -72,6 +86,14 @@ class CRMDeal(Base):
     email: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     nome_cliente: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     
+    # Cliente único: id do primeiro negócio com o mesmo telefone/e-mail
+    # (gravado pelo worker, tasks.leads.dedup_leads; nulo = ainda não agrupado)
+    lead_cluster_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+        index=True
+    )
+    
     # Origem e tracking
     origem: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
     canal: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
@@ -0,0 +1,420 @@
+"""
+Profiling por requisição (main.py e roi_api.py)
+
+Duas camadas:
+
+- Tempos por fase em toda requisição, agregados por rota: db (CRM externo
+  via shared.query_metrics + banco local via eventos do SQLAlchemy),
+  serialize (do retorno do endpoint até o início da resposta: pydantic,
+  jsonable_encoder/Decimal -> float, render do JSON) e compute (o resto).
+  Exportados no /metrics.
+- Profiler por amostragem, só quando pedido (header `X-Profile: 1` ou
+  `?profile=1`, autorizado pelo `authorize` de cada app) ou sorteado por
+  PROFILING_SAMPLE_RATE. Uma thread lê a pilha das threads da requisição a
+  cada PROFILING_INTERVAL_MS e grava em PROFILING_DIR:
+    <id>.collapsed  pilhas no formato "a;b;c N" (flamegraph.pl, speedscope)
+    <id>.json       resumo: fases, categorias, funções mais amostradas
+                    (próprias e, só do código da app, cumulativas)
+
+O endpoint async roda na thread do event loop; amostras dessa thread podem
+incluir outras requisições concorrentes (o profiling é para diagnóstico,
+não para contabilidade exata).
+"""
+import asyncio
+import contextvars
+import functools
+import hmac
+import json
+import os
+import random
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import structlog
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.requests import Request
+
+from shared import query_metrics
+
+logger = structlog.get_logger()
+
+PROFILE_DIR = os.getenv("PROFILING_DIR", "/tmp/crm-profiles")
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+KEEP_PROFILES = int(os.getenv("PROFILING_KEEP", "200"))
+
+PHASES = ("db", "serialize", "compute")
+# Frames fora daqui são código da aplicação (top_cumulativo_app)
+_LIB_PATHS = tuple({sysconfig.get_paths()[k] for k in ("stdlib", "platstdlib", "purelib", "platlib")})
+UNMATCHED = "<sem rota>"
+
+# Categoria de uma amostra pelo arquivo do frame mais interno reconhecido
+CATEGORIES = [
+    ("crm", ("pymysql",)),
+    ("db", ("sqlalchemy", "asyncpg", "aiosqlite", "sqlite3")),
+    ("encode", ("fastapi/encoders.py",)),
+    ("validation", ("pydantic",)),
+    ("render", ("json/", "orjson", "starlette/responses.py")),
+]
+
+
+# ============================================
+# TEMPOS DA REQUISIÇÃO
+# ============================================
+
+class RequestTimings:
+    """Estado mutável da requisição (visível também no threadpool)"""
+
+    __slots__ = ("route", "db", "endpoint_end", "db_at_endpoint_end", "threads")
+
+    def __init__(self):
+        self.route = UNMATCHED
+        self.db = 0.0
+        self.endpoint_end: Optional[float] = None
+        self.db_at_endpoint_end = 0.0
+        self.threads = {threading.get_ident()}
+
+
+_current: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def add_db_time(seconds: float):
+    """Soma tempo de banco na requisição corrente (se houver)"""
+    timings = _current.get()
+    if timings is not None:
+        timings.db += seconds
+
+
+query_metrics.REGISTRY.add_listener(lambda name, seconds: add_db_time(seconds))
+
+
+def instrument_engine_phases(sync_engine):
+    """Conta o tempo das queries de um engine SQLAlchemy na fase db"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("phase_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        add_db_time(time.perf_counter() - conn.info["phase_start"].pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _erro(context):
+        inicios = context.connection.info.get("phase_start") if context.connection is not None else None
+        if inicios:
+            add_db_time(time.perf_counter() - inicios.pop())
+
+
+def _wrap_endpoint(call, path: str):
+    """Marca rota e fim do endpoint; mantém assinatura e sync/async"""
+    if asyncio.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is not None:
+                timings.route = path
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings.endpoint_end = time.perf_counter()
+                    timings.db_at_endpoint_end = timings.db
+    else:
+        @functools.wraps(call)
+        def wrapper(*args, **kwargs):
+            # Roda no threadpool: a thread entra na amostragem
+            timings = _current.get()
+            if timings is not None:
+                timings.route = path
+                timings.threads.add(threading.get_ident())
+            try:
+                return call(*args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings.endpoint_end = time.perf_counter()
+                    timings.db_at_endpoint_end = timings.db
+    return wrapper
+
+
+def instrument_routes(app: FastAPI):
+    """
+    Instrumenta os endpoints já registrados
+
+    Chamar depois de todos os include_router. O handler do FastAPI chama
+    `dependant.call` a cada requisição, então trocar a função ali basta.
+    """
+    for route in app.routes:
+        if isinstance(route, APIRoute) and not getattr(route.dependant.call, "_profiled", False):
+            route.dependant.call = _wrap_endpoint(route.dependant.call, route.path)
+            route.dependant.call._profiled = True
+
+
+# ============================================
+# AGREGADO POR ROTA
+# ============================================
+
+class RouteTimings:
+    """Soma e contagem por rota x fase"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count: Counter = Counter()
+        self._seconds: Dict[Tuple[str, str, str], float] = {}
+
+    def observe(self, method: str, route: str, phases: Dict[str, float]):
+        with self._lock:
+            self._count[(method, route)] += 1
+            for phase, seconds in phases.items():
+                key = (method, route, phase)
+                self._seconds[key] = self._seconds.get(key, 0.0) + seconds
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                f"{method} {route}": {
+                    "count": n,
+                    **{p: round(self._seconds.get((method, route, p), 0.0), 6) for p in PHASES}
+                }
+                for (method, route), n in self._count.items()
+            }
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            linhas = [
+                "# HELP http_request_phase_seconds Tempo das requisições por rota e fase",
+                "# TYPE http_request_phase_seconds summary",
+            ]
+            for (method, route), n in sorted(self._count.items()):
+                rotulo = f'method="{method}",route="{query_metrics.escape_label(route)}"'
+                for phase in PHASES:
+                    total = self._seconds.get((method, route, phase), 0.0)
+                    linhas.append(f'http_request_phase_seconds_sum{{{rotulo},phase="{phase}"}} {total:.6f}')
+                    linhas.append(f'http_request_phase_seconds_count{{{rotulo},phase="{phase}"}} {n}')
+        return "\n".join(linhas) + "\n"
+
+
+ROUTE_TIMINGS = RouteTimings()
+
+
+def render_prometheus() -> str:
+    """Métricas do CRM (shared.query_metrics) + fases por rota"""
+    return query_metrics.render_prometheus() + ROUTE_TIMINGS.render_prometheus()
+
+
+# ============================================
+# PROFILER POR AMOSTRAGEM
+# ============================================
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _category(stack: Tuple[Tuple[str, str], ...]) -> str:
+    for _, filename in reversed(stack):
+        nome = filename.replace("\\", "/")
+        for categoria, padroes in CATEGORIES:
+            if any(p in nome for p in padroes):
+                return categoria
+    return "app"
+
+
+class Sampler(threading.Thread):
+    """Amostra as pilhas das threads da requisição até stop()"""
+
+    def __init__(self, timings: RequestTimings, interval: float):
+        super().__init__(name="request-profiler", daemon=True)
+        self.timings = timings
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for tid in list(self.timings.threads):
+                frame = frames.get(tid)
+                if frame is None:
+                    continue
+                pilha = []
+                while frame is not None:
+                    pilha.append((_frame_label(frame), frame.f_code.co_filename))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(pilha))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _summary(sampler: Sampler) -> dict:
+    total = sum(sampler.stacks.values()) or 1
+    self_count: Counter = Counter()
+    cumulative: Counter = Counter()
+    categorias: Counter = Counter()
+    for pilha, n in sampler.stacks.items():
+        self_count[pilha[-1][0]] += n
+        for label in {label for label, filename in pilha if not filename.startswith(_LIB_PATHS)}:
+            cumulative[label] += n
+        categorias[_category(pilha)] += n
+
+    def top(counter: Counter, limite: int = 25) -> List[dict]:
+        return [{"funcao": f, "amostras": n, "pct": round(n * 100 / total, 1)} for f, n in counter.most_common(limite)]
+
+    return {
+        "amostras": sum(sampler.stacks.values()),
+        "intervalo_ms": sampler.interval * 1000,
+        "categorias": {c: round(n * 100 / total, 1) for c, n in categorias.most_common()},
+        "top_self": top(self_count),
+        "top_cumulativo_app": top(cumulative),
+    }
+
+
+def _save_profile(profile_id: str, info: dict, sampler: Sampler):
+    """Grava o .collapsed e o .json e apaga os mais antigos além de KEEP_PROFILES"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, profile_id)
+    with open(base + ".collapsed", "w") as f:
+        for pilha, n in sampler.stacks.items():
+            f.write(";".join(label for label, _ in pilha) + f" {n}\n")
+    with open(base + ".json", "w") as f:
+        json.dump({**info, **_summary(sampler)}, f, ensure_ascii=False, indent=2)
+
+    resumos = sorted(
+        (os.path.join(PROFILE_DIR, n) for n in os.listdir(PROFILE_DIR) if n.endswith(".json")),
+        key=os.path.getmtime
+    )
+    for antigo in resumos[:-KEEP_PROFILES] if KEEP_PROFILES > 0 else []:
+        for ext in (".json", ".collapsed"):
+            try:
+                os.remove(antigo[:-len(".json")] + ext)
+            except OSError:
+                pass
+
+
+# ============================================
+# MIDDLEWARE
+# ============================================
+
+Authorizer = Callable[[Request], Awaitable[bool]]
+
+
+def token_authorizer(token: Optional[str]) -> Optional[Authorizer]:
+    """Autoriza quem manda `X-Profile-Token` igual a `token` (apps sem login)"""
+    if not token:
+        return None
+
+    async def authorize(request: Request) -> bool:
+        return hmac.compare_digest(request.headers.get("x-profile-token", ""), token)
+
+    return authorize
+
+
+def _requested(scope) -> bool:
+    for nome, valor in scope.get("headers", []):
+        if nome == b"x-profile":
+            return valor.strip() in (b"1", b"true")
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("profile", [""])[0] in ("1", "true")
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI: fases por rota sempre, profiler sob demanda
+
+    Args:
+        authorize: Decide se a requisição pode pedir profiling
+            (`X-Profile: 1` / `?profile=1`); sem ele, só a amostragem
+            por sample_rate liga o profiler
+        sample_rate: Fração das requisições perfiladas (0 = nenhuma)
+    """
+
+    def __init__(self, app, authorize: Optional[Authorizer] = None, sample_rate: float = SAMPLE_RATE):
+        self.app = app
+        self.authorize = authorize
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        sampler = None
+        try:
+            if await self._should_profile(scope):
+                sampler = Sampler(timings, INTERVAL_MS / 1000)
+                sampler.start()
+            inicio = time.perf_counter()
+            resposta = {"inicio": None, "status": 500}
+            profile_id = uuid.uuid4().hex[:12] if sampler else None
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    resposta["inicio"] = time.perf_counter()
+                    resposta["status"] = message["status"]
+                    if profile_id:
+                        message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                fim = resposta["inicio"] or time.perf_counter()
+                phases = self._phases(timings, inicio, fim)
+                ROUTE_TIMINGS.observe(scope.get("method", ""), timings.route, phases)
+                if sampler:
+                    sampler.stop()
+                    info = {
+                        "id": profile_id,
+                        "method": scope.get("method"),
+                        "path": scope.get("path"),
+                        "route": timings.route,
+                        "status": resposta["status"],
+                        "total_ms": round((fim - inicio) * 1000, 1),
+                        "fases_ms": {p: round(s * 1000, 1) for p, s in phases.items()},
+                    }
+                    try:
+                        await asyncio.get_running_loop().run_in_executor(
+                            None, _save_profile, profile_id, info, sampler
+                        )
+                        logger.info("Profile da requisição salvo", profile_id=profile_id,
+                                    route=timings.route, total_ms=info["total_ms"])
+                    except OSError as e:
+                        logger.warning("Falha ao salvar profile", profile_id=profile_id, error=str(e))
+                    sampler = None
+        finally:
+            if sampler:
+                sampler.stop()
+            _current.reset(token)
+
+    async def _should_profile(self, scope) -> bool:
+        if _requested(scope) and self.authorize is not None:
+            try:
+                if await self.authorize(Request(scope)):
+                    return True
+            except Exception as e:
+                logger.warning("Falha ao autorizar profiling", error=str(e))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @staticmethod
+    def _phases(timings: RequestTimings, inicio: float, fim: float) -> Dict[str, float]:
+        total = fim - inicio
+        serialize = 0.0
+        if timings.endpoint_end is not None:
+            # Depois do endpoint: encode/validação/render, menos banco (commit do get_db)
+            serialize = max(fim - timings.endpoint_end - (timings.db - timings.db_at_endpoint_end), 0.0)
+        db = min(timings.db, total)
+        return {"db": db, "serialize": serialize, "compute": max(total - db - serialize, 0.0)}
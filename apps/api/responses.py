@@ -0,0 +1,169 @@
+"""
+Respostas JSON com orjson e compressão (main.py e roi_api.py)
+
+- FastJSONResponse: classe de resposta padrão das duas apps. Serializa com
+  orjson; Decimal vira número como no jsonable_encoder do FastAPI (inteiro
+  sem casas decimais, float com), datetime/date/UUID/Enum são nativos do
+  orjson e modelos pydantic usam o serializador do próprio modelo.
+  Endpoints que devolvem listas grandes (linhas do DictCursor com Decimal e
+  datetime) retornam a resposta direto: o FastAPI só passa o retorno pelo
+  jsonable_encoder quando ele não é uma Response, e é esse passo que custa.
+- CompressionMiddleware: brotli (se instalado) ou gzip, conforme o
+  Accept-Encoding, para corpos JSON/texto acima de COMPRESSION_MIN_BYTES.
+  Corpos grandes são comprimidos numa thread para não segurar o event loop.
+
+Medido em infra/benchmarks/bench_serialization.py.
+"""
+import asyncio
+import gzip
+import os
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, List, Optional
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Opcional: sem o pacote, só gzip
+    brotli = None
+
+MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+THREAD_BYTES = 256 * 1024  # Acima disso a compressão sai do event loop
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+COMPRESSIBLE = ("application/json", "text/")
+
+
+# ============================================
+# JSON
+# ============================================
+
+def _default(obj: Any):
+    """Tipos que o orjson não serializa sozinho"""
+    if isinstance(obj, Decimal):
+        if not obj.is_finite():
+            return None  # NaN/Infinity não existem em JSON (como o orjson faz com float)
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, bytes):
+        return obj.decode()
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON (bytes) com as mesmas conversões da FastJSONResponse"""
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode()
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse com orjson (Decimal, datetime e modelos pydantic)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ============================================
+# COMPRESSÃO
+# ============================================
+
+def _qvalue(params: List[str]) -> float:
+    """q do Accept-Encoding (padrão 1); inválido conta como recusa"""
+    for param in params:
+        nome, _, valor = param.partition("=")
+        if nome.lower() == "q":
+            try:
+                return float(valor)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def _encoding(accept_encoding: str) -> Optional[str]:
+    aceitas = set()
+    for parte in accept_encoding.replace(" ", "").split(","):
+        codificacao, *params = parte.split(";")
+        # q=0, q=0.0, q=0.000: o cliente recusa a codificação
+        if codificacao and _qvalue(params) > 0:
+            aceitas.add(codificacao.lower())
+    if brotli is not None and "br" in aceitas:
+        return "br"
+    if "gzip" in aceitas:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI: comprime respostas completas acima de `minimum_size`
+
+    Respostas em streaming (more_body) e já codificadas passam intactas.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio = None
+
+        async def send_wrapper(message):
+            nonlocal inicio
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if inicio is None:
+                await send(message)
+                return
+
+            start, inicio = inicio, None
+            start["headers"] = list(start.get("headers", []))
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE)
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) > THREAD_BYTES:
+                body = await asyncio.to_thread(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -4,16 +4,26 @@ Conecta diretamente ao CRM MySQL, sem depender de PostgreSQL
 CORRIGIDO: Considera tanto ORIGEM quanto CANAL como fonte de mídia
 """
 import os
+import time
 import calendar
 from datetime import date, datetime
 from decimal import Decimal
 from typing import Optional, List, Dict
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import pymysql
 from pymysql.cursors import DictCursor
 
+from shared import query_metrics
+from shared.dedup import cluster
+import profiling
+from responses import CompressionMiddleware, FastJSONResponse
+from conditional import ConditionalGetMiddleware, VersionedRoute
+from shared.data_versions import CRM, AGENCY
+from shared.query_metrics import instrumented_cursor
+
 # Configurações do CRM
 CRM_HOST = os.getenv("EXTERNAL_CRM_HOST", "mysql.netcar-rc.com.br")
 CRM_PORT = int(os.getenv("EXTERNAL_CRM_PORT", "3306"))
@@ -77,7 +87,8 @@ AGENCY_DATA = {
 app = FastAPI(
     title="ROI Dashboard API",
     description="API para análise de ROI - CRM vs Agência (considera origem E canal)",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(
@@ -88,10 +99,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli acima de COMPRESSION_MIN_BYTES (dentro do profiling: conta como serialize)
+app.add_middleware(CompressionMiddleware)
+
+# ETag por versão de dados; If-None-Match igual -> 304 antes de consultar o CRM
+app.add_middleware(ConditionalGetMiddleware, routes=[VersionedRoute("/api/roi/", (CRM, AGENCY))])
+
+# Sem login nesta API: o profiling sob demanda exige X-Profile-Token = PROFILING_TOKEN
+app.add_middleware(
+    profiling.ProfilingMiddleware,
+    authorize=profiling.token_authorizer(os.getenv("PROFILING_TOKEN"))
+)
+
 
 def get_crm_connection():
-    """Conecta ao CRM MySQL"""
-    return pymysql.connect(
+    """Conecta ao CRM MySQL (o tempo de conexão vai para a primeira consulta)"""
+    inicio = time.perf_counter()
+    conn = pymysql.connect(
         host=CRM_HOST,
         port=CRM_PORT,
         database=CRM_DATABASE,
@@ -100,6 +124,8 @@ def get_crm_connection():
         cursorclass=DictCursor,
         charset='utf8mb4'
     )
+    query_metrics.mark_wait(conn, time.perf_counter() - inicio)
+    return conn
 
 
 def get_resumo_mes(ano: int, mes: int) -> dict:
@@ -117,7 +143,7 @@ def get_resumo_mes(ano: int, mes: int) -> dict:
         FROM crm_negocio
         WHERE YEAR(date_create) = %s AND MONTH(date_create) = %s
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_resumo_mes") as cursor:
             cursor.execute(query, (ano, mes))
             result = cursor.fetchone()
         
@@ -139,10 +165,45 @@ def get_resumo_mes(ano: int, mes: int) -> dict:
         conn.close()
 
 
-def get_resumo_midia_paga(ano: int, mes: int) -> dict:
+def _leads_unicos_midia(conn, periodo_sql: str, params: tuple, nome: str) -> dict:
+    """
+    Clientes distintos por plataforma de mídia paga no período
+
+    Negócios do mesmo cliente (telefone/e-mail, shared.dedup) contam como um
+    lead; vendas e valores continuam por negócio.
+    """
+    query = f"""
+    SELECT 
+        id_crm_negocio AS id,
+        celular,
+        email,
+        CASE 
+            WHEN origem = 'INSTAGRAM' OR canal = 'INSTAGRAM' THEN 'INSTAGRAM'
+            WHEN origem = 'FACEBOOK' OR canal = 'FACEBOOK' THEN 'FACEBOOK'
+            WHEN origem = 'GOOGLE' OR canal = 'GOOGLE' THEN 'GOOGLE'
+        END AS plataforma
+    FROM crm_negocio
+    WHERE (origem IN ('INSTAGRAM', 'FACEBOOK', 'GOOGLE') 
+           OR canal IN ('INSTAGRAM', 'FACEBOOK', 'GOOGLE'))
+      AND {periodo_sql}
+    ORDER BY date_create, id_crm_negocio
+    """
+    with instrumented_cursor(conn, nome) as cursor:
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+
+    clusters = cluster([(r["id"], r["celular"], r["email"]) for r in rows])
+    por_plataforma: Dict[str, set] = {}
+    for r in rows:
+        por_plataforma.setdefault(r["plataforma"], set()).add(clusters[r["id"]])
+    return {plat: len(ids) for plat, ids in por_plataforma.items()}
+
+
+def get_resumo_midia_paga(ano: int, mes: int, leads_unicos: bool = False) -> dict:
     """
     Busca resumo de mídia paga considerando ORIGEM ou CANAL
     CORRIGIDO: Um lead é considerado de mídia paga se origem OU canal for Instagram/Facebook/Google
+    leads_unicos: leads contados por cliente (mesmo telefone/e-mail = um lead)
     """
     conn = get_crm_connection()
     try:
@@ -166,7 +227,7 @@ def get_resumo_midia_paga(ano: int, mes: int) -> dict:
         GROUP BY plataforma
         ORDER BY ganhos DESC
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_resumo_midia_paga") as cursor:
             cursor.execute(query, (ano, mes))
             results = cursor.fetchall()
         
@@ -185,6 +246,14 @@ def get_resumo_midia_paga(ano: int, mes: int) -> dict:
                     'perdidos': r['perdidos'] or 0
                 }
         
+        if leads_unicos:
+            unicos = _leads_unicos_midia(
+                conn, "YEAR(date_create) = %s AND MONTH(date_create) = %s", (ano, mes),
+                "roi.get_resumo_midia_paga.leads_unicos"
+            )
+            for plat in dados:
+                dados[plat]['leads'] = unicos.get(plat, 0)
+        
         return dados
     finally:
         conn.close()
@@ -272,7 +341,7 @@ def get_resumo_mes_range(start: date, end: date) -> dict:
         FROM crm_negocio
         WHERE date_create >= %s AND date_create <= %s
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_resumo_mes_range") as cursor:
             cursor.execute(query, (start, end))
             result = cursor.fetchone()
 
@@ -294,8 +363,8 @@ def get_resumo_mes_range(start: date, end: date) -> dict:
         conn.close()
 
 
-def get_resumo_midia_paga_range(start: date, end: date) -> dict:
-    """Resumo de mídia paga no período (origem OU canal)."""
+def get_resumo_midia_paga_range(start: date, end: date, leads_unicos: bool = False) -> dict:
+    """Resumo de mídia paga no período (origem OU canal); leads_unicos conta clientes."""
     conn = get_crm_connection()
     try:
         query = """
@@ -317,7 +386,7 @@ def get_resumo_midia_paga_range(start: date, end: date) -> dict:
         GROUP BY plataforma
         ORDER BY ganhos DESC
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_resumo_midia_paga_range") as cursor:
             cursor.execute(query, (start, end))
             results = cursor.fetchall()
 
@@ -337,6 +406,14 @@ def get_resumo_midia_paga_range(start: date, end: date) -> dict:
                     "perdidos": int(r["perdidos"] or 0),
                 }
 
+        if leads_unicos:
+            unicos = _leads_unicos_midia(
+                conn, "date_create >= %s AND date_create <= %s", (start, end),
+                "roi.get_resumo_midia_paga_range.leads_unicos"
+            )
+            for plat in dados:
+                dados[plat]["leads"] = unicos.get(plat, 0)
+
         return dados
     finally:
         conn.close()
@@ -371,7 +448,7 @@ def get_vendas_midia_range(start: date, end: date) -> list:
           AND n.date_create >= %s AND n.date_create <= %s
         ORDER BY n.date_update DESC
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_vendas_midia_range") as cursor:
             cursor.execute(query, (start, end))
             return cursor.fetchall()
     finally:
@@ -407,7 +484,7 @@ def get_vendas_midia_detalhadas(ano: int, mes: int) -> list:
           AND YEAR(n.date_create) = %s AND MONTH(n.date_create) = %s
         ORDER BY n.date_update DESC
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_vendas_midia_detalhadas") as cursor:
             cursor.execute(query, (ano, mes))
             return cursor.fetchall()
     finally:
@@ -433,7 +510,7 @@ def get_resumo_por_vendedor_midia(ano: int, mes: int) -> list:
         GROUP BY n.id_user, u.name
         ORDER BY ganhos DESC
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_resumo_por_vendedor_midia") as cursor:
             cursor.execute(query, (ano, mes))
             results = cursor.fetchall()
         
@@ -466,7 +543,7 @@ def get_motivos_perda_midia(ano: int, mes: int) -> list:
         ORDER BY quantidade DESC
         LIMIT 10
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_motivos_perda_midia") as cursor:
             cursor.execute(query, (ano, mes))
             results = cursor.fetchall()
         
@@ -505,7 +582,7 @@ def get_resumo_por_origem(ano: int, mes: int) -> list:
         GROUP BY grupo_origem
         ORDER BY ganhos DESC
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_resumo_por_origem") as cursor:
             cursor.execute(query, (ano, mes))
             results = cursor.fetchall()
         
@@ -538,7 +615,7 @@ def get_resumo_por_vendedor(ano: int, mes: int) -> list:
         GROUP BY n.id_user, u.name
         ORDER BY ganhos DESC
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_resumo_por_vendedor") as cursor:
             cursor.execute(query, (ano, mes))
             results = cursor.fetchall()
         
@@ -571,7 +648,7 @@ def get_motivos_perda(ano: int, mes: int) -> list:
         ORDER BY quantidade DESC
         LIMIT 10
         """
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_motivos_perda") as cursor:
             cursor.execute(query, (ano, mes))
             results = cursor.fetchall()
         
@@ -599,11 +676,18 @@ async def health():
         return {"status": "unhealthy", "error": str(e)}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas das consultas ao CRM e fases por rota no formato do Prometheus"""
+    return PlainTextResponse(profiling.render_prometheus(), media_type=query_metrics.CONTENT_TYPE)
+
+
 @app.get("/api/roi/dashboard/{ano}/{mes}")
-async def get_dashboard(ano: int, mes: int):
+async def get_dashboard(ano: int, mes: int, leads_unicos: bool = False):
     """
     Dashboard principal de cruzamento CRM vs Agência
     CORRIGIDO: Considera origem OU canal como fonte de mídia paga
+    leads_unicos: leads (e CPL) por cliente, não por negócio
     """
     
     periodo_key = f"{ano}-{mes:02d}"
@@ -621,7 +705,7 @@ async def get_dashboard(ano: int, mes: int):
     try:
         # Buscar dados reais do CRM
         resumo_mes = get_resumo_mes(ano, mes)
-        resumo_midia = get_resumo_midia_paga(ano, mes)
+        resumo_midia = get_resumo_midia_paga(ano, mes, leads_unicos)
         resumo_origem = get_resumo_por_origem(ano, mes)
         
     except Exception as e:
@@ -714,6 +798,7 @@ async def get_dashboard(ano: int, mes: int):
     
     return {
         "periodo": f"{mes:02d}/{ano}",
+        "leads_unicos": leads_unicos,
         "investimento_total": investimento_total,
         "leads_agencia": leads_agencia,
         "leads_crm": leads_midia,  # Leads de mídia paga no CRM
@@ -792,12 +877,13 @@ async def get_vendas_detalhadas(ano: int, mes: int):
         
         total = sum(r['valor'] for r in resultado)
         
-        return {
+        # Resposta direta: lista grande, sem passar pelo jsonable_encoder
+        return FastJSONResponse({
             "periodo": f"{mes:02d}/{ano}",
             "total_vendas": len(resultado),
             "valor_total": total,
             "vendas": resultado
-        }
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -986,10 +1072,12 @@ async def get_comparativo_periodo():
 async def get_consolidado(
     start: str = "2025-10-01",
     end: str = "2026-01-14",
+    leads_unicos: bool = False,
 ):
     """
     Retorna o consolidado do período (por date_create no CRM).
     Default: 01/10/2025 a 14/01/2026.
+    leads_unicos: leads (e CPL) por cliente, não por negócio.
     """
     try:
         start_d = _parse_ymd(start)
@@ -1001,7 +1089,7 @@ async def get_consolidado(
 
     # CRM (período)
     resumo_mes = get_resumo_mes_range(start_d, end_d)
-    resumo_midia = get_resumo_midia_paga_range(start_d, end_d)
+    resumo_midia = get_resumo_midia_paga_range(start_d, end_d, leads_unicos)
 
     # Agência (soma pró-rateada do período)
     agencia_sum = _agency_sum_for_range(start_d, end_d)
@@ -1071,6 +1159,7 @@ async def get_consolidado(
         "periodo": f"{start_d.strftime('%d/%m/%Y')} a {end_d.strftime('%d/%m/%Y')}",
         "periodo_inicio": start_d.strftime("%Y-%m-%d"),
         "periodo_fim": end_d.strftime("%Y-%m-%d"),
+        "leads_unicos": leads_unicos,
         "investimento_total": round(investimento_total, 2),
         "leads_agencia": int(leads_agencia),
         "leads_crm": leads_midia,
@@ -1158,12 +1247,13 @@ async def get_vendas_consolidado(
         })
 
     total = sum(r["valor"] for r in resultado)
-    return {
+    # Resposta direta: lista grande, sem passar pelo jsonable_encoder
+    return FastJSONResponse({
         "periodo": f"{start_d.strftime('%d/%m/%Y')} a {end_d.strftime('%d/%m/%Y')}",
         "total_vendas": len(resultado),
         "valor_total": total,
         "vendas": resultado,
-    }
+    })
 
 
 @app.get("/api/roi/qualidade-leads")
@@ -1194,7 +1284,7 @@ async def get_qualidade_leads():
         ORDER BY total_leads DESC
         """
         
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_qualidade_leads.origens") as cursor:
             cursor.execute(query_origens)
             origens_raw = cursor.fetchall()
         
@@ -1227,7 +1317,7 @@ async def get_qualidade_leads():
           AND date_create >= '2025-10-01' AND date_create <= '2026-01-14'
         """
         
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_qualidade_leads.midia") as cursor:
             cursor.execute(query_midia)
             midia = cursor.fetchone()
         
@@ -1251,7 +1341,7 @@ async def get_qualidade_leads():
         LIMIT 10
         """
         
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_qualidade_leads.motivos") as cursor:
             cursor.execute(query_motivos)
             motivos_raw = cursor.fetchall()
         
@@ -1276,7 +1366,7 @@ async def get_qualidade_leads():
           AND date_create >= '2025-10-01' AND date_create <= '2026-01-14'
         """
         
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_qualidade_leads.indicacao") as cursor:
             cursor.execute(query_indicacao)
             ind = cursor.fetchone()
         
@@ -1301,7 +1391,7 @@ async def get_qualidade_leads():
         ORDER BY ganhos DESC
         """
         
-        with conn.cursor() as cursor:
+        with instrumented_cursor(conn, "roi.get_qualidade_leads.vendedores") as cursor:
             cursor.execute(query_vendedores)
             vendedores_raw = cursor.fetchall()
         
@@ -1384,6 +1474,10 @@ async def get_qualidade_leads():
         conn.close()
 
 
+# Depois de todas as rotas: marca rota e fim do endpoint para as fases
+profiling.instrument_routes(app)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -7,7 +7,7 @@ from typing import Optional, List
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select, func
+from sqlalchemy import select, func, cast, Integer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
@@ -187,7 +187,7 @@ async def run_analysis(
     # --- Análise 2: Taxa de perda alta ---
     deals_query = select(
         func.count(CRMDeal.id).label('total'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.PERDIDO, int)).label('perdidos')
+        func.sum(cast(CRMDeal.status == DealStatus.PERDIDO, Integer)).label('perdidos')
     ).where(
         CRMDeal.data_criacao >= datetime.combine(data_inicio, datetime.min.time()),
         CRMDeal.data_criacao <= datetime.combine(data_fim, datetime.max.time())
@@ -6,7 +6,7 @@ from decimal import Decimal
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, func, and_, cast, Integer
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
@@ -21,9 +21,15 @@ from schemas.analytics import (
     VendedorMetrics,
     VendedorListResponse,
     FunnelMetrics,
-    MotivoPerdaItem
+    MotivoPerdaItem,
+    CampaignROI,
+    CampaignROIResponse,
+    UTMResolutionResponse,
+    AttributionModelsResponse
 )
 from routers.auth import get_current_user
+from services.attribution import campaign_roi, utm_resolution
+from services.multitouch import compare_attribution_models
 
 router = APIRouter()
 
@@ -84,8 +90,8 @@ async def get_dashboard_overview(
     # --- Métricas de CRM ---
     deals_query = select(
         func.count(CRMDeal.id),
-        func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int)),
-        func.sum(func.cast(CRMDeal.status == DealStatus.PERDIDO, int)),
+        func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer)),
+        func.sum(cast(CRMDeal.status == DealStatus.PERDIDO, Integer)),
         func.sum(CRMDeal.valor).filter(CRMDeal.status == DealStatus.GANHO),
         func.sum(CRMDeal.lucro_bruto).filter(CRMDeal.status == DealStatus.GANHO)
     ).where(
@@ -105,7 +111,7 @@ async def get_dashboard_overview(
     deals_anterior = await db.execute(
         select(
             func.count(CRMDeal.id),
-            func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int))
+            func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer))
         ).where(
             CRMDeal.data_criacao >= datetime.combine(data_inicio_anterior, datetime.min.time()),
             CRMDeal.data_criacao <= datetime.combine(data_fim_anterior, datetime.max.time())
@@ -137,7 +143,7 @@ async def get_dashboard_overview(
     serie_query = select(
         func.date_trunc('day', CRMDeal.data_criacao).label('dia'),
         func.count(CRMDeal.id).label('deals'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int)).label('ganhos')
+        func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer)).label('ganhos')
     ).where(
         CRMDeal.data_criacao >= datetime.combine(data_inicio, datetime.min.time()),
         CRMDeal.data_criacao <= datetime.combine(data_fim, datetime.max.time())
@@ -223,11 +229,14 @@ async def get_dashboard_overview(
 @router.get("/channels", response_model=ChannelComparisonResponse)
 async def get_channel_comparison(
     dias: int = Query(30, ge=1, le=365),
+    leads_unicos: bool = Query(False),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Comparação de performance entre canais (Google vs Meta)
+    
+    leads_unicos conta deals por cliente (mesmo telefone/e-mail = um lead)
     """
     data_fim = date.today()
     data_inicio = data_fim - timedelta(days=dias)
@@ -256,9 +265,13 @@ async def get_channel_comparison(
         
         # Métricas de CRM por canal
         canal_name = "Google" if platform == AdPlatform.GOOGLE else "Meta"
+        if leads_unicos:
+            total_deals = func.count(func.distinct(func.coalesce(CRMDeal.lead_cluster_id, CRMDeal.id)))
+        else:
+            total_deals = func.count(CRMDeal.id)
         deals_query = select(
-            func.count(CRMDeal.id),
-            func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int)),
+            total_deals,
+            func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer)),
             func.sum(CRMDeal.valor).filter(CRMDeal.status == DealStatus.GANHO)
         ).where(
             CRMDeal.canal.ilike(f"%{canal_name}%"),
@@ -295,6 +308,7 @@ async def get_channel_comparison(
     return ChannelComparisonResponse(
         periodo_inicio=data_inicio,
         periodo_fim=data_fim,
+        leads_unicos=leads_unicos,
         canais=canais
     )
 
@@ -314,9 +328,9 @@ async def get_vendedores_metrics(
     query = select(
         CRMDeal.vendedor,
         func.count(CRMDeal.id).label('total'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int)).label('ganhos'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.PERDIDO, int)).label('perdidos'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.ABERTO, int)).label('abertos'),
+        func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer)).label('ganhos'),
+        func.sum(cast(CRMDeal.status == DealStatus.PERDIDO, Integer)).label('perdidos'),
+        func.sum(cast(CRMDeal.status == DealStatus.ABERTO, Integer)).label('abertos'),
         func.sum(CRMDeal.valor).filter(CRMDeal.status == DealStatus.GANHO).label('valor'),
         func.sum(CRMDeal.lucro_bruto).filter(CRMDeal.status == DealStatus.GANHO).label('lucro')
     ).where(
@@ -382,9 +396,9 @@ async def get_funnel_metrics(
     # Deals
     deals_query = select(
         func.count(CRMDeal.id).label('total'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int)).label('ganhos'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.PERDIDO, int)).label('perdidos'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.ABERTO, int)).label('abertos')
+        func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer)).label('ganhos'),
+        func.sum(cast(CRMDeal.status == DealStatus.PERDIDO, Integer)).label('perdidos'),
+        func.sum(cast(CRMDeal.status == DealStatus.ABERTO, Integer)).label('abertos')
     ).where(
         CRMDeal.data_criacao >= datetime.combine(data_inicio, datetime.min.time()),
         CRMDeal.data_criacao <= datetime.combine(data_fim, datetime.max.time())
@@ -429,8 +443,8 @@ async def get_funnel_metrics(
     serie_query = select(
         func.date_trunc('day', CRMDeal.data_criacao).label('dia'),
         func.count(CRMDeal.id).label('total'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int)).label('ganhos'),
-        func.sum(func.cast(CRMDeal.status == DealStatus.PERDIDO, int)).label('perdidos')
+        func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer)).label('ganhos'),
+        func.sum(cast(CRMDeal.status == DealStatus.PERDIDO, Integer)).label('perdidos')
     ).where(
         CRMDeal.data_criacao >= datetime.combine(data_inicio, datetime.min.time()),
         CRMDeal.data_criacao <= datetime.combine(data_fim, datetime.max.time())
@@ -488,7 +502,7 @@ async def get_kpis(
     deals = await db.execute(
         select(
             func.count(CRMDeal.id),
-            func.sum(func.cast(CRMDeal.status == DealStatus.GANHO, int)),
+            func.sum(cast(CRMDeal.status == DealStatus.GANHO, Integer)),
             func.sum(CRMDeal.valor).filter(CRMDeal.status == DealStatus.GANHO),
             func.sum(CRMDeal.lucro_bruto).filter(CRMDeal.status == DealStatus.GANHO)
         ).where(
@@ -516,3 +530,78 @@ async def get_kpis(
         "roas": receita / gasto_total if gasto_total > 0 else 0
     }
 
+
+@router.get("/campaigns/roi", response_model=CampaignROIResponse)
+async def get_campaigns_roi(
+    dias: int = Query(30, ge=1, le=365),
+    min_confidence: Decimal = Query(Decimal("0"), ge=0, le=1),
+    leads_unicos: bool = Query(False),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    ROI por campanha a partir dos deals ligados (attribution_links)
+    
+    min_confidence descarta ligações fracas (ex.: 0.9 = só click id e id externo)
+    leads_unicos conta deals (e CPL) por cliente em vez de por negócio
+    """
+    data_fim = date.today()
+    data_inicio = data_fim - timedelta(days=dias)
+    
+    campanhas = await campaign_roi(db, data_inicio, data_fim, min_confidence, leads_unicos)
+    
+    return CampaignROIResponse(
+        periodo_inicio=data_inicio,
+        periodo_fim=data_fim,
+        leads_unicos=leads_unicos,
+        campanhas=[CampaignROI(**c) for c in campanhas]
+    )
+
+
+@router.get("/campaigns/utm-match", response_model=UTMResolutionResponse)
+async def get_utm_resolution(
+    dias: int = Query(30, ge=1, le=365),
+    limit: int = Query(200, ge=1, le=2000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    utm_campaign dos deals do período e a campanha que cada um recebe
+    (nome exato ou aproximado); os sem campanha indicam UTM a corrigir
+    """
+    data_fim = date.today()
+    data_inicio = data_fim - timedelta(days=dias)
+    
+    return UTMResolutionResponse(
+        periodo_inicio=data_inicio,
+        periodo_fim=data_fim,
+        utms=await utm_resolution(db, data_inicio, data_fim, limit)
+    )
+
+
+@router.get("/attribution/models", response_model=AttributionModelsResponse)
+async def get_attribution_models(
+    dias: int = Query(365, ge=1, le=730),
+    lookback_dias: int = Query(90, ge=0, le=365),
+    meia_vida_dias: float = Query(7.0, gt=0, le=90),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Crédito por canal em cada modelo multi-touch
+    
+    Contatos = negócios do mesmo lead (telefone/e-mail) e cliques de anúncio
+    dos seus click ids; conversão = negócio ganho no período
+    """
+    data_fim = date.today()
+    data_inicio = data_fim - timedelta(days=dias)
+    
+    resultado = await compare_attribution_models(db, data_inicio, data_fim, lookback_dias, meia_vida_dias)
+    
+    return AttributionModelsResponse(
+        periodo_inicio=data_inicio,
+        periodo_fim=data_fim,
+        lookback_dias=lookback_dias,
+        meia_vida_dias=meia_vida_dias,
+        **resultado
+    )
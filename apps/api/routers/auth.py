@@ -5,7 +5,7 @@ from datetime import datetime, timedelta
 from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -13,7 +13,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import get_settings
-from database import get_db
+from database import get_db, async_session_maker
 from models import User
 from schemas.auth import Token, TokenData, UserCreate, UserResponse, LoginRequest
 
@@ -95,6 +95,40 @@ async def get_current_admin_user(
     return current_user
 
 
+async def has_valid_token(request: Request) -> bool:
+    """
+    Token Bearer válido e não expirado? (só a assinatura, sem consultar o banco)
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return bool(jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub"))
+    except JWTError:
+        return False
+
+
+async def is_admin_request(request: Request) -> bool:
+    """
+    Token Bearer de um admin ativo? (usado fora das dependências, ex: middleware)
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user_id = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+        user_id = UUID(user_id) if user_id else None
+    except (JWTError, ValueError):
+        return False
+    if user_id is None:
+        return False
+    
+    async with async_session_maker() as db:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+    return bool(user and user.is_active and user.is_admin)
+
+
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -13,6 +13,7 @@ from schemas.campaigns import (
     PlatformEnum
 )
 from services.campaign_integrator import CampaignIntegrator
+from shared.query_metrics import instrument_engine
 import os
 
 router = APIRouter(prefix="/campaigns", tags=["Campanhas"])
@@ -25,7 +26,7 @@ def get_crm_db():
     
     CRM_DATABASE_URL = f"mysql+pymysql://{os.getenv('CRM_DB_USER', 'netcarrc01_add1')}:{os.getenv('CRM_DB_PASS', 'netcar2025')}@{os.getenv('CRM_DB_HOST', 'mysql.netcar-rc.com.br')}/{os.getenv('CRM_DB_NAME', 'netcarrc01')}"
     
-    engine = create_engine(CRM_DATABASE_URL)
+    engine = instrument_engine(create_engine(CRM_DATABASE_URL), "campaigns.crm_db")
     SessionLocal = sessionmaker(bind=engine)
     db = SessionLocal()
     try:
@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
 from models import User
+from responses import FastJSONResponse
 from models.crm import CRMDeal, DealStatus
 from schemas.crm import (
     CRMDealCreate,
@@ -22,9 +23,21 @@ from schemas.crm import (
     CRMImportResult
 )
 from routers.auth import get_current_user
+from services.kpi_dirty import mark_kpi_days_dirty
+from services.data_versions import bump_data_version
+from shared.data_versions import CRM
+from shared.utils import extract_utm_params_batch
 
 router = APIRouter()
 
+# Colunas de rastreamento que a coluna `url` do CSV pode preencher
+TRACKING_FIELDS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_content', 'utm_term', 'gclid', 'fbclid')
+
+
+def _tracking(row: dict, da_url: dict, campo: str) -> Optional[str]:
+    """Coluna explícita do CSV; vazia, o parâmetro da URL de entrada"""
+    return (row.get(campo) or '').strip() or da_url.get(campo) or None
+
 
 @router.get("/deals", response_model=CRMDealListResponse)
 async def list_deals(
@@ -78,13 +91,14 @@ async def list_deals(
     result = await db.execute(query)
     deals = result.scalars().all()
     
-    return CRMDealListResponse(
+    # Modelo já validado: serializa direto, sem revalidar pelo response_model
+    return FastJSONResponse(CRMDealListResponse(
         items=[CRMDealResponse.model_validate(d) for d in deals],
         total=total,
         page=page,
         page_size=page_size,
         pages=(total + page_size - 1) // page_size
-    )
+    ))
 
 
 @router.get("/deals/{deal_id}", response_model=CRMDealResponse)
@@ -125,7 +139,9 @@ async def create_deal(
         deal.data_criacao = deal_data.data_criacao
     
     db.add(deal)
+    await mark_kpi_days_dirty(db, [deal.data_criacao or datetime.utcnow()])
     await db.commit()
+    await bump_data_version(CRM)
     await db.refresh(deal)
     
     return deal
@@ -150,6 +166,7 @@ async def update_deal(
         raise HTTPException(status_code=404, detail="Deal não encontrado")
     
     update_data = deal_data.model_dump(exclude_unset=True)
+    dias_alterados = [deal.data_criacao]
     
     for field, value in update_data.items():
         if field == "status" and value:
@@ -157,7 +174,11 @@ async def update_deal(
         else:
             setattr(deal, field, value)
     
+    # Se a data de criação mudou, o dia antigo e o novo ficam sujos
+    dias_alterados.append(deal.data_criacao)
+    await mark_kpi_days_dirty(db, dias_alterados)
     await db.commit()
+    await bump_data_version(CRM)
     await db.refresh(deal)
     
     return deal
@@ -180,8 +201,10 @@ async def delete_deal(
     if not deal:
         raise HTTPException(status_code=404, detail="Deal não encontrado")
     
+    await mark_kpi_days_dirty(db, [deal.data_criacao])
     await db.delete(deal)
     await db.commit()
+    await bump_data_version(CRM)
 
 
 @router.post("/import", response_model=CRMImportResult)
@@ -207,11 +230,13 @@ async def import_deals(
     - origem
     - canal
     - utm_source
+    - utm_medium
     - utm_campaign
     - utm_content
     - utm_term
     - gclid
     - fbclid
+    - url (página de entrada; UTMs, gclid e fbclid dela preenchem as colunas vazias)
     - veiculo_interesse
     - observacoes
     """
@@ -229,13 +254,16 @@ async def import_deals(
     except UnicodeDecodeError:
         text = content.decode('latin-1')
     
-    reader = csv.DictReader(io.StringIO(text))
+    linhas = list(csv.DictReader(io.StringIO(text)))
+    # Parâmetros das URLs extraídos da coluna inteira (URLs se repetem muito)
+    das_urls = extract_utm_params_batch([(row.get('url') or '').strip() for row in linhas])
     
     total_linhas = 0
     importados = 0
     erros = []
+    dias_alterados = set()
     
-    for row_num, row in enumerate(reader, start=2):  # Linha 1 é cabeçalho
+    for row_num, (row, da_url) in enumerate(zip(linhas, das_urls), start=2):  # Linha 1 é cabeçalho
         total_linhas += 1
         
         try:
@@ -292,18 +320,13 @@ async def import_deals(
                 nome_cliente=row.get('nome_cliente', '').strip() or None,
                 origem=row.get('origem', '').strip() or None,
                 canal=row.get('canal', '').strip() or None,
-                utm_source=row.get('utm_source', '').strip() or None,
-                utm_medium=row.get('utm_medium', '').strip() or None,
-                utm_campaign=row.get('utm_campaign', '').strip() or None,
-                utm_content=row.get('utm_content', '').strip() or None,
-                utm_term=row.get('utm_term', '').strip() or None,
-                gclid=row.get('gclid', '').strip() or None,
-                fbclid=row.get('fbclid', '').strip() or None,
+                **{campo: _tracking(row, da_url, campo) for campo in TRACKING_FIELDS},
                 veiculo_interesse=row.get('veiculo_interesse', '').strip() or None,
                 observacoes=row.get('observacoes', '').strip() or None
             )
             
             db.add(deal)
+            dias_alterados.add(deal.data_criacao)
             importados += 1
             
         except Exception as e:
@@ -313,7 +336,10 @@ async def import_deals(
                 "dados": dict(row)
             })
     
+    await mark_kpi_days_dirty(db, dias_alterados)
     await db.commit()
+    if importados:
+        await bump_data_version(CRM)
     
     return CRMImportResult(
         total_linhas=total_linhas,
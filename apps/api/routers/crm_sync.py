@@ -4,13 +4,15 @@ Router para sincronização com CRM externo
 from datetime import date, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import get_db
 from models import User
 from services.external_crm import get_external_crm
 from services.crm_sync import CRMSyncService
+from services.kpi_store import get_kpi_store
+from shared.kpi_snapshots import PANELS
 from routers.auth import get_current_user, get_current_admin_user
 
 router = APIRouter()
@@ -121,52 +123,98 @@ async def get_realtime_resumo(
 ):
     """
     Dados em tempo real do CRM externo - Resumo do mês
+    
+    Servido a partir do snapshot publicado pelo worker (a cada 3 min),
+    sem consultar o CRM na requisição.
     """
-    external = get_external_crm()
+    periodo = date.today().strftime("%Y-%m")
+    snapshot = await get_kpi_store().get(periodo)
     
-    try:
-        resumo = external.get_resumo_mensal()
-        return resumo
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Erro ao consultar CRM: {str(e)}")
+    if snapshot is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Snapshot de KPIs ainda não publicado pelo worker"
+        )
+    
+    return {
+        "periodo": snapshot["periodo"],
+        "total_leads": snapshot["total_leads"],
+        "ganhos": snapshot["ganhos"],
+        "perdidos": snapshot["perdidos"],
+        "em_andamento": snapshot["em_andamento"],
+        "taxa_conversao": snapshot["taxa_conversao"],
+        "valor_vendido": snapshot["valor_vendido"],
+        "ticket_medio": snapshot["ticket_medio"],
+        "version": snapshot["version"]
+    }
 
 
-@router.get("/realtime/vendedores")
-async def get_realtime_vendedores(
-    dias: int = Query(30, ge=1, le=365),
+@router.get("/realtime/snapshot")
+async def get_realtime_snapshot(
+    grupo: Optional[str] = Query(None, description="META, GOOGLE, PORTAIS..."),
+    vendedor_id: Optional[int] = None,
+    periodo: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Performance por vendedor em tempo real
+    KPIs pré-calculados por período, grupo de origem e vendedor
+    
+    Leitura O(1) do snapshot versionado; não consulta o CRM.
     """
-    external = get_external_crm()
+    periodo = periodo or date.today().strftime("%Y-%m")
+    store = get_kpi_store()
+    snapshot = await store.get(periodo, grupo=grupo, vendedor_id=vendedor_id)
     
-    data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=dias)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Nenhum snapshot para este período/recorte"
+        )
+    
+    return {
+        "kpis": snapshot,
+        "meta": await store.get_meta(periodo)
+    }
+
+
+async def _painel(nome: str, dias: Optional[int] = None) -> Response:
+    """Painel publicado pelo worker (get_realtime_kpis), sem consultar o CRM"""
+    janelas = PANELS[nome]
+    if dias is not None and dias not in janelas:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Janela não publicada; use dias em {list(janelas)}"
+        )
     
-    try:
-        return external.get_resumo_por_vendedor(data_inicio, data_fim)
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Erro ao consultar CRM: {str(e)}")
+    raw = await get_kpi_store().get_panel(nome, dias)
+    if raw is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Snapshot de KPIs ainda não publicado pelo worker"
+        )
+    return Response(content=raw, media_type="application/json")
+
+
+@router.get("/realtime/vendedores")
+async def get_realtime_vendedores(
+    dias: int = Query(30, description="Janela: 7, 30, 90 ou 365"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Performance por vendedor (snapshot do worker, a cada 3 min)
+    """
+    return await _painel("vendedores", dias)
 
 
 @router.get("/realtime/origens")
 async def get_realtime_origens(
-    dias: int = Query(30, ge=1, le=365),
+    dias: int = Query(30, description="Janela: 7, 30, 90 ou 365"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Performance por origem em tempo real
+    Performance por origem (snapshot do worker, a cada 3 min)
     """
-    external = get_external_crm()
-    
-    data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=dias)
-    
-    try:
-        return external.get_resumo_por_origem(data_inicio, data_fim)
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Erro ao consultar CRM: {str(e)}")
+    return await _painel("origens", dias)
 
 
 @router.get("/realtime/funil")
@@ -174,66 +222,39 @@ async def get_realtime_funil(
     current_user: User = Depends(get_current_user)
 ):
     """
-    Estado atual do funil em tempo real
+    Estado atual do funil (snapshot do worker, a cada 3 min)
     """
-    external = get_external_crm()
-    
-    try:
-        return external.get_funil()
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Erro ao consultar CRM: {str(e)}")
+    return await _painel("funil")
 
 
 @router.get("/realtime/motivos-perda")
 async def get_realtime_motivos_perda(
-    dias: int = Query(30, ge=1, le=365),
+    dias: int = Query(30, description="Janela: 7, 30, 90 ou 365"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Motivos de perda em tempo real
+    Top 20 motivos de perda (snapshot do worker, a cada 3 min)
     """
-    external = get_external_crm()
-    
-    data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=dias)
-    
-    try:
-        return external.get_motivos_perda(data_inicio, data_fim)
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Erro ao consultar CRM: {str(e)}")
+    return await _painel("motivos-perda", dias)
 
 
 @router.get("/realtime/leads-parados")
 async def get_realtime_leads_parados(
-    dias: int = Query(7, ge=1, le=30),
+    dias: int = Query(7, description="Parados há mais de 3, 7, 14 ou 30 dias"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Leads parados há mais de X dias
+    Leads parados há mais de X dias (snapshot do worker, a cada 3 min)
     """
-    external = get_external_crm()
-    
-    try:
-        return external.get_leads_parados(dias)
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Erro ao consultar CRM: {str(e)}")
+    return await _painel("leads-parados", dias)
 
 
 @router.get("/realtime/meta-vs-google")
 async def get_realtime_meta_vs_google(
-    dias: int = Query(30, ge=1, le=365),
+    dias: int = Query(30, description="Janela: 7, 30, 90 ou 365"),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Comparativo META vs GOOGLE em tempo real
+    Comparativo META vs GOOGLE (snapshot do worker, a cada 3 min)
     """
-    external = get_external_crm()
-    
-    data_fim = date.today()
-    data_inicio = data_fim - timedelta(days=dias)
-    
-    try:
-        return external.get_comparativo_meta_google(data_inicio, data_fim)
-    except Exception as e:
-        raise HTTPException(status_code=503, detail=f"Erro ao consultar CRM: {str(e)}")
-
+    return await _painel("meta-vs-google", dias)
@@ -8,6 +8,8 @@ from fastapi import APIRouter, HTTPException, Depends
 import structlog
 
 from services.external_crm import get_external_crm, ExternalCRMClient
+from services.data_versions import bump_data_version
+from shared.data_versions import AGENCY
 from schemas.agency import (
     AgencyReportCreate,
     AgencyReportResponse,
@@ -340,6 +342,7 @@ async def create_agency_report(report: AgencyReportCreate):
         "instagram_stories": report.instagram_stories,
         "instagram_likes": report.instagram_likes
     }
+    await bump_data_version(AGENCY)
     
     return {
         "message": f"Relatório {periodo_key} cadastrado com sucesso",
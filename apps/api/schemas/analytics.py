@@ -73,6 +73,7 @@ class ChannelComparisonResponse(BaseModel):
     """Comparação entre canais"""
     periodo_inicio: date
     periodo_fim: date
+    leads_unicos: bool = False  # deals contados por cliente (lead_cluster_id)
     canais: List[ChannelMetrics]
 
 
@@ -127,3 +128,78 @@ class FunnelMetrics(BaseModel):
     # Série temporal
     serie_diaria: List[Dict]
 
+
+
+class CampaignROI(BaseModel):
+    """ROI de uma campanha pelos deals atribuídos (pesados pela confiança)"""
+    campaign_id: int
+    nome: str
+    plataforma: Optional[str]
+    gasto: Decimal
+    leads_plataforma: int
+    impressoes: int = 0
+    cliques: int = 0
+    cpc: float = 0.0  # Métricas da plataforma (0 sem cliques/impressões/leads)
+    cpm: float = 0.0
+    ctr: float = 0.0
+    cpl_plataforma: float = 0.0  # Gasto por lead reportado pela plataforma
+    deals: Decimal
+    vendas: Decimal
+    receita: Decimal
+    lucro_bruto: Decimal
+    cpl: Optional[Decimal]  # Gasto por deal (ou por cliente, em leads únicos)
+    cpa: Optional[Decimal]
+    roas: Optional[Decimal]
+    roi: Optional[Decimal]  # % sobre o gasto, pelo lucro bruto
+
+
+class CampaignROIResponse(BaseModel):
+    """ROI por campanha no período"""
+    periodo_inicio: date
+    periodo_fim: date
+    leads_unicos: bool = False  # deals contados por cliente (lead_cluster_id)
+    campanhas: List[CampaignROI]
+
+
+class UTMCampaignCandidate(BaseModel):
+    """Campanha escolhida para um utm_campaign"""
+    campaign_id: int
+    nome: str
+    confianca: Decimal
+
+
+class UTMResolution(BaseModel):
+    """Como um utm_campaign do CRM é resolvido pelo motor de atribuição"""
+    utm_source: Optional[str]
+    utm_campaign: str
+    deals: int
+    campanhas: List[UTMCampaignCandidate]  # vazio = não casa com nenhuma campanha
+    detalhe: Optional[str]
+
+
+class UTMResolutionResponse(BaseModel):
+    """utm_campaign do período com a campanha resolvida"""
+    periodo_inicio: date
+    periodo_fim: date
+    utms: List[UTMResolution]
+
+
+class ChannelCredit(BaseModel):
+    """Crédito de um canal num modelo de atribuição"""
+    canal: str
+    conversoes: float
+    receita: float
+    percentual: float  # % das conversões do período
+
+
+class AttributionModelsResponse(BaseModel):
+    """Modelos multi-touch lado a lado (first/last/linear/time_decay/position_based)"""
+    periodo_inicio: date
+    periodo_fim: date
+    lookback_dias: int
+    meia_vida_dias: float
+    contatos: int
+    conversoes: int
+    receita: float
+    modelos: Dict[str, List[ChannelCredit]]
+    cache: bool
@@ -0,0 +1,719 @@
+"""
+Gerador sintético de dados para desenvolvimento e teste de carga
+
+Produz usuários (vendedores), contas de anúncio, campanhas, gasto diário
+(campaign_insights), deals e relatórios da agência em lotes por coluna
+(arrays NumPy), com semente fixa: a mesma configuração gera sempre os
+mesmos dados.
+
+- Escala: número de deals, campanhas, vendedores e dias
+- Sazonalidade: peso por dia da semana, ciclo anual (pico em dez/jan) e
+  tendência de crescimento no período; vale para deals e gasto
+- Conversão por canal (GANHO entre os fechados); negócios recentes ficam
+  majoritariamente em aberto
+- Clientes recorrentes (mesmo telefone em vários deals) e deals de mídia
+  paga com utm_campaign = nome da campanha
+
+A carga é em massa: COPY no PostgreSQL e executemany direto no driver nos
+demais (sqlite3 prepara uma vez; pymysql junta em INSERT multi-linha).
+Índices secundários das tabelas grandes são removidos durante a carga e
+recriados no fim.
+
+Dados existentes só são substituídos com replace=True (--replace nos
+scripts de seed); sem ele a carga recusa tabelas que já têm linhas. Mesmo
+com replace, usuários e contas de anúncio reais ficam (só os do domínio
+SYNTHETIC_DOMAIN e as contas de SYNTHETIC_ACCOUNT_IDS são trocados) e
+ad_clicks nunca é apagada: os cliques só perdem o campaign_id (o
+external_campaign_id continua lá para religar).
+"""
+import csv
+import io
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import func, select, text
+
+from database import Base
+from models import AdClick, AttributionLink, Campaign, CampaignInsight, CRMDeal, User
+from models.agency import AgencyCampaignDetail, AgencyMonthlyReport
+from models.campaigns import AdPlatformAccount
+
+SYNTHETIC_DOMAIN = "vendas.revenda.com"
+# account_id das contas de anúncio geradas (accounts_batch)
+SYNTHETIC_ACCOUNT_IDS = ("123-456-7890", "act_1234567890")
+
+# Canal -> participação nos deals; conversão padrão em SyntheticConfig
+CANAIS = {"Google": 0.28, "Meta": 0.30, "Orgânico": 0.17, "Direto": 0.13, "Indicação": 0.12}
+CONVERSAO = {"Google": 0.10, "Meta": 0.07, "Orgânico": 0.15, "Direto": 0.18, "Indicação": 0.26}
+
+ORIGENS = {
+    "Google": ["Site", "Telefone", "WhatsApp"],
+    "Meta": ["Facebook", "Instagram", "WhatsApp"],
+    "Orgânico": ["Site", "Instagram", "Showroom"],
+    "Direto": ["Showroom", "Telefone"],
+    "Indicação": ["Indicação", "Showroom"],
+}
+
+MOTIVOS_PERDA = [
+    "Preço alto", "Cliente não retornou", "Comprou em outro lugar", "Sem condições financeiras",
+    "Desistiu da compra", "Veículo vendido", "Demora no atendimento", "Crédito negado",
+]
+MOTIVOS_PESOS = [0.22, 0.30, 0.14, 0.12, 0.08, 0.06, 0.04, 0.04]
+
+VEICULOS = [
+    "Honda Civic 2022", "Toyota Corolla 2023", "VW Golf 2021", "Hyundai HB20 2023",
+    "Chevrolet Onix 2022", "Fiat Argo 2023", "Jeep Compass 2022", "Ford Ranger 2023",
+    "Nissan Kicks 2022", "Renault Kwid 2023", "Peugeot 208 2022", "Citroën C3 2023",
+]
+
+NOMES = ["Carlos", "Maria", "João", "Ana", "Pedro", "Juliana", "Lucas", "Fernanda", "Rafael", "Camila"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Costa", "Souza", "Lima", "Pereira", "Almeida", "Rocha"]
+
+# Plataforma -> (tipos de campanha, utm_source, utm_medium, CPM, CTR, conversão clique->lead)
+# CPL resultante ~R$ 33 (Google) e ~R$ 37 (Meta)
+PLATAFORMAS = {
+    "GOOGLE": (["Busca", "Performance Max", "Display", "YouTube"], "google", "cpc", 30.0, 0.03, 0.03),
+    "META": (["Leads", "Conversões", "Remarketing", "Alcance"], "facebook", "paid_social", 15.0, 0.01, 0.04),
+}
+PAID_UTM_SHARE = 0.85  # Deals de Google/Meta que chegam com UTM
+TEMAS = ["Seminovos Premium", "Carros Usados SP", "Financiamento", "Ofertas Especiais",
+         "SUVs", "Picapes", "Feirão", "Troca com Troco"]
+
+
+@dataclass
+class SyntheticConfig:
+    """Escala e distribuições dos dados gerados"""
+    deals: int = 50000
+    campaigns: int = 40
+    vendedores: int = 25
+    days: int = 365
+    end: Optional[date] = None  # Padrão: hoje
+    seed: int = 42
+    chunk: int = 250000  # Deals por lote (memória constante em qualquer escala)
+    # Seg..dom; sábado é o dia forte da revenda
+    weekday_weights: Sequence[float] = (1.0, 0.95, 0.95, 1.0, 1.1, 1.35, 0.55)
+    annual_amplitude: float = 0.25
+    trend: float = 0.15
+    conversion: Dict[str, float] = field(default_factory=lambda: dict(CONVERSAO))
+    open_days: float = 14.0  # Meia-vida (dias) de um negócio em aberto
+    agency_lead_inflation: float = 1.15  # A agência reporta mais leads que o CRM registra
+
+    @property
+    def end_date(self) -> date:
+        return self.end or date.today()
+
+    @property
+    def start_date(self) -> date:
+        return self.end_date - timedelta(days=self.days - 1)
+
+
+@dataclass
+class Batch:
+    """Lote de linhas de uma tabela, por coluna"""
+    table: str
+    columns: Dict[str, object]  # ndarray (datetime64 inclusive) ou lista
+
+    @property
+    def rows(self) -> int:
+        return len(next(iter(self.columns.values())))
+
+
+# =============================================================================
+# GERAÇÃO
+# =============================================================================
+
+def day_weights(config: SyntheticConfig) -> np.ndarray:
+    """Intensidade relativa de cada dia do período (soma 1)"""
+    dias = np.arange(config.days)
+    inicio = config.start_date
+    semana = np.asarray(config.weekday_weights)[(inicio.weekday() + dias) % 7]
+    dia_ano = (inicio.timetuple().tm_yday + dias) % 365
+    # Cosseno com pico perto de 1º de janeiro
+    anual = 1 + config.annual_amplitude * np.cos(2 * np.pi * dia_ano / 365)
+    tendencia = 1 + config.trend * dias / max(config.days - 1, 1)
+    pesos = semana * anual * tendencia
+    return pesos / pesos.sum()
+
+
+def _vendedores(config: SyntheticConfig) -> List[str]:
+    return [f"{NOMES[i % len(NOMES)]} {SOBRENOMES[(i // len(NOMES)) % len(SOBRENOMES)]}"
+            + (f" {i // (len(NOMES) * len(SOBRENOMES)) + 1}" if i >= len(NOMES) * len(SOBRENOMES) else "")
+            for i in range(config.vendedores)]
+
+
+def _uuids(rng: np.random.Generator, n: int, start: int = 0) -> List[str]:
+    """
+    UUIDs em hex (32 caracteres), como o tipo UUID grava fora do PostgreSQL
+
+    Os 6 primeiros bytes são a sequência start..start+n (como o timestamp do
+    UUIDv7): ids crescentes entram no fim do índice da PK em vez de
+    espalhados, o que domina o tempo de carga em milhões de linhas.
+    """
+    b = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    seq = np.arange(start, start + n, dtype=">u8").view(np.uint8).reshape(n, 8)
+    b[:, :6] = seq[:, 2:]
+    b[:, 6] = (b[:, 6] & 0x0F) | 0x70
+    b[:, 8] = (b[:, 8] & 0x3F) | 0x80
+    raw = b.tobytes()
+    return [raw[i:i + 16].hex() for i in range(0, 16 * n, 16)]
+
+
+def _escolha(rng: np.random.Generator, opcoes: Sequence, pesos: Sequence[float], n: int) -> np.ndarray:
+    p = np.asarray(pesos, dtype=float)
+    return np.asarray(opcoes, dtype=object)[rng.choice(len(opcoes), size=n, p=p / p.sum())]
+
+
+def users_batch(config: SyntheticConfig, password_hash: str) -> Batch:
+    """Um usuário por vendedor (mesmo hash de senha: bcrypt por linha é caro)"""
+    rng = np.random.default_rng([config.seed, 1])
+    nomes = _vendedores(config)
+    criacao = np.datetime64(config.start_date, "s") - np.timedelta64(30, "D")
+    n = len(nomes)
+    return Batch("users", {
+        "id": _uuids(rng, n),
+        "email": [f"vendedor{i + 1}@{SYNTHETIC_DOMAIN}" for i in range(n)],
+        "nome": nomes,
+        "hashed_password": [password_hash] * n,
+        "is_active": [True] * n,
+        "is_admin": [False] * n,
+        "created_at": np.full(n, criacao),
+        "updated_at": np.full(n, criacao),
+    })
+
+
+@dataclass
+class CampaignPlan:
+    """Campanhas geradas (antes dos agregados) e o gasto diário de cada uma"""
+    ids: np.ndarray
+    names: List[str]
+    external_ids: List[str]
+    platforms: np.ndarray  # "GOOGLE" / "META"
+    start_day: np.ndarray
+    spend: np.ndarray  # (campanhas, dias); 0 fora do período ativo
+    impressions: np.ndarray
+    clicks: np.ndarray
+    leads: np.ndarray
+
+
+def plan_campaigns(config: SyntheticConfig) -> CampaignPlan:
+    rng = np.random.default_rng([config.seed, 2])
+    n, dias = config.campaigns, config.days
+    plataformas = np.where(np.arange(n) % 2 == 0, "GOOGLE", "META")
+    nomes, externos = [], []
+    for i, plataforma in enumerate(plataformas):
+        tipos = PLATAFORMAS[plataforma][0]
+        nomes.append(f"{tipos[(i // 2) % len(tipos)]} - {TEMAS[(i // 2) % len(TEMAS)]} {i // 2 + 1}")
+        externos.append(f"{plataforma.lower()}_{i // 2 + 1:04d}")
+
+    cpm = np.array([PLATAFORMAS[p][3] for p in plataformas])[:, None]
+    ctr = np.array([PLATAFORMAS[p][4] for p in plataformas])[:, None]
+    cvr = np.array([PLATAFORMAS[p][5] for p in plataformas])[:, None]
+
+    # Início espalhado no primeiro terço; orçamento relativo log-normal
+    inicio = rng.integers(0, max(dias // 3, 1), n)
+    orcamento = rng.lognormal(0, 0.5, n)
+    ativa = np.arange(dias)[None, :] >= inicio[:, None]
+    intensidade = day_weights(config) * dias
+    gasto = orcamento[:, None] * intensidade[None, :] * rng.lognormal(0, 0.2, (n, dias)) * ativa
+    # Escala do gasto: leads das plataformas ~ deals pagos com UTM (mínimo de
+    # 1 lead/dia por campanha para seeds só de campanhas)
+    alvo = max(config.deals * (CANAIS["Google"] + CANAIS["Meta"]) * PAID_UTM_SHARE, n * dias)
+    leads_por_real = ctr * cvr * 1000 / cpm
+    gasto *= alvo / max((gasto * leads_por_real).sum(), 1e-9)
+
+    impressoes = rng.poisson(gasto / cpm * 1000)
+    cliques = rng.binomial(impressoes, ctr)
+    leads = rng.binomial(cliques, cvr)
+    return CampaignPlan(
+        ids=np.arange(1, n + 1), names=nomes, external_ids=externos, platforms=plataformas,
+        start_day=inicio, spend=gasto.round(2), impressions=impressoes, clicks=cliques, leads=leads,
+    )
+
+
+def accounts_batch() -> Batch:
+    return Batch("ad_platform_accounts", {
+        "platform": ["GOOGLE", "META"],
+        "account_id": list(SYNTHETIC_ACCOUNT_IDS),
+        "account_name": ["Revenda Autos - Google Ads", "Revenda Autos - Meta Ads"],
+        "is_active": [True, True],
+        "created_at": np.full(2, np.datetime64(date.today(), "s")),
+    })
+
+
+def insights_batch(config: SyntheticConfig, plan: CampaignPlan) -> Batch:
+    """Uma linha por campanha/dia ativo"""
+    c, d = np.nonzero(plan.spend > 0)
+    datas = np.datetime64(config.start_date, "s") + d.astype("timedelta64[D]")
+    return Batch("campaign_insights", {
+        "campaign_id": plan.ids[c],
+        "external_campaign_id": np.asarray(plan.external_ids, dtype=object)[c],
+        "platform": plan.platforms.astype(object)[c],
+        "date": datas,
+        "impressions": plan.impressions[c, d],
+        "clicks": plan.clicks[c, d],
+        "spend": plan.spend[c, d],
+        "leads": plan.leads[c, d],
+        "sales": np.zeros(len(c), dtype=np.int64),
+        "revenue": np.zeros(len(c)),
+        "created_at": datas,
+    })
+
+
+@dataclass
+class DealTotals:
+    """Agregados dos deals para campanhas e relatórios da agência"""
+    sales: np.ndarray  # Por campanha
+    revenue: np.ndarray
+    paid_sales_by_month: Dict[tuple, int] = field(default_factory=dict)
+
+
+def deal_batches(config: SyntheticConfig, plan: CampaignPlan, totals: DealTotals) -> Iterator[Batch]:
+    """Deals em lotes de `config.chunk`, acumulando vendas por campanha em `totals`"""
+    pesos_dia = day_weights(config)
+    canais = list(CANAIS)
+    conversao = np.array([config.conversion.get(c, 0.1) for c in canais])
+    vendedores = _vendedores(config)
+    # Poucos vendedores concentram a maior parte (Zipf suave)
+    pesos_vendedor = 1 / np.arange(1, len(vendedores) + 1) ** 0.8
+    inicio = np.datetime64(config.start_date, "s")
+    campanhas_por_canal = {
+        "Google": np.nonzero(plan.platforms == "GOOGLE")[0],
+        "Meta": np.nonzero(plan.platforms == "META")[0],
+    }
+    # Deals de uma campanha proporcionais aos leads dela
+    leads_campanha = plan.leads.sum(axis=1) + 1
+    clientes = max(config.deals // 3, 1)
+    # Deals por dia sorteados de uma vez; os lotes seguem em ordem cronológica
+    # (ids e data_criacao crescentes: índices crescem pelo fim durante a carga)
+    dias = np.repeat(
+        np.arange(config.days), np.random.default_rng([config.seed, 3]).multinomial(config.deals, pesos_dia)
+    )
+
+    for n_lote, offset in enumerate(range(0, config.deals, config.chunk)):
+        n = min(config.chunk, config.deals - offset)
+        rng = np.random.default_rng([config.seed, 3, n_lote])
+
+        dia = dias[offset:offset + n]
+        segundos = rng.integers(8 * 3600, 21 * 3600, n)
+        criacao = np.sort(inicio + (dia * 86400 + segundos).astype("timedelta64[s]"))
+
+        canal_idx = rng.choice(len(canais), size=n, p=np.array(list(CANAIS.values())))
+        canal = np.asarray(canais, dtype=object)[canal_idx]
+        origem = np.empty(n, dtype=object)
+        for i, nome in enumerate(canais):
+            sel = canal_idx == i
+            origem[sel] = rng.choice(ORIGENS[nome], size=int(sel.sum()))
+
+        # Fechamento: quanto mais antigo, mais provável; GANHO pela conversão do canal
+        idade = config.days - 1 - dia
+        fechado = rng.random(n) < 1 - 0.5 ** (idade / config.open_days + 0.1)
+        ganho = fechado & (rng.random(n) < conversao[canal_idx])
+        perdido = fechado & ~ganho
+        status = np.where(ganho, "GANHO", np.where(perdido, "PERDIDO", "ABERTO")).astype(object)
+        fechamento_dias = np.minimum(rng.integers(1, 15, n), np.maximum(idade, 1))
+        fechamento = criacao + (fechamento_dias * 86400).astype("timedelta64[s]")
+        fechamento[~fechado] = np.datetime64("NaT")
+        motivo = np.full(n, None, dtype=object)
+        motivo[perdido] = _escolha(rng, MOTIVOS_PERDA, MOTIVOS_PESOS, int(perdido.sum()))
+
+        valor = np.clip(rng.lognormal(np.log(70000), 0.45, n), 20000, 250000).round(-2)
+        lucro = np.where(ganho, (valor * rng.uniform(0.05, 0.15, n)).round(2), 0.0)
+
+        cliente = rng.integers(0, clientes, n)
+        telefone = [f"11 9{c // 10000 % 10000:04d}-{c % 10000:04d}" for c in cliente.tolist()]
+        tem_email = rng.random(n) < 0.6
+        email = [f"cliente{c}@email.com" if e else None for c, e in zip(cliente.tolist(), tem_email.tolist())]
+
+        utm_source = np.full(n, None, dtype=object)
+        utm_medium = np.full(n, None, dtype=object)
+        utm_campaign = np.full(n, None, dtype=object)
+        gclid = np.full(n, None, dtype=object)
+        fbclid = np.full(n, None, dtype=object)
+        campanha = np.full(n, -1)
+        nomes = np.asarray(plan.names, dtype=object)
+        for nome, plataforma in (("Google", "GOOGLE"), ("Meta", "META")):
+            opcoes = campanhas_por_canal[nome]
+            sel = np.nonzero(canal == nome)[0]
+            if not len(opcoes) or not len(sel):
+                continue
+            sel = sel[rng.random(len(sel)) < PAID_UTM_SHARE]
+            escolhida = rng.choice(opcoes, size=len(sel), p=leads_campanha[opcoes] / leads_campanha[opcoes].sum())
+            campanha[sel] = escolhida
+            utm_source[sel] = PLATAFORMAS[plataforma][1]
+            utm_medium[sel] = PLATAFORMAS[plataforma][2]
+            utm_campaign[sel] = nomes[escolhida]
+            clid = sel[rng.random(len(sel)) < 0.6]
+            ids = [f"{'gclid' if nome == 'Google' else 'fbclid'}-{offset + i}" for i in clid.tolist()]
+            (gclid if nome == "Google" else fbclid)[clid] = ids
+
+        pago = campanha >= 0
+        totals.sales += np.bincount(campanha[pago & ganho], minlength=len(plan.ids))
+        totals.revenue += np.bincount(campanha[pago & ganho], weights=valor[pago & ganho], minlength=len(plan.ids))
+        meses = criacao[pago & ganho].astype("datetime64[M]")
+        for mes, qtd in zip(*np.unique(meses, return_counts=True)):
+            chave = (mes.astype(object).year, mes.astype(object).month)
+            totals.paid_sales_by_month[chave] = totals.paid_sales_by_month.get(chave, 0) + int(qtd)
+
+        yield Batch("crm_deals", {
+            "id": _uuids(rng, n, offset),
+            "data_criacao": criacao,
+            "data_fechamento": fechamento,
+            "status": status,
+            "motivo_perda": motivo,
+            "valor": valor,
+            "lucro_bruto": lucro,
+            "vendedor": _escolha(rng, vendedores, pesos_vendedor, n),
+            "telefone": telefone,
+            "email": email,
+            "nome_cliente": [f"Cliente {c}" for c in cliente.tolist()],
+            "origem": origem,
+            "canal": canal,
+            "utm_source": utm_source,
+            "utm_medium": utm_medium,
+            "utm_campaign": utm_campaign,
+            "gclid": gclid,
+            "fbclid": fbclid,
+            "veiculo_interesse": _escolha(rng, VEICULOS, [1] * len(VEICULOS), n),
+            "created_at": criacao,
+            "updated_at": criacao,
+        })
+
+
+def campaigns_batch(config: SyntheticConfig, plan: CampaignPlan, totals: DealTotals) -> Batch:
+    """Campanhas com os totais do período (gasto das insights, vendas dos deals)"""
+    spend = plan.spend.sum(axis=1)
+    impressoes = plan.impressions.sum(axis=1)
+    cliques = plan.clicks.sum(axis=1)
+    leads = plan.leads.sum(axis=1)
+
+    def razao(a, b, fator=1.0):
+        return np.round(np.divide(a * fator, b, out=np.zeros(len(a)), where=b > 0), 2)
+
+    inicio = np.datetime64(config.start_date, "s") + plan.start_day.astype("timedelta64[D]")
+    agora = np.datetime64(config.end_date, "s")
+    n = len(plan.ids)
+    return Batch("campaigns", {
+        "id": plan.ids,
+        "external_id": plan.external_ids,
+        "name": plan.names,
+        "platform": plan.platforms.astype(object),
+        "status": np.where(np.arange(n) % 7 == 6, "PAUSED", "ACTIVE").astype(object),
+        "impressions": impressoes,
+        "clicks": cliques,
+        "spend": spend.round(2),
+        "cpc": razao(spend, cliques),
+        "ctr": razao(cliques, impressoes, 100),
+        "leads_generated": leads,
+        "sales_closed": totals.sales,
+        "revenue": totals.revenue.round(2),
+        "cpl": razao(spend, leads),
+        "conversion_rate": razao(totals.sales, leads, 100),
+        "roi": razao(totals.revenue - spend, spend, 100),
+        "roas": razao(totals.revenue, spend),
+        "start_date": inicio,
+        "last_sync": np.full(n, agora),
+        "created_at": inicio,
+        "updated_at": np.full(n, agora),
+    })
+
+
+def agency_batches(config: SyntheticConfig, plan: CampaignPlan, totals: DealTotals) -> Iterator[Batch]:
+    """Relatório mensal da agência (somas das insights) e detalhe por campanha"""
+    rng = np.random.default_rng([config.seed, 4])
+    dias = np.datetime64(config.start_date, "D") + np.arange(config.days)
+    meses, mes_idx = np.unique(dias.astype("datetime64[M]"), return_inverse=True)
+    n_meses, n_campanhas = len(meses), len(plan.ids)
+
+    def por_mes(matriz):
+        """(campanhas, dias) -> (campanhas, meses)"""
+        saida = np.zeros((n_campanhas, n_meses), dtype=matriz.dtype)
+        np.add.at(saida.T, mes_idx, matriz.T)
+        return saida
+
+    gasto, impressoes = por_mes(plan.spend), por_mes(plan.impressions)
+    cliques, leads = por_mes(plan.clicks), por_mes(plan.leads)
+    google = plan.platforms == "GOOGLE"
+    meta = ~google
+    criacao = (meses + 1).astype("datetime64[D]").astype("datetime64[s]") + np.timedelta64(3, "D")
+    ano_mes = [(m.astype(object).year, m.astype(object).month) for m in meses]
+
+    inv_meta, inv_google = gasto[meta].sum(axis=0).round(2), gasto[google].sum(axis=0).round(2)
+    leads_total = leads.sum(axis=0)
+    google_conv = leads[google].sum(axis=0)
+    yield Batch("agency_monthly_reports", {
+        "id": np.arange(1, n_meses + 1),
+        "ano": [a for a, _ in ano_mes],
+        "mes": [m for _, m in ano_mes],
+        "investimento_meta": inv_meta,
+        "investimento_google": inv_google,
+        "investimento_tiktok": np.zeros(n_meses),
+        "investimento_outros": np.zeros(n_meses),
+        "investimento_total": (inv_meta + inv_google).round(2),
+        "meta_alcance": (impressoes[meta].sum(axis=0) * 0.6).astype(np.int64),
+        "meta_impressoes": impressoes[meta].sum(axis=0),
+        "meta_cliques": cliques[meta].sum(axis=0),
+        "meta_conversoes": np.round(leads[meta].sum(axis=0) * config.agency_lead_inflation).astype(np.int64),
+        "google_impressoes": impressoes[google].sum(axis=0),
+        "google_cliques": cliques[google].sum(axis=0),
+        "google_conversoes": np.round(google_conv * config.agency_lead_inflation).astype(np.int64),
+        "google_chamadas": rng.binomial(google_conv, 0.15),
+        "google_whatsapp": rng.binomial(google_conv, 0.35),
+        "google_custo_conversao": np.round(np.divide(inv_google, google_conv, out=np.zeros(n_meses),
+                                                     where=google_conv > 0), 2),
+        "total_leads_reportados": np.round(leads_total * config.agency_lead_inflation).astype(np.int64),
+        "total_vendas_reportadas": [
+            int(round(totals.paid_sales_by_month.get(am, 0) * config.agency_lead_inflation)) for am in ano_mes
+        ],
+        "created_at": criacao,
+        "updated_at": criacao,
+    })
+
+    c, m = np.nonzero(gasto > 0)
+    yield Batch("agency_campaign_details", {
+        "report_id": m + 1,
+        "plataforma": plan.platforms.astype(object)[c],
+        "nome_campanha": np.asarray(plan.names, dtype=object)[c],
+        "objetivo": np.where(google[c], "vendas_site", "vendas_whatsapp").astype(object),
+        "investimento": gasto[c, m].round(2),
+        "impressoes": impressoes[c, m],
+        "cliques": cliques[c, m],
+        "conversoes": leads[c, m],
+        "custo_conversao": np.round(np.divide(gasto[c, m], leads[c, m], out=np.zeros(len(c)),
+                                              where=leads[c, m] > 0), 2),
+        "created_at": criacao[m],
+    })
+
+
+def generate(config: SyntheticConfig, password_hash: str) -> Iterator[Batch]:
+    """Todos os lotes, na ordem de carga"""
+    plan = plan_campaigns(config)
+    totals = DealTotals(sales=np.zeros(len(plan.ids), dtype=np.int64), revenue=np.zeros(len(plan.ids)))
+    yield users_batch(config, password_hash)
+    yield accounts_batch()
+    yield insights_batch(config, plan)
+    yield from deal_batches(config, plan, totals)
+    # Agregados dependem de todos os deals
+    yield campaigns_batch(config, plan, totals)
+    yield from agency_batches(config, plan, totals)
+
+
+# =============================================================================
+# CARGA EM MASSA
+# =============================================================================
+
+TABLES = {
+    t.__tablename__: t.__table__
+    for t in (User, AdPlatformAccount, Campaign, CampaignInsight, CRMDeal, AgencyMonthlyReport, AgencyCampaignDetail)
+}
+# Dependentes primeiro; vínculos de atribuição apontam para deals/campanhas e
+# ficariam órfãos com os dados substituídos (o worker os recalcula)
+CLEAR_ORDER = ["agency_campaign_details", "agency_monthly_reports", "crm_deals", "campaign_insights",
+               "campaigns", "ad_platform_accounts", "users"]
+LINKED = {"crm_deals": [AttributionLink.__table__], "campaigns": [AttributionLink.__table__]}
+# Cliques reais referenciam campaigns.id: com replace só perdem o vínculo
+CLICKS = AdClick.__table__
+# Tabelas grandes: índices secundários recriados depois da carga
+DEFER_INDEXES = ("crm_deals", "campaign_insights")
+
+
+@lru_cache(maxsize=1)
+def _horas() -> np.ndarray:
+    """"HH:MM:SS.000000" de cada segundo do dia, como matriz de bytes (86400, 15)"""
+    texto = [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}.000000" for s in range(86400)]
+    return np.array(texto, dtype="S15").view(np.uint8).reshape(-1, 15)
+
+
+def _datetimes(values: np.ndarray) -> list:
+    """
+    datetime64 -> "2025-01-31 10:00:00.000000" (formato do DateTime no SQLite,
+    aceito pelo COPY); NaT -> None
+
+    Montado por tabela de dias x tabela de segundos direto nos bytes:
+    datetime_as_string + troca do "T" por linha custa ~2x mais.
+    """
+    nulo = np.isnat(values)
+    segundos = values.astype("datetime64[s]").astype(np.int64)
+    validos = segundos[~nulo]
+    segundos[nulo] = validos.min() if len(validos) else 0
+    dia, hora = np.divmod(segundos, 86400)
+    primeiro, ultimo = (dia.min(), dia.max()) if len(dia) else (0, 0)
+    dias = np.arange(primeiro, ultimo + 1).astype("datetime64[D]")
+    tabela = np.char.add(np.datetime_as_string(dias).astype("S10"), b" ").view(np.uint8).reshape(-1, 11)
+    linhas = np.concatenate([tabela[dia - primeiro], _horas()[hora]], axis=1)
+    lista = np.ascontiguousarray(linhas).view("S26").ravel().astype("U26").tolist()
+    for i in np.flatnonzero(nulo).tolist():
+        lista[i] = None
+    return lista
+
+
+def _column(values, dialect: str) -> list:
+    """Coluna no formato que o driver grava (sem os conversores do SQLAlchemy)"""
+    if isinstance(values, np.ndarray):
+        if values.dtype.kind == "M":
+            return _datetimes(values)
+        values = values.tolist()
+    if dialect != "postgresql" and values and isinstance(values[0], bool):
+        return [int(v) for v in values]
+    return list(values)
+
+
+def _copy(cursor, table: str, colunas: List[str], linhas: Iterable[tuple]):
+    """COPY ... FROM STDIN (CSV): vazio sem aspas é NULL"""
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(linhas)
+    buf.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+
+def _rows(batch: Batch, dialect: str) -> List[tuple]:
+    # Colunas repetidas (created_at = data_criacao) convertidas uma vez
+    convertidas = {}
+    for v in batch.columns.values():
+        if id(v) not in convertidas:
+            convertidas[id(v)] = _column(v, dialect)
+    return list(zip(*(convertidas[id(v)] for v in batch.columns.values())))
+
+
+def _insert(conn, table: str, colunas: List[str], linhas: List[tuple], chunk: int = 50000):
+    cursor = conn.connection.driver_connection.cursor()
+    try:
+        if conn.dialect.name == "postgresql":
+            for i in range(0, len(linhas), chunk):
+                _copy(cursor, table, colunas, linhas[i:i + chunk])
+        else:
+            marcador = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+            sql = f"INSERT INTO {table} ({', '.join(colunas)}) VALUES ({', '.join([marcador] * len(colunas))})"
+            for i in range(0, len(linhas), chunk):
+                cursor.executemany(sql, linhas[i:i + chunk])
+    finally:
+        cursor.close()
+
+
+def _prepared(config: SyntheticConfig, password_hash: str, alvo: set, dialect: str) -> Iterator[tuple]:
+    """
+    (tabela, colunas, linhas) prontas para o driver, geradas numa thread
+
+    Geração/conversão do próximo lote corre enquanto o banco grava o atual
+    (os drivers soltam o GIL durante a escrita).
+    """
+    fila: queue.Queue = queue.Queue(maxsize=2)
+    fim = object()
+
+    def produzir():
+        try:
+            for batch in generate(config, password_hash):
+                if batch.table in alvo:
+                    fila.put((batch.table, list(batch.columns), _rows(batch, dialect)))
+            fila.put(fim)
+        except BaseException as e:  # Repassado para a thread que grava
+            fila.put(e)
+
+    threading.Thread(target=produzir, name="synthetic-seed", daemon=True).start()
+    while True:
+        item = fila.get()
+        if item is fim:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+class ExistingDataError(Exception):
+    """Tabelas de destino já têm dados e a carga não foi chamada com replace"""
+
+
+def _replaced(tabela):
+    """DELETE das linhas que a carga substitui (usuários/contas: só as sintéticas)"""
+    if tabela.name == "users":
+        return tabela.delete().where(tabela.c.email.like(f"%@{SYNTHETIC_DOMAIN}"))
+    if tabela.name == "ad_platform_accounts":
+        return tabela.delete().where(tabela.c.account_id.in_(SYNTHETIC_ACCOUNT_IDS))
+    return tabela.delete()
+
+
+def existing_rows(conn, tabelas) -> Dict[str, int]:
+    """Linhas que a carga substituiria, por tabela (só as que têm alguma)"""
+    encontradas = {}
+    for tabela in tabelas:
+        filtro = _replaced(tabela).whereclause
+        consulta = select(func.count()).select_from(tabela)
+        n = conn.execute(consulta if filtro is None else consulta.where(filtro)).scalar()
+        if n:
+            encontradas[tabela.name] = n
+    return encontradas
+
+
+def load(engine, config: SyntheticConfig, password_hash: str, tables: Optional[Iterable[str]] = None,
+         log=print, replace: bool = False) -> Dict[str, int]:
+    """
+    Gera e carrega os dados num engine síncrono; retorna linhas por tabela
+
+    Args:
+        tables: Subconjunto de TABLES a carregar (padrão: todas). As demais
+            são geradas (os agregados dependem delas) mas não gravadas.
+        replace: Apaga antes o conteúdo das tabelas carregadas e os vínculos
+            de atribuição. Sem ele, ExistingDataError se alguma já tiver
+            linhas. Usuários e contas reais e ad_clicks nunca são apagados.
+    """
+    alvo = set(tables or TABLES)
+    dialect = engine.dialect.name
+    contagem = {t: 0 for t in TABLES if t in alvo}
+    inicio = time.perf_counter()
+
+    vinculadas = {t for tabela in alvo for t in LINKED.get(tabela, [])}
+    destino = sorted(vinculadas, key=lambda t: t.name) + [TABLES[t] for t in CLEAR_ORDER if t in alvo]
+    extras = [CLICKS] if "campaigns" in alvo else []
+    Base.metadata.create_all(engine, tables=[TABLES[t] for t in contagem] + list(vinculadas) + extras)
+    with engine.begin() as conn:
+        if not replace:
+            existentes = existing_rows(conn, destino)
+            if existentes:
+                resumo = ", ".join(f"{t} ({n})" for t, n in existentes.items())
+                raise ExistingDataError(f"Tabelas com dados: {resumo}; use replace (--replace) para substituir")
+        if dialect == "sqlite":
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            # Cache maior para a recriação dos índices (256 MB, só nesta conexão)
+            conn.exec_driver_sql("PRAGMA cache_size=-262144")
+        if replace and extras:
+            conn.execute(CLICKS.update().where(CLICKS.c.campaign_id.is_not(None)).values(campaign_id=None))
+        for tabela in destino:
+            conn.execute(_replaced(tabela))
+
+        adiados = [idx for t in DEFER_INDEXES if t in alvo for idx in TABLES[t].indexes]
+        for idx in adiados:
+            idx.drop(conn, checkfirst=True)
+
+        for tabela, colunas, linhas in _prepared(config, password_hash, alvo, dialect):
+            t = time.perf_counter()
+            _insert(conn, tabela, colunas, linhas)
+            contagem[tabela] += len(linhas)
+            log(f"  {tabela}: +{len(linhas)} linhas ({time.perf_counter() - t:.1f}s)")
+
+        t = time.perf_counter()
+        for idx in adiados:
+            idx.create(conn, checkfirst=True)
+        if adiados:
+            log(f"  índices recriados ({time.perf_counter() - t:.1f}s)")
+
+        if dialect == "postgresql":
+            # ids explícitos (campanhas, relatórios): sequência continua depois deles
+            for tabela in ("campaigns", "agency_monthly_reports"):
+                if tabela in alvo:
+                    conn.execute(text(
+                        f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+                        f"COALESCE((SELECT MAX(id) FROM {tabela}), 1))"
+                    ))
+        if dialect == "sqlite":
+            # Estatísticas por amostra: ANALYZE completo em milhões de linhas é lento
+            conn.exec_driver_sql("PRAGMA analysis_limit=1000")
+        conn.execute(text("ANALYZE"))
+
+    total = sum(contagem.values())
+    log(f"{total} linhas em {time.perf_counter() - inicio:.1f}s")
+    return contagem
@@ -3,6 +3,8 @@ Serviços da aplicação
 """
 from .crm_sync import CRMSyncService
 from .external_crm import ExternalCRMClient
+from .kpi_store import KPISnapshotStore
+from .data_versions import DataVersionStore
 
-__all__ = ["CRMSyncService", "ExternalCRMClient"]
+__all__ = ["CRMSyncService", "ExternalCRMClient", "KPISnapshotStore", "DataVersionStore"]
 
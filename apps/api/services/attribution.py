@@ -0,0 +1,194 @@
+"""
+ROI por campanha a partir dos deals atribuídos (attribution_links)
+
+As ligações são gravadas pelo motor do worker (attribution_store). Cada
+deal entra na campanha com peso = confiança da ligação, então um deal
+dividido entre campanhas de mesmo nome não é contado duas vezes.
+
+Modo leads únicos: negócios do mesmo cliente (crm_deals.lead_cluster_id,
+gravado pelo worker) contam como um lead por campanha, com o maior peso
+entre eles. Vendas e receita continuam por negócio.
+
+CPC, CPM, CTR e CPL da plataforma saem das métricas de Ads somadas no
+período, calculados para todas as campanhas de uma vez
+(shared.utils.calculate_metrics_batch).
+
+utm_resolution mostra como cada utm_campaign do CRM é resolvido pelo mesmo
+motor (exato ou aproximado), para corrigir UTMs na origem.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import select, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.attribution import AttributionLink
+from models.campaigns import Campaign, CampaignInsight
+from models.crm import CRMDeal, DealStatus
+from shared.attribution import CampaignIndex
+from shared.utils import calculate_metrics_batch
+
+
+async def campaign_roi(
+    db: AsyncSession,
+    data_inicio: date,
+    data_fim: date,
+    min_confidence: Decimal = Decimal("0"),
+    unique_leads: bool = False
+) -> List[Dict]:
+    """
+    Gasto (campaign_insights) x resultado dos deals ligados, por campanha
+
+    Deals contam pela data de criação dentro do período; o gasto pela data
+    da métrica. Campanhas sem gasto nem deals no período ficam de fora.
+    unique_leads: "deals" (e o CPL) por cliente, não por negócio.
+    """
+    gastos = await db.execute(
+        select(
+            CampaignInsight.campaign_id,
+            func.sum(CampaignInsight.spend),
+            func.sum(CampaignInsight.leads),
+            func.sum(CampaignInsight.impressions),
+            func.sum(CampaignInsight.clicks),
+        ).where(
+            CampaignInsight.date >= datetime.combine(data_inicio, datetime.min.time()),
+            CampaignInsight.date <= datetime.combine(data_fim, datetime.max.time()),
+        ).group_by(CampaignInsight.campaign_id)
+    )
+    por_campanha: Dict[int, Dict] = {}
+    for campaign_id, gasto, leads, impressoes, cliques in gastos:
+        if campaign_id is None:
+            continue
+        por_campanha[campaign_id] = {
+            "gasto": Decimal(str(gasto or 0)),
+            "leads_plataforma": int(leads or 0),
+            "impressoes": int(impressoes or 0),
+            "cliques": int(cliques or 0),
+            "deals": Decimal(0), "vendas": Decimal(0),
+            "receita": Decimal(0), "lucro_bruto": Decimal(0),
+        }
+
+    ganho = CRMDeal.status == DealStatus.GANHO
+    peso = AttributionLink.confidence
+    filtros = (
+        CRMDeal.data_criacao >= datetime.combine(data_inicio, datetime.min.time()),
+        CRMDeal.data_criacao <= datetime.combine(data_fim, datetime.max.time()),
+        AttributionLink.confidence >= min_confidence,
+    )
+    deals = await db.execute(
+        select(
+            AttributionLink.campaign_id,
+            func.sum(peso),
+            func.sum(case((ganho, peso), else_=0)),
+            func.sum(case((ganho, CRMDeal.valor * peso), else_=0)),
+            func.sum(case((ganho, CRMDeal.lucro_bruto * peso), else_=0)),
+        ).join(CRMDeal, CRMDeal.id == AttributionLink.deal_id).where(*filtros)
+        .group_by(AttributionLink.campaign_id)
+    )
+    deals = deals.all()
+
+    if unique_leads:
+        # Um lead por (campanha, cliente); deal ainda sem cluster conta sozinho
+        cliente = func.coalesce(CRMDeal.lead_cluster_id, CRMDeal.id)
+        por_cliente = (
+            select(AttributionLink.campaign_id, func.max(peso).label("peso"))
+            .join(CRMDeal, CRMDeal.id == AttributionLink.deal_id).where(*filtros)
+            .group_by(AttributionLink.campaign_id, cliente)
+            .subquery()
+        )
+        unicos = dict((await db.execute(
+            select(por_cliente.c.campaign_id, func.sum(por_cliente.c.peso)).group_by(por_cliente.c.campaign_id)
+        )).all())
+        deals = [(cid, unicos.get(cid, 0), *resto) for cid, _, *resto in deals]
+
+    for campaign_id, total, vendas, receita, lucro in deals:
+        linha = por_campanha.setdefault(campaign_id, {
+            "gasto": Decimal(0), "leads_plataforma": 0, "impressoes": 0, "cliques": 0,
+        })
+        linha.update({
+            "deals": Decimal(str(total or 0)),
+            "vendas": Decimal(str(vendas or 0)),
+            "receita": Decimal(str(receita or 0)),
+            "lucro_bruto": Decimal(str(lucro or 0)),
+        })
+
+    if not por_campanha:
+        return []
+
+    campanhas = (await db.execute(
+        select(Campaign.id, Campaign.name, Campaign.platform).where(Campaign.id.in_(list(por_campanha)))
+    )).all()
+    linhas = [por_campanha[campaign_id] for campaign_id, _, _ in campanhas]
+    plataforma = calculate_metrics_batch(
+        [float(l["gasto"]) for l in linhas],
+        [l["impressoes"] for l in linhas],
+        [l["cliques"] for l in linhas],
+        [l["leads_plataforma"] for l in linhas],
+    )
+    resultado = []
+    for i, (campaign_id, nome, platform) in enumerate(campanhas):
+        linha = linhas[i]
+        gasto = linha["gasto"]
+        resultado.append({
+            "campaign_id": campaign_id,
+            "nome": nome,
+            "plataforma": platform.value if platform else None,
+            **linha,
+            "cpc": float(plataforma["cpc"][i]),
+            "cpm": float(plataforma["cpm"][i]),
+            "ctr": float(plataforma["ctr"][i]),
+            "cpl_plataforma": float(plataforma["cpl"][i]),
+            "cpl": gasto / linha["deals"] if linha["deals"] > 0 else None,
+            "cpa": gasto / linha["vendas"] if linha["vendas"] > 0 else None,
+            "roas": linha["receita"] / gasto if gasto > 0 else None,
+            "roi": (linha["lucro_bruto"] - gasto) / gasto * 100 if gasto > 0 else None,
+        })
+
+    resultado.sort(key=lambda r: r["gasto"], reverse=True)
+    return resultado
+
+
+async def utm_resolution(db: AsyncSession, data_inicio: date, data_fim: date, limit: int = 200) -> List[Dict]:
+    """
+    utm_campaign distintos do período -> campanha(s) que o motor escolheria
+
+    Mais frequentes primeiro; sem campanha = UTM que não casa com nada.
+    """
+    utms = await db.execute(
+        select(CRMDeal.utm_source, CRMDeal.utm_campaign, func.count(CRMDeal.id).label("deals"))
+        .where(
+            CRMDeal.utm_campaign.isnot(None),
+            CRMDeal.data_criacao >= datetime.combine(data_inicio, datetime.min.time()),
+            CRMDeal.data_criacao <= datetime.combine(data_fim, datetime.max.time()),
+        )
+        .group_by(CRMDeal.utm_source, CRMDeal.utm_campaign)
+        .order_by(func.count(CRMDeal.id).desc())
+        .limit(limit)
+    )
+    utms = utms.all()
+    if not utms:
+        return []
+
+    campanhas = (await db.execute(
+        select(Campaign.id, Campaign.external_id, Campaign.name, Campaign.platform)
+    )).all()
+    nomes = {cid: nome for cid, _, nome, _ in campanhas}
+    index = CampaignIndex(
+        (cid, ext, nome, platform.name if platform else None) for cid, ext, nome, platform in campanhas
+    )
+
+    resultado = []
+    for utm_source, utm_campaign, deals in utms:
+        matches = index.match({"id": None, "utm_source": utm_source, "utm_campaign": utm_campaign})
+        resultado.append({
+            "utm_source": utm_source,
+            "utm_campaign": utm_campaign,
+            "deals": deals,
+            "campanhas": [
+                {"campaign_id": m.campaign_id, "nome": nomes[m.campaign_id], "confianca": m.confidence}
+                for m in matches
+            ],
+            "detalhe": matches[0].details if matches else None,
+        })
+    return resultado
@@ -11,6 +11,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from .external_crm import ExternalCRMClient, get_external_crm
+from .kpi_dirty import mark_kpi_days_dirty
+from .data_versions import bump_data_version
+from shared.data_versions import CRM
 from models.crm import CRMDeal, DealStatus
 
 logger = structlog.get_logger()
@@ -109,6 +112,7 @@ class CRMSyncService:
             'atualizados': 0,
             'erros': 0
         }
+        dias_alterados = set()
         
         try:
             # Buscar negócios do CRM externo
@@ -144,6 +148,7 @@ class CRMSyncService:
                             existing.motivo_perda = negocio.get('motivo_perda')
                             if new_status != DealStatus.ABERTO:
                                 existing.data_fechamento = negocio.get('data_atualizacao')
+                            dias_alterados.add(existing.data_criacao)
                             stats['atualizados'] += 1
                     else:
                         # Criar novo deal
@@ -165,6 +170,7 @@ class CRMSyncService:
                             observacoes=f"[EXT_ID:{external_id}] Sincronizado do CRM em {datetime.now().isoformat()}"
                         )
                         self.db.add(deal)
+                        dias_alterados.add(deal.data_criacao)
                         stats['novos'] += 1
                 
                 except Exception as e:
@@ -174,7 +180,10 @@ class CRMSyncService:
                     )
                     stats['erros'] += 1
             
+            await mark_kpi_days_dirty(self.db, dias_alterados)
             await self.db.commit()
+            if stats['novos'] or stats['atualizados']:
+                await bump_data_version(CRM)
             
             logger.info("Sincronização CRM concluída", **stats)
             return stats
@@ -0,0 +1,67 @@
+"""
+Versões de dados por domínio no Redis (lado da API)
+
+Leitura para o ETag (conditional.py) e bump depois dos commits da API.
+Falha do Redis nunca derruba a requisição: a leitura devolve None (a rota
+responde sem ETag) e o bump só vai para o log.
+"""
+from typing import Dict, Iterable, Optional
+
+import structlog
+from redis import asyncio as aioredis
+
+from config import get_settings
+from shared.data_versions import BUMP_SCRIPT, now_ms, version_key
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+class DataVersionStore:
+    """Versões monotônicas por domínio (shared.data_versions)"""
+
+    def __init__(self, redis_client: aioredis.Redis = None):
+        self.redis = redis_client or aioredis.from_url(
+            settings.redis_url, decode_responses=True, socket_timeout=0.5, socket_connect_timeout=0.5
+        )
+
+    async def get(self, domains: Iterable[str]) -> Dict[str, int]:
+        """Versão atual de cada domínio (um MGET; domínio sem versão é iniciado)"""
+        domains = sorted(set(domains))
+        valores = await self.redis.mget([version_key(d) for d in domains])
+        faltando = [d for d, v in zip(domains, valores) if v is None]
+        if faltando:
+            agora = now_ms()
+            pipe = self.redis.pipeline(transaction=False)
+            for d in faltando:
+                pipe.set(version_key(d), agora, nx=True)
+            await pipe.execute()
+            valores = await self.redis.mget([version_key(d) for d in domains])
+        return {d: int(v) for d, v in zip(domains, valores)}
+
+    async def bump(self, *domains: str) -> Optional[Dict[str, int]]:
+        """Nova versão dos domínios; chamar depois do commit da escrita"""
+        try:
+            agora = now_ms()
+            versoes = {d: int(await self.redis.eval(BUMP_SCRIPT, 1, version_key(d), agora)) for d in domains}
+        except Exception as e:
+            logger.warning("Falha ao incrementar versão de dados", domains=domains, error=str(e))
+            return None
+        logger.debug("Versão de dados incrementada", **versoes)
+        return versoes
+
+
+# Singleton para uso global
+_data_versions = None
+
+def get_data_versions() -> DataVersionStore:
+    """Retorna instância singleton do store de versões"""
+    global _data_versions
+    if _data_versions is None:
+        _data_versions = DataVersionStore()
+    return _data_versions
+
+
+async def bump_data_version(*domains: str) -> Optional[Dict[str, int]]:
+    """Atalho para get_data_versions().bump"""
+    return await get_data_versions().bump(*domains)
@@ -3,6 +3,7 @@ Cliente para conectar ao CRM externo (MySQL - netcarrc01)
 Leitura apenas (READ-ONLY) - Nenhuma escrita permitida
 """
 import os
+import time
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date, timedelta
 from decimal import Decimal
@@ -10,6 +11,8 @@ import structlog
 import pymysql
 from pymysql.cursors import DictCursor
 
+from shared.query_metrics import instrumented_cursor
+
 logger = structlog.get_logger()
 
 
@@ -52,11 +55,14 @@ class ExternalCRMClient:
             )
         return self._connection
     
-    def _execute_query(self, query: str, params: tuple = None) -> List[Dict]:
+    def _execute_query(self, query: str, params: tuple = None, name: str = "external_crm") -> List[Dict]:
         """
         Executa query READ-ONLY e retorna resultados
         
         SEGURANÇA: Verifica se a query é apenas SELECT
+        
+        `name` é o nome lógico da consulta nas métricas (/metrics) e no log
+        de consultas lentas.
         """
         # Validar que é apenas SELECT
         query_upper = query.strip().upper()
@@ -66,8 +72,9 @@ class ExternalCRMClient:
             raise PermissionError("Apenas comandos SELECT são permitidos no CRM externo!")
         
         try:
+            inicio = time.perf_counter()
             conn = self._get_connection()
-            with conn.cursor() as cursor:
+            with instrumented_cursor(conn, name, wait=time.perf_counter() - inicio) as cursor:
                 cursor.execute(query, params)
                 results = cursor.fetchall()
                 return results
@@ -159,7 +166,7 @@ class ExternalCRMClient:
         
         query += f" ORDER BY n.date_create DESC LIMIT {limit}"
         
-        return self._execute_query(query, tuple(params))
+        return self._execute_query(query, tuple(params), name="external_crm.get_negocios")
     
     def get_negocios_ganhos(self, data_inicio: date = None, data_fim: date = None) -> List[Dict]:
         """Busca apenas negócios GANHOS (estado = 6)"""
@@ -188,7 +195,7 @@ class ExternalCRMClient:
         WHERE status = 'S'
         ORDER BY name
         """
-        return self._execute_query(query)
+        return self._execute_query(query, name="external_crm.get_vendedores")
     
     def get_origens_disponiveis(self) -> List[str]:
         """Lista todas as origens únicas"""
@@ -198,7 +205,7 @@ class ExternalCRMClient:
         WHERE origem IS NOT NULL AND origem != ''
         ORDER BY origem
         """
-        results = self._execute_query(query)
+        results = self._execute_query(query, name="external_crm.get_origens_disponiveis")
         return [r['origem'] for r in results]
     
     def get_resumo_mensal(self, ano: int = None, mes: int = None) -> Dict:
@@ -219,7 +226,7 @@ class ExternalCRMClient:
         FROM crm_negocio
         WHERE YEAR(date_create) = %s AND MONTH(date_create) = %s
         """
-        results = self._execute_query(query, (ano, mes))
+        results = self._execute_query(query, (ano, mes), name="external_crm.get_resumo_mensal")
         
         if results:
             r = results[0]
@@ -263,7 +270,7 @@ class ExternalCRMClient:
         GROUP BY n.id_user, u.name
         ORDER BY valor_vendido DESC
         """
-        results = self._execute_query(query, (data_inicio, data_fim))
+        results = self._execute_query(query, (data_inicio, data_fim), name="external_crm.get_resumo_por_vendedor")
         
         for r in results:
             ganhos = r['ganhos'] or 0
@@ -302,7 +309,7 @@ class ExternalCRMClient:
         GROUP BY grupo_origem
         ORDER BY ganhos DESC
         """
-        results = self._execute_query(query, (data_inicio, data_fim))
+        results = self._execute_query(query, (data_inicio, data_fim), name="external_crm.get_resumo_por_origem")
         
         for r in results:
             ganhos = r['ganhos'] or 0
@@ -337,7 +344,7 @@ class ExternalCRMClient:
         ORDER BY quantidade DESC
         LIMIT %s
         """
-        return self._execute_query(query, (data_inicio, data_fim, data_inicio, data_fim, limit))
+        return self._execute_query(query, (data_inicio, data_fim, data_inicio, data_fim, limit), name="external_crm.get_motivos_perda")
     
     def get_funil(self) -> List[Dict]:
         """Estado atual do funil (leads ativos)"""
@@ -361,7 +368,7 @@ class ExternalCRMClient:
         GROUP BY id_state
         ORDER BY id_state
         """
-        return self._execute_query(query)
+        return self._execute_query(query, name="external_crm.get_funil")
     
     def get_leads_parados(self, dias: int = 7) -> List[Dict]:
         """Leads parados há mais de X dias (apenas ativos)"""
@@ -384,7 +391,7 @@ class ExternalCRMClient:
         ORDER BY dias_parado DESC
         LIMIT 100
         """
-        return self._execute_query(query, (dias,))
+        return self._execute_query(query, (dias,), name="external_crm.get_leads_parados")
     
     def get_comparativo_meta_google(self, data_inicio: date = None, data_fim: date = None) -> Dict:
         """Comparativo direto META vs GOOGLE"""
@@ -409,7 +416,7 @@ class ExternalCRMClient:
           AND date_create BETWEEN %s AND %s
         GROUP BY plataforma
         """
-        results = self._execute_query(query, (data_inicio, data_fim))
+        results = self._execute_query(query, (data_inicio, data_fim), name="external_crm.get_comparativo_meta_google")
         
         comparativo = {'META': None, 'GOOGLE': None}
         for r in results:
@@ -426,7 +433,7 @@ class ExternalCRMClient:
         """Testa a conexão com o banco"""
         try:
             query = "SELECT 1 as ok"
-            result = self._execute_query(query)
+            result = self._execute_query(query, name="external_crm.test_connection")
             return result and result[0].get('ok') == 1
         except Exception as e:
             logger.error("Falha ao testar conexão com CRM externo", error=str(e))
@@ -0,0 +1,44 @@
+"""
+Marcação de dias para recálculo incremental de KPIs
+
+Toda escrita em crm_deals marca o dia de criação do deal; o worker
+recalcula só os períodos que contêm dias marcados.
+"""
+from datetime import datetime, date
+from typing import Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.analytics import KPIDirtyDay
+
+
+def _as_day(valor) -> Optional[date]:
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+async def mark_kpi_days_dirty(db: AsyncSession, dias: Iterable) -> int:
+    """
+    Marca os dias na mesma transação da escrita (commit fica com quem chama)
+
+    Aceita date ou datetime; None é ignorado.
+    """
+    dias = sorted({d for d in (_as_day(v) for v in dias) if d is not None})
+    if not dias:
+        return 0
+
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    agora = datetime.utcnow()
+    stmt = insert(KPIDirtyDay).values([{"dia": d, "marked_at": agora} for d in dias])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["dia"],
+        set_={"marked_at": stmt.excluded.marked_at}
+    )
+    await db.execute(stmt)
+    return len(dias)
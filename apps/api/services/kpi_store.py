@@ -0,0 +1,80 @@
+"""
+Leitura dos snapshots de KPIs em tempo real publicados pelo worker
+"""
+import json
+from datetime import date
+from typing import Optional
+
+import structlog
+from redis import asyncio as aioredis
+
+from config import get_settings
+from shared.kpi_snapshots import current_key, snapshot_key, field, panel_field
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+class KPISnapshotStore:
+    """
+    Lê os snapshots versionados do Redis
+
+    Cada leitura custa dois comandos O(1): GET do ponteiro da versão atual
+    e HGET do recorte. O CRM externo nunca é consultado aqui.
+    """
+    
+    def __init__(self, redis_client: aioredis.Redis = None):
+        self.redis = redis_client or aioredis.from_url(settings.redis_url, decode_responses=True)
+    
+    async def get_version(self, periodo: str) -> Optional[int]:
+        """Versão atual do período, ou None se o worker ainda não publicou"""
+        version = await self.redis.get(current_key(periodo))
+        return int(version) if version else None
+    
+    async def get(
+        self,
+        periodo: str,
+        grupo: Optional[str] = None,
+        vendedor_id: Optional[int] = None
+    ) -> Optional[dict]:
+        """Recorte grupo de origem x vendedor da versão atual"""
+        version = await self.get_version(periodo)
+        if version is None:
+            return None
+        
+        raw = await self.redis.hget(snapshot_key(periodo, version), field(grupo, vendedor_id))
+        if raw is None:
+            return None
+        
+        return {**json.loads(raw), "version": version}
+    
+    async def get_panel(self, nome: str, dias: Optional[int] = None) -> Optional[str]:
+        """
+        Painel do dashboard (JSON já serializado pelo worker) da versão atual
+
+        Os painéis são janelas móveis até hoje e vão no hash do mês corrente.
+        """
+        periodo = date.today().strftime("%Y-%m")
+        version = await self.get_version(periodo)
+        if version is None:
+            return None
+        return await self.redis.hget(snapshot_key(periodo, version), panel_field(nome, dias))
+    
+    async def get_meta(self, periodo: str) -> Optional[dict]:
+        """Metadados da versão atual (data de geração, grupos e vendedores)"""
+        version = await self.get_version(periodo)
+        if version is None:
+            return None
+        raw = await self.redis.hget(snapshot_key(periodo, version), "_meta")
+        return json.loads(raw) if raw else None
+
+
+# Singleton para uso global
+_kpi_store = None
+
+def get_kpi_store() -> KPISnapshotStore:
+    """Retorna instância singleton do store de snapshots"""
+    global _kpi_store
+    if _kpi_store is None:
+        _kpi_store = KPISnapshotStore()
+    return _kpi_store
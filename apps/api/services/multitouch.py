@@ -0,0 +1,175 @@
+"""
+Comparação de modelos de atribuição multi-touch por canal
+
+Pontos de contato do período (+ janela de lookback):
+- Deals do CRM (crm_deals): um lead com vários negócios tem vários contatos,
+  agrupados por telefone/e-mail (shared.multitouch.lead_key)
+- Cliques de anúncio (ad_clicks) cujo gclid/fbclid aparece num deal: contato
+  pago no instante do clique, anterior ao deal
+
+Conversão = deal GANHO criado no período. O cálculo é todo em lote
+(shared/multitouch.py); o resultado fica no Redis por período, com TTL curto
+se o período inclui hoje (dados ainda mudando) e longo caso contrário.
+"""
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional
+
+import numpy as np
+import structlog
+from redis import asyncio as aioredis
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_settings
+from models.attribution import AdClick
+from models.crm import CRMDeal, DealStatus
+from shared.multitouch import MODELS, compare_models, encode, lead_key, touch_channel
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CACHE_PREFIX = "attribution:multitouch"
+TTL_OPEN = 300           # Período até hoje
+TTL_CLOSED = 24 * 3600   # Período fechado
+
+_PLATFORM_CHANNEL = {"META": "Meta", "GOOGLE": "Google"}
+
+
+def _epoch(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def cache_key(data_inicio: date, data_fim: date, lookback_dias: int, meia_vida_dias: float) -> str:
+    return f"{CACHE_PREFIX}:{data_inicio.isoformat()}:{data_fim.isoformat()}:{lookback_dias}:{meia_vida_dias:g}"
+
+
+async def load_touchpoints(db: AsyncSession, data_inicio: date, data_fim: date, lookback_dias: int) -> Dict:
+    """Arrays de contatos (lead, ts, canal, conversão, valor) do período + lookback"""
+    desde = datetime.combine(data_inicio - timedelta(days=lookback_dias), time.min)
+    ate = datetime.combine(data_fim, time.max)
+    inicio_ts = _epoch(datetime.combine(data_inicio, time.min))
+
+    deals = await db.execute(
+        select(
+            CRMDeal.id, CRMDeal.telefone, CRMDeal.email, CRMDeal.canal, CRMDeal.origem,
+            CRMDeal.gclid, CRMDeal.fbclid, CRMDeal.data_criacao, CRMDeal.status, CRMDeal.valor,
+        ).where(CRMDeal.data_criacao >= desde, CRMDeal.data_criacao <= ate)
+    )
+    leads, ts, canais, convertido, valores = [], [], [], [], []
+    for deal_id, telefone, email, canal, origem, gclid, fbclid, criacao, status, valor in deals:
+        instante = _epoch(criacao)
+        leads.append(lead_key(telefone, email, deal_id))
+        ts.append(instante)
+        canais.append(touch_channel(gclid, fbclid, canal, origem))
+        convertido.append(status == DealStatus.GANHO and instante >= inicio_ts)
+        valores.append(float(valor or 0))
+
+    cliques = await db.execute(
+        select(AdClick.platform, AdClick.clicked_at, CRMDeal.id, CRMDeal.telefone, CRMDeal.email)
+        .join(CRMDeal, or_(CRMDeal.gclid == AdClick.click_id, CRMDeal.fbclid == AdClick.click_id))
+        .where(
+            AdClick.clicked_at.isnot(None),
+            AdClick.clicked_at >= desde,
+            CRMDeal.data_criacao >= desde,
+            CRMDeal.data_criacao <= ate,
+        )
+    )
+    for platform, clicked_at, deal_id, telefone, email in cliques:
+        leads.append(lead_key(telefone, email, deal_id))
+        ts.append(_epoch(clicked_at))
+        canais.append(_PLATFORM_CHANNEL.get(platform.name, platform.name))
+        convertido.append(False)
+        valores.append(0.0)
+
+    return {"lead": leads, "ts": ts, "canal": canais, "convertido": convertido, "valor": valores}
+
+
+def summarize(touchpoints: Dict, lookback_dias: int, meia_vida_dias: float) -> Dict:
+    """Crédito de conversões e receita por canal em cada modelo"""
+    convertido = np.asarray(touchpoints["convertido"], dtype=bool)
+    valor = np.asarray(touchpoints["valor"], dtype=float)
+    resumo = {
+        "contatos": len(convertido),
+        "conversoes": int(convertido.sum()),
+        "receita": round(float(valor[convertido].sum()), 2),
+        "modelos": {},
+    }
+    if not resumo["conversoes"]:
+        resumo["modelos"] = {m: [] for m in MODELS}
+        return resumo
+
+    leads, _ = encode(touchpoints["lead"])
+    canais, rotulos = encode(touchpoints["canal"])
+    creditos = compare_models(
+        leads, np.asarray(touchpoints["ts"], dtype=np.int64), canais, convertido, valor,
+        len(rotulos), lookback_days=lookback_dias, half_life_days=meia_vida_dias,
+    )
+    for modelo, (conversoes, receita) in creditos.items():
+        linhas = [
+            {
+                "canal": str(rotulos[i]),
+                "conversoes": round(float(conversoes[i]), 4),
+                "receita": round(float(receita[i]), 2),
+                "percentual": round(float(conversoes[i]) / resumo["conversoes"] * 100, 2),
+            }
+            for i in np.flatnonzero(conversoes > 0)
+        ]
+        linhas.sort(key=lambda r: r["conversoes"], reverse=True)
+        resumo["modelos"][modelo] = linhas
+    return resumo
+
+
+class MultiTouchCache:
+    """Resultado por período no Redis; falha do Redis = recalcula"""
+
+    def __init__(self, redis_client: aioredis.Redis = None):
+        self.redis = redis_client or aioredis.from_url(settings.redis_url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[Dict]:
+        try:
+            raw = await self.redis.get(key)
+        except Exception as e:
+            logger.warning("Cache multi-touch indisponível", error=str(e))
+            return None
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: Dict, ttl: int):
+        try:
+            await self.redis.set(key, json.dumps(value), ex=ttl)
+        except Exception as e:
+            logger.warning("Falha ao gravar cache multi-touch", error=str(e))
+
+
+# Singleton para uso global
+_cache = None
+
+def get_multitouch_cache() -> MultiTouchCache:
+    """Retorna instância singleton do cache multi-touch"""
+    global _cache
+    if _cache is None:
+        _cache = MultiTouchCache()
+    return _cache
+
+
+async def compare_attribution_models(
+    db: AsyncSession,
+    data_inicio: date,
+    data_fim: date,
+    lookback_dias: int = 90,
+    meia_vida_dias: float = 7.0,
+    cache: MultiTouchCache = None
+) -> Dict:
+    """Modelos first/last/linear/time-decay/position-based lado a lado (com cache)"""
+    cache = cache or get_multitouch_cache()
+    key = cache_key(data_inicio, data_fim, lookback_dias, meia_vida_dias)
+    resultado = await cache.get(key)
+    if resultado is not None:
+        return {**resultado, "cache": True}
+
+    touchpoints = await load_touchpoints(db, data_inicio, data_fim, lookback_dias)
+    resultado = summarize(touchpoints, lookback_dias, meia_vida_dias)
+    await cache.set(key, resultado, TTL_OPEN if data_fim >= date.today() else TTL_CLOSED)
+    return {**resultado, "cache": False}
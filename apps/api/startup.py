@@ -0,0 +1,282 @@
+"""
+Inicialização rápida da API principal (FAST_STARTUP=1)
+
+Reinícios de container e autoscaling pagam o boot inteiro antes da primeira
+requisição. Com FAST_STARTUP=1 o main.py:
+
+- Não importa os routers no import: cada router é importado e registrado
+  na primeira requisição ao seu prefixo (LazyRoutersMiddleware) e um
+  aquecimento em segundo plano importa os demais logo depois do startup.
+  /docs, /redoc e /openapi.json carregam todos antes de responder.
+- Pula o `Base.metadata.create_all` quando o `alembic_version` do banco já
+  está nos heads das migrations (ALEMBIC_SCRIPT_LOCATION, padrão
+  infra/migrations do repositório). Sem o diretório ou sem a tabela, roda o
+  create_all como antes.
+- Não testa o CRM externo por padrão (STARTUP_CRM_CHECK=1 liga); quando
+  ligado, o teste roda em segundo plano e o resultado aparece no /health
+  (`crm_externo`) e no log, sem segurar o startup.
+
+Em qualquer modo, as fases do boot vão para o /metrics
+(`app_startup_phase_seconds`) e para o log "Startup concluído".
+O alvo de tempo até a primeira requisição é verificado por
+infra/benchmarks/check_cold_start.py.
+"""
+import ast
+import asyncio
+import importlib
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Set
+
+import structlog
+from sqlalchemy import text
+
+import profiling
+
+logger = structlog.get_logger()
+
+FAST_STARTUP = os.getenv("FAST_STARTUP", "0").lower() in ("1", "true", "yes")
+# Padrão: ligado no modo normal, desligado com FAST_STARTUP
+CRM_CHECK = os.getenv("STARTUP_CRM_CHECK", "0" if FAST_STARTUP else "1").lower() in ("1", "true", "yes")
+ALEMBIC_SCRIPT_LOCATION = os.getenv(
+    "ALEMBIC_SCRIPT_LOCATION",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "infra", "migrations"),
+)
+
+# Rotas que precisam de todos os routers (schema OpenAPI completo)
+DOCS_PATHS = ("/docs", "/redoc", "/openapi.json")
+
+
+# ============================================
+# FASES DO STARTUP
+# ============================================
+
+class StartupTimer:
+    """
+    Duração de cada fase do boot
+
+    `mark(fase)` fecha a fase que começou na marca anterior (ou em
+    `inicio`, o perf_counter do começo do import do main); `phase(fase)` mede um bloco isolado, ex: tarefas em segundo
+    plano. `first_request` é o total de `inicio` até a primeira resposta.
+    """
+
+    def __init__(self, inicio: Optional[float] = None):
+        self.inicio = inicio or time.perf_counter()
+        self._ultima = self.inicio
+        self._lock = threading.Lock()
+        self.phases: Dict[str, float] = {}
+
+    def _add(self, fase: str, segundos: float):
+        with self._lock:
+            self.phases[fase] = self.phases.get(fase, 0.0) + segundos
+
+    def mark(self, fase: str):
+        agora = time.perf_counter()
+        self._add(fase, agora - self._ultima)
+        self._ultima = agora
+
+    @contextmanager
+    def phase(self, fase: str):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(fase, time.perf_counter() - inicio)
+
+    def first_request(self):
+        if "first_request" not in self.phases:
+            self._add("first_request", time.perf_counter() - self.inicio)
+            logger.info("Primeira requisição respondida", **self.snapshot())
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {fase: round(segundos, 6) for fase, segundos in self.phases.items()}
+
+    def render_prometheus(self) -> str:
+        linhas = [
+            "# HELP app_startup_phase_seconds Duração das fases do startup da API",
+            "# TYPE app_startup_phase_seconds gauge",
+        ]
+        for fase, segundos in self.snapshot().items():
+            linhas.append(f'app_startup_phase_seconds{{phase="{fase}"}} {segundos:.6f}')
+        return "\n".join(linhas) + "\n"
+
+
+# ============================================
+# ROUTERS SOB DEMANDA
+# ============================================
+
+@dataclass(frozen=True)
+class RouterSpec:
+    """Router do main.py: módulo com `router`, prefixo e tags"""
+    module: str
+    prefix: str
+    tags: Sequence[str]
+
+    def matches(self, path: str) -> bool:
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+
+class LazyRouters:
+    """
+    Registro dos routers do app
+
+    `include_all` é o caminho antigo (tudo no import). No modo rápido, o
+    `ensure` importa numa thread (o event loop segue respondendo) e registra
+    na thread do loop; um lock serializa os imports.
+    """
+
+    def __init__(self, specs: List[RouterSpec], timer: Optional[StartupTimer] = None):
+        self.specs = list(specs)
+        self.timer = timer
+        self._carregados: Set[str] = set()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def pending(self) -> List[RouterSpec]:
+        return [spec for spec in self.specs if spec.module not in self._carregados]
+
+    def _include(self, app, spec: RouterSpec, modulo):
+        app.include_router(modulo.router, prefix=spec.prefix, tags=list(spec.tags))
+        self._carregados.add(spec.module)
+
+    def include_all(self, app):
+        for spec in self.pending:
+            self._include(app, spec, importlib.import_module(spec.module))
+
+    async def ensure(self, app, specs: List[RouterSpec]):
+        """Importa e registra os routers de `specs` que ainda faltam"""
+        if not any(spec.module not in self._carregados for spec in specs):
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            novos = [spec for spec in specs if spec.module not in self._carregados]
+            for spec in novos:
+                inicio = time.perf_counter()
+                modulo = await asyncio.to_thread(importlib.import_module, spec.module)
+                self._include(app, spec, modulo)
+                logger.info("Router carregado", module=spec.module,
+                            ms=round((time.perf_counter() - inicio) * 1000, 1))
+            if novos:
+                # Rotas novas: instrumentar (idempotente) e refazer o schema OpenAPI
+                profiling.instrument_routes(app)
+                app.openapi_schema = None
+
+    async def ensure_path(self, app, path: str):
+        if path in DOCS_PATHS:
+            await self.ensure(app, self.specs)
+        else:
+            await self.ensure(app, [spec for spec in self.specs if spec.matches(path)])
+
+    async def warm(self, app):
+        """Aquecimento em segundo plano: carrega o que ninguém pediu ainda"""
+        try:
+            with self.timer.phase("routers_warm") if self.timer else nullcontext():
+                await self.ensure(app, self.specs)
+        except Exception as e:
+            logger.error("Falha ao carregar routers em segundo plano", error=str(e))
+
+
+class LazyRoutersMiddleware:
+    """
+    Middleware ASGI dos routers sob demanda
+
+    Carrega o router do prefixo antes do roteamento (sem pendentes, só
+    repassa) e registra o tempo até a primeira resposta. O app FastAPI vem
+    de `scope["app"]`.
+    """
+
+    def __init__(self, app, routers: LazyRouters):
+        self.app = app
+        self.routers = routers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if self.routers.pending:
+            await self.routers.ensure_path(scope["app"], scope["path"])
+        await self.app(scope, receive, send)
+        if self.routers.timer:
+            self.routers.timer.first_request()
+
+
+# ============================================
+# SCHEMA (ALEMBIC)
+# ============================================
+
+_ATRIBUICAO = re.compile(r"^(revision|down_revision)\s*(?::[^=]*)?=\s*(.+)$", re.MULTILINE)
+
+
+def alembic_heads(script_location: str = ALEMBIC_SCRIPT_LOCATION) -> Set[str]:
+    """
+    Heads das migrations lendo `revision`/`down_revision` dos arquivos
+
+    Evita importar alembic.script (~0,4 s) no boot. Diretório ausente -> set().
+    """
+    pasta = os.path.join(script_location, "versions")
+    if not os.path.isdir(pasta):
+        return set()
+    revisoes: Set[str] = set()
+    anteriores: Set[str] = set()
+    for nome in os.listdir(pasta):
+        if not nome.endswith(".py"):
+            continue
+        with open(os.path.join(pasta, nome), encoding="utf-8") as f:
+            valores = {chave: valor for chave, valor in _ATRIBUICAO.findall(f.read())}
+        if "revision" not in valores:
+            continue
+        revisoes.add(ast.literal_eval(valores["revision"].strip()))
+        down = ast.literal_eval(valores.get("down_revision", "None").strip())
+        if isinstance(down, str):
+            anteriores.add(down)
+        elif down:
+            anteriores.update(down)
+    return revisoes - anteriores
+
+
+async def schema_is_current(engine, script_location: str = ALEMBIC_SCRIPT_LOCATION) -> bool:
+    """True se o alembic_version do banco é exatamente o(s) head(s)"""
+    heads = alembic_heads(script_location)
+    if not heads:
+        logger.info("Migrations não encontradas; create_all será executado", path=script_location)
+        return False
+    try:
+        async with engine.connect() as conn:
+            versoes = {row[0] for row in await conn.execute(text("SELECT version_num FROM alembic_version"))}
+    except Exception as e:
+        logger.info("alembic_version indisponível; create_all será executado", error=str(e))
+        return False
+    if versoes != heads:
+        logger.warning("Schema fora do head do Alembic", banco=sorted(versoes), heads=sorted(heads))
+        return False
+    return True
+
+
+# ============================================
+# CRM EXTERNO EM SEGUNDO PLANO
+# ============================================
+
+CRM_STATUS = {"status": "pendente" if CRM_CHECK else "desativado"}
+
+
+async def check_external_crm(timer: Optional[StartupTimer] = None):
+    """Testa a conexão com o CRM externo sem segurar o startup"""
+    CRM_STATUS["status"] = "verificando"
+    inicio = time.perf_counter()
+    with timer.phase("crm_check") if timer else nullcontext():
+        try:
+            from services.external_crm import get_external_crm
+            ok = await asyncio.to_thread(get_external_crm().test_connection)
+        except Exception as e:
+            logger.error("Falha ao testar CRM externo", error=str(e))
+            ok = False
+    CRM_STATUS["status"] = "ok" if ok else "indisponivel"
+    log = logger.info if ok else logger.warning
+    log("Conexão com CRM externo verificada", status=CRM_STATUS["status"],
+        ms=round((time.perf_counter() - inicio) * 1000, 1))
@@ -201,20 +201,23 @@ export default function PublicRoiClient() {
   const [error, setError] = useState<string | null>(null);
   const searchParams = useSearchParams();
   const token = searchParams.get('t') ?? '';
+  // Variante gerada pelo worker (public/public-reports/<v>.json); sem ?v= usa o padrão
+  const variante = searchParams.get('v') ?? '';
 
   useEffect(() => {
     (async () => {
       try {
-        const url = token ? `/public-report.json?t=${encodeURIComponent(token)}` : '/public-report.json';
+        const arquivo = variante ? `/public-reports/${encodeURIComponent(variante)}.json` : '/public-report.json';
+        const url = token ? `${arquivo}?t=${encodeURIComponent(token)}` : arquivo;
         const res = await fetch(url, { cache: 'no-store' });
-        if (!res.ok) throw new Error('public-report.json não encontrado');
+        if (!res.ok) throw new Error(`${arquivo.slice(1)} não encontrado`);
         const data = (await res.json()) as PublicReport;
         setReport(data);
       } catch (e: any) {
         setError(e?.message ?? 'Erro ao carregar relatório');
       }
     })();
-  }, [token]);
+  }, [token, variante]);
 
   if (error) {
     return (
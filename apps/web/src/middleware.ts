@@ -7,7 +7,7 @@ export function middleware(req: NextRequest) {
   const { pathname, searchParams } = req.nextUrl;
 
   const isPublicRoi = pathname.startsWith('/publico/roi');
-  const isPublicJson = pathname === '/public-report.json';
+  const isPublicJson = pathname === '/public-report.json' || pathname.startsWith('/public-reports/');
   if (!isPublicRoi && !isPublicJson) return NextResponse.next();
 
   // "Somente quem tem o link": exige ?t=TOKEN (e retorna 404 quando inválido).
@@ -23,6 +23,6 @@ export function middleware(req: NextRequest) {
 }
 
 export const config = {
-  matcher: ['/publico/roi/:path*', '/public-report.json'],
+  matcher: ['/publico/roi/:path*', '/public-report.json', '/public-reports/:path*'],
 };
 
@@ -0,0 +1,83 @@
+"""
+Formato das métricas diárias por campanha das APIs de Ads
+
+Contas configuradas, consulta GAQL e normalização das respostas do Meta
+(insights) e do Google (searchStream). As requisições ficam em
+ads_ingest.AdsIngestClient (sync, backfill e reprocessamento usam o mesmo
+cliente, com retry e rate limit); as linhas normalizadas têm o formato:
+
+    {"platform", "external_campaign_id", "campaign_name", "date",
+     "spend", "impressions", "clicks", "leads"}
+"""
+from datetime import date
+from typing import Dict, List
+
+import structlog
+
+from config import get_settings
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+META = "META"
+GOOGLE = "GOOGLE"
+
+# Ações do Meta contadas como lead
+META_LEAD_ACTIONS = {"lead", "onsite_conversion.lead_grouped", "offsite_conversion.fb_pixel_lead"}
+
+
+def account_ids(platform: str) -> List[str]:
+    return settings.meta_account_ids if platform == META else settings.google_customer_ids
+
+
+def is_configured(platform: str) -> bool:
+    return settings.is_meta_configured if platform == META else settings.is_google_configured
+
+
+# ============================================================
+# META
+# ============================================================
+
+def _meta_leads(actions) -> int:
+    return int(sum(float(a.get("value") or 0) for a in actions or [] if a.get("action_type") in META_LEAD_ACTIONS))
+
+
+def normalize_meta(item: Dict) -> Dict:
+    return {
+        "platform": META,
+        "external_campaign_id": str(item["campaign_id"]),
+        "campaign_name": item.get("campaign_name") or str(item["campaign_id"]),
+        "date": date.fromisoformat(item["date_start"]),
+        "spend": float(item.get("spend") or 0),
+        "impressions": int(item.get("impressions") or 0),
+        "clicks": int(item.get("clicks") or 0),
+        "leads": _meta_leads(item.get("actions")),
+    }
+
+
+# ============================================================
+# GOOGLE
+# ============================================================
+
+def google_query(inicio: date, fim: date) -> str:
+    return (
+        "SELECT campaign.id, campaign.name, segments.date, metrics.cost_micros, "
+        "metrics.impressions, metrics.clicks, metrics.conversions "
+        f"FROM campaign WHERE segments.date BETWEEN '{inicio}' AND '{fim}'"
+    )
+
+
+def normalize_google(item: Dict) -> Dict:
+    campaign = item.get("campaign", {})
+    metrics = item.get("metrics", {})
+    return {
+        "platform": GOOGLE,
+        "external_campaign_id": str(campaign["id"]),
+        "campaign_name": campaign.get("name") or str(campaign["id"]),
+        "date": date.fromisoformat(item["segments"]["date"]),
+        "spend": int(metrics.get("costMicros") or 0) / 1_000_000,
+        "impressions": int(metrics.get("impressions") or 0),
+        "clicks": int(metrics.get("clicks") or 0),
+        "leads": int(float(metrics.get("conversions") or 0)),
+    }
+
@@ -0,0 +1,363 @@
+"""
+Ingestão concorrente de métricas de Ads (Meta/Google)
+
+- Um httpx.AsyncClient com pool de conexões por execução
+- Meta: batch requests (até 50 consultas por chamada), janelas de dias por
+  conta em paralelo e paginação por paging.next dentro do batch
+- Google: googleAds:searchStream (um stream por customer, sem paginação)
+- Retry com backoff exponencial + jitter em 429/5xx/erros de rede,
+  respeitando Retry-After
+- Rate limit do Meta: lê x-business-use-case-usage / x-app-usage e reduz o
+  ritmo antes de chegar em 100%
+
+As linhas saem no mesmo formato de ads_api e são gravadas em lote por
+ads_store.upsert_insights.
+"""
+import asyncio
+import json
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlencode, urlparse, parse_qsl
+
+import httpx
+import structlog
+
+from config import get_settings
+from database import get_engine
+from ads_store import upsert_insights
+from data_versions import bump_data_version
+from ads_api import (
+    META, normalize_meta, normalize_google, google_query,
+)
+from shared.data_versions import ADS
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+META_BATCH_SIZE = 50  # Limite do Graph API por batch
+META_FIELDS = "campaign_id,campaign_name,spend,impressions,clicks,actions"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class IngestError(Exception):
+    """Falha definitiva (sem retry) ao buscar dados na plataforma"""
+
+
+def windows(inicio: date, fim: date, dias: int) -> List[Tuple[date, date]]:
+    """Divide [inicio, fim] em janelas de até `dias` dias"""
+    janelas = []
+    d = inicio
+    while d <= fim:
+        ate = min(fim, d + timedelta(days=dias - 1))
+        janelas.append((d, ate))
+        d = ate + timedelta(days=1)
+    return janelas
+
+
+class UsageThrottle:
+    """
+    Desacelera conforme o uso reportado pelo Meta
+
+    Abaixo de `soft` não espera; entre `soft` e 100% espera proporcionalmente
+    até `max_delay`; em 100% espera o tempo de recuperação informado.
+    """
+
+    def __init__(self, soft: float = 75.0, max_delay: float = 30.0):
+        self.soft = soft
+        self.max_delay = max_delay
+        self.usage = 0.0
+        self.regain_seconds = 0.0
+
+    def update(self, headers: httpx.Headers):
+        usos, regain = [], 0.0
+        for header in ("x-business-use-case-usage", "x-app-usage", "x-ad-account-usage"):
+            raw = headers.get(header)
+            if not raw:
+                continue
+            try:
+                dados = json.loads(raw)
+            except ValueError:
+                continue
+            entradas = [dados] if header != "x-business-use-case-usage" else [
+                e for lista in dados.values() for e in lista
+            ]
+            for e in entradas:
+                usos.extend(float(e.get(k) or 0) for k in ("call_count", "total_cputime", "total_time", "acc_id_util_pct"))
+                regain = max(regain, float(e.get("estimated_time_to_regain_access") or 0) * 60)
+        if usos:
+            self.usage = max(usos)
+            self.regain_seconds = regain
+
+    def delay(self) -> float:
+        if self.usage >= 100:
+            return max(self.regain_seconds, self.max_delay)
+        if self.usage <= self.soft:
+            return 0.0
+        return (self.usage - self.soft) / (100 - self.soft) * self.max_delay
+
+
+class AdsIngestClient:
+    """
+    Cliente assíncrono das APIs de Ads
+
+        async with AdsIngestClient() as client:
+            rows = await client.meta_insights(["act_1"], inicio, fim)
+    """
+
+    def __init__(self, concurrency: int = None, max_retries: int = 5, transport: httpx.AsyncBaseTransport = None):
+        self.concurrency = concurrency or settings.ads_ingest_concurrency
+        self.max_retries = max_retries
+        self._transport = transport
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self.throttle = UsageThrottle()
+        self.stats = {"requests": 0, "retries": 0, "throttled_seconds": 0.0}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._google_token: Optional[str] = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=self.concurrency * 2,
+                max_keepalive_connections=self.concurrency,
+            ),
+            transport=self._transport,
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._client.aclose()
+
+    # --------------------------------------------------------
+    # HTTP com retry
+    # --------------------------------------------------------
+
+    @staticmethod
+    def backoff(tentativa: int, base: float = 0.5, cap: float = 30.0) -> float:
+        """Exponencial com jitter (0.5x a 1.5x) para não sincronizar retries"""
+        return min(cap, base * 2 ** tentativa) * random.uniform(0.5, 1.5)
+
+    @staticmethod
+    def retry_after(valor: Optional[str]) -> Optional[float]:
+        """Retry-After em segundos ("120") ou data HTTP; None se inválido"""
+        if not valor:
+            return None
+        try:
+            return max(0.0, float(valor))
+        except ValueError:
+            pass
+        try:
+            quando = parsedate_to_datetime(valor)
+        except (TypeError, ValueError):
+            return None
+        if quando.tzinfo is None:
+            quando = quando.replace(tzinfo=timezone.utc)
+        return max(0.0, (quando - datetime.now(timezone.utc)).total_seconds())
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        for tentativa in range(self.max_retries + 1):
+            espera = self.throttle.delay()
+            if espera:
+                self.stats["throttled_seconds"] += espera
+                await asyncio.sleep(espera)
+
+            try:
+                async with self._sem:
+                    self.stats["requests"] += 1
+                    resp = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                if tentativa == self.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(self.backoff(tentativa))
+                continue
+
+            self.throttle.update(resp.headers)
+            if resp.status_code not in RETRY_STATUS:
+                if resp.status_code >= 400:
+                    raise IngestError(f"{method} {url}: HTTP {resp.status_code} {resp.text[:200]}")
+                return resp
+            if tentativa == self.max_retries:
+                raise IngestError(f"{method} {url}: HTTP {resp.status_code} após {tentativa} tentativas")
+
+            self.stats["retries"] += 1
+            espera = self.retry_after(resp.headers.get("Retry-After"))
+            await asyncio.sleep(espera if espera is not None else self.backoff(tentativa))
+
+        raise IngestError(f"{method} {url}: sem resposta")
+
+    # --------------------------------------------------------
+    # META
+    # --------------------------------------------------------
+
+    def _meta_relative(self, url: str) -> str:
+        """paging.next (URL absoluta) -> relative_url do batch, sem token"""
+        parsed = urlparse(url)
+        base_path = urlparse(settings.meta_api_base_url).path.rstrip("/")
+        path = parsed.path[len(base_path):] if parsed.path.startswith(base_path) else parsed.path
+        query = [(k, v) for k, v in parse_qsl(parsed.query) if k != "access_token"]
+        return f"{path.lstrip('/')}?{urlencode(query)}"
+
+    @staticmethod
+    def _meta_query(node: str, inicio: date, fim: date) -> str:
+        params = {
+            "level": "campaign",
+            "time_range": json.dumps({"since": str(inicio), "until": str(fim)}),
+            "time_increment": 1,
+            "fields": META_FIELDS,
+            "limit": 500,
+        }
+        return f"{node}/insights?{urlencode(params)}"
+
+    async def _meta_batch(self, relative_urls: List[str]) -> Tuple[List[Dict], List[str], List[str]]:
+        """
+        Executa um batch; devolve (linhas, próximas páginas, itens a repetir)
+        """
+        resp = await self.request(
+            "POST", settings.meta_api_base_url.rstrip("/") + "/",
+            data={
+                "access_token": settings.meta_access_token,
+                "include_headers": "true",
+                "batch": json.dumps([{"method": "GET", "relative_url": u} for u in relative_urls]),
+            },
+        )
+        rows, proximas, repetir = [], [], []
+        for url, item in zip(relative_urls, resp.json()):
+            if item is None:
+                # Graph API devolve null quando o item expirou no batch
+                repetir.append(url)
+                continue
+            headers = httpx.Headers([(h["name"], h["value"]) for h in item.get("headers") or []])
+            self.throttle.update(headers)
+            if item["code"] in RETRY_STATUS:
+                repetir.append(url)
+                continue
+            if item["code"] >= 400:
+                raise IngestError(f"Meta {url}: HTTP {item['code']} {str(item.get('body'))[:200]}")
+            body = json.loads(item["body"])
+            rows.extend(normalize_meta(r) for r in body.get("data", []))
+            proxima = body.get("paging", {}).get("next")
+            if proxima:
+                proximas.append(self._meta_relative(proxima))
+        return rows, proximas, repetir
+
+    async def _meta_run(self, consultas: List[str]) -> List[Dict]:
+        """Roda consultas (relative_urls) em batches paralelos até esgotar as páginas"""
+        rows: List[Dict] = []
+        pendentes = list(consultas)
+        tentativas: Dict[str, int] = {}
+        while pendentes:
+            lotes = [pendentes[i:i + META_BATCH_SIZE] for i in range(0, len(pendentes), META_BATCH_SIZE)]
+            resultados = await asyncio.gather(*(self._meta_batch(lote) for lote in lotes))
+            pendentes, repetir_total = [], []
+            for linhas, proximas, repetir in resultados:
+                rows.extend(linhas)
+                pendentes.extend(proximas)
+                repetir_total.extend(repetir)
+            if repetir_total:
+                # Tentativas contadas por consulta: uma falha isolada não atrasa as demais rodadas
+                for url in repetir_total:
+                    tentativas[url] = tentativas.get(url, 0) + 1
+                    if tentativas[url] > self.max_retries:
+                        raise IngestError(f"Meta {url}: falhou após {self.max_retries} tentativas")
+                self.stats["retries"] += len(repetir_total)
+                await asyncio.sleep(self.backoff(max(tentativas[u] for u in repetir_total) - 1))
+                pendentes.extend(repetir_total)
+        return rows
+
+    async def meta_insights(self, account_ids: Iterable[str], inicio: date, fim: date, window_days: int = 7) -> List[Dict]:
+        """Métricas diárias por campanha de várias contas (janelas em paralelo)"""
+        consultas = []
+        for account_id in account_ids:
+            act = account_id if account_id.startswith("act_") else f"act_{account_id}"
+            consultas.extend(self._meta_query(act, a, b) for a, b in windows(inicio, fim, window_days))
+        return await self._meta_run(consultas)
+
+    async def meta_campaign_insights(self, campaign_ids: Iterable[str], inicio: date, fim: date) -> List[Dict]:
+        """Métricas diárias de campanhas específicas"""
+        return await self._meta_run([self._meta_query(cid, inicio, fim) for cid in campaign_ids])
+
+    # --------------------------------------------------------
+    # GOOGLE
+    # --------------------------------------------------------
+
+    async def _google_headers(self) -> Dict[str, str]:
+        if not self._google_token:
+            resp = await self.request("POST", settings.google_oauth_token_url, data={
+                "grant_type": "refresh_token",
+                "client_id": settings.google_ads_client_id,
+                "client_secret": settings.google_ads_client_secret,
+                "refresh_token": settings.google_ads_refresh_token,
+            })
+            self._google_token = resp.json()["access_token"]
+        return {
+            "Authorization": f"Bearer {self._google_token}",
+            "developer-token": settings.google_ads_developer_token or "",
+        }
+
+    async def _google_stream(self, customer_id: str, inicio: date, fim: date) -> List[Dict]:
+        url = f"{settings.google_ads_api_base_url}/customers/{customer_id}/googleAds:searchStream"
+        resp = await self.request("POST", url, json={"query": google_query(inicio, fim)}, headers=await self._google_headers())
+        # searchStream devolve um array JSON de blocos {"results": [...]}
+        return [normalize_google(item) for bloco in resp.json() for item in bloco.get("results", [])]
+
+    async def google_insights(self, customer_ids: Iterable[str], inicio: date, fim: date) -> List[Dict]:
+        """Métricas diárias por campanha de vários customers (um stream cada)"""
+        await self._google_headers()
+        blocos = await asyncio.gather(*(self._google_stream(c, inicio, fim) for c in customer_ids))
+        return [r for bloco in blocos for r in bloco]
+
+
+# ============================================================
+# ENTRADA SÍNCRONA (tasks Celery)
+# ============================================================
+
+async def _fetch(platform: str, inicio: date, fim: date, campaign_ids: List[str] = None) -> Tuple[List[Dict], Dict]:
+    async with AdsIngestClient() as client:
+        if platform == META and campaign_ids:
+            rows = await client.meta_campaign_insights(campaign_ids, inicio, fim)
+        elif platform == META:
+            rows = await client.meta_insights(settings.meta_account_ids, inicio, fim)
+        else:
+            rows = await client.google_insights(settings.google_customer_ids, inicio, fim)
+        return rows, client.stats
+
+
+async def _fetch_account(platform: str, account_id: str, inicio: date, fim: date) -> List[Dict]:
+    async with AdsIngestClient() as client:
+        if platform == META:
+            return await client.meta_insights([account_id], inicio, fim)
+        return await client.google_insights([account_id], inicio, fim)
+
+
+def fetch_day(platform: str, account_id: str, dia: date) -> List[Dict]:
+    """Métricas de uma conta em um dia (bloco do backfill), sem gravar"""
+    return asyncio.run(_fetch_account(platform, account_id, dia, dia))
+
+
+def ingest(platform: str, inicio: date, fim: date, campaign_ids: List[str] = None) -> Dict:
+    """
+    Busca o intervalo na plataforma e grava tudo em uma transação
+
+    Returns:
+        {"rows", "campaigns", "requests", "retries", "seconds"}
+    """
+    inicio_t = time.monotonic()
+    rows, stats = asyncio.run(_fetch(platform, inicio, fim, campaign_ids))
+    with get_engine().begin() as conn:
+        gravadas = upsert_insights(conn, rows)
+    if gravadas:
+        bump_data_version(ADS)
+
+    resultado = {
+        "rows": gravadas,
+        "campaigns": len({r["external_campaign_id"] for r in rows}),
+        "requests": stats["requests"],
+        "retries": stats["retries"],
+        "seconds": round(time.monotonic() - inicio_t, 2),
+    }
+    logger.info("Ingestão de Ads concluída", platform=platform, **resultado)
+    return resultado
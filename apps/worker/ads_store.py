@@ -0,0 +1,65 @@
+"""
+Gravação das métricas diárias de Ads (campaigns + campaign_insights)
+
+Tudo é upsert: campanhas por external_id e métricas por (campaign_id, date),
+então repetir um dia/bloco sobrescreve em vez de duplicar. As métricas vão
+pelo caminho colunar de timeseries (um statement por bloco).
+"""
+from datetime import datetime, time
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select
+
+from database import campaigns, campaign_insights, upsert_rows, mark_days_dirty
+from timeseries import upsert_columns
+
+METRIC_COLUMNS = ["spend", "impressions", "clicks", "leads"]
+
+
+def upsert_campaigns(conn, rows: List[Dict]) -> Dict[str, int]:
+    """Garante as campanhas e devolve {external_id: id local}"""
+    nomes: Dict[str, Tuple[str, str]] = {}
+    for r in rows:
+        nomes[r["external_campaign_id"]] = (r["platform"], r["campaign_name"])
+    if not nomes:
+        return {}
+
+    upsert_rows(
+        conn, campaigns,
+        [{"external_id": ext, "platform": plat, "name": nome} for ext, (plat, nome) in nomes.items()],
+        index_elements=["external_id"],
+        update_columns=["name"],
+    )
+    result = conn.execute(
+        select(campaigns.c.external_id, campaigns.c.id).where(campaigns.c.external_id.in_(list(nomes)))
+    )
+    return {ext: cid for ext, cid in result}
+
+
+def upsert_insights(conn, rows: List[Dict]) -> int:
+    """
+    Grava linhas normalizadas (ver ads_api) e marca os dias para os KPIs
+
+    Linhas repetidas de campanha/dia no mesmo lote: vale a última.
+    """
+    if not rows:
+        return 0
+
+    ids = upsert_campaigns(conn, rows)
+    colunas = {c: [] for c in ["campaign_id", "external_campaign_id", "platform", "date"] + METRIC_COLUMNS}
+    for r in rows:
+        colunas["campaign_id"].append(ids[r["external_campaign_id"]])
+        colunas["external_campaign_id"].append(r["external_campaign_id"])
+        colunas["platform"].append(r["platform"])
+        colunas["date"].append(datetime.combine(r["date"], time.min))
+        for m in METRIC_COLUMNS:
+            colunas[m].append(r[m])
+
+    alteradas = upsert_columns(
+        conn, campaign_insights, ["campaign_id", "date"], colunas,
+        update_columns=METRIC_COLUMNS + ["platform"],
+    )
+    if alteradas:
+        # Replay idêntico não muda nada e não precisa recalcular KPIs
+        mark_days_dirty(conn, {r["date"] for r in rows})
+    return len(set(zip(colunas["campaign_id"], colunas["date"])))
@@ -0,0 +1,188 @@
+"""
+Motor de atribuição deal -> campanha (gravação em attribution_links)
+
+O casamento em si está em shared/attribution.py; aqui ficam a leitura em
+lotes, o índice de cliques por lote e a gravação:
+
+- Índice de campanhas montado uma vez por execução (tabela pequena)
+- Deals lidos em lotes por keyset; cliques do lote buscados por IN nos
+  gclid/fbclid do próprio lote (ad_clicks tem índice único em click_id)
+- Por lote, numa transação: apaga as ligações automáticas (UTM/GCLID/FBCLID)
+  dos deals do lote e insere as novas em bulk. MANUAL/RULE/AI ficam intactas
+
+Incremental: o checkpoint guarda o maior updated_at de deal já processado e
+uma assinatura das campanhas/cliques indexados. Sem mudança no índice, só
+deals alterados desde o checkpoint são relidos; campanha nova ou renomeada
+(ou cliques novos) muda a assinatura e reprocessa todos os deals.
+"""
+import hashlib
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, delete, func, tuple_
+from sqlalchemy.engine import Engine
+
+from config import get_settings
+from database import (
+    crm_deals, campaigns, ad_clicks, attribution_links, attribution_checkpoints, upsert_rows,
+)
+from shared.attribution import CampaignIndex, attribute, AUTOMATIC_METHODS
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CONSUMER = "attribution"
+DEAL_COLUMNS = [
+    crm_deals.c.id, crm_deals.c.utm_source, crm_deals.c.utm_campaign,
+    crm_deals.c.gclid, crm_deals.c.fbclid, crm_deals.c.updated_at,
+]
+
+
+def load_campaign_index(conn) -> Tuple[List[Tuple], str]:
+    """Campanhas para o índice e a assinatura (campanhas + último clique)"""
+    linhas = [
+        tuple(r) for r in conn.execute(
+            select(campaigns.c.id, campaigns.c.external_id, campaigns.c.name, campaigns.c.platform)
+            .order_by(campaigns.c.id)
+        )
+    ]
+    ultimo_clique = conn.execute(select(func.max(ad_clicks.c.id))).scalar()
+    digest = hashlib.sha256(repr((linhas, ultimo_clique)).encode()).hexdigest()
+    return linhas, digest
+
+
+def batch_clicks(conn, deals: List[Dict]) -> List[Tuple[str, int]]:
+    """(click_id, campaign_id) dos gclid/fbclid presentes no lote"""
+    ids = {d[c].strip() for d in deals for c in ("gclid", "fbclid") if d.get(c)}
+    if not ids:
+        return []
+    result = conn.execute(
+        select(ad_clicks.c.click_id, ad_clicks.c.campaign_id)
+        .where(ad_clicks.c.click_id.in_(list(ids)), ad_clicks.c.campaign_id.isnot(None))
+    )
+    return [tuple(r) for r in result]
+
+
+def get_checkpoint(conn) -> Tuple[Optional[datetime], Optional[str]]:
+    row = conn.execute(
+        select(attribution_checkpoints.c.deals_updated_at, attribution_checkpoints.c.index_signature)
+        .where(attribution_checkpoints.c.consumer == CONSUMER)
+    ).first()
+    return (row[0], row[1]) if row else (None, None)
+
+
+def save_checkpoint(conn, deals_updated_at: Optional[datetime], signature: str):
+    upsert_rows(
+        conn, attribution_checkpoints,
+        [{"consumer": CONSUMER, "deals_updated_at": deals_updated_at, "index_signature": signature}],
+        index_elements=["consumer"],
+    )
+
+
+def write_links(conn, deal_ids: List, matches) -> int:
+    """Substitui as ligações automáticas dos deals do lote pelas novas"""
+    if deal_ids:
+        conn.execute(
+            delete(attribution_links).where(
+                attribution_links.c.deal_id.in_(deal_ids),
+                attribution_links.c.method.in_(AUTOMATIC_METHODS),
+            )
+        )
+    if not matches:
+        return 0
+
+    agora = datetime.utcnow()
+    conn.execute(attribution_links.insert(), [
+        {
+            "id": uuid.uuid4(),
+            "deal_id": m.deal_id,
+            "campaign_id": m.campaign_id,
+            "method": m.method,
+            "confidence": m.confidence,
+            "match_details": m.details,
+            "created_by": None,
+            "created_at": agora,
+        }
+        for m in matches
+    ])
+    return len(matches)
+
+
+def _deal_batches(engine: Engine, full: bool, desde: Optional[datetime], batch_size: int):
+    """
+    Lotes de deals por keyset
+
+    Completo: por id. Incremental: por (updated_at, id) a partir do checkpoint.
+    """
+    ultimo = None
+    while True:
+        query = select(*DEAL_COLUMNS).limit(batch_size)
+        if full:
+            query = query.order_by(crm_deals.c.id)
+            if ultimo is not None:
+                query = query.where(crm_deals.c.id > ultimo[1])
+        else:
+            query = query.where(crm_deals.c.updated_at.isnot(None)).order_by(crm_deals.c.updated_at, crm_deals.c.id)
+            if ultimo is not None:
+                query = query.where(tuple_(crm_deals.c.updated_at, crm_deals.c.id) > tuple_(*ultimo))
+            elif desde is not None:
+                query = query.where(crm_deals.c.updated_at > desde)
+
+        with engine.connect() as conn:
+            lote = [dict(r._mapping) for r in conn.execute(query)]
+        if not lote:
+            return
+        ultimo = (lote[-1]["updated_at"], lote[-1]["id"])
+        yield lote
+
+
+def run_attribution(engine: Engine, full: bool = False, batch_size: int = None) -> Dict:
+    """
+    Atribui os deals novos/alterados (ou todos, se o índice mudou ou full=True)
+
+    Returns:
+        {"mode", "deals", "links", "by_method", "campaigns", "seconds"}
+    """
+    inicio_t = time.monotonic()
+    batch_size = batch_size or settings.attribution_batch_size
+
+    with engine.connect() as conn:
+        linhas, assinatura = load_campaign_index(conn)
+        desde, assinatura_anterior = get_checkpoint(conn)
+        # Deals alterados durante um reprocessamento completo ficam para a próxima
+        maior_updated_at = conn.execute(select(func.max(crm_deals.c.updated_at))).scalar()
+
+    full = full or desde is None or assinatura != assinatura_anterior
+    campanhas = CampaignIndex(linhas)
+
+    deals = links = 0
+    por_metodo = Counter()
+    for lote in _deal_batches(engine, full, desde, batch_size):
+        with engine.begin() as conn:
+            index = campanhas.with_clicks(batch_clicks(conn, lote))
+            matches = attribute(lote, index)
+            links += write_links(conn, [d["id"] for d in lote], matches)
+            por_metodo.update(m.method for m in matches)
+            deals += len(lote)
+
+            if not full:
+                save_checkpoint(conn, lote[-1]["updated_at"], assinatura)
+
+    if full:
+        with engine.begin() as conn:
+            save_checkpoint(conn, maior_updated_at, assinatura)
+
+    resultado = {
+        "mode": "full" if full else "incremental",
+        "deals": deals,
+        "links": links,
+        "by_method": dict(por_metodo),
+        "campaigns": len(campanhas),
+        "seconds": round(time.monotonic() - inicio_t, 2),
+    }
+    logger.info("Atribuição concluída", **resultado)
+    return resultado
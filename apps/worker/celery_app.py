@@ -1,8 +1,11 @@
 """
 Configuração do Celery
 """
+from fnmatch import fnmatch
+
 from celery import Celery
 from celery.schedules import crontab
+from kombu import Queue
 from config import get_settings
 
 settings = get_settings()
@@ -17,10 +20,71 @@ app = Celery(
         'tasks.sync_meta',
         'tasks.kpi_calculator',
         'tasks.ai_analyst',
-        'tasks.sync_crm'
+        'tasks.sync_crm',
+        'tasks.backfill',
+        'tasks.monitoring',
+        'tasks.maintenance',
+        'tasks.attribution',
+        'tasks.leads',
+        'tasks.public_report'
     ]
 )
 
+# ========================================
+# FILAS
+# ========================================
+# realtime: tasks de 2-5 min que alimentam o dashboard (nunca esperam backfill)
+# sync:     ingestão incremental (CRM, Meta, Google)
+# batch:    KPIs, reprocessamentos e backfills
+# ai:       análises com LLM
+#
+# Cada fila tem workers próprios no docker-compose; a prioridade vale quando
+# um mesmo worker consome várias filas (0 = mais alta no broker Redis).
+
+TASK_ROUTES = {
+    'check_crm_connection': {'queue': 'realtime', 'priority': 0},
+    'get_realtime_kpis': {'queue': 'realtime', 'priority': 0},
+    'task_lock_stats': {'queue': 'realtime', 'priority': 0},
+    'task_crm_query_stats': {'queue': 'realtime', 'priority': 0},
+    'collect_queue_metrics': {'queue': 'realtime', 'priority': 0},
+    'sync_crm_external': {'queue': 'sync', 'priority': 3},
+    'tasks.sync_google.reprocess_last_7_days': {'queue': 'batch', 'priority': 6},
+    'tasks.sync_google.*': {'queue': 'sync', 'priority': 3},
+    'tasks.sync_meta.*': {'queue': 'sync', 'priority': 3},
+    'tasks.kpi_calculator.*': {'queue': 'batch', 'priority': 6},
+    'tasks.backfill.backfill_status': {'queue': 'realtime', 'priority': 0},
+    'tasks.backfill.*': {'queue': 'batch', 'priority': 6},
+    'tasks.maintenance.*': {'queue': 'batch', 'priority': 6},
+    'tasks.attribution.*': {'queue': 'batch', 'priority': 6},
+    'tasks.leads.*': {'queue': 'batch', 'priority': 6},
+    'tasks.public_report.*': {'queue': 'sync', 'priority': 3},
+    'tasks.ai_analyst.*': {'queue': 'ai', 'priority': 9},
+}
+
+# Limites por família (fila): soft levanta SoftTimeLimitExceeded na task,
+# hard mata o processo filho
+QUEUE_LIMITS = {
+    'realtime': {'soft_time_limit': 60, 'time_limit': 90},
+    'sync': {'soft_time_limit': 240, 'time_limit': 300, 'rate_limit': '30/m'},
+    'batch': {'soft_time_limit': 1800, 'time_limit': 2100},
+    'ai': {'soft_time_limit': 600, 'time_limit': 900, 'rate_limit': '10/m'},
+}
+
+
+def queue_for(task_name: str) -> str:
+    """Fila da task segundo TASK_ROUTES (padrão: batch)"""
+    for pattern, route in TASK_ROUTES.items():
+        if fnmatch(task_name, pattern):
+            return route['queue']
+    return 'batch'
+
+
+class QueueAnnotations:
+    """Aplica os limites da fila a cada task (task_annotations não aceita glob)"""
+
+    def annotate(self, task):
+        return QUEUE_LIMITS.get(queue_for(task.name))
+
 # Configurações
 app.conf.update(
     # Serialização
@@ -39,9 +103,24 @@ app.conf.update(
     # Resultados
     result_expires=3600,  # 1 hora
     
-    # Concorrência
+    # Concorrência (padrão; cada serviço do compose passa -c por fila)
     worker_prefetch_multiplier=1,
     worker_concurrency=4,
+    
+    # Filas e roteamento
+    task_queues=[Queue(name) for name in QUEUE_LIMITS],
+    task_default_queue='batch',
+    task_routes=TASK_ROUTES,
+    task_annotations=[QueueAnnotations()],
+    
+    # Prioridades no broker Redis
+    task_default_priority=5,
+    broker_transport_options={
+        'priority_steps': list(range(10)),
+        'sep': ':',
+        'queue_order_strategy': 'priority',
+    },
+
 )
 
 # Agendamento de tasks (Celery Beat)
@@ -54,21 +133,24 @@ app.conf.beat_schedule = {
     'check-crm-connection': {
         'task': 'check_crm_connection',
         'schedule': crontab(minute='*/2'),
-        'args': ()
+        'args': (),
+        'options': {'expires': 110}  # Não acumula na fila se o worker atrasar
     },
     
     # Sincronizar CRM a cada 5 minutos (incremental)
     'sync-crm-incremental': {
         'task': 'sync_crm_external',
         'schedule': crontab(minute='*/5'),
-        'args': (1,)  # Último dia
+        'args': (1,),  # Último dia
+        'options': {'expires': 290}
     },
     
     # KPIs em tempo real a cada 3 minutos
     'realtime-kpis': {
         'task': 'get_realtime_kpis',
         'schedule': crontab(minute='*/3'),
-        'args': ()
+        'args': (),
+        'options': {'expires': 170}
     },
     
     # ========================================
@@ -91,13 +173,43 @@ app.conf.beat_schedule = {
     # ANALYTICS E IA
     # ========================================
     
-    # Calcular KPIs a cada 6 horas
+    # Recalcular KPIs dos dias sujos (incremental, barato se nada mudou)
     'calculate-kpis': {
         'task': 'tasks.kpi_calculator.calculate_daily_kpis',
-        'schedule': crontab(minute=30, hour='*/6'),  # A cada 6h
+        'schedule': crontab(minute='*/15'),
         'args': ()
     },
     
+    # Atribuição dos deals novos/alterados (os syncs de Ads também disparam)
+    'attribute-deals': {
+        'task': 'tasks.attribution.attribute_deals',
+        'schedule': crontab(minute='7-59/15'),
+        'args': ()
+    },
+    
+    # Clusters de leads (mesmo telefone/e-mail); sem deal novo, não relê nada
+    'dedup-leads': {
+        'task': 'tasks.leads.dedup_leads',
+        'schedule': crontab(minute='11-59/15'),
+        'args': ()
+    },
+    
+    # Relatório público: só reescreve as variantes cujos dados mudaram (ETag)
+    'public-report': {
+        'task': 'tasks.public_report.generate_public_reports',
+        'schedule': crontab(minute='3-59/5'),
+        'args': (),
+        'options': {'expires': 290}
+    },
+    
+    # Métricas das filas (profundidade e latência)
+    'queue-metrics': {
+        'task': 'collect_queue_metrics',
+        'schedule': crontab(),  # A cada minuto
+        'args': (),
+        'options': {'expires': 55}
+    },
+    
     # Rodar IA Analyst a cada 6 horas
     'run-ai-analyst': {
         'task': 'tasks.ai_analyst.run_analysis',
@@ -110,9 +222,32 @@ app.conf.beat_schedule = {
         'task': 'tasks.sync_google.reprocess_last_7_days',
         'schedule': crontab(minute=0, hour=3),
         'args': ()
+    },
+    
+    # ========================================
+    # MANUTENÇÃO
+    # ========================================
+    
+    # Partições mensais de campaign_insights (meses à frente)
+    'ensure-partitions': {
+        'task': 'tasks.maintenance.ensure_ad_partitions',
+        'schedule': crontab(minute=30, hour=2),
+        'args': ()
+    },
+    
+    # Retenção: rollups + remoção dos meses antigos (1x por mês)
+    'ads-retention': {
+        'task': 'tasks.maintenance.apply_ad_retention',
+        'schedule': crontab(minute=0, hour=4, day_of_month=1),
+        'args': ()
     }
 }
 
+# Conexões por processo (registra os sinais worker_process_init/shutdown)
+import connections  # noqa: E402,F401
+# Latência por fila (sinais before_task_publish/task_prerun/task_postrun)
+import queue_metrics  # noqa: E402,F401
+
 # Export para uso em tasks
 celery_app = app
 
@@ -3,7 +3,7 @@ Configurações do Worker
 """
 import os
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 
 
@@ -20,18 +20,55 @@ class WorkerSettings(BaseSettings):
     # Redis
     redis_url: str = "redis://localhost:6379/0"
     
+    # CRM externo (MySQL - netcarrc01)
+    external_crm_host: str = "mysql.netcar-rc.com.br"
+    external_crm_port: int = 3306
+    external_crm_database: str = "netcarrc01"
+    external_crm_user: str = ""
+    external_crm_password: str = ""
+    
+    # Lock das tasks periódicas (redis | local)
+    task_lock_backend: str = "redis"
+    task_lock_ttl_seconds: int = 60  # Lease renovado por heartbeat a cada ttl/3
+    task_lock_max_reruns: int = 3  # Reexecuções COALESCE por execução (o resto fica pendente)
+    
+    # CDC (binlog) do CRM externo - opcional
+    cdc_enabled: bool = False
+    cdc_server_id: int = 4101  # Precisa ser único entre réplicas do MySQL
+    cdc_batch_size: int = 500
+    cdc_batch_seconds: float = 2.0
+    
     # Google Ads
     google_ads_developer_token: Optional[str] = None
     google_ads_client_id: Optional[str] = None
     google_ads_client_secret: Optional[str] = None
     google_ads_refresh_token: Optional[str] = None
-    google_ads_customer_id: Optional[str] = None
+    google_ads_customer_id: Optional[str] = None  # Várias contas: separadas por vírgula
+    google_ads_api_base_url: str = "https://googleads.googleapis.com/v15"
+    google_oauth_token_url: str = "https://oauth2.googleapis.com/token"
     
     # Meta Ads
     meta_app_id: Optional[str] = None
     meta_app_secret: Optional[str] = None
     meta_access_token: Optional[str] = None
-    meta_ad_account_id: Optional[str] = None
+    meta_ad_account_id: Optional[str] = None  # Várias contas: separadas por vírgula
+    meta_api_base_url: str = "https://graph.facebook.com/v18.0"
+    
+    # Ingestão de Ads (ads_ingest)
+    ads_ingest_concurrency: int = 8  # Requisições simultâneas por execução
+    ads_sync_days: int = 3  # Dias revisados a cada sync (plataformas ajustam dias recentes)
+    ads_raw_retention_months: int = 25  # Meses brutos em campaign_insights (analytics compara até 2x365 dias)
+    ads_partitions_ahead: int = 3  # Partições mensais criadas à frente
+    
+    # Atribuição deal -> campanha (attribution_store)
+    attribution_batch_size: int = 5000  # Deals por lote/transação
+    
+    # Relatório público (/publico) - tasks.public_report
+    public_report_api_base: str = "http://localhost:8000"  # roi_api
+    public_report_dir: str = "../web/public"  # public-report.json + public-reports/
+    public_report_brand: str = ""
+    public_report_variants: List[Dict] = []  # JSON: [{"slug", "start", "end", "brand"}]
+    public_report_concurrency: int = 4
     
     # IA
     ai_mode: str = "mock"
@@ -45,6 +82,14 @@ class WorkerSettings(BaseSettings):
     def database_url(self) -> str:
         return f"postgresql://{self.postgres_user}:{self.postgres_password}@{self.postgres_host}:{self.postgres_port}/{self.postgres_db}"
     
+    @property
+    def meta_account_ids(self) -> list:
+        return [a.strip() for a in (self.meta_ad_account_id or "").split(",") if a.strip()]
+    
+    @property
+    def google_customer_ids(self) -> list:
+        return [c.strip().replace("-", "") for c in (self.google_ads_customer_id or "").split(",") if c.strip()]
+    
     @property
     def is_google_configured(self) -> bool:
         return all([
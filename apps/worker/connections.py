@@ -0,0 +1,96 @@
+"""
+Conexões com escopo de processo do worker
+
+Cada processo filho do Celery abre a conexão com o CRM externo uma vez
+(worker_process_init), reutiliza entre tasks com ping + reconnect e fecha no
+shutdown. O engine do banco local segue o mesmo ciclo: o pool herdado do
+processo pai é descartado após o fork e fechado ao encerrar.
+"""
+import threading
+import time
+
+import pymysql
+import structlog
+from pymysql.cursors import DictCursor
+from celery.signals import worker_process_init, worker_process_shutdown
+
+from config import get_settings
+from database import get_engine
+from shared import query_metrics
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+# Uma conexão por thread (o pool prefork usa uma thread por processo)
+_local = threading.local()
+
+
+def connect_crm() -> pymysql.connections.Connection:
+    """Abre uma nova conexão com o CRM externo MySQL"""
+    return pymysql.connect(
+        host=settings.external_crm_host,
+        port=settings.external_crm_port,
+        database=settings.external_crm_database,
+        user=settings.external_crm_user,
+        password=settings.external_crm_password,
+        cursorclass=DictCursor,
+        charset='utf8mb4',
+        autocommit=True,
+        connect_timeout=10,
+        read_timeout=30
+    )
+
+
+def get_crm_connection() -> pymysql.connections.Connection:
+    """
+    Conexão do processo com o CRM externo
+
+    Reutiliza a conexão aberta; ping(reconnect=True) refaz o socket se o
+    MySQL derrubou a sessão (wait_timeout, failover). Se nem o reconnect
+    funcionar, abre uma conexão nova. O tempo de ping/conexão entra nas
+    métricas como espera pela conexão da próxima consulta.
+    """
+    inicio = time.perf_counter()
+    conn = getattr(_local, "crm", None)
+    if conn is not None:
+        try:
+            conn.ping(reconnect=True)
+            query_metrics.mark_wait(conn, time.perf_counter() - inicio)
+            return conn
+        except pymysql.Error as e:
+            logger.warning("Reconectando ao CRM externo", error=str(e))
+            close_crm_connection()
+
+    conn = connect_crm()
+    _local.crm = conn
+    query_metrics.mark_wait(conn, time.perf_counter() - inicio)
+    return conn
+
+
+def close_crm_connection():
+    """Fecha a conexão do processo (se houver)"""
+    conn = getattr(_local, "crm", None)
+    _local.crm = None
+    if conn is not None:
+        try:
+            conn.close()
+        except pymysql.Error:
+            pass
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    # Sockets do pool herdados do pai não podem ser usados pelo filho
+    get_engine().dispose(close=False)
+    try:
+        get_crm_connection()
+        logger.info("Conexão do processo com o CRM aberta")
+    except pymysql.Error as e:
+        # Sem CRM no boot: a primeira task tenta de novo
+        logger.warning("CRM externo indisponível no início do processo", error=str(e))
+
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    close_crm_connection()
+    get_engine().dispose()
@@ -0,0 +1,467 @@
+"""
+Consumidor CDC (binlog) do CRM externo
+
+Lê o binlog row-based do MySQL (netcarrc01) para as tabelas `crm_negocio`
+e `users` e aplica inserts/updates/deletes em micro-lotes no espelho local
+(`crm_negocio_mirror`, `crm_users_mirror`) e no rollup diário
+(`crm_negocio_daily`). A posição do binlog é salva na mesma transação do
+lote, então um restart retoma exatamente de onde parou.
+
+Nenhuma query analítica é feita no CRM: apenas o stream de replicação
+(e, opcionalmente, uma cópia inicial por chave primária via --bootstrap).
+
+Requisitos no MySQL:
+    binlog_format=ROW, binlog_row_image=FULL, binlog_row_metadata=FULL
+    usuário com REPLICATION SLAVE e REPLICATION CLIENT
+
+Uso:
+    python crm_cdc.py --bootstrap  # copia as tabelas e começa do binlog atual
+    python crm_cdc.py              # consome continuamente a partir do checkpoint
+
+Sem checkpoint salvo o consumidor não inicia: sem a cópia inicial o espelho
+ficaria só com as linhas alteradas dali em diante.
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+import pymysql
+import structlog
+from pymysql.cursors import DictCursor
+from sqlalchemy import delete, select
+
+from config import get_settings
+from data_versions import bump_data_version
+from shared.data_versions import CRM
+from shared.query_metrics import instrumented_cursor
+from database import (
+    get_engine, init_tables, upsert_rows, increment_rows,
+    crm_negocio_mirror, crm_users_mirror, crm_negocio_daily, crm_cdc_checkpoints
+)
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+CONSUMER_NAME = "crm_negocio_users"
+WATCHED_TABLES = ["crm_negocio", "users"]
+
+NEGOCIO_COLUMNS = [c.name for c in crm_negocio_mirror.columns if c.name != "synced_at"]
+USER_COLUMNS = [c.name for c in crm_users_mirror.columns if c.name != "synced_at"]
+ROLLUP_METRICS = ["total", "ganhos", "perdidos", "em_andamento", "valor_vendido"]
+
+# Mesmo agrupamento de ExternalCRMClient.get_resumo_por_origem
+GRUPOS_ORIGEM = {
+    "META": {"FACEBOOK", "INSTAGRAM"},
+    "GOOGLE": {"GOOGLE"},
+    "SITE": {"SITE"},
+    "PORTAIS": {"WEBMOTORS", "ICARROS", "MEUCARRONOVO", "MERCADO LIVRE", "MOBIAUTO",
+                "AUTOLINE", "POACARROS", "SOCARRAO", "AUTOCARRO"},
+    "PRESENCIAL": {"SHOWROOM", "NA PISTA", "FEIRÃO"},
+    "DIRETO": {"WHATSAPP", "TELEFONE", "TELEMARKETING"},
+    "INDICACAO": {"INDICACAO", "INDICAÇÃO CAMPANHA", "REDE RELACIONAMENTO"},
+}
+_ORIGEM_PARA_GRUPO = {o: g for g, origens in GRUPOS_ORIGEM.items() for o in origens}
+
+
+def grupo_origem(origem: Optional[str]) -> str:
+    """Agrupa a origem do CRM (META, GOOGLE, PORTAIS...)"""
+    if not origem:
+        return "OUTROS"
+    return _ORIGEM_PARA_GRUPO.get(origem.strip().upper(), "OUTROS")
+
+
+def _as_date(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
+
+
+def rollup_contribution(row: Dict) -> Optional[Tuple[Tuple[date, str], Dict]]:
+    """
+    Contribuição de um negócio para o rollup diário
+
+    Retorna (chave, métricas) ou None se o negócio não tem data de criação.
+    """
+    dia = _as_date(row.get("date_create"))
+    if dia is None:
+        return None
+
+    estado = row.get("id_state") or 0
+    ganho = estado == 6
+    metricas = {
+        "total": 1,
+        "ganhos": 1 if ganho else 0,
+        "perdidos": 1 if estado == 7 else 0,
+        "em_andamento": 1 if 1 <= estado <= 5 else 0,
+        "valor_vendido": Decimal(str(row.get("valor") or 0)) if ganho else Decimal("0"),
+    }
+    return (dia, grupo_origem(row.get("origem"))), metricas
+
+
+class ChangeBatch:
+    """
+    Micro-lote de mudanças já consolidadas
+
+    Eventos posteriores da mesma chave sobrescrevem os anteriores. Os deltas
+    do rollup não vêm das imagens before/after do binlog: são calculados na
+    aplicação contra a linha que está no espelho (rollup_against), então
+    reaplicar um evento que o espelho já contém não muda o rollup.
+    """
+
+    def __init__(self):
+        self.negocios_upsert: Dict[int, Dict] = {}
+        self.negocios_delete: set = set()
+        self.users_upsert: Dict[int, Dict] = {}
+        self.users_delete: set = set()
+        self.rollup_deltas: Dict[Tuple[date, str], Dict] = defaultdict(
+            lambda: {m: 0 for m in ROLLUP_METRICS}
+        )
+        self.events = 0
+
+    def __len__(self):
+        return self.events
+
+    def _apply_rollup(self, row: Dict, sign: int):
+        contrib = rollup_contribution(row)
+        if contrib is None:
+            return
+        key, metricas = contrib
+        delta = self.rollup_deltas[key]
+        for metrica, valor in metricas.items():
+            delta[metrica] += sign * valor
+
+    def add_negocio(self, before: Optional[Dict], after: Optional[Dict]):
+        """Registra insert (before=None), update ou delete (after=None)"""
+        self.events += 1
+        if after is not None:
+            row = {col: after.get(col) for col in NEGOCIO_COLUMNS}
+            self.negocios_upsert[row["id_crm_negocio"]] = row
+            self.negocios_delete.discard(row["id_crm_negocio"])
+        elif before is not None:
+            negocio_id = before.get("id_crm_negocio")
+            self.negocios_upsert.pop(negocio_id, None)
+            self.negocios_delete.add(negocio_id)
+
+    def add_user(self, before: Optional[Dict], after: Optional[Dict]):
+        self.events += 1
+        if after is not None:
+            row = {col: after.get(col) for col in USER_COLUMNS}
+            self.users_upsert[row["id_users"]] = row
+            self.users_delete.discard(row["id_users"])
+        elif before is not None:
+            user_id = before.get("id_users")
+            self.users_upsert.pop(user_id, None)
+            self.users_delete.add(user_id)
+
+    def negocio_ids(self) -> set:
+        return set(self.negocios_upsert) | self.negocios_delete
+
+    def rollup_against(self, stored: Dict[int, Dict]):
+        """
+        Deltas do rollup: estado final do lote menos a linha atual do espelho
+
+        `stored` são as linhas do espelho (id -> linha) dos negócios do lote,
+        lidas antes de gravar o lote.
+        """
+        self.rollup_deltas.clear()
+        for negocio_id in self.negocio_ids():
+            if negocio_id in stored:
+                self._apply_rollup(stored[negocio_id], -1)
+            if negocio_id in self.negocios_upsert:
+                self._apply_rollup(self.negocios_upsert[negocio_id], +1)
+        return self.rollup_rows()
+
+    def rollup_rows(self):
+        rows = []
+        for (dia, grupo), delta in self.rollup_deltas.items():
+            if not any(delta.values()):
+                continue
+            rows.append({"dia": dia, "grupo_origem": grupo, **delta})
+        return rows
+
+
+class CheckpointStore:
+    """Posição do binlog persistida no banco local"""
+
+    def __init__(self, engine, consumer: str = CONSUMER_NAME):
+        self.engine = engine
+        self.consumer = consumer
+
+    def load(self) -> Optional[Tuple[str, int]]:
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(crm_cdc_checkpoints.c.log_file, crm_cdc_checkpoints.c.log_pos)
+                .where(crm_cdc_checkpoints.c.consumer == self.consumer)
+            ).first()
+        return (row.log_file, row.log_pos) if row else None
+
+    def save(self, conn, log_file: str, log_pos: int):
+        """Salva dentro da transação do lote"""
+        upsert_rows(
+            conn, crm_cdc_checkpoints,
+            [{"consumer": self.consumer, "log_file": log_file, "log_pos": log_pos}],
+            index_elements=["consumer"]
+        )
+
+
+class CRMChangeApplier:
+    """Aplica um ChangeBatch no espelho e no rollup, com checkpoint atômico"""
+
+    def __init__(self, engine, checkpoints: CheckpointStore):
+        self.engine = engine
+        self.checkpoints = checkpoints
+
+    def _stored_negocios(self, conn, ids: set) -> Dict[int, Dict]:
+        """Linhas atuais do espelho que entram no rollup"""
+        m = crm_negocio_mirror.c
+        ids = list(ids)
+        stored = {}
+        for inicio in range(0, len(ids), 1000):
+            result = conn.execute(
+                select(m.id_crm_negocio, m.date_create, m.id_state, m.origem, m.valor)
+                .where(m.id_crm_negocio.in_(ids[inicio:inicio + 1000]))
+            )
+            stored.update({row["id_crm_negocio"]: row for row in result.mappings()})
+        return stored
+
+    def apply(self, batch: ChangeBatch, log_file: str, log_pos: int) -> dict:
+        with self.engine.begin() as conn:
+            rollup = batch.rollup_against(self._stored_negocios(conn, batch.negocio_ids()))
+
+            if batch.negocios_delete:
+                conn.execute(delete(crm_negocio_mirror).where(
+                    crm_negocio_mirror.c.id_crm_negocio.in_(batch.negocios_delete)
+                ))
+            upsert_rows(conn, crm_negocio_mirror, list(batch.negocios_upsert.values()),
+                        index_elements=["id_crm_negocio"])
+
+            if batch.users_delete:
+                conn.execute(delete(crm_users_mirror).where(
+                    crm_users_mirror.c.id_users.in_(batch.users_delete)
+                ))
+            upsert_rows(conn, crm_users_mirror, list(batch.users_upsert.values()),
+                        index_elements=["id_users"])
+
+            increment_rows(conn, crm_negocio_daily, rollup,
+                           index_elements=["dia", "grupo_origem"],
+                           delta_columns=ROLLUP_METRICS)
+
+            self.checkpoints.save(conn, log_file, log_pos)
+
+        if len(batch):
+            bump_data_version(CRM)
+        return {
+            "eventos": batch.events,
+            "negocios_upsert": len(batch.negocios_upsert),
+            "negocios_delete": len(batch.negocios_delete),
+            "users_upsert": len(batch.users_upsert),
+            "users_delete": len(batch.users_delete),
+            "rollup_linhas": len(rollup),
+            "log_file": log_file,
+            "log_pos": log_pos,
+        }
+
+
+def _mysql_settings() -> dict:
+    return {
+        "host": settings.external_crm_host,
+        "port": settings.external_crm_port,
+        "user": settings.external_crm_user,
+        "password": settings.external_crm_password,
+    }
+
+
+def bootstrap_mirror(engine, checkpoints: CheckpointStore, chunk_size: int = 5000) -> dict:
+    """
+    Cópia inicial do espelho, lendo por faixas de chave primária
+
+    A posição do binlog é lida antes da cópia, então o consumidor reaplica
+    as mudanças feitas durante a cópia. O espelho converge (upsert) e o
+    rollup também: os deltas são calculados contra a linha do espelho, e um
+    evento que a cópia já trouxe gera delta zero.
+    """
+    conn_mysql = pymysql.connect(
+        database=settings.external_crm_database,
+        cursorclass=DictCursor,
+        charset="utf8mb4",
+        connect_timeout=10,
+        read_timeout=120,
+        **_mysql_settings()
+    )
+    stats = {"negocios": 0, "users": 0}
+    try:
+        with instrumented_cursor(conn_mysql, "cdc.master_status") as cursor:
+            cursor.execute("SHOW MASTER STATUS")
+            status = cursor.fetchone()
+        log_file, log_pos = status["File"], status["Position"]
+
+        copias = [
+            ("crm_negocio", "id_crm_negocio", NEGOCIO_COLUMNS, crm_negocio_mirror, "negocios"),
+            ("users", "id_users", USER_COLUMNS, crm_users_mirror, "users"),
+        ]
+        for tabela, pk, colunas, destino, stat_key in copias:
+            ultimo_id = 0
+            while True:
+                with instrumented_cursor(conn_mysql, f"cdc.bootstrap.{tabela}") as cursor:
+                    cursor.execute(
+                        f"SELECT {', '.join(colunas)} FROM {tabela} "
+                        f"WHERE {pk} > %s ORDER BY {pk} LIMIT %s",
+                        (ultimo_id, chunk_size)
+                    )
+                    rows = cursor.fetchall()
+                if not rows:
+                    break
+                with engine.begin() as conn:
+                    upsert_rows(conn, destino, list(rows), index_elements=[pk])
+                ultimo_id = rows[-1][pk]
+                stats[stat_key] += len(rows)
+
+        rebuild_rollup(engine)
+        with engine.begin() as conn:
+            checkpoints.save(conn, log_file, log_pos)
+
+        logger.info("Bootstrap do espelho CRM concluído", log_file=log_file, log_pos=log_pos, **stats)
+        return {**stats, "log_file": log_file, "log_pos": log_pos}
+    finally:
+        conn_mysql.close()
+
+
+class MissingCheckpointError(RuntimeError):
+    """Consumidor iniciado sem checkpoint (falta rodar --bootstrap)"""
+
+
+def rebuild_rollup(engine) -> int:
+    """Recalcula o rollup diário inteiro a partir do espelho local"""
+    batch = ChangeBatch()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(
+            select(crm_negocio_mirror.c.date_create, crm_negocio_mirror.c.id_state,
+                   crm_negocio_mirror.c.origem, crm_negocio_mirror.c.valor)
+        )
+        for row in result.mappings():
+            batch._apply_rollup(row, +1)
+
+    rows = batch.rollup_rows()
+    with engine.begin() as conn:
+        conn.execute(delete(crm_negocio_daily))
+        upsert_rows(conn, crm_negocio_daily, rows, index_elements=["dia", "grupo_origem"])
+    return len(rows)
+
+
+def run_consumer(max_batches: int = None):
+    """
+    Loop principal: lê o binlog e aplica micro-lotes
+
+    O lote é aplicado quando atinge `cdc_batch_size` eventos ou quando o
+    stream fica ocioso/`cdc_batch_seconds` se passam. O checkpoint só avança
+    em fronteiras de transação (XidEvent).
+    """
+    engine = get_engine()
+    init_tables(engine)
+    checkpoints = CheckpointStore(engine)
+    applier = CRMChangeApplier(engine, checkpoints)
+
+    posicao = checkpoints.load()
+    if posicao is None:
+        raise MissingCheckpointError(
+            "CDC sem checkpoint - rode com --bootstrap para a carga inicial "
+            "(copia as tabelas e grava a posição do SHOW MASTER STATUS)"
+        )
+
+    from pymysqlreplication import BinLogStreamReader
+    from pymysqlreplication.event import XidEvent
+    from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+
+    stream = BinLogStreamReader(
+        connection_settings=_mysql_settings(),
+        server_id=settings.cdc_server_id,
+        only_schemas=[settings.external_crm_database],
+        only_tables=WATCHED_TABLES,
+        only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent, XidEvent],
+        resume_stream=True,
+        log_file=posicao[0],
+        log_pos=posicao[1],
+        blocking=False,
+        slave_heartbeat=10,
+    )
+    logger.info("Consumidor CDC iniciado", posicao=posicao, tabelas=WATCHED_TABLES)
+
+    batch = ChangeBatch()
+    transacao = []  # eventos da transação corrente, até o XidEvent
+    commit_pos = posicao
+    batch_started = time.monotonic()
+    batches = 0
+
+    def flush():
+        nonlocal batch, batch_started, batches
+        if len(batch):
+            stats = applier.apply(batch, *commit_pos)
+            logger.info("CDC lote aplicado", **stats)
+            batches += 1
+        batch = ChangeBatch()
+        batch_started = time.monotonic()
+
+    try:
+        while max_batches is None or batches < max_batches:
+            event = stream.fetchone()
+            if event is None:
+                # Stream ocioso: aplica o que já foi commitado e espera
+                flush()
+                time.sleep(settings.cdc_batch_seconds)
+                continue
+
+            if isinstance(event, XidEvent):
+                # Só transações completas entram no lote, para que o
+                # checkpoint nunca fique no meio de uma transação
+                for add, before, after in transacao:
+                    add(before, after)
+                transacao = []
+                commit_pos = (stream.log_file, stream.log_pos)
+                if (len(batch) >= settings.cdc_batch_size or
+                        time.monotonic() - batch_started >= settings.cdc_batch_seconds):
+                    flush()
+                continue
+
+            add = batch.add_negocio if event.table == "crm_negocio" else batch.add_user
+            for row in event.rows:
+                if isinstance(event, WriteRowsEvent):
+                    transacao.append((add, None, row["values"]))
+                elif isinstance(event, UpdateRowsEvent):
+                    transacao.append((add, row["before_values"], row["after_values"]))
+                else:
+                    transacao.append((add, row["values"], None))
+    finally:
+        stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consumidor CDC do CRM externo")
+    parser.add_argument("--bootstrap", action="store_true",
+                        help="Copia crm_negocio/users para o espelho antes de consumir")
+    parser.add_argument("--max-batches", type=int, default=None,
+                        help="Encerra após N lotes aplicados (útil em testes)")
+    args = parser.parse_args()
+
+    if not settings.cdc_enabled:
+        logger.warning("CDC_ENABLED=false - consumidor não iniciado")
+        return
+
+    if args.bootstrap:
+        engine = get_engine()
+        init_tables(engine)
+        bootstrap_mirror(engine, CheckpointStore(engine))
+
+    try:
+        run_consumer(max_batches=args.max_batches)
+    except MissingCheckpointError as e:
+        logger.error(str(e))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
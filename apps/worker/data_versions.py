@@ -0,0 +1,49 @@
+"""
+Versões de dados por domínio no Redis (lado do worker)
+
+As tasks incrementam a versão do domínio depois do commit das escritas; a
+API usa as versões no ETag das rotas de leitura (shared.data_versions).
+O CRM externo não avisa quando muda, então as tasks que já o consultam
+comparam um resumo do resultado com o da rodada anterior e só incrementam
+quando ele muda. Falha do Redis nunca derruba a task: vai só para o log.
+"""
+from typing import Dict, Optional
+
+import structlog
+
+from redis_client import get_redis
+from shared.data_versions import BUMP_SCRIPT, digest, digest_key, now_ms, version_key
+
+logger = structlog.get_logger()
+
+DIGEST_TTL_SECONDS = 7 * 24 * 3600
+
+
+def bump_data_version(*domains: str) -> Optional[Dict[str, int]]:
+    """Nova versão dos domínios; chamar depois do commit da escrita"""
+    try:
+        r = get_redis()
+        agora = now_ms()
+        versoes = {d: int(r.eval(BUMP_SCRIPT, 1, version_key(d), agora)) for d in domains}
+    except Exception as e:
+        logger.warning("Falha ao incrementar versão de dados", domains=domains, error=str(e))
+        return None
+    logger.debug("Versão de dados incrementada", **versoes)
+    return versoes
+
+
+def bump_if_changed(domain: str, source: str, payload) -> bool:
+    """
+    Incrementa a versão só se o resultado de `source` mudou desde a última rodada
+
+    A primeira rodada (sem resumo anterior) também incrementa.
+    """
+    novo = digest(payload)
+    try:
+        anterior = get_redis().set(digest_key(source), novo, ex=DIGEST_TTL_SECONDS, get=True)
+    except Exception as e:
+        logger.warning("Falha ao comparar resumo de dados", source=source, error=str(e))
+        return False
+    if anterior == novo:
+        return False
+    return bump_data_version(domain) is not None
@@ -0,0 +1,356 @@
+"""
+Acesso ao banco local (PostgreSQL) pelo worker
+
+O worker não importa os modelos ORM da API (containers separados), então
+as tabelas que ele escreve são declaradas aqui com SQLAlchemy Core.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Dict, Any
+
+from sqlalchemy import (
+    create_engine, MetaData, Table, Column, Integer, BigInteger, String,
+    Numeric, Float, Date, DateTime, JSON, Uuid, UniqueConstraint, Index, func,
+    literal_column
+)
+from sqlalchemy.engine import Engine
+
+from config import get_settings
+
+settings = get_settings()
+
+# Tabelas criadas pelo worker
+metadata = MetaData()
+
+# Tabelas criadas pela API (models/); declaradas só com as colunas que o
+# worker lê/escreve e nunca passadas para create_all aqui
+app_metadata = MetaData()
+
+
+# ============================================================
+# ESPELHO DO CRM EXTERNO (alimentado pelo CDC)
+# ============================================================
+
+crm_negocio_mirror = Table(
+    "crm_negocio_mirror", metadata,
+    Column("id_crm_negocio", BigInteger, primary_key=True),
+    Column("id_user", BigInteger, nullable=True, index=True),
+    Column("id_state", Integer, nullable=True, index=True),
+    Column("titulo", String(255), nullable=True),
+    Column("cliente", String(255), nullable=True),
+    Column("celular", String(50), nullable=True),
+    Column("email", String(255), nullable=True),
+    Column("origem", String(100), nullable=True),
+    Column("canal", String(100), nullable=True),
+    Column("valor", Numeric(15, 2), nullable=True),
+    Column("motivo_perda", String(255), nullable=True),
+    Column("date_create", DateTime, nullable=True, index=True),
+    Column("date_update", DateTime, nullable=True),
+    Column("synced_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+crm_users_mirror = Table(
+    "crm_users_mirror", metadata,
+    Column("id_users", BigInteger, primary_key=True),
+    Column("name", String(255), nullable=True),
+    Column("email", String(255), nullable=True),
+    Column("id_profile", Integer, nullable=True),
+    Column("status", String(5), nullable=True),
+    Column("synced_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+# Rollup diário por grupo de origem (derivado do espelho, atualizado por deltas)
+crm_negocio_daily = Table(
+    "crm_negocio_daily", metadata,
+    Column("dia", Date, primary_key=True),
+    Column("grupo_origem", String(50), primary_key=True),
+    Column("total", Integer, nullable=False, default=0),
+    Column("ganhos", Integer, nullable=False, default=0),
+    Column("perdidos", Integer, nullable=False, default=0),
+    Column("em_andamento", Integer, nullable=False, default=0),
+    Column("valor_vendido", Numeric(15, 2), nullable=False, default=0),
+    Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+# Posição do binlog já aplicada (uma linha por consumidor)
+crm_cdc_checkpoints = Table(
+    "crm_cdc_checkpoints", metadata,
+    Column("consumer", String(100), primary_key=True),
+    Column("log_file", String(255), nullable=False),
+    Column("log_pos", BigInteger, nullable=False),
+    Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+
+# ============================================================
+# BACKFILL DE ADS
+# ============================================================
+
+# Checkpoints do backfill de Ads (um bloco = plataforma x conta x dia)
+ads_backfill_chunks = Table(
+    "ads_backfill_chunks", metadata,
+    Column("backfill_id", String(100), primary_key=True),
+    Column("platform", String(20), primary_key=True),
+    Column("account_id", String(100), primary_key=True),
+    Column("dia", Date, primary_key=True),
+    Column("status", String(20), nullable=False, default="pending", index=True),  # pending/done/failed
+    Column("rows", Integer, nullable=False, default=0),
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("error", String(500), nullable=True),
+    Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+# Rollups semanais/mensais de campaign_insights (o que sobra após a retenção)
+campaign_insights_rollup = Table(
+    "campaign_insights_rollup", metadata,
+    Column("campaign_id", Integer, primary_key=True),
+    Column("granularidade", String(10), primary_key=True),  # WEEKLY/MONTHLY
+    Column("periodo_inicio", Date, primary_key=True),
+    Column("external_campaign_id", String(100)),
+    Column("platform", String(20), index=True),
+    Column("impressions", Integer, nullable=False, default=0),
+    Column("clicks", Integer, nullable=False, default=0),
+    Column("spend", Float, nullable=False, default=0.0),
+    Column("leads", Integer, nullable=False, default=0),
+    Column("sales", Integer, nullable=False, default=0),
+    Column("revenue", Float, nullable=False, default=0.0),
+    Column("dias", Integer, nullable=False, default=0),  # Dias brutos somados
+    Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+
+# ============================================================
+# ATRIBUIÇÃO
+# ============================================================
+
+# Progresso do motor de atribuição (uma linha por consumidor)
+attribution_checkpoints = Table(
+    "attribution_checkpoints", metadata,
+    Column("consumer", String(100), primary_key=True),
+    Column("deals_updated_at", DateTime(timezone=True), nullable=True),  # Último updated_at processado
+    Column("index_signature", String(64), nullable=True),  # Hash de campanhas + cliques indexados
+    Column("updated_at", DateTime, server_default=func.now(), onupdate=func.now()),
+)
+
+
+# ============================================================
+# TABELAS DA API USADAS PELO WORKER
+# ============================================================
+
+crm_deals = Table(
+    "crm_deals", app_metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("data_criacao", DateTime(timezone=True)),
+    Column("status", String(20)),  # nome do enum DealStatus (ABERTO/GANHO/PERDIDO)
+    Column("valor", Numeric(15, 2)),
+    Column("lucro_bruto", Numeric(15, 2)),
+    Column("vendedor", String(255)),
+    Column("canal", String(100)),
+    Column("telefone", String(50)),
+    Column("email", String(255)),
+    Column("lead_cluster_id", Uuid),  # Primeiro negócio do mesmo cliente (lead_dedup)
+    Column("utm_source", String(255)),
+    Column("utm_campaign", String(255)),
+    Column("gclid", String(255)),
+    Column("fbclid", String(255)),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+campaigns = Table(
+    "campaigns", app_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("external_id", String(100), unique=True),
+    Column("name", String(255)),
+    Column("platform", String(20)),  # nome do enum PlatformEnum (META/GOOGLE)
+    Column("status", String(20), default="ACTIVE"),  # nome do enum StatusEnum
+    Column("last_sync", DateTime, default=func.now(), onupdate=func.now()),
+    Column("created_at", DateTime, default=func.now()),
+    Column("updated_at", DateTime, default=func.now(), onupdate=func.now()),
+)
+
+campaign_insights = Table(
+    "campaign_insights", app_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("campaign_id", Integer),
+    Column("external_campaign_id", String(100)),
+    Column("platform", String(20)),
+    Column("date", DateTime),  # meia-noite do dia (uma linha por campanha/dia)
+    Column("impressions", Integer),
+    Column("clicks", Integer),
+    Column("spend", Float),
+    Column("leads", Integer),
+    Column("sales", Integer),
+    Column("revenue", Float),
+    Column("created_at", DateTime, default=func.now()),
+    UniqueConstraint("campaign_id", "date", name="uq_campaign_insights_campaign_date"),
+)
+
+attribution_links = Table(
+    "attribution_links", app_metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("deal_id", Uuid),
+    Column("campaign_id", Integer),
+    Column("method", String(20)),  # nome do enum AttributionMethod (UTM/GCLID/FBCLID/...)
+    Column("confidence", Numeric(5, 4)),
+    Column("match_details", String(500)),
+    Column("created_by", String(255)),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+# Click id -> campanha (relatórios de clique / importação offline)
+ad_clicks = Table(
+    "ad_clicks", app_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("click_id", String(255), unique=True),
+    Column("platform", String(20)),
+    Column("campaign_id", Integer),
+    Column("external_campaign_id", String(100)),
+    Column("clicked_at", DateTime),
+    Column("created_at", DateTime, default=func.now()),
+)
+
+kpi_snapshots = Table(
+    "kpi_snapshots", app_metadata,
+    Column("id", Uuid, primary_key=True),
+    Column("periodo_inicio", Date),
+    Column("periodo_fim", Date),
+    Column("agregacao", String(20)),  # nome do enum AggregationType (DAILY/WEEKLY/MONTHLY)
+    Column("canal", String(100)),
+    Column("campaign_id", String(100)),
+    Column("vendedor", String(255)),
+    Column("metricas", JSON),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+# Chave natural de um snapshot (migration 007); dimensões nulas do recorte
+# geral entram como '' para que o índice único também as compare
+KPI_SNAPSHOT_KEY = [
+    kpi_snapshots.c.agregacao,
+    kpi_snapshots.c.periodo_inicio,
+    *(
+        func.coalesce(kpi_snapshots.c[col], literal_column("''"))
+        for col in ("canal", "campaign_id", "vendedor")
+    ),
+]
+Index("uq_kpi_snapshots_recorte", *KPI_SNAPSHOT_KEY, unique=True)
+
+# Dias cujos KPIs precisam ser recalculados (marcados por sync/import)
+kpi_dirty_days = Table(
+    "kpi_dirty_days", app_metadata,
+    Column("dia", Date, primary_key=True),
+    Column("marked_at", DateTime),
+)
+
+
+# ============================================================
+# ENGINE E HELPERS
+# ============================================================
+
+@lru_cache()
+def get_engine() -> Engine:
+    """Engine síncrono do banco local"""
+    return create_engine(
+        settings.database_url,
+        pool_pre_ping=True,
+        pool_size=5,
+        max_overflow=5,
+        future=True
+    )
+
+
+def init_tables(engine: Engine = None):
+    """Cria as tabelas do worker se ainda não existirem"""
+    metadata.create_all(engine or get_engine())
+
+
+def dialect_insert(conn, table: Table):
+    """INSERT com suporte a ON CONFLICT para o dialeto da conexão"""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif conn.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upsert não suportado para {conn.dialect.name}")
+    return insert(table)
+
+
+def onupdate_columns(table: Table, set_: dict) -> dict:
+    """ON CONFLICT não dispara onupdate; repassa os timestamps explicitamente"""
+    return {
+        c.name: c.onupdate.arg
+        for c in table.columns
+        if c.onupdate is not None and c.name not in set_
+    }
+
+
+def insert_default_columns(table: Table, columns: Iterable[str]) -> List[str]:
+    """Colunas com default SQL (created_at) que o INSERT em SQL cru precisa preencher"""
+    columns = set(columns)
+    return [
+        c.name for c in table.columns
+        if c.default is not None and c.default.is_clause_element and c.name not in columns
+    ]
+
+
+def upsert_rows(
+    conn,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    index_elements: Iterable[str],
+    update_columns: Iterable[str] = None
+) -> int:
+    """
+    INSERT ... ON CONFLICT DO UPDATE em lote
+
+    Sobrescreve as colunas informadas (por padrão todas menos a chave).
+    """
+    if not rows:
+        return 0
+
+    index_elements = list(index_elements)
+    stmt = dialect_insert(conn, table)
+    if update_columns is None:
+        update_columns = [c for c in rows[0].keys() if c not in index_elements]
+
+    set_ = {col: stmt.excluded[col] for col in update_columns}
+    set_.update(onupdate_columns(table, set_))
+    stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+    conn.execute(stmt, rows)
+    return len(rows)
+
+
+def increment_rows(
+    conn,
+    table: Table,
+    rows: List[Dict[str, Any]],
+    index_elements: Iterable[str],
+    delta_columns: Iterable[str]
+) -> int:
+    """
+    Aplica deltas numéricos em lote (INSERT ou soma ao valor existente)
+    """
+    if not rows:
+        return 0
+
+    stmt = dialect_insert(conn, table)
+    set_ = {col: table.c[col] + stmt.excluded[col] for col in delta_columns}
+    set_.update(onupdate_columns(table, set_))
+    stmt = stmt.on_conflict_do_update(index_elements=list(index_elements), set_=set_)
+    conn.execute(stmt, rows)
+    return len(rows)
+
+
+def mark_days_dirty(conn, dias: Iterable) -> int:
+    """Marca dias para recálculo de KPIs (idempotente)"""
+    rows = [{"dia": d, "marked_at": datetime.utcnow()} for d in sorted(set(dias))]
+    return upsert_rows(conn, kpi_dirty_days, rows, ["dia"], ["marked_at"])
+
+
+def insert_missing(conn, table: Table, rows: List[Dict[str, Any]], index_elements: Iterable[str]) -> int:
+    """INSERT ... ON CONFLICT DO NOTHING em lote (mantém as linhas existentes)"""
+    if not rows:
+        return 0
+
+    stmt = dialect_insert(conn, table).on_conflict_do_nothing(index_elements=list(index_elements))
+    conn.execute(stmt, rows)
+    return len(rows)
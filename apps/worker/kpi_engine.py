@@ -0,0 +1,396 @@
+"""
+Motor incremental de KPIs
+
+Lê gasto diário (campaign_insights/AdSpendDaily + campaigns.platform) e
+negócios (crm_deals) agrupados por dia x canal x vendedor e grava snapshots
+diários, semanais (segunda a domingo) e mensais em kpi_snapshots, nos
+recortes geral, por canal e por vendedor.
+
+Só os períodos que contêm dias marcados em kpi_dirty_days são recalculados:
+cada período é apagado e regravado inteiro (upsert pela chave única da
+migration 007), então reprocessar é idempotente.
+"""
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Set, Tuple
+
+import structlog
+from sqlalchemy import select, delete, func, and_
+from sqlalchemy.engine import Engine
+
+from database import (
+    crm_deals, campaigns, campaign_insights, kpi_snapshots, kpi_dirty_days,
+    KPI_SNAPSHOT_KEY, dialect_insert
+)
+
+logger = structlog.get_logger()
+
+DAILY = "DAILY"
+WEEKLY = "WEEKLY"
+MONTHLY = "MONTHLY"
+CUSTOM = "CUSTOM"
+AGREGACOES = (DAILY, WEEKLY, MONTHLY)
+
+METRICAS_SOMADAS = [
+    "gasto_total", "impressoes", "cliques", "leads",
+    "deals_total", "deals_ganhos", "deals_perdidos", "deals_abertos",
+    "valor_total", "lucro_bruto",
+]
+
+# Chave de período: (agregacao, inicio)
+Periodo = Tuple[str, date]
+
+
+# ============================================================
+# PERÍODOS
+# ============================================================
+
+def week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def period_end(agregacao: str, inicio: date) -> date:
+    """Último dia (inclusivo) do período"""
+    if agregacao == DAILY:
+        return inicio
+    if agregacao == WEEKLY:
+        return inicio + timedelta(days=6)
+    proximo = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return proximo - timedelta(days=1)
+
+
+def period_of(agregacao: str, d: date) -> date:
+    if agregacao == DAILY:
+        return d
+    if agregacao == WEEKLY:
+        return week_start(d)
+    return month_start(d)
+
+
+def periods_for_days(dias: Iterable[date]) -> Set[Periodo]:
+    """Todos os períodos (dia, semana, mês) que contêm algum dos dias"""
+    return {(ag, period_of(ag, d)) for d in dias for ag in AGREGACOES}
+
+
+def _merge_ranges(periodos: Iterable[Periodo]) -> List[Tuple[date, date]]:
+    """Une os intervalos dos períodos para ler a base com poucas queries"""
+    intervalos = sorted((inicio, period_end(ag, inicio)) for ag, inicio in periodos)
+    merged: List[List[date]] = []
+    for inicio, fim in intervalos:
+        if merged and inicio <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], fim)
+        else:
+            merged.append([inicio, fim])
+    return [(i, f) for i, f in merged]
+
+
+def _as_date(valor) -> date:
+    # SQLite devolve date() como string
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+
+def _canal_key(valor) -> str:
+    return (str(valor) if valor else "outros").strip().lower()
+
+
+# ============================================================
+# LEITURA DA BASE
+# ============================================================
+
+def load_base(conn, inicio: date, fim: date) -> Tuple[Dict, Dict]:
+    """
+    Lê o intervalo [inicio, fim] já agregado no banco
+
+    Returns:
+        (gasto, deals): gasto por (dia, canal) e deals por (dia, canal, vendedor)
+    """
+    de = datetime.combine(inicio, time.min)
+    ate = datetime.combine(fim + timedelta(days=1), time.min)
+
+    dia_ci = func.date(campaign_insights.c.date)
+    spend_q = (
+        select(
+            dia_ci.label("dia"),
+            campaigns.c.platform,
+            func.coalesce(func.sum(campaign_insights.c.spend), 0).label("gasto_total"),
+            func.coalesce(func.sum(campaign_insights.c.impressions), 0).label("impressoes"),
+            func.coalesce(func.sum(campaign_insights.c.clicks), 0).label("cliques"),
+            func.coalesce(func.sum(campaign_insights.c.leads), 0).label("leads"),
+        )
+        .select_from(
+            campaign_insights.outerjoin(campaigns, campaigns.c.id == campaign_insights.c.campaign_id)
+        )
+        .where(campaign_insights.c.date >= de, campaign_insights.c.date < ate)
+        .group_by(dia_ci, campaigns.c.platform)
+    )
+
+    gasto = defaultdict(lambda: defaultdict(float))
+    for r in conn.execute(spend_q).mappings():
+        alvo = gasto[(_as_date(r["dia"]), _canal_key(r["platform"]))]
+        for m in ("gasto_total", "impressoes", "cliques", "leads"):
+            alvo[m] += float(r[m] or 0)
+
+    # status agrupado e normalizado em Python: o enum pode estar gravado
+    # pelo nome (create_all) ou pelo valor (migration inicial)
+    dia_d = func.date(crm_deals.c.data_criacao)
+    deals_q = (
+        select(
+            dia_d.label("dia"),
+            crm_deals.c.canal,
+            crm_deals.c.vendedor,
+            crm_deals.c.status,
+            func.count().label("qtd"),
+            func.coalesce(func.sum(crm_deals.c.valor), 0).label("valor"),
+            func.coalesce(func.sum(crm_deals.c.lucro_bruto), 0).label("lucro"),
+        )
+        .where(crm_deals.c.data_criacao >= de, crm_deals.c.data_criacao < ate)
+        .group_by(dia_d, crm_deals.c.canal, crm_deals.c.vendedor, crm_deals.c.status)
+    )
+
+    deals = defaultdict(lambda: defaultdict(float))
+    for r in conn.execute(deals_q).mappings():
+        alvo = deals[(_as_date(r["dia"]), _canal_key(r["canal"]), r["vendedor"] or "Não Atribuído")]
+        status = str(r["status"]).split(".")[-1].lower()
+        alvo["deals_total"] += r["qtd"]
+        if status == "ganho":
+            alvo["deals_ganhos"] += r["qtd"]
+            alvo["valor_total"] += float(r["valor"] or 0)
+            alvo["lucro_bruto"] += float(r["lucro"] or 0)
+        elif status == "perdido":
+            alvo["deals_perdidos"] += r["qtd"]
+        else:
+            alvo["deals_abertos"] += r["qtd"]
+
+    return gasto, deals
+
+
+# ============================================================
+# AGREGAÇÃO
+# ============================================================
+
+def finalize_metrics(m: Dict) -> Dict:
+    """Adiciona as métricas derivadas às somas de um recorte"""
+    gasto = m["gasto_total"]
+    ganhos = m["deals_ganhos"]
+    m = {k: (round(v, 2) if k in ("gasto_total", "valor_total", "lucro_bruto") else int(v))
+         for k, v in m.items()}
+    m["cpl"] = round(gasto / m["leads"], 2) if m["leads"] else 0.0
+    m["cpl_real"] = round(gasto / m["deals_total"], 2) if m["deals_total"] else 0.0
+    m["cpa"] = round(gasto / ganhos, 2) if ganhos else 0.0
+    m["roas"] = round(m["valor_total"] / gasto, 2) if gasto else 0.0
+    m["taxa_conversao"] = round(ganhos / m["deals_total"] * 100, 2) if m["deals_total"] else 0.0
+    m["ticket_medio"] = round(m["valor_total"] / ganhos, 2) if ganhos else 0.0
+    m["lucro"] = round(m["lucro_bruto"] - gasto, 2)
+    return m
+
+
+def aggregate(gasto: Dict, deals: Dict, periodos: Set[Periodo]) -> Dict[Tuple, Dict]:
+    """
+    Soma a base nos períodos pedidos, em uma passada
+
+    Recortes por período: geral (None, None), por canal (canal, None) e por
+    vendedor (None, vendedor). Gasto não tem vendedor, então os recortes de
+    vendedor só têm métricas de CRM.
+    """
+    alvos = defaultdict(set)
+    for ag, inicio in periodos:
+        alvos[ag].add(inicio)
+
+    somas = defaultdict(lambda: {m: 0.0 for m in METRICAS_SOMADAS})
+
+    def _periodos_do_dia(dia):
+        for ag, inicios in alvos.items():
+            inicio = period_of(ag, dia)
+            if inicio in inicios:
+                yield ag, inicio
+
+    for (dia, canal), m in gasto.items():
+        for ag, inicio in _periodos_do_dia(dia):
+            for chave in ((ag, inicio, None, None), (ag, inicio, canal, None)):
+                for k, v in m.items():
+                    somas[chave][k] += v
+
+    for (dia, canal, vendedor), m in deals.items():
+        for ag, inicio in _periodos_do_dia(dia):
+            for chave in ((ag, inicio, None, None), (ag, inicio, canal, None), (ag, inicio, None, vendedor)):
+                for k, v in m.items():
+                    somas[chave][k] += v
+
+    # Períodos sem dados ainda recebem o recorte geral zerado
+    for ag, inicio in periodos:
+        somas[(ag, inicio, None, None)]
+
+    return {chave: finalize_metrics(m) for chave, m in somas.items()}
+
+
+def compute_periods(conn, periodos: Set[Periodo]) -> Dict[Tuple, Dict]:
+    """Lê só os intervalos cobertos pelos períodos e agrega"""
+    gasto, deals = {}, {}
+    for inicio, fim in _merge_ranges(periodos):
+        g, d = load_base(conn, inicio, fim)
+        gasto.update(g)
+        deals.update(d)
+    return aggregate(gasto, deals, periodos)
+
+
+# ============================================================
+# PERSISTÊNCIA
+# ============================================================
+
+def write_snapshots(conn, periodos: Set[Periodo], resultado: Dict[Tuple, Dict]) -> int:
+    """
+    Substitui os snapshots dos períodos na mesma transação
+
+    O delete remove recortes que deixaram de existir; a gravação é upsert
+    pela chave única (agregação, período, canal, campanha, vendedor), então
+    backfill e calculate_daily_kpis recalculando o mesmo período ao mesmo
+    tempo não duplicam linhas: a segunda espera o commit da primeira e
+    sobrescreve.
+    """
+    por_agregacao = defaultdict(list)
+    for ag, inicio in periodos:
+        por_agregacao[ag].append(inicio)
+
+    for ag, inicios in por_agregacao.items():
+        conn.execute(
+            delete(kpi_snapshots).where(
+                and_(kpi_snapshots.c.agregacao == ag, kpi_snapshots.c.periodo_inicio.in_(inicios))
+            )
+        )
+
+    agora = datetime.utcnow()
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "periodo_inicio": inicio,
+            "periodo_fim": period_end(ag, inicio),
+            "agregacao": ag,
+            "canal": canal,
+            "campaign_id": None,
+            "vendedor": vendedor,
+            "metricas": metricas,
+            "created_at": agora,
+        }
+        for (ag, inicio, canal, vendedor), metricas in resultado.items()
+    ]
+    if rows:
+        stmt = dialect_insert(conn, kpi_snapshots)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=KPI_SNAPSHOT_KEY,
+            set_={col: stmt.excluded[col] for col in ("periodo_fim", "metricas", "created_at")},
+        )
+        conn.execute(stmt, rows)
+    return len(rows)
+
+
+def recompute_periods(engine: Engine, periodos: Set[Periodo]) -> int:
+    """Recalcula e grava os períodos em uma transação"""
+    if not periodos:
+        return 0
+    with engine.begin() as conn:
+        resultado = compute_periods(conn, periodos)
+        return write_snapshots(conn, periodos, resultado)
+
+
+def recompute_dirty(engine: Engine, limit: int = 400, desde: date = None) -> Dict:
+    """
+    Recalcula os períodos que contêm dias sujos e limpa as marcas
+
+    Só remove marcas com marked_at <= início da leitura: um dia remarcado
+    durante o cálculo continua sujo para a próxima rodada.
+
+    Dias anteriores a `desde` (fora da retenção de campaign_insights) só têm
+    as marcas removidas: sem o gasto diário, recalcular zeraria o spend dos
+    snapshots existentes.
+    """
+    corte = datetime.utcnow()
+    if desde:
+        with engine.begin() as conn:
+            conn.execute(delete(kpi_dirty_days).where(kpi_dirty_days.c.dia < desde))
+
+    with engine.connect() as conn:
+        dias = [
+            _as_date(d) for d in conn.execute(
+                select(kpi_dirty_days.c.dia)
+                .where(kpi_dirty_days.c.marked_at <= corte)
+                .order_by(kpi_dirty_days.c.dia)
+                .limit(limit)
+            ).scalars()
+        ]
+
+    if not dias:
+        return {"dias": 0, "periodos": 0, "snapshots": 0}
+
+    periodos = periods_for_days(dias)
+    with engine.begin() as conn:
+        resultado = compute_periods(conn, periodos)
+        snapshots = write_snapshots(conn, periodos, resultado)
+        conn.execute(
+            delete(kpi_dirty_days).where(
+                kpi_dirty_days.c.dia.in_(dias), kpi_dirty_days.c.marked_at <= corte
+            )
+        )
+
+    logger.info("KPIs recalculados", dias=len(dias), periodos=len(periodos), snapshots=snapshots)
+    return {"dias": len(dias), "periodos": len(periodos), "snapshots": snapshots}
+
+
+def chunk_periods(inicio: date, fim: date, primeiro: bool = False) -> Set[Periodo]:
+    """
+    Períodos de um bloco de backfill [inicio, fim]
+
+    Semanas e meses pertencem ao bloco onde começam, assim blocos vizinhos
+    rodando em paralelo nunca gravam o mesmo período. O primeiro bloco também
+    leva a semana/mês que já estavam em curso no seu início.
+    """
+    periodos = {(ag, period_of(ag, inicio)) for ag in AGREGACOES} if primeiro else set()
+    d = inicio
+    while d <= fim:
+        periodos.add((DAILY, d))
+        if d.weekday() == 0:
+            periodos.add((WEEKLY, d))
+        if d.day == 1:
+            periodos.add((MONTHLY, d))
+        d += timedelta(days=1)
+    return periodos
+
+
+def month_chunks(inicio: date, fim: date) -> List[Tuple[date, date]]:
+    """Divide [inicio, fim] em blocos mensais para o fan-out do backfill"""
+    blocos = []
+    d = month_start(inicio)
+    while d <= fim:
+        ultimo = period_end(MONTHLY, d)
+        blocos.append((max(d, inicio), min(ultimo, fim)))
+        d = ultimo + timedelta(days=1)
+    return blocos
+
+
+def period_totals(conn, inicio: date, fim: date) -> Dict:
+    """KPIs gerais de um período arbitrário (sem gravar)"""
+    gasto, deals = load_base(conn, inicio, fim)
+    somas = {m: 0.0 for m in METRICAS_SOMADAS}
+    for base in (gasto, deals):
+        for m in base.values():
+            for k, v in m.items():
+                somas[k] += v
+    return finalize_metrics(somas)
+
+
+def vendor_totals(conn, inicio: date, fim: date) -> Dict[str, Dict]:
+    """KPIs por vendedor de um período arbitrário (sem gravar)"""
+    _, deals = load_base(conn, inicio, fim)
+    somas = defaultdict(lambda: {m: 0.0 for m in METRICAS_SOMADAS})
+    for (_, _, vendedor), m in deals.items():
+        for k, v in m.items():
+            somas[vendedor][k] += v
+    return {v: finalize_metrics(m) for v, m in somas.items()}
@@ -0,0 +1,204 @@
+"""
+Publicação dos snapshots de KPIs em tempo real no Redis
+"""
+import json
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import structlog
+
+from redis_client import get_redis
+from shared.kpi_snapshots import (
+    ALL, SNAPSHOT_TTL_SECONDS, VERSION_KEY, PANEL_WINDOWS, STALLED_WINDOWS,
+    current_key, snapshot_key, field, panel_field, finalize_metrics
+)
+
+logger = structlog.get_logger()
+
+METRICAS_SOMADAS = ["total_leads", "ganhos", "perdidos", "em_andamento", "valor_vendido"]
+MOTIVOS_LIMITE = 20
+PARADOS_LIMITE = 100
+
+
+def _json_default(obj):
+    """Mesmos tipos que a API serializava direto das linhas do CRM"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(obj).__name__}")
+
+
+def build_snapshot(rows: List[Dict], periodo: str) -> Dict[str, Dict]:
+    """
+    Monta todos os recortes a partir das linhas grupo x vendedor
+
+    Cada linha traz grupo_origem, vendedor_id, vendedor e as somas. Os totais
+    por grupo, por vendedor e geral são agregados aqui, sem nova query.
+    """
+    somas = defaultdict(lambda: {m: 0 for m in METRICAS_SOMADAS})
+    nomes = {}
+
+    for r in rows:
+        grupo = r.get("grupo_origem") or "OUTROS"
+        vendedor_id = r.get("vendedor_id")
+        nomes[vendedor_id] = r.get("vendedor") or "N/A"
+        # Sem vendedor (LEFT JOIN), a chave por vendedor coincide com o total:
+        # o conjunto evita somar a linha duas vezes
+        for chave in {
+            field(grupo, vendedor_id),
+            field(grupo, None),
+            field(None, vendedor_id),
+            field(None, None),
+        }:
+            alvo = somas[chave]
+            for m in METRICAS_SOMADAS:
+                alvo[m] += r.get(m) or 0
+
+    # Garante o recorte geral mesmo sem dados no mês
+    somas[field(None, None)]
+
+    recortes = {}
+    for chave, metricas in somas.items():
+        grupo, vendedor = chave.split("|")
+        recortes[chave] = finalize_metrics({
+            "periodo": periodo,
+            "grupo_origem": grupo,
+            "vendedor_id": None if vendedor == ALL else int(vendedor),
+            "vendedor": None if vendedor == ALL else nomes.get(int(vendedor)),
+            **{m: float(v) if m == "valor_vendido" else int(v) for m, v in metricas.items()},
+        })
+    return recortes
+
+
+def _metricas(linhas: List[Dict]) -> Dict:
+    """Somas + taxa de conversão e ticket médio (AVG do valor dos ganhos)"""
+    total = {m: 0 for m in METRICAS_SOMADAS}
+    for r in linhas:
+        for m in METRICAS_SOMADAS:
+            total[m] += r.get(m) or 0
+    ganhos, finalizados = total["ganhos"], total["ganhos"] + total["perdidos"]
+    valor = float(total["valor_vendido"])
+    return {
+        **{m: int(v) for m, v in total.items() if m != "valor_vendido"},
+        "valor_vendido": valor,
+        "ticket_medio": round(valor / ganhos, 2) if ganhos else None,
+        "taxa_conversao": round(ganhos / finalizados * 100, 2) if finalizados else 0,
+    }
+
+
+def _agrupar(linhas: List[Dict], chave) -> Dict:
+    grupos = defaultdict(list)
+    for r in linhas:
+        grupos[chave(r)].append(r)
+    return grupos
+
+
+def build_panels(
+    dias_rows: List[Dict],
+    motivos_rows: List[Dict],
+    funil: List[Dict],
+    parados: List[Dict],
+    hoje: Optional[date] = None
+) -> Dict[str, object]:
+    """
+    Painéis do dashboard por janela (PANEL_WINDOWS / STALLED_WINDOWS)
+
+    Mesmo formato dos endpoints /realtime/* que consultavam o CRM, montados a
+    partir de poucas linhas agregadas por dia:
+
+    - dias_rows: dia x grupo_origem x vendedor (último ano), com as somas
+    - motivos_rows: dia x motivo_perda -> quantidade (perdidos)
+    - parados: leads ativos parados há mais que a menor janela, do mais
+      parado para o menos (as janelas maiores são filtros dessa lista)
+    """
+    hoje = hoje or date.today()
+    paineis = {panel_field("funil"): funil}
+
+    for dias in PANEL_WINDOWS:
+        inicio = hoje - timedelta(days=dias)
+        linhas = [r for r in dias_rows if r["dia"] >= inicio]
+
+        vendedores = []
+        for vendedor_id, grupo in _agrupar(linhas, lambda r: r.get("vendedor_id")).items():
+            vendedores.append({"vendedor_id": vendedor_id, "vendedor": grupo[0].get("vendedor"), **_metricas(grupo)})
+        vendedores.sort(key=lambda v: v["valor_vendido"], reverse=True)
+
+        origens = []
+        for grupo_origem, grupo in _agrupar(linhas, lambda r: r.get("grupo_origem") or "OUTROS").items():
+            metricas = _metricas(grupo)
+            del metricas["em_andamento"]
+            origens.append({"grupo_origem": grupo_origem, **metricas})
+        origens.sort(key=lambda o: o["ganhos"], reverse=True)
+
+        comparativo = {"META": None, "GOOGLE": None}
+        for plataforma in comparativo:
+            grupo = [r for r in linhas if r.get("grupo_origem") == plataforma]
+            if grupo:
+                metricas = _metricas(grupo)
+                del metricas["em_andamento"]
+                comparativo[plataforma] = {"plataforma": plataforma, **metricas}
+
+        perdidos = sum(r.get("perdidos") or 0 for r in linhas)
+        motivos = defaultdict(int)
+        for r in motivos_rows:
+            if r["dia"] >= inicio:
+                motivos[r["motivo_perda"]] += r["quantidade"]
+        top = sorted(motivos.items(), key=lambda m: m[1], reverse=True)[:MOTIVOS_LIMITE]
+
+        paineis[panel_field("vendedores", dias)] = vendedores
+        paineis[panel_field("origens", dias)] = origens
+        paineis[panel_field("meta-vs-google", dias)] = comparativo
+        paineis[panel_field("motivos-perda", dias)] = [
+            {"motivo_perda": motivo, "quantidade": n,
+             "percentual": round(n * 100 / perdidos, 2) if perdidos else None}
+            for motivo, n in top
+        ]
+
+    for dias in STALLED_WINDOWS:
+        paineis[panel_field("leads-parados", dias)] = [
+            r for r in parados if r["dias_parado"] > dias
+        ][:PARADOS_LIMITE]
+
+    return paineis
+
+
+def publish_snapshot(periodo: str, recortes: Dict[str, Dict], paineis: Optional[Dict[str, object]] = None) -> int:
+    """
+    Grava uma nova versão e só então move o ponteiro `current`
+
+    Leitores nunca veem uma versão pela metade: o hash completo é escrito
+    antes do ponteiro, na mesma transação MULTI. Os painéis (build_panels)
+    vão no mesmo hash, já serializados como a API os devolve.
+    """
+    r = get_redis()
+    version = r.incr(VERSION_KEY)
+    generated_at = datetime.utcnow().isoformat()
+
+    mapping = {chave: json.dumps(m) for chave, m in recortes.items()}
+    mapping["_meta"] = json.dumps({
+        "version": version,
+        "periodo": periodo,
+        "generated_at": generated_at,
+        "grupos": sorted({m["grupo_origem"] for m in recortes.values()}),
+        "vendedores": sorted(
+            ({"id": m["vendedor_id"], "nome": m["vendedor"]}
+             for m in recortes.values()
+             if m["vendedor_id"] is not None and m["grupo_origem"] == ALL),
+            key=lambda v: v["nome"] or ""
+        ),
+    })
+    for chave, painel in (paineis or {}).items():
+        mapping[chave] = json.dumps(painel, default=_json_default)
+
+    key = snapshot_key(periodo, version)
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(key, mapping=mapping)
+    pipe.expire(key, SNAPSHOT_TTL_SECONDS)
+    pipe.set(current_key(periodo), version, ex=SNAPSHOT_TTL_SECONDS)
+    pipe.execute()
+
+    logger.info("Snapshot de KPIs publicado", periodo=periodo, version=version, recortes=len(recortes))
+    return version
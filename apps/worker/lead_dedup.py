@@ -0,0 +1,100 @@
+"""
+De-duplicação de leads: grava crm_deals.lead_cluster_id
+
+O agrupamento está em shared/dedup.py (hash join + union-find, linear).
+Aqui ficam a leitura e a gravação:
+
+- Todos os deals lidos em streaming, só (id, telefone, email, cluster atual),
+  em ordem de criação: o cluster recebe o id do primeiro negócio do cliente
+- Só os deals cujo cluster mudou são atualizados (executemany em lotes);
+  updated_at não é tocado, então a atribuição incremental não é disparada
+- Sem deal novo/alterado desde a última execução (contagem e maior
+  updated_at iguais ao checkpoint), nada é relido
+
+Recalcular tudo é necessário: um negócio novo pode unir dois clusters antigos.
+"""
+import time
+from typing import Dict
+
+import structlog
+from sqlalchemy import select, update, func, bindparam
+from sqlalchemy.engine import Engine
+
+from database import crm_deals, attribution_checkpoints, upsert_rows
+from shared.dedup import cluster
+
+logger = structlog.get_logger()
+
+CONSUMER = "lead_dedup"
+WRITE_BATCH = 5000
+
+
+def _state(conn):
+    """(contagem, maior updated_at) dos deals: muda quando algo precisa recalcular"""
+    return conn.execute(select(func.count(), func.max(crm_deals.c.updated_at))).one()
+
+
+def _checkpoint(conn):
+    return conn.execute(
+        select(attribution_checkpoints.c.deals_updated_at, attribution_checkpoints.c.index_signature)
+        .where(attribution_checkpoints.c.consumer == CONSUMER)
+    ).first()
+
+
+def run_dedup(engine: Engine, force: bool = False) -> Dict:
+    """
+    Recalcula os clusters de leads e grava os que mudaram
+
+    Returns:
+        {"status", "deals", "clusters", "updated", "seconds"}
+    """
+    inicio = time.monotonic()
+    with engine.connect() as conn:
+        total, maior_updated_at = _state(conn)
+        anterior = _checkpoint(conn)
+    assinatura = str(total)
+    if not force and anterior and tuple(anterior) == (maior_updated_at, assinatura):
+        return {"status": "unchanged", "deals": total}
+
+    with engine.connect() as conn:
+        linhas = conn.execution_options(stream_results=True, yield_per=WRITE_BATCH).execute(
+            select(crm_deals.c.id, crm_deals.c.telefone, crm_deals.c.email, crm_deals.c.lead_cluster_id)
+            .order_by(crm_deals.c.data_criacao, crm_deals.c.id)
+        )
+        registros, atuais = [], {}
+        for deal_id, telefone, email, atual in linhas:
+            registros.append((deal_id, telefone, email))
+            atuais[deal_id] = atual
+
+    clusters = cluster(registros)
+    mudancas = [
+        {"b_id": deal_id, "b_cluster": cluster_id}
+        for deal_id, cluster_id in clusters.items()
+        if atuais[deal_id] != cluster_id
+    ]
+
+    stmt = (
+        update(crm_deals)
+        .where(crm_deals.c.id == bindparam("b_id"))
+        .values(lead_cluster_id=bindparam("b_cluster"))
+    )
+    for i in range(0, len(mudancas), WRITE_BATCH):
+        with engine.begin() as conn:
+            conn.execute(stmt, mudancas[i:i + WRITE_BATCH])
+
+    with engine.begin() as conn:
+        upsert_rows(
+            conn, attribution_checkpoints,
+            [{"consumer": CONSUMER, "deals_updated_at": maior_updated_at, "index_signature": assinatura}],
+            index_elements=["consumer"],
+        )
+
+    resultado = {
+        "status": "success",
+        "deals": len(registros),
+        "clusters": len(set(clusters.values())),
+        "updated": len(mudancas),
+        "seconds": round(time.monotonic() - inicio, 2),
+    }
+    logger.info("De-duplicação de leads concluída", **resultado)
+    return resultado
@@ -0,0 +1,327 @@
+"""
+Lock distribuído / singleflight para tasks periódicas
+
+Uma execução por nome de task de cada vez, em todos os workers. O lock é
+um lease no Redis (SET NX PX com token) renovado por heartbeat enquanto a
+task roda; se o processo morrer o lease expira sozinho.
+
+Quando o lock está ocupado a nova execução é:
+- SKIP: descartada (a próxima do beat assume)
+- COALESCE: registrada como pendente com os seus argumentos; quem está
+  rodando executa mais uma vez por conjunto distinto de argumentos ao
+  terminar (disparos com argumentos iguais viram uma só execução)
+
+As reexecuções param em TASK_LOCK_MAX_RERUNS ou antes de estourar o
+soft_time_limit da task; o que sobrar continua pendente para a próxima.
+
+Contadores de skipped/coalesced ficam no hash `task_locks:stats`.
+"""
+import functools
+import inspect
+import json
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+import structlog
+
+from config import get_settings
+from redis_client import get_redis
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+SKIP = "skip"
+COALESCE = "coalesce"
+
+LOCK_PREFIX = "task_locks:lock:"
+PENDING_PREFIX = "task_locks:pending:"
+STATS_KEY = "task_locks:stats"
+
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_EXTEND = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+# ============================================================
+# BACKENDS
+# ============================================================
+
+class RedisLockBackend:
+    """Lease no Redis compartilhado por todos os workers"""
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or get_redis()
+        self._release = self.redis.register_script(_RELEASE)
+        self._extend = self.redis.register_script(_EXTEND)
+
+    def acquire(self, name: str, token: str, ttl_ms: int) -> bool:
+        return bool(self.redis.set(LOCK_PREFIX + name, token, nx=True, px=ttl_ms))
+
+    def extend(self, name: str, token: str, ttl_ms: int) -> bool:
+        return bool(self._extend(keys=[LOCK_PREFIX + name], args=[token, ttl_ms]))
+
+    def release(self, name: str, token: str) -> bool:
+        return bool(self._release(keys=[LOCK_PREFIX + name], args=[token]))
+
+    def mark_pending(self, name: str, ttl_ms: int, call: str):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hsetnx(PENDING_PREFIX + name, call, time.time())
+        pipe.pexpire(PENDING_PREFIX + name, ttl_ms)
+        pipe.execute()
+
+    def pop_pending(self, name: str) -> List[str]:
+        """Chamadas pendentes (JSON dos argumentos), na ordem de chegada"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hgetall(PENDING_PREFIX + name)
+        pipe.delete(PENDING_PREFIX + name)
+        pendentes, _ = pipe.execute()
+        return sorted(pendentes, key=lambda call: float(pendentes[call]))
+
+    def incr(self, name: str, counter: str):
+        self.redis.hincrby(STATS_KEY, f"{name}:{counter}", 1)
+
+    def stats(self) -> Dict[str, int]:
+        return {k: int(v) for k, v in self.redis.hgetall(STATS_KEY).items()}
+
+
+class LocalLockBackend:
+    """
+    Mesmo contrato em memória, para testes e desenvolvimento sem Redis
+
+    Só protege dentro de um processo.
+    """
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locks: Dict[str, tuple] = {}
+        self._pending: Dict[str, tuple] = {}
+        self._stats: Dict[str, int] = {}
+
+    def _held(self, name: str) -> Optional[str]:
+        atual = self._locks.get(name)
+        if atual and atual[1] > time.monotonic():
+            return atual[0]
+        return None
+
+    def acquire(self, name: str, token: str, ttl_ms: int) -> bool:
+        with self._mutex:
+            if self._held(name):
+                return False
+            self._locks[name] = (token, time.monotonic() + ttl_ms / 1000)
+            return True
+
+    def extend(self, name: str, token: str, ttl_ms: int) -> bool:
+        with self._mutex:
+            if self._held(name) != token:
+                return False
+            self._locks[name] = (token, time.monotonic() + ttl_ms / 1000)
+            return True
+
+    def release(self, name: str, token: str) -> bool:
+        with self._mutex:
+            if self._held(name) != token:
+                return False
+            del self._locks[name]
+            return True
+
+    def mark_pending(self, name: str, ttl_ms: int, call: str):
+        with self._mutex:
+            _, chamadas = self._pending.get(name, (0, []))
+            if call not in chamadas:
+                chamadas = chamadas + [call]
+            self._pending[name] = (time.monotonic() + ttl_ms / 1000, chamadas)
+
+    def pop_pending(self, name: str) -> List[str]:
+        with self._mutex:
+            expira, chamadas = self._pending.pop(name, (0, []))
+            return chamadas if expira > time.monotonic() else []
+
+    def incr(self, name: str, counter: str):
+        with self._mutex:
+            chave = f"{name}:{counter}"
+            self._stats[chave] = self._stats.get(chave, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._mutex:
+            return dict(self._stats)
+
+
+_backend = None
+
+
+def get_lock_backend():
+    """Backend configurado (TASK_LOCK_BACKEND=redis|local)"""
+    global _backend
+    if _backend is None:
+        _backend = LocalLockBackend() if settings.task_lock_backend == "local" else RedisLockBackend()
+    return _backend
+
+
+def set_lock_backend(backend):
+    """Troca o backend (ex.: LocalLockBackend em testes)"""
+    global _backend
+    _backend = backend
+
+
+# ============================================================
+# LOCK COM HEARTBEAT
+# ============================================================
+
+class TaskLock:
+    """
+    Lease renovado em background enquanto o bloco roda
+
+        with TaskLock("sync_crm_external") as lock:
+            if lock.acquired: ...
+    """
+
+    def __init__(self, name: str, ttl_seconds: int = None, backend=None):
+        self.name = name
+        self.ttl_ms = int((ttl_seconds or settings.task_lock_ttl_seconds) * 1000)
+        self.backend = backend or get_lock_backend()
+        self.token = uuid.uuid4().hex
+        self.acquired = False
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def acquire(self) -> bool:
+        self.acquired = self.backend.acquire(self.name, self.token, self.ttl_ms)
+        if self.acquired:
+            self._heartbeat = threading.Thread(
+                target=self._beat, name=f"lock-heartbeat-{self.name}", daemon=True
+            )
+            self._heartbeat.start()
+        return self.acquired
+
+    def _beat(self):
+        intervalo = self.ttl_ms / 3000
+        while not self._stop.wait(intervalo):
+            try:
+                if not self.backend.extend(self.name, self.token, self.ttl_ms):
+                    logger.warning("Lease da task perdido", task=self.name)
+                    return
+            except Exception as e:
+                logger.warning("Falha no heartbeat do lock", task=self.name, error=str(e))
+
+    def release(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.join(timeout=1)
+        if self.acquired:
+            self.acquired = False
+            try:
+                self.backend.release(self.name, self.token)
+            except Exception as e:
+                # O lease expira sozinho no TTL
+                logger.warning("Falha ao liberar lock", task=self.name, error=str(e))
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _soft_time_limit() -> Optional[float]:
+    """soft_time_limit da task Celery em execução (None fora do worker)"""
+    try:
+        from celery import current_task
+    except ImportError:
+        return None
+    if not current_task or current_task.request.called_directly:
+        return None
+    _, soft = current_task.request.timelimit or (None, None)
+    return soft or getattr(current_task, "soft_time_limit", None)
+
+
+def singleflight(name: str, mode: str = SKIP, ttl_seconds: int = None, max_reruns: int = None) -> Callable:
+    """
+    Garante uma execução por vez da task entre todos os workers
+
+    Aplicar abaixo de @celery_app.task. Execuções descartadas retornam
+    {"status": "skipped"} ou {"status": "coalesced"}; no modo COALESCE os
+    argumentos da chamada agrupada são guardados e executados depois (o
+    retorno da execução original é o da própria chamada).
+    """
+    def decorator(func):
+        assinatura = inspect.signature(func)
+
+        def chamada(args, kwargs) -> str:
+            # Padrões aplicados: f() e f(1) com dias=1 são a mesma chamada
+            bound = assinatura.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return json.dumps(bound.arguments, sort_keys=True, default=str)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            backend = get_lock_backend()
+            lock = TaskLock(name, ttl_seconds, backend)
+            atual = chamada(args, kwargs)
+
+            if not lock.acquire():
+                if mode == COALESCE:
+                    backend.mark_pending(name, lock.ttl_ms * 2, atual)
+                    backend.incr(name, "coalesced")
+                    logger.info("Execução agrupada com a que está em andamento", task=name)
+                    return {"status": "coalesced", "task": name}
+                backend.incr(name, "skipped")
+                logger.info("Execução ignorada: anterior ainda em andamento", task=name)
+                return {"status": "skipped", "task": name}
+
+            try:
+                # Pendências de antes desta execução: as iguais a ela já estão cobertas
+                fila = [c for c in backend.pop_pending(name) if c != atual]
+                inicio = time.monotonic()
+                result = func(*args, **kwargs)
+                if mode == COALESCE:
+                    _rerun(func, backend, lock, fila, inicio, time.monotonic() - inicio, max_reruns)
+                return result
+            finally:
+                lock.release()
+
+        def _rerun(func, backend, lock, fila, inicio, duracao, limite):
+            limite = settings.task_lock_max_reruns if limite is None else limite
+            soft = _soft_time_limit()
+            reruns = 0
+            while True:
+                fila += [c for c in backend.pop_pending(name) if c not in fila]
+                if not fila:
+                    return
+                decorrido = time.monotonic() - inicio
+                if reruns >= limite or (soft and decorrido + duracao > soft):
+                    # Fica para a próxima execução (beat ou novo disparo)
+                    for c in fila:
+                        backend.mark_pending(name, lock.ttl_ms * 2, c)
+                    logger.warning("Reexecuções adiadas", task=name, pendentes=len(fila), reruns=reruns)
+                    return
+                c = fila.pop(0)
+                backend.incr(name, "reruns")
+                reruns += 1
+                comeco = time.monotonic()
+                func(**json.loads(c))
+                duracao = max(duracao, time.monotonic() - comeco)
+
+        return wrapper
+    return decorator
+
+
+def lock_stats() -> Dict[str, Dict[str, int]]:
+    """Contadores agrupados por task: {"sync_crm_external": {"coalesced": 3, ...}}"""
+    agrupado: Dict[str, Dict[str, int]] = {}
+    for chave, valor in get_lock_backend().stats().items():
+        task, _, contador = chave.rpartition(":")
+        agrupado.setdefault(task, {})[contador] = valor
+    return agrupado
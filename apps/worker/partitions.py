@@ -0,0 +1,223 @@
+"""
+Partições mensais e retenção de campaign_insights
+
+PostgreSQL: campaign_insights é particionada por RANGE (date), uma partição
+por mês (campaign_insights_pAAAA_MM) + DEFAULT. A migração 003 converte a
+tabela existente; aqui só criamos as partições dos próximos meses e
+aplicamos a retenção. Consultas com filtro em `date` (todas as de
+routers/analytics.py) leem só as partições do intervalo.
+
+SQLite (dev/testes): tabela única; a retenção faz DELETE por intervalo.
+
+Retenção: meses mais antigos que `ads_raw_retention_months` viram rollups
+semanais e mensais (campaign_insights_rollup) e a partição é removida. Cada
+mês é resumido e removido na mesma transação, então rodar de novo nunca
+soma duas vezes.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+from sqlalchemy import select, delete, func, text
+
+from config import get_settings
+from database import campaign_insights, campaign_insights_rollup, increment_rows
+from kpi_engine import WEEKLY, MONTHLY, week_start, month_start
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+TABLE = campaign_insights.name
+ROLLUP_METRICS = ["impressions", "clicks", "spend", "leads", "sales", "revenue"]
+
+
+def add_months(d: date, n: int) -> date:
+    total = d.year * 12 + d.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def partition_name(mes: date, table: str = TABLE) -> str:
+    return f"{table}_p{mes:%Y_%m}"
+
+
+def retention_cutoff(hoje: date = None, meses: int = None) -> date:
+    """Primeiro dia mantido em dados brutos (início de mês)"""
+    hoje = hoje or date.today()
+    meses = settings.ads_raw_retention_months if meses is None else meses
+    return add_months(month_start(hoje), -meses)
+
+
+def is_partitioned(conn, table: str = TABLE) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(conn, table: str = TABLE) -> Dict[date, str]:
+    """{início do mês: nome} das partições mensais existentes"""
+    nomes = conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:t)"
+        ),
+        {"t": table},
+    ).scalars()
+    prefixo = f"{table}_p"
+    partes = {}
+    for nome in nomes:
+        if nome.startswith(prefixo):
+            ano, mes = nome[len(prefixo):].split("_")
+            partes[date(int(ano), int(mes), 1)] = nome
+    return partes
+
+
+def create_partition(conn, mes: date, table: str = TABLE) -> bool:
+    """
+    Cria a partição do mês (se não existir)
+
+    Linhas do mês que caíram na DEFAULT são movidas para a nova partição
+    antes do ATTACH (senão o PostgreSQL recusa a partição).
+    """
+    nome = partition_name(mes, table)
+    if conn.execute(text("SELECT to_regclass(:n)"), {"n": nome}).scalar():
+        return False
+
+    inicio, fim = mes, add_months(mes, 1)
+    conn.execute(text(f"CREATE TABLE {nome} (LIKE {table} INCLUDING DEFAULTS)"))
+    default = f"{table}_default"
+    if conn.execute(text("SELECT to_regclass(:n)"), {"n": default}).scalar():
+        conn.execute(
+            text(
+                f"WITH movidas AS (DELETE FROM {default} WHERE date >= :inicio AND date < :fim RETURNING *) "
+                f"INSERT INTO {nome} SELECT * FROM movidas"
+            ),
+            {"inicio": inicio, "fim": fim},
+        )
+    conn.execute(text(
+        f"ALTER TABLE {table} ATTACH PARTITION {nome} FOR VALUES FROM ('{inicio}') TO ('{fim}')"
+    ))
+    logger.info("Partição criada", partition=nome)
+    return True
+
+
+def ensure_partitions(conn, hoje: date = None, meses_a_frente: int = None, table: str = TABLE) -> List[str]:
+    """Garante as partições do mês corrente e dos próximos meses"""
+    if not is_partitioned(conn, table):
+        return []
+    hoje = hoje or date.today()
+    meses_a_frente = settings.ads_partitions_ahead if meses_a_frente is None else meses_a_frente
+    criadas = []
+    for n in range(meses_a_frente + 1):
+        mes = add_months(month_start(hoje), n)
+        if create_partition(conn, mes, table):
+            criadas.append(partition_name(mes, table))
+    return criadas
+
+
+# ============================================================
+# RETENÇÃO / DOWNSAMPLING
+# ============================================================
+
+def _as_date(valor) -> date:
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    return valor
+
+
+def rollup_rows(linhas) -> List[Dict]:
+    """Linhas diárias -> rollups WEEKLY e MONTHLY somados em Python"""
+    grupos: Dict[Tuple, Dict] = defaultdict(lambda: {m: 0 for m in ROLLUP_METRICS + ["dias"]})
+    for r in linhas:
+        dia = _as_date(r.date)
+        for granularidade, inicio in ((WEEKLY, week_start(dia)), (MONTHLY, month_start(dia))):
+            g = grupos[(r.campaign_id, granularidade, inicio, r.external_campaign_id, r.platform)]
+            for m in ROLLUP_METRICS:
+                g[m] += getattr(r, m) or 0
+            g["dias"] += 1
+
+    return [
+        {
+            "campaign_id": campaign_id,
+            "granularidade": granularidade,
+            "periodo_inicio": inicio,
+            "external_campaign_id": external_id,
+            "platform": str(platform).split(".")[-1] if platform is not None else None,
+            **valores,
+        }
+        for (campaign_id, granularidade, inicio, external_id, platform), valores in grupos.items()
+    ]
+
+
+def downsample_month(conn, mes: date, drop_partition: bool) -> Dict:
+    """Resume um mês em rollups e remove os dados brutos (mesma transação)"""
+    inicio = datetime.combine(mes, time.min)
+    fim = datetime.combine(add_months(mes, 1), time.min)
+    linhas = conn.execute(
+        select(
+            campaign_insights.c.campaign_id,
+            campaign_insights.c.external_campaign_id,
+            campaign_insights.c.platform,
+            campaign_insights.c.date,
+            *(campaign_insights.c[m] for m in ROLLUP_METRICS),
+        ).where(campaign_insights.c.date >= inicio, campaign_insights.c.date < fim)
+    ).all()
+
+    rollups = rollup_rows(linhas)
+    # Semanas que cruzam o mês acumulam as duas metades (um mês por vez)
+    increment_rows(
+        conn, campaign_insights_rollup, rollups,
+        ["campaign_id", "granularidade", "periodo_inicio"], ROLLUP_METRICS + ["dias"],
+    )
+
+    if drop_partition:
+        conn.execute(text(f"DROP TABLE {partition_name(mes)}"))
+    else:
+        conn.execute(delete(campaign_insights).where(
+            campaign_insights.c.date >= inicio, campaign_insights.c.date < fim
+        ))
+    return {"mes": str(mes), "linhas": len(linhas), "rollups": len(rollups)}
+
+
+def oldest_month(conn) -> Optional[date]:
+    menor = conn.execute(select(func.min(campaign_insights.c.date))).scalar()
+    return month_start(_as_date(menor)) if menor else None
+
+
+def apply_retention(engine, hoje: date = None, meses: int = None) -> Dict:
+    """
+    Resume e remove os meses anteriores ao corte de retenção
+
+    Um mês por transação: se parar no meio, os meses já feitos ficam feitos.
+    """
+    corte = retention_cutoff(hoje, meses)
+    with engine.connect() as conn:
+        particionada = is_partitioned(conn)
+        particoes = list_partitions(conn) if particionada else {}
+        inicio = oldest_month(conn)
+
+    meses_antigos = set(m for m in particoes if m < corte)
+    if inicio:
+        mes = inicio
+        while mes < corte:
+            meses_antigos.add(mes)
+            mes = add_months(mes, 1)
+
+    feitos = []
+    for mes in sorted(meses_antigos):
+        with engine.begin() as conn:
+            feitos.append(downsample_month(conn, mes, drop_partition=mes in particoes))
+
+    resultado = {
+        "corte": str(corte),
+        "meses": len(feitos),
+        "linhas": sum(f["linhas"] for f in feitos),
+        "particionada": particionada,
+    }
+    logger.info("Retenção de campaign_insights aplicada", **resultado)
+    return resultado
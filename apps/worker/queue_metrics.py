@@ -0,0 +1,108 @@
+"""
+Métricas por fila do Celery: profundidade e latência
+
+- Profundidade: LLEN das listas da fila no broker Redis (uma por nível de
+  prioridade)
+- Espera: publish -> início da execução (header `published_at` gravado em
+  before_task_publish e lido em task_prerun)
+- Execução: task_prerun -> task_postrun
+
+As amostras ficam em listas curtas no Redis (`queue_metrics:{fila}:wait` e
+`:run`), suficientes para p50/p95 recentes sem depender de Prometheus.
+"""
+import time
+from typing import Dict, List
+
+import structlog
+from celery.signals import before_task_publish, task_prerun, task_postrun
+
+from redis_client import get_redis
+
+logger = structlog.get_logger()
+
+QUEUES = ["realtime", "sync", "batch", "ai"]
+PRIORITY_STEPS = list(range(10))
+PRIORITY_SEP = ":"
+MAX_SAMPLES = 500
+METRICS_PREFIX = "queue_metrics:"
+
+_started: Dict[str, float] = {}
+
+
+def _queue_of(task) -> str:
+    info = getattr(task.request, "delivery_info", None) or {}
+    return info.get("routing_key") or "default"
+
+
+def _push_sample(queue: str, kind: str, value: float):
+    key = f"{METRICS_PREFIX}{queue}:{kind}"
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.lpush(key, round(value, 4))
+    pipe.ltrim(key, 0, MAX_SAMPLES - 1)
+    pipe.execute()
+
+
+@before_task_publish.connect
+def _mark_published(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@task_prerun.connect
+def _record_wait(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.time()
+    published_at = task.request.get("published_at") if task else None
+    if not published_at:
+        return
+    try:
+        _push_sample(_queue_of(task), "wait", time.time() - float(published_at))
+    except Exception as e:
+        logger.debug("Falha ao registrar espera da fila", error=str(e))
+
+
+@task_postrun.connect
+def _record_runtime(task_id=None, task=None, **kwargs):
+    inicio = _started.pop(task_id, None)
+    if inicio is None or task is None:
+        return
+    try:
+        _push_sample(_queue_of(task), "run", time.time() - inicio)
+    except Exception as e:
+        logger.debug("Falha ao registrar duração da task", error=str(e))
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return round(ordered[idx], 3)
+
+
+def queue_depth(queue: str) -> int:
+    """Mensagens aguardando na fila (somando os níveis de prioridade)"""
+    r = get_redis()
+    keys = [queue] + [f"{queue}{PRIORITY_SEP}{p}" for p in PRIORITY_STEPS[1:]]
+    pipe = r.pipeline(transaction=False)
+    for key in keys:
+        pipe.llen(key)
+    return sum(pipe.execute())
+
+
+def collect(queues: List[str] = None) -> Dict[str, Dict]:
+    """Profundidade + p50/p95/max de espera e execução por fila"""
+    r = get_redis()
+    resultado = {}
+    for queue in queues or QUEUES:
+        wait = [float(v) for v in r.lrange(f"{METRICS_PREFIX}{queue}:wait", 0, -1)]
+        run = [float(v) for v in r.lrange(f"{METRICS_PREFIX}{queue}:run", 0, -1)]
+        resultado[queue] = {
+            "depth": queue_depth(queue),
+            "wait_p50": _percentile(wait, 50),
+            "wait_p95": _percentile(wait, 95),
+            "wait_max": round(max(wait), 3) if wait else 0.0,
+            "run_p50": _percentile(run, 50),
+            "run_p95": _percentile(run, 95),
+            "samples": len(wait),
+        }
+    return resultado
@@ -0,0 +1,16 @@
+"""
+Cliente Redis compartilhado pelas tasks do worker
+"""
+from functools import lru_cache
+
+import redis
+
+from config import get_settings
+
+settings = get_settings()
+
+
+@lru_cache()
+def get_redis() -> redis.Redis:
+    """Cliente Redis (o pool reconecta sozinho após fork do worker)"""
+    return redis.Redis.from_url(settings.redis_url, decode_responses=True)
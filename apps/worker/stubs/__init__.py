@@ -0,0 +1,3 @@
+"""
+Servidores locais que imitam APIs externas (desenvolvimento e testes)
+"""
@@ -0,0 +1,275 @@
+"""
+Servidor local que imita as APIs do Meta e do Google Ads
+
+Só stdlib. Os números são determinísticos por (conta, campanha, dia), então
+rodar o mesmo backfill duas vezes deve produzir exatamente as mesmas linhas.
+
+    python stubs/ads_stub_server.py --port 8765 --campaigns 50 --fail-rate 0.05 --throttle-rate 0.02
+
+    META_API_BASE_URL=http://localhost:8765/meta
+    GOOGLE_ADS_API_BASE_URL=http://localhost:8765/google
+    GOOGLE_OAUTH_TOKEN_URL=http://localhost:8765/google/token
+
+Endpoints:
+    GET  /meta/act_{id}/insights           paginação por paging.next
+    GET  /meta/{campaign_id}/insights      insights de uma campanha
+    POST /meta/                            batch (form `batch` com até 50 GETs)
+    POST /google/customers/{id}/googleAds:search   paginação por nextPageToken
+    POST /google/customers/{id}/googleAds:searchStream   array de blocos
+    POST /google/token                     access token fake
+
+As respostas do Meta trazem x-business-use-case-usage com `--usage` (%).
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+PAGE_SIZE = 25
+
+CONFIG = {
+    "campaigns": 20,
+    "latency": 0.0,
+    "fail_rate": 0.0,
+    "throttle_rate": 0.0,
+    "usage": 5,
+}
+
+STREAM_BLOCK = 10000  # Linhas por bloco do searchStream
+
+
+def _seed(*parts) -> random.Random:
+    digest = hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def campaign_day(platform: str, account: str, n: int, dia: date) -> dict:
+    """Métricas determinísticas de uma campanha em um dia"""
+    rnd = _seed(platform, account[-4:], n, dia)
+    impressions = rnd.randint(1000, 20000)
+    clicks = int(impressions * rnd.uniform(0.01, 0.06))
+    return {
+        "id": f"{account[-4:]}{n:04d}",
+        "name": f"{platform.title()} {account[-4:]} #{n}",
+        "spend": round(rnd.uniform(50, 400), 2),
+        "impressions": impressions,
+        "clicks": clicks,
+        "leads": int(clicks * rnd.uniform(0.05, 0.18)),
+    }
+
+
+def meta_campaign(campaign_id: str):
+    """Id de campanha do stub -> (conta, n); o id é sufixo da conta + n"""
+    if len(campaign_id) <= 4 or not campaign_id[-4:].isdigit():
+        return None
+    n = int(campaign_id[-4:])
+    return (campaign_id[:-4], n) if n < CONFIG["campaigns"] else None
+
+
+def _days(since: date, until: date):
+    d = since
+    while d <= until:
+        yield d
+        d += timedelta(days=1)
+
+
+def meta_rows(account: str, since: date, until: date, campaigns=None) -> list:
+    rows = []
+    for dia in _days(since, until):
+        for n in campaigns if campaigns is not None else range(CONFIG["campaigns"]):
+            c = campaign_day("meta", account, n, dia)
+            rows.append({
+                "campaign_id": c["id"],
+                "campaign_name": c["name"],
+                "spend": str(c["spend"]),
+                "impressions": str(c["impressions"]),
+                "clicks": str(c["clicks"]),
+                "actions": [{"action_type": "lead", "value": str(c["leads"])}],
+                "date_start": str(dia),
+                "date_stop": str(dia),
+            })
+    return rows
+
+
+def google_rows(customer: str, since: date, until: date) -> list:
+    rows = []
+    for dia in _days(since, until):
+        for n in range(CONFIG["campaigns"]):
+            c = campaign_day("google", customer, n, dia)
+            rows.append({
+                "campaign": {"id": c["id"], "name": c["name"]},
+                "segments": {"date": str(dia)},
+                "metrics": {
+                    "costMicros": str(int(c["spend"] * 1_000_000)),
+                    "impressions": str(c["impressions"]),
+                    "clicks": str(c["clicks"]),
+                    "conversions": float(c["leads"]),
+                },
+            })
+    return rows
+
+
+GAQL_DATES = re.compile(r"segments\.date BETWEEN '(\d{4}-\d{2}-\d{2})' AND '(\d{4}-\d{2}-\d{2})'")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, payload, headers: dict = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _chaos(self) -> bool:
+        status, payload, headers = self._chaos_status()
+        if status:
+            self._send(status, payload, headers)
+            return True
+        return False
+
+    @staticmethod
+    def _chaos_status():
+        if CONFIG["latency"]:
+            time.sleep(CONFIG["latency"])
+        if CONFIG["throttle_rate"] and random.random() < CONFIG["throttle_rate"]:
+            return 429, {"error": {"message": "stub: rate limit"}}, {"Retry-After": "1"}
+        if CONFIG["fail_rate"] and random.random() < CONFIG["fail_rate"]:
+            return 503, {"error": {"message": "stub: falha simulada"}}, {}
+        return None, None, {}
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    @staticmethod
+    def _usage_headers() -> dict:
+        uso = {"call_count": CONFIG["usage"], "total_cputime": 1, "total_time": 1,
+               "estimated_time_to_regain_access": 0}
+        return {"x-business-use-case-usage": json.dumps({"stub": [uso]})}
+
+    def _meta_get(self, path: str, query: str):
+        """Um GET do Graph API -> (status, payload)"""
+        m = re.fullmatch(r"/meta/([^/]+)/insights", path)
+        if not m:
+            return 404, {"error": {"message": "not found"}}
+        node = m.group(1)
+        if node.startswith("act_"):
+            account, campaigns = node, None
+        else:
+            campanha = meta_campaign(node)
+            if not campanha:
+                return 404, {"error": {"message": "campaign not found"}}
+            account, campaigns = campanha[0], [campanha[1]]
+
+        qs = {k: v[0] for k, v in parse_qs(query).items()}
+        time_range = json.loads(qs.get("time_range", "{}"))
+        since = date.fromisoformat(time_range["since"])
+        until = date.fromisoformat(time_range["until"])
+        offset = int(qs.get("after", 0))
+        limit = min(int(qs.get("limit", PAGE_SIZE)), PAGE_SIZE)
+
+        rows = meta_rows(account, since, until, campaigns)
+        page = rows[offset:offset + limit]
+        payload = {"data": page, "paging": {"cursors": {"after": str(offset + limit)}}}
+        if offset + limit < len(rows):
+            host = self.headers.get("Host")
+            payload["paging"]["next"] = f"http://{host}{path}?" + urlencode({**qs, "after": offset + limit})
+        return 200, payload
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if self._chaos():
+            return
+        status, payload = self._meta_get(url.path, url.query)
+        self._send(status, payload, self._usage_headers())
+
+    def _meta_batch(self, body: bytes):
+        """Batch do Graph API: cada item vira {code, headers, body (string)}"""
+        form = {k: v[0] for k, v in parse_qs(body.decode()).items()}
+        itens = json.loads(form.get("batch", "[]"))
+        if len(itens) > 50:
+            return self._send(400, {"error": {"message": "batch com mais de 50 itens"}})
+
+        respostas = []
+        for item in itens:
+            url = urlparse("/meta/" + item["relative_url"].lstrip("/"))
+            status, payload, _ = self._chaos_status()
+            if not status:
+                status, payload = self._meta_get(url.path, url.query)
+            headers = [{"name": k, "value": v} for k, v in self._usage_headers().items()]
+            respostas.append({"code": status, "headers": headers, "body": json.dumps(payload)})
+        self._send(200, respostas, self._usage_headers())
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self._body()
+
+        if url.path == "/google/token":
+            return self._send(200, {"access_token": "stub-token", "expires_in": 3600, "token_type": "Bearer"})
+        if url.path in ("/meta", "/meta/"):
+            # Erros ficam por item, como no Graph API
+            return self._meta_batch(body)
+
+        m = re.fullmatch(r"/google/customers/([^/]+)/googleAds:(search|searchStream)", url.path)
+        if not m:
+            return self._send(404, {"error": {"message": "not found"}})
+        if self.headers.get("Authorization") != "Bearer stub-token":
+            return self._send(401, {"error": {"message": "unauthenticated"}})
+        if self._chaos():
+            return
+
+        request = json.loads(body or b"{}")
+        datas = GAQL_DATES.search(request.get("query", ""))
+        if not datas:
+            return self._send(400, {"error": {"message": "query sem segments.date"}})
+        since, until = (date.fromisoformat(d) for d in datas.groups())
+        rows = google_rows(m.group(1), since, until)
+
+        if m.group(2) == "searchStream":
+            blocos = [{"results": rows[i:i + STREAM_BLOCK]} for i in range(0, len(rows), STREAM_BLOCK)]
+            return self._send(200, blocos or [{"results": []}])
+
+        offset = int(request.get("pageToken") or 0)
+        payload = {"results": rows[offset:offset + PAGE_SIZE]}
+        if offset + PAGE_SIZE < len(rows):
+            payload["nextPageToken"] = str(offset + PAGE_SIZE)
+        self._send(200, payload)
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Cria o servidor (chamar serve_forever, ou rodar em thread nos testes)"""
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub das APIs do Meta/Google Ads")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--campaigns", type=int, default=CONFIG["campaigns"], help="Campanhas por conta")
+    parser.add_argument("--latency", type=float, default=0.0, help="Atraso por requisição (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fração de respostas 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fração de respostas 429 (Retry-After: 1)")
+    parser.add_argument("--usage", type=int, default=CONFIG["usage"], help="Uso reportado ao cliente Meta (%%)")
+    args = parser.parse_args()
+
+    CONFIG.update(
+        campaigns=args.campaigns, latency=args.latency, fail_rate=args.fail_rate,
+        throttle_rate=args.throttle_rate, usage=args.usage,
+    )
+    print(f"Stub de Ads em http://{args.host}:{args.port} ({args.campaigns} campanhas/conta)")
+    serve(args.host, args.port).serve_forever()
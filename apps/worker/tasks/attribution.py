@@ -0,0 +1,33 @@
+"""
+Task de atribuição deal -> campanha (attribution_links)
+"""
+import structlog
+
+from celery_app import app
+from database import get_engine, init_tables
+from locks import singleflight, COALESCE
+import attribution_store
+from data_versions import bump_data_version
+from shared.data_versions import ADS
+
+logger = structlog.get_logger()
+
+
+@app.task
+@singleflight("attribute_deals", mode=COALESCE)
+def attribute_deals(full: bool = False):
+    """
+    Liga deals novos/alterados às campanhas (UTM, gclid, fbclid)
+
+    Disparada ao fim de cada sync de Ads e pelo beat (deals vindos do CRM).
+    Disparos sobrepostos viram uma execução extra ao terminar a atual.
+
+    Args:
+        full: Reprocessa todos os deals mesmo sem mudança nas campanhas
+    """
+    engine = get_engine()
+    init_tables(engine)
+    resultado = attribution_store.run_attribution(engine, full=full)
+    if resultado["deals"]:
+        bump_data_version(ADS)
+    return {"status": "success", **resultado}
@@ -0,0 +1,199 @@
+"""
+Backfill paralelo de métricas de Ads (Meta/Google)
+
+O intervalo é dividido em blocos plataforma x conta x dia, registrados em
+ads_backfill_chunks. Os blocos pendentes rodam em paralelo (chord) e cada
+um grava as métricas e marca o próprio checkpoint na mesma transação.
+Rodar de novo o mesmo backfill_id só executa o que não terminou.
+
+Exemplo (contra o stub local, ver stubs/ads_stub_server.py):
+
+    celery -A celery_app call tasks.backfill.backfill_ads \\
+        --kwargs '{"data_inicio": "2025-01-01", "data_fim": "2025-06-30"}'
+"""
+import random
+from datetime import date, timedelta
+from typing import List
+
+import structlog
+from celery import chord, group
+from sqlalchemy import select, update, func, and_
+
+from celery_app import app
+from database import get_engine, init_tables, insert_missing, ads_backfill_chunks
+from ads_store import upsert_insights
+from ads_ingest import fetch_day
+import ads_api
+
+logger = structlog.get_logger()
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def default_backfill_id(platforms: List[str], inicio: date, fim: date) -> str:
+    """Id determinístico: repetir a mesma chamada retoma o mesmo backfill"""
+    return f"{'+'.join(sorted(platforms)).lower()}:{inicio}:{fim}"
+
+
+def plan_chunks(conn, backfill_id: str, platforms: List[str], inicio: date, fim: date) -> int:
+    """Registra os blocos que ainda não existem (os já feitos são mantidos)"""
+    rows = []
+    for platform in platforms:
+        for account_id in ads_api.account_ids(platform):
+            d = inicio
+            while d <= fim:
+                rows.append({
+                    "backfill_id": backfill_id,
+                    "platform": platform,
+                    "account_id": account_id,
+                    "dia": d,
+                    "status": PENDING,
+                })
+                d += timedelta(days=1)
+    return insert_missing(conn, ads_backfill_chunks, rows, ["backfill_id", "platform", "account_id", "dia"])
+
+
+def start_backfill(data_inicio: date, data_fim: date, platforms: List[str] = None, backfill_id: str = None) -> dict:
+    """Planeja e dispara os blocos pendentes como chord"""
+    platforms = [p for p in (platforms or [ads_api.META, ads_api.GOOGLE]) if ads_api.is_configured(p)]
+    if not platforms:
+        return {"status": "skipped", "reason": "nenhuma plataforma configurada"}
+
+    backfill_id = backfill_id or default_backfill_id(platforms, data_inicio, data_fim)
+    engine = get_engine()
+    init_tables(engine)
+
+    with engine.begin() as conn:
+        plan_chunks(conn, backfill_id, platforms, data_inicio, data_fim)
+        pendentes = conn.execute(
+            select(
+                ads_backfill_chunks.c.platform,
+                ads_backfill_chunks.c.account_id,
+                ads_backfill_chunks.c.dia,
+            ).where(
+                ads_backfill_chunks.c.backfill_id == backfill_id,
+                ads_backfill_chunks.c.status != DONE,
+            )
+        ).all()
+
+    logger.info("Backfill de Ads", backfill_id=backfill_id, pendentes=len(pendentes))
+    if not pendentes:
+        return {"status": "done", "backfill_id": backfill_id, "pendentes": 0}
+
+    header = group(
+        backfill_ads_chunk.s(backfill_id, platform, account_id, str(dia))
+        for platform, account_id, dia in pendentes
+    )
+    result = chord(header)(finish_backfill.s(backfill_id))
+    return {"status": "dispatched", "backfill_id": backfill_id, "pendentes": len(pendentes), "chord_id": result.id}
+
+
+def _chunk_key(backfill_id: str, platform: str, account_id: str, dia: date):
+    return and_(
+        ads_backfill_chunks.c.backfill_id == backfill_id,
+        ads_backfill_chunks.c.platform == platform,
+        ads_backfill_chunks.c.account_id == account_id,
+        ads_backfill_chunks.c.dia == dia,
+    )
+
+
+@app.task(bind=True)
+def backfill_ads(self, data_inicio: str, data_fim: str = None, platforms: List[str] = None, backfill_id: str = None):
+    """
+    Backfill histórico de Meta/Google em blocos paralelos
+
+    Args:
+        data_inicio: Data inicial (YYYY-MM-DD)
+        data_fim: Data final (YYYY-MM-DD), padrão ontem
+        platforms: ["META", "GOOGLE"] (padrão: as configuradas)
+        backfill_id: Id para retomar um backfill anterior
+    """
+    inicio = date.fromisoformat(data_inicio)
+    fim = date.fromisoformat(data_fim) if data_fim else date.today() - timedelta(days=1)
+    return start_backfill(inicio, fim, platforms, backfill_id)
+
+
+@app.task(bind=True, max_retries=4)
+def backfill_ads_chunk(self, backfill_id: str, platform: str, account_id: str, dia: str):
+    """
+    Um bloco do backfill: busca o dia na plataforma e faz upsert
+
+    Falhas definitivas ficam como `failed` (e não derrubam o chord); a
+    próxima execução do mesmo backfill tenta de novo.
+    """
+    engine = get_engine()
+    dia_date = date.fromisoformat(dia)
+    key = _chunk_key(backfill_id, platform, account_id, dia_date)
+
+    try:
+        rows = fetch_day(platform, account_id, dia_date)
+        with engine.begin() as conn:
+            gravadas = upsert_insights(conn, rows)
+            conn.execute(
+                update(ads_backfill_chunks).where(key).values(
+                    status=DONE, rows=gravadas, error=None,
+                    attempts=ads_backfill_chunks.c.attempts + 1,
+                )
+            )
+        return {"status": DONE, "platform": platform, "account_id": account_id, "dia": dia, "rows": gravadas}
+
+    except Exception as e:
+        ultima = self.request.retries >= self.max_retries
+        with engine.begin() as conn:
+            conn.execute(
+                update(ads_backfill_chunks).where(key).values(
+                    status=FAILED if ultima else PENDING, error=str(e)[:500],
+                    attempts=ads_backfill_chunks.c.attempts + 1,
+                )
+            )
+        if not ultima:
+            # Backoff exponencial com jitter para não sincronizar as tentativas
+            countdown = min(300, 2 ** self.request.retries * 10) * random.uniform(0.5, 1.5)
+            raise self.retry(exc=e, countdown=countdown)
+
+        logger.error("Bloco do backfill falhou", backfill_id=backfill_id, platform=platform,
+                     account_id=account_id, dia=dia, error=str(e))
+        return {"status": FAILED, "platform": platform, "account_id": account_id, "dia": dia, "error": str(e)}
+
+
+@app.task(bind=True)
+def finish_backfill(self, results: list, backfill_id: str):
+    """Callback do chord: resume o backfill, recalcula os KPIs e a atribuição"""
+    status = backfill_status(backfill_id)
+    app.signature("tasks.kpi_calculator.calculate_daily_kpis").delay()
+    app.signature("tasks.attribution.attribute_deals").delay()
+    logger.info("Backfill de Ads concluído", **status)
+    return status
+
+
+@app.task(name="tasks.backfill.backfill_status")
+def backfill_status_task(backfill_id: str):
+    """Progresso de um backfill (para acompanhar enquanto roda)"""
+    return backfill_status(backfill_id)
+
+
+def backfill_status(backfill_id: str) -> dict:
+    with get_engine().connect() as conn:
+        linhas = conn.execute(
+            select(
+                ads_backfill_chunks.c.status,
+                func.count(),
+                func.coalesce(func.sum(ads_backfill_chunks.c.rows), 0),
+            )
+            .where(ads_backfill_chunks.c.backfill_id == backfill_id)
+            .group_by(ads_backfill_chunks.c.status)
+        ).all()
+
+    blocos = {s: n for s, n, _ in linhas}
+    total = sum(blocos.values())
+    return {
+        "backfill_id": backfill_id,
+        "total": total,
+        "done": blocos.get(DONE, 0),
+        "pending": blocos.get(PENDING, 0),
+        "failed": blocos.get(FAILED, 0),
+        "rows": int(sum(r for _, _, r in linhas)),
+        "progresso": round(blocos.get(DONE, 0) / total * 100, 1) if total else 0.0,
+    }
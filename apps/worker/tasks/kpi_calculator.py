@@ -1,11 +1,15 @@
 """
 Tasks de cálculo de KPIs
 """
-from datetime import datetime, timedelta, date
+from datetime import timedelta, date
 import structlog
+from celery import group
 
 from celery_app import app
 from config import get_settings
+from database import get_engine
+import kpi_engine
+from partitions import retention_cutoff
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -14,20 +18,19 @@ settings = get_settings()
 @app.task(bind=True)
 def calculate_daily_kpis(self):
     """
-    Calcula KPIs diários e salva snapshots
+    Recalcula os snapshots dos dias marcados como sujos
+
+    Sync/import marcam os dias alterados em kpi_dirty_days; só os dias,
+    semanas e meses que contêm esses dias são regravados.
     """
-    logger.info("Calculando KPIs diários")
-    
-    today = date.today()
-    yesterday = today - timedelta(days=1)
-    
+    logger.info("Calculando KPIs (dias sujos)")
+
     try:
-        # Calcular para ontem (dados completos)
-        kpis = calculate_kpis_for_period(yesterday, yesterday)
-        
-        logger.info("KPIs calculados", date=str(yesterday), kpis=kpis)
-        return {"status": "success", "date": str(yesterday), "kpis": kpis}
-        
+        stats = kpi_engine.recompute_dirty(get_engine(), desde=retention_cutoff())
+
+        logger.info("KPIs calculados", **stats)
+        return {"status": "success", **stats}
+
     except Exception as e:
         logger.error("Erro ao calcular KPIs", error=str(e))
         return {"status": "error", "error": str(e)}
@@ -36,21 +39,21 @@ def calculate_daily_kpis(self):
 @app.task(bind=True)
 def calculate_weekly_kpis(self):
     """
-    Calcula KPIs semanais
+    Calcula KPIs da última semana completa (segunda a domingo)
     """
     logger.info("Calculando KPIs semanais")
-    
+
     today = date.today()
-    # Última semana completa (domingo a sábado)
-    end_date = today - timedelta(days=today.weekday() + 1)
-    start_date = end_date - timedelta(days=6)
-    
+    start_date = kpi_engine.week_start(today) - timedelta(days=7)
+    end_date = start_date + timedelta(days=6)
+
     try:
+        kpi_engine.recompute_periods(get_engine(), {(kpi_engine.WEEKLY, start_date)})
         kpis = calculate_kpis_for_period(start_date, end_date)
-        
+
         logger.info("KPIs semanais calculados", start=str(start_date), end=str(end_date))
         return {"status": "success", "period": f"{start_date} - {end_date}", "kpis": kpis}
-        
+
     except Exception as e:
         logger.error("Erro ao calcular KPIs semanais", error=str(e))
         return {"status": "error", "error": str(e)}
@@ -59,58 +62,87 @@ def calculate_weekly_kpis(self):
 @app.task(bind=True)
 def calculate_vendor_kpis(self):
     """
-    Calcula KPIs por vendedor
+    Calcula KPIs por vendedor (últimos 30 dias)
     """
     logger.info("Calculando KPIs por vendedor")
-    
-    # Últimos 30 dias
+
     end_date = date.today()
     start_date = end_date - timedelta(days=30)
-    
+
     try:
-        # Em produção, buscar vendedores do banco e calcular para cada
-        vendors = ["Carlos Silva", "Maria Santos", "João Oliveira", "Ana Costa", "Pedro Souza"]
-        
-        results = {}
-        for vendor in vendors:
-            results[vendor] = {
-                "deals_total": 0,  # TODO: buscar do banco
-                "deals_ganhos": 0,
-                "taxa_conversao": 0.0,
-                "valor_total": 0.0
-            }
-        
-        logger.info("KPIs por vendedor calculados", vendors=len(vendors))
-        return {"status": "success", "vendors": len(vendors)}
-        
+        with get_engine().connect() as conn:
+            results = kpi_engine.vendor_totals(conn, start_date, end_date)
+
+        logger.info("KPIs por vendedor calculados", vendors=len(results))
+        return {"status": "success", "vendors": len(results), "kpis": results}
+
     except Exception as e:
         logger.error("Erro ao calcular KPIs por vendedor", error=str(e))
         return {"status": "error", "error": str(e)}
 
 
+@app.task(bind=True)
+def backfill_kpis(self, data_inicio: str, data_fim: str = None):
+    """
+    Recalcula o histórico em blocos mensais distribuídos entre os workers
+
+    Args:
+        data_inicio: Data inicial (YYYY-MM-DD)
+        data_fim: Data final (YYYY-MM-DD), padrão hoje
+    """
+    inicio = date.fromisoformat(data_inicio)
+    fim = date.fromisoformat(data_fim) if data_fim else date.today()
+    blocos = kpi_engine.month_chunks(inicio, fim)
+
+    logger.info("Backfill de KPIs", inicio=str(inicio), fim=str(fim), blocos=len(blocos))
+
+    job = group(
+        recompute_kpi_chunk.s(str(b_inicio), str(b_fim), i == 0)
+        for i, (b_inicio, b_fim) in enumerate(blocos)
+    )
+    result = job.apply_async()
+
+    return {"status": "dispatched", "blocos": len(blocos), "group_id": result.id}
+
+
+@app.task(bind=True, max_retries=3, default_retry_delay=30)
+def recompute_kpi_chunk(self, data_inicio: str, data_fim: str, primeiro: bool = False):
+    """
+    Recalcula um bloco do backfill (dias, semanas e meses que começam nele)
+    """
+    inicio = date.fromisoformat(data_inicio)
+    fim = date.fromisoformat(data_fim)
+
+    try:
+        periodos = kpi_engine.chunk_periods(inicio, fim, primeiro)
+        snapshots = kpi_engine.recompute_periods(get_engine(), periodos)
+        return {"status": "success", "inicio": data_inicio, "fim": data_fim, "snapshots": snapshots}
+
+    except Exception as e:
+        logger.error("Erro no bloco de backfill", inicio=data_inicio, error=str(e))
+        raise self.retry(exc=e)
+
+
 def calculate_kpis_for_period(start_date: date, end_date: date) -> dict:
     """
-    Calcula KPIs para um período específico
-    
-    Em produção, isso faria queries no banco de dados
-    Por enquanto, retorna dados mock
+    Calcula KPIs gerais para um período específico (sem gravar snapshot)
     """
-    # TODO: Implementar queries reais
-    
+    with get_engine().connect() as conn:
+        kpis = kpi_engine.period_totals(conn, start_date, end_date)
+
     return {
         "periodo": {
             "inicio": str(start_date),
             "fim": str(end_date)
         },
-        "gasto_total": 0.0,  # TODO
-        "leads": 0,
-        "deals": 0,
-        "vendas": 0,
-        "receita": 0.0,
-        "lucro": 0.0,
-        "cpl": 0.0,
-        "cpa": 0.0,
-        "roas": 0.0,
-        "taxa_conversao": 0.0
+        "gasto_total": kpis["gasto_total"],
+        "leads": kpis["leads"],
+        "deals": kpis["deals_total"],
+        "vendas": kpis["deals_ganhos"],
+        "receita": kpis["valor_total"],
+        "lucro": kpis["lucro"],
+        "cpl": kpis["cpl"],
+        "cpa": kpis["cpa"],
+        "roas": kpis["roas"],
+        "taxa_conversao": kpis["taxa_conversao"]
     }
-
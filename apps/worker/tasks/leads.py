@@ -0,0 +1,33 @@
+"""
+Task de de-duplicação de leads (crm_deals.lead_cluster_id)
+"""
+import structlog
+
+from celery_app import app
+from database import get_engine, init_tables
+from locks import singleflight, COALESCE
+import lead_dedup
+from data_versions import bump_data_version
+from shared.data_versions import CRM
+
+logger = structlog.get_logger()
+
+
+@app.task
+@singleflight("dedup_leads", mode=COALESCE)
+def dedup_leads(force: bool = False):
+    """
+    Agrupa os negócios do mesmo cliente (telefone/e-mail) em clusters
+
+    Agendada pelo beat; sem deal novo/alterado desde a última execução,
+    termina sem reler a tabela.
+
+    Args:
+        force: Recalcula mesmo sem mudança nos deals
+    """
+    engine = get_engine()
+    init_tables(engine)
+    resultado = lead_dedup.run_dedup(engine, force=force)
+    if resultado.get("updated"):
+        bump_data_version(CRM)
+    return resultado
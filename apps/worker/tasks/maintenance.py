@@ -0,0 +1,45 @@
+"""
+Tasks de manutenção do banco (partições e retenção de séries de Ads)
+"""
+import structlog
+
+from celery_app import app
+from database import get_engine, init_tables
+from locks import singleflight, SKIP
+import partitions
+from data_versions import bump_data_version
+from shared.data_versions import ADS
+
+logger = structlog.get_logger()
+
+
+@app.task
+@singleflight("ensure_ad_partitions", mode=SKIP)
+def ensure_ad_partitions(meses_a_frente: int = None):
+    """
+    Cria as partições mensais de campaign_insights dos próximos meses
+    Sem efeito no SQLite ou se a tabela ainda não foi particionada (migração 003)
+    """
+    with get_engine().begin() as conn:
+        if not partitions.is_partitioned(conn):
+            logger.info("campaign_insights não particionada; nada a fazer", dialect=conn.dialect.name)
+            return {"status": "skipped", "reason": "tabela não particionada"}
+        criadas = partitions.ensure_partitions(conn, meses_a_frente=meses_a_frente)
+    return {"status": "success", "criadas": criadas}
+
+
+@app.task
+@singleflight("apply_ad_retention", mode=SKIP)
+def apply_ad_retention(meses: int = None):
+    """
+    Resume em rollups semanais/mensais e remove os meses além da retenção
+
+    Args:
+        meses: Meses mantidos em dados brutos (padrão: ADS_RAW_RETENTION_MONTHS)
+    """
+    engine = get_engine()
+    init_tables(engine)
+    resultado = partitions.apply_retention(engine, meses=meses)
+    if resultado["meses"]:
+        bump_data_version(ADS)
+    return {"status": "success", **resultado}
@@ -0,0 +1,21 @@
+"""
+Tasks de monitoramento do worker
+"""
+import structlog
+
+from celery_app import app
+import queue_metrics
+
+logger = structlog.get_logger()
+
+
+@app.task(name="collect_queue_metrics")
+def collect_queue_metrics():
+    """
+    Profundidade e latência (espera/execução) de cada fila
+    Executa a cada minuto; o resultado também vai para o log
+    """
+    metrics = queue_metrics.collect()
+    for queue, m in metrics.items():
+        logger.info("Fila do worker", queue=queue, **m)
+    return {"status": "ok", "queues": metrics}
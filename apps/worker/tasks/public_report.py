@@ -0,0 +1,44 @@
+"""
+Task do relatório público (/publico) a partir da roi_api
+"""
+import asyncio
+import os
+
+import structlog
+
+from celery_app import app
+from config import get_settings
+from locks import singleflight, COALESCE
+from shared import public_report
+
+logger = structlog.get_logger()
+settings = get_settings()
+
+
+@app.task
+@singleflight("generate_public_reports", mode=COALESCE)
+def generate_public_reports(force: bool = False):
+    """
+    Gera public-report.json e as variantes de PUBLIC_REPORT_VARIANTS
+
+    Agendada pelo beat a cada 5 minutos. As fontes saem com If-None-Match;
+    sem mudança de versão nos dados, nada é reescrito.
+
+    Args:
+        force: Reescreve todas as variantes mesmo sem mudança
+    """
+    pasta = os.path.abspath(settings.public_report_dir)
+    variantes = public_report.variants_from_config(
+        settings.public_report_variants, brand=settings.public_report_brand
+    )
+    resultado = asyncio.run(public_report.generate(
+        settings.public_report_api_base,
+        out_dir=os.path.join(pasta, "public-reports"),
+        variants=variantes,
+        state_file=os.path.join(os.path.dirname(pasta), ".public-report-state.json"),
+        legacy_file=os.path.join(pasta, "public-report.json"),
+        concurrency=settings.public_report_concurrency,
+        force=force,
+    ))
+    status = "error" if "erro" in resultado["variantes"].values() else "success"
+    return {"status": status, **resultado}
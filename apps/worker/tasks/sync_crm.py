@@ -1,33 +1,37 @@
 """
 Task Celery para sincronização periódica do CRM externo
 """
-import os
 from datetime import date, timedelta
 import structlog
-import pymysql
-from pymysql.cursors import DictCursor
 
 from celery_app import celery_app
+from connections import get_crm_connection
+from data_versions import bump_if_changed
+from kpi_store import build_panels, build_snapshot, publish_snapshot
+from locks import singleflight, lock_stats, SKIP, COALESCE
+from shared.data_versions import CRM
+from shared.kpi_snapshots import PANEL_WINDOWS, STALLED_WINDOWS, field
+from shared.query_metrics import REGISTRY as query_registry, instrumented_cursor
 
 logger = structlog.get_logger()
 
-
-def get_external_connection():
-    """Conecta ao CRM externo MySQL"""
-    return pymysql.connect(
-        host=os.getenv("EXTERNAL_CRM_HOST", "mysql.netcar-rc.com.br"),
-        port=int(os.getenv("EXTERNAL_CRM_PORT", "3306")),
-        database=os.getenv("EXTERNAL_CRM_DATABASE", "netcarrc01"),
-        user=os.getenv("EXTERNAL_CRM_USER", ""),
-        password=os.getenv("EXTERNAL_CRM_PASSWORD", ""),
-        cursorclass=DictCursor,
-        charset='utf8mb4',
-        connect_timeout=10,
-        read_timeout=30
-    )
+# Mesmo agrupamento de origens da API (services/external_crm.py)
+GRUPO_ORIGEM_SQL = """
+    CASE 
+        WHEN n.origem IN ('FACEBOOK', 'INSTAGRAM') THEN 'META'
+        WHEN n.origem IN ('Google', 'GOOGLE') THEN 'GOOGLE'
+        WHEN n.origem IN ('SITE') THEN 'SITE'
+        WHEN n.origem IN ('WEBMOTORS', 'ICARROS', 'MEUCARRONOVO', 'MERCADO LIVRE', 'MOBIAUTO', 'AUTOLINE', 'POACARROS', 'SOCARRAO', 'Autocarro') THEN 'PORTAIS'
+        WHEN n.origem IN ('SHOWROOM', 'NA PISTA', 'FEIRÃO') THEN 'PRESENCIAL'
+        WHEN n.origem IN ('WHATSAPP', 'TELEFONE', 'TELEMARKETING') THEN 'DIRETO'
+        WHEN n.origem IN ('INDICACAO', 'INDICAÇÃO CAMPANHA', 'REDE RELACIONAMENTO') THEN 'INDICACAO'
+        ELSE 'OUTROS'
+    END
+"""
 
 
 @celery_app.task(name="sync_crm_external")
+@singleflight("sync_crm_external", mode=COALESCE)
 def sync_crm_external(dias: int = 1):
     """
     Sincroniza dados do CRM externo
@@ -41,9 +45,7 @@ def sync_crm_external(dias: int = 1):
         data_fim = date.today()
         data_inicio = data_fim - timedelta(days=dias)
         
-        conn = get_external_connection()
-        
-        with conn.cursor() as cursor:
+        with instrumented_cursor(get_crm_connection(), "sync_crm.resumo") as cursor:
             # Buscar resumo rápido para log
             cursor.execute("""
                 SELECT 
@@ -63,7 +65,8 @@ def sync_crm_external(dias: int = 1):
                 perdidos=resumo['perdidos']
             )
         
-        conn.close()
+        # O CRM externo não avisa quando muda: compara com a rodada anterior
+        bump_if_changed(CRM, "crm_resumo", [str(data_inicio), resumo])
         
         return {
             "status": "success",
@@ -79,17 +82,16 @@ def sync_crm_external(dias: int = 1):
 
 
 @celery_app.task(name="check_crm_connection")
+@singleflight("check_crm_connection", mode=SKIP)
 def check_crm_connection():
     """
     Verifica se a conexão com o CRM externo está OK
     Executa a cada minuto
     """
     try:
-        conn = get_external_connection()
-        with conn.cursor() as cursor:
+        with instrumented_cursor(get_crm_connection(), "sync_crm.check_connection") as cursor:
             cursor.execute("SELECT 1 as ok")
             result = cursor.fetchone()
-        conn.close()
         
         if result and result['ok'] == 1:
             logger.debug("CRM externo OK")
@@ -104,48 +106,62 @@ def check_crm_connection():
 
 
 @celery_app.task(name="get_realtime_kpis")
+@singleflight("get_realtime_kpis", mode=SKIP)
 def get_realtime_kpis():
     """
-    Obtém KPIs em tempo real do CRM
-    Usado para atualizar dashboard
+    Obtém KPIs em tempo real do CRM e publica o snapshot versionado
+
+    Uma única query agrupada por grupo de origem x vendedor alimenta todos os
+    recortes (geral, por grupo, por vendedor). Os painéis do dashboard
+    (vendedores, origens, META x GOOGLE, motivos de perda, funil e leads
+    parados) saem de outras quatro queries agregadas e vão na mesma versão.
+    A API lê esses snapshots no Redis e nunca consulta o CRM no caminho da
+    requisição.
     """
     try:
-        conn = get_external_connection()
+        hoje = date.today()
+        inicio_mes = hoje.replace(day=1)
+        proximo_mes = (inicio_mes + timedelta(days=32)).replace(day=1)
+        periodo = inicio_mes.strftime("%Y-%m")
         
-        with conn.cursor() as cursor:
-            # KPIs do mês atual
-            cursor.execute("""
+        with instrumented_cursor(get_crm_connection(), "sync_crm.realtime_kpis") as cursor:
+            # KPIs do mês atual por grupo de origem x vendedor
+            cursor.execute(f"""
                 SELECT 
+                    {GRUPO_ORIGEM_SQL} AS grupo_origem,
+                    n.id_user AS vendedor_id,
+                    u.name AS vendedor,
                     COUNT(*) AS total_leads,
-                    SUM(CASE WHEN id_state = 6 THEN 1 ELSE 0 END) AS ganhos,
-                    SUM(CASE WHEN id_state = 7 THEN 1 ELSE 0 END) AS perdidos,
-                    SUM(CASE WHEN id_state BETWEEN 1 AND 5 THEN 1 ELSE 0 END) AS em_andamento,
-                    SUM(CASE WHEN id_state = 6 THEN valor ELSE 0 END) AS valor_vendido,
-                    ROUND(AVG(CASE WHEN id_state = 6 THEN valor ELSE NULL END), 2) AS ticket_medio
-                FROM crm_negocio
-                WHERE DATE_FORMAT(date_create, '%Y-%m') = DATE_FORMAT(NOW(), '%Y-%m')
-            """)
-            
-            kpis = cursor.fetchone()
+                    SUM(CASE WHEN n.id_state = 6 THEN 1 ELSE 0 END) AS ganhos,
+                    SUM(CASE WHEN n.id_state = 7 THEN 1 ELSE 0 END) AS perdidos,
+                    SUM(CASE WHEN n.id_state BETWEEN 1 AND 5 THEN 1 ELSE 0 END) AS em_andamento,
+                    SUM(CASE WHEN n.id_state = 6 THEN n.valor ELSE 0 END) AS valor_vendido
+                FROM crm_negocio n
+                LEFT JOIN users u ON n.id_user = u.id_users
+                WHERE n.date_create >= %s AND n.date_create < %s
+                GROUP BY grupo_origem, n.id_user, u.name
+            """, (inicio_mes, proximo_mes))
             
-            # Calcular taxa de conversão
-            ganhos = kpis['ganhos'] or 0
-            perdidos = kpis['perdidos'] or 0
-            total_finalizados = ganhos + perdidos
-            taxa_conversao = (ganhos / total_finalizados * 100) if total_finalizados > 0 else 0
-            
-        conn.close()
+            rows = cursor.fetchall()
+        
+        paineis = build_panels(*_panel_rows(hoje), hoje=hoje)
+        recortes = build_snapshot(rows, periodo)
+        bump_if_changed(CRM, "crm_kpis_mes", recortes)
+        version = publish_snapshot(periodo, recortes, paineis)
+        kpis = recortes[field(None, None)]
         
         return {
             "status": "ok",
+            "version": version,
+            "recortes": len(recortes),
             "kpis": {
-                "total_leads": kpis['total_leads'] or 0,
-                "ganhos": ganhos,
-                "perdidos": perdidos,
-                "em_andamento": kpis['em_andamento'] or 0,
-                "taxa_conversao": round(taxa_conversao, 2),
-                "valor_vendido": float(kpis['valor_vendido'] or 0),
-                "ticket_medio": float(kpis['ticket_medio'] or 0)
+                "total_leads": kpis["total_leads"],
+                "ganhos": kpis["ganhos"],
+                "perdidos": kpis["perdidos"],
+                "em_andamento": kpis["em_andamento"],
+                "taxa_conversao": kpis["taxa_conversao"],
+                "valor_vendido": kpis["valor_vendido"],
+                "ticket_medio": kpis["ticket_medio"]
             }
         }
         
@@ -153,3 +169,105 @@ def get_realtime_kpis():
         logger.error("Erro ao obter KPIs", error=str(e))
         return {"status": "error", "error": str(e)}
 
+
+def _panel_rows(hoje: date) -> tuple:
+    """
+    Linhas agregadas para build_panels: (dias, motivos, funil, parados)
+
+    dias/motivos vêm por dia desde a maior janela; cada janela menor é um
+    filtro em Python, sem nova query.
+    """
+    inicio = hoje - timedelta(days=max(PANEL_WINDOWS))
+    amanha = hoje + timedelta(days=1)
+    
+    with instrumented_cursor(get_crm_connection(), "sync_crm.realtime_paineis") as cursor:
+        cursor.execute(f"""
+            SELECT 
+                DATE(n.date_create) AS dia,
+                {GRUPO_ORIGEM_SQL} AS grupo_origem,
+                n.id_user AS vendedor_id,
+                u.name AS vendedor,
+                COUNT(*) AS total_leads,
+                SUM(CASE WHEN n.id_state = 6 THEN 1 ELSE 0 END) AS ganhos,
+                SUM(CASE WHEN n.id_state = 7 THEN 1 ELSE 0 END) AS perdidos,
+                SUM(CASE WHEN n.id_state BETWEEN 1 AND 5 THEN 1 ELSE 0 END) AS em_andamento,
+                SUM(CASE WHEN n.id_state = 6 THEN n.valor ELSE 0 END) AS valor_vendido
+            FROM crm_negocio n
+            LEFT JOIN users u ON n.id_user = u.id_users
+            WHERE n.date_create >= %s AND n.date_create < %s
+            GROUP BY dia, grupo_origem, n.id_user, u.name
+        """, (inicio, amanha))
+        dias = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT DATE(date_create) AS dia, motivo_perda, COUNT(*) AS quantidade
+            FROM crm_negocio
+            WHERE id_state = 7
+              AND motivo_perda IS NOT NULL
+              AND motivo_perda != ''
+              AND date_create >= %s AND date_create < %s
+            GROUP BY dia, motivo_perda
+        """, (inicio, amanha))
+        motivos = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT 
+                id_state,
+                CASE id_state
+                    WHEN 1 THEN '1. Novo'
+                    WHEN 2 THEN '2. Em Atendimento'
+                    WHEN 3 THEN '3. Proposta Enviada'
+                    WHEN 4 THEN '4. Em Negociação'
+                    WHEN 5 THEN '5. Fechamento'
+                    WHEN 6 THEN '6. GANHO'
+                    WHEN 7 THEN '7. PERDIDO'
+                    WHEN 8 THEN '8. Arquivado'
+                END AS etapa,
+                COUNT(*) AS quantidade,
+                SUM(valor) AS valor_total,
+                ROUND(AVG(valor), 2) AS ticket_medio
+            FROM crm_negocio
+            GROUP BY id_state
+            ORDER BY id_state
+        """)
+        funil = cursor.fetchall()
+        
+        cursor.execute("""
+            SELECT 
+                n.id_crm_negocio AS id,
+                n.titulo AS veiculo,
+                n.cliente AS nome_cliente,
+                n.origem,
+                u.name AS vendedor,
+                n.id_state AS estado,
+                n.valor,
+                n.date_create AS data_criacao,
+                n.date_update AS ultima_atualizacao,
+                DATEDIFF(NOW(), n.date_update) AS dias_parado
+            FROM crm_negocio n
+            LEFT JOIN users u ON n.id_user = u.id_users
+            WHERE n.id_state BETWEEN 1 AND 5
+              AND DATEDIFF(NOW(), n.date_update) > %s
+            ORDER BY dias_parado DESC
+            LIMIT 100
+        """, (min(STALLED_WINDOWS),))
+        parados = cursor.fetchall()
+    
+    return dias, motivos, funil, parados
+
+
+@celery_app.task(name="task_lock_stats")
+def task_lock_stats():
+    """
+    Contadores de execuções ignoradas/agrupadas pelo singleflight
+    """
+    return {"status": "ok", "tasks": lock_stats()}
+
+
+@celery_app.task(name="task_crm_query_stats")
+def task_crm_query_stats():
+    """
+    Métricas das consultas ao CRM (shared.query_metrics) do processo que
+    executar a task; o worker não expõe /metrics
+    """
+    return {"status": "ok", "queries": query_registry.snapshot()}
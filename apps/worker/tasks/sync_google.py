@@ -8,6 +8,9 @@ import structlog
 
 from celery_app import app
 from config import get_settings
+from ads_api import GOOGLE
+from ads_ingest import ingest
+from tasks.backfill import start_backfill
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -25,10 +28,13 @@ def sync_google_ads(self):
     
     try:
         if settings.is_google_configured:
-            # TODO: Implementar integração real com Google Ads API
-            # from google.ads.googleads.client import GoogleAdsClient
-            logger.info("Modo live - integração Google Ads não implementada ainda")
-            return {"status": "skipped", "reason": "live integration not implemented"}
+            # Um searchStream por customer, em paralelo
+            fim = date.today()
+            inicio = fim - timedelta(days=settings.ads_sync_days - 1)
+            resultado = ingest(GOOGLE, inicio, fim)
+            # Campanhas novas/renomeadas mudam o índice de atribuição
+            app.signature("tasks.attribution.attribute_deals").delay()
+            return {"status": "success", "mode": "live", **resultado}
         
         # Modo mock - gerar dados fake
         today = date.today()
@@ -58,8 +64,11 @@ def reprocess_last_7_days(self):
         logger.info("Modo mock - reprocessamento simulado", start=str(start_date), end=str(end_date))
         return {"status": "success", "mode": "mock", "days": 7}
     
-    # TODO: Implementar reprocessamento real
-    return {"status": "skipped", "reason": "live integration not implemented"}
+    # Um bloco por conta/dia em paralelo; upsert sobrescreve os dias revisados
+    return start_backfill(
+        start_date, end_date, [GOOGLE],
+        backfill_id=f"reprocess:google:{end_date}"
+    )
 
 
 def generate_mock_google_data(target_date: date) -> int:
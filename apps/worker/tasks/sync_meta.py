@@ -8,6 +8,8 @@ import structlog
 
 from celery_app import app
 from config import get_settings
+from ads_api import META
+from ads_ingest import ingest
 
 logger = structlog.get_logger()
 settings = get_settings()
@@ -25,9 +27,13 @@ def sync_meta_ads(self):
     
     try:
         if settings.is_meta_configured:
-            # TODO: Implementar integração real com Meta Marketing API
-            logger.info("Modo live - integração Meta Ads não implementada ainda")
-            return {"status": "skipped", "reason": "live integration not implemented"}
+            # Últimos dias de todas as contas em batch; upsert sobrescreve revisões
+            fim = date.today()
+            inicio = fim - timedelta(days=settings.ads_sync_days - 1)
+            resultado = ingest(META, inicio, fim)
+            # Campanhas novas/renomeadas mudam o índice de atribuição
+            app.signature("tasks.attribution.attribute_deals").delay()
+            return {"status": "success", "mode": "live", **resultado}
         
         # Modo mock - gerar dados fake
         today = date.today()
@@ -52,8 +58,9 @@ def sync_meta_insights(self, campaign_id: str, days: int = 7):
         logger.info("Modo mock - insights simulados")
         return {"status": "success", "mode": "mock"}
     
-    # TODO: Implementar
-    return {"status": "skipped"}
+    fim = date.today()
+    resultado = ingest(META, fim - timedelta(days=days - 1), fim, campaign_ids=[campaign_id])
+    return {"status": "success", "mode": "live", **resultado}
 
 
 def generate_mock_meta_data(target_date: date) -> int:
@@ -0,0 +1,157 @@
+"""
+Gravação em lote de séries diárias (campaign_insights e afins)
+
+Recebe lotes colunares ({"campaign_id": [...], "date": [...], "spend": [...]})
+e grava cada bloco com UM statement de upsert na chave composta:
+
+- PostgreSQL: INSERT ... SELECT FROM unnest(arrays) ON CONFLICT (chave)
+  (uma coluna = um parâmetro, independe do tamanho do bloco)
+- SQLite: INSERT ... VALUES (...), (...) ON CONFLICT (chave)
+
+O UPDATE só acontece se algum valor mudou, então reprocessar o mesmo dia
+(reprocess_last_7_days, replays de backfill) não reescreve linhas iguais.
+"""
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import Table, text
+
+from database import insert_default_columns, onupdate_columns
+
+# Limite de parâmetros por statement (SQLite < 3.32 aceita só 999)
+SQLITE_MAX_PARAMS = 32766 if sqlite3.sqlite_version_info >= (3, 32) else 999
+PG_CHUNK_ROWS = 10000
+
+# (url, tabela) -> {coluna: tipo no banco}, para os casts do unnest
+_pg_types: Dict[tuple, Dict[str, str]] = {}
+
+
+def _as_list(values) -> list:
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def dedupe_last(columns: Dict[str, list], key: Sequence[str]) -> Dict[str, list]:
+    """
+    Mantém a última ocorrência de cada chave
+
+    ON CONFLICT não pode tocar a mesma linha duas vezes no mesmo statement.
+    """
+    n = len(columns[key[0]])
+    ultima = {}
+    for i in range(n):
+        ultima[tuple(columns[k][i] for k in key)] = i
+    if len(ultima) == n:
+        return columns
+    indices = sorted(ultima.values())
+    return {c: [v[i] for i in indices] for c, v in columns.items()}
+
+
+def _pg_column_types(conn, table: Table) -> Dict[str, str]:
+    """Tipos reais das colunas (enum criado pela API, varchar(n), ...)"""
+    cache_key = (str(conn.engine.url), table.name)
+    if cache_key not in _pg_types:
+        result = conn.execute(
+            text(
+                "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = CAST(:t AS regclass) AND attnum > 0 AND NOT attisdropped"
+            ),
+            {"t": table.name},
+        )
+        _pg_types[cache_key] = dict(result.all())
+    return _pg_types[cache_key]
+
+
+def _pg_upsert(conn, table: Table, key: List[str], columns: Dict[str, list], update_columns: List[str]) -> int:
+    tipos = _pg_column_types(conn, table)
+    nomes = list(columns)
+    arrays = ", ".join(f"CAST(:{c} AS {tipos[c]}[])" for c in nomes)
+    # created_at só no INSERT; o UPDATE mantém o valor original
+    defaults = insert_default_columns(table, nomes)
+    selecao = ", ".join(["*"] + ["now()"] * len(defaults))
+
+    sets = [f"{c} = EXCLUDED.{c}" for c in update_columns]
+    sets += [f"{c} = now()" for c in onupdate_columns(table, dict.fromkeys(update_columns))]
+    atuais = ", ".join(f"t.{c}" for c in update_columns)
+    novos = ", ".join(f"EXCLUDED.{c}" for c in update_columns)
+
+    sql = (
+        f"INSERT INTO {table.name} AS t ({', '.join(nomes + defaults)}) "
+        f"SELECT {selecao} FROM unnest({arrays}) "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {', '.join(sets)} "
+        f"WHERE ({atuais}) IS DISTINCT FROM ({novos})"
+    )
+    return conn.execute(text(sql), columns).rowcount
+
+
+def _sqlite_upsert(conn, table: Table, key: List[str], columns: Dict[str, list], update_columns: List[str]) -> int:
+    # SQL montado à mão: compilar um VALUES com milhares de linhas no
+    # SQLAlchemy custa mais que o próprio INSERT
+    nomes = list(columns)
+    valores = []
+    for c in nomes:
+        processa = table.c[c].type.dialect_impl(conn.dialect).bind_processor(conn.dialect)
+        valores.append([processa(v) for v in columns[c]] if processa else columns[c])
+    n = len(valores[0])
+    defaults = insert_default_columns(table, nomes)
+
+    sets = [f"{c} = excluded.{c}" for c in update_columns]
+    sets += [f"{c} = CURRENT_TIMESTAMP" for c in onupdate_columns(table, dict.fromkeys(update_columns))]
+    atuais = ", ".join(f"t.{c}" for c in update_columns)
+    novos = ", ".join(f"excluded.{c}" for c in update_columns)
+    linha = "(" + ", ".join(["?"] * len(nomes) + ["CURRENT_TIMESTAMP"] * len(defaults)) + ")"
+
+    sql = (
+        f"INSERT INTO {table.name} AS t ({', '.join(nomes + defaults)}) VALUES {', '.join([linha] * n)} "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {', '.join(sets)} "
+        f"WHERE ({atuais}) IS NOT ({novos})"
+    )
+    params = tuple(v for linha_valores in zip(*valores) for v in linha_valores)
+    return conn.exec_driver_sql(sql, params).rowcount
+
+
+def upsert_columns(
+    conn,
+    table: Table,
+    key: Sequence[str],
+    columns: Dict[str, Sequence[Any]],
+    update_columns: Optional[Sequence[str]] = None,
+    chunk_size: Optional[int] = None,
+) -> int:
+    """
+    Upsert colunar: um statement por bloco na chave composta `key`
+
+    Args:
+        columns: {coluna: valores}, todas com o mesmo tamanho (listas ou arrays NumPy)
+        update_columns: colunas sobrescritas no conflito (padrão: todas menos a chave)
+        chunk_size: linhas por statement (padrão: limite do dialeto)
+
+    Returns:
+        Linhas inseridas ou alteradas (linhas idênticas não contam)
+    """
+    columns = {c: _as_list(v) for c, v in columns.items()}
+    key = list(key)
+    tamanhos = {len(v) for v in columns.values()}
+    if len(tamanhos) > 1:
+        raise ValueError(f"Colunas com tamanhos diferentes: {tamanhos}")
+    if not tamanhos or not tamanhos.pop():
+        return 0
+
+    columns = dedupe_last(columns, key)
+    if update_columns is None:
+        update_columns = [c for c in columns if c not in key]
+    update_columns = list(update_columns)
+
+    if conn.dialect.name == "postgresql":
+        upsert, limite = _pg_upsert, PG_CHUNK_ROWS
+    elif conn.dialect.name == "sqlite":
+        upsert, limite = _sqlite_upsert, SQLITE_MAX_PARAMS // len(columns)
+    else:
+        raise NotImplementedError(f"Upsert não suportado para {conn.dialect.name}")
+
+    chunk_size = min(chunk_size or limite, limite)
+    n = len(columns[key[0]])
+    gravadas = 0
+    for i in range(0, n, chunk_size):
+        bloco = {c: v[i:i + chunk_size] for c, v in columns.items()}
+        gravadas += upsert(conn, table, key, bloco, update_columns)
+    return gravadas
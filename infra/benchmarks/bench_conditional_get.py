@@ -0,0 +1,126 @@
+"""
+GET condicional: 200 completo vs 304 por ETag de versão de dados
+
+Roda GET /api/roi/vendas/consolidado do roi_api (ASGI, sem rede) com as
+linhas sintéticas de bench_serialization e mede, na mediana de --repeat
+rodadas:
+
+- primeira carga (200, sem If-None-Match)
+- revalidação com o ETag recebido (304, sem chegar ao endpoint)
+- revalidação depois de um bump de versão (200 com ETag novo)
+
+As versões ficam num dicionário em memória (só no harness, sem Redis). O
+script sai com código 1 se um 304 chegar a consultar o CRM ou se o bump
+não invalidar o ETag.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/bench_conditional_get.py
+    PYTHONPATH=packages python infra/benchmarks/bench_conditional_get.py --rows 50000 --output cond.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+sys.path.insert(0, os.path.join(AQUI, '..', '..', 'apps', 'api'))
+
+from bench_serialization import linhas_vendas
+from conditional import ConditionalGetMiddleware
+from shared.data_versions import CRM, DOMAINS
+
+ROTA = "/api/roi/vendas/consolidado"
+
+
+class VersoesEmMemoria:
+    """Mesma interface de leitura do DataVersionStore"""
+
+    def __init__(self):
+        self.versoes = {d: 1 for d in DOMAINS}
+
+    async def get(self, domains):
+        return {d: self.versoes[d] for d in sorted(set(domains))}
+
+    def bump(self, domain):
+        self.versoes[domain] += 1
+
+
+async def medir(client, repeat: int, headers=None) -> tuple:
+    tempos, resposta = [], None
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        resposta = await client.get(ROTA, headers=headers or {})
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), resposta
+
+
+def wire(resposta) -> int:
+    """Bytes na rede (o httpx já entrega o corpo descomprimido)"""
+    return int(resposta.headers.get("content-length", 0))
+
+
+async def rodar(linhas: list, repeat: int, encoding: str) -> dict:
+    import httpx
+    import roi_api
+
+    consultas = [0]
+
+    def consulta(start, end):
+        consultas[0] += 1
+        return linhas
+
+    # Só no harness: endpoint lê as linhas sintéticas e versões em memória
+    roi_api.get_vendas_midia_range = consulta
+    versoes = VersoesEmMemoria()
+    for middleware in roi_api.app.user_middleware:
+        if middleware.cls is ConditionalGetMiddleware:
+            middleware.kwargs["store"] = versoes
+
+    transport = httpx.ASGITransport(app=roi_api.app)
+    base = {"accept-encoding": encoding}
+    resultado = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://cond") as client:
+        ms, resposta = await medir(client, repeat, base)
+        etag = resposta.headers["etag"]
+        resultado["200"] = {"ms": round(ms, 2), "bytes": wire(resposta)}
+
+        antes = consultas[0]
+        ms, resposta = await medir(client, repeat, {**base, "if-none-match": etag})
+        if resposta.status_code != 304 or consultas[0] != antes:
+            raise SystemExit(f"If-None-Match não gerou 304 sem consulta: status={resposta.status_code}")
+        resultado["304"] = {"ms": round(ms, 2), "bytes": wire(resposta)}
+
+        versoes.bump(CRM)
+        ms, resposta = await medir(client, 1, {**base, "if-none-match": etag})
+        if resposta.status_code != 200 or resposta.headers["etag"] == etag:
+            raise SystemExit("Bump de versão não invalidou o ETag")
+        resultado["apos_bump"] = {"ms": round(ms, 2), "bytes": wire(resposta)}
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GET condicional por versão de dados (200 vs 304)")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--encoding", default="gzip", help="Accept-Encoding das requisições")
+    parser.add_argument("--output", help="Arquivo JSON com o resultado")
+    args = parser.parse_args()
+
+    resultado = asyncio.run(rodar(linhas_vendas(args.rows), args.repeat, args.encoding))
+    print(f"GET {ROTA} ({args.rows} linhas, {args.encoding}, mediana de {args.repeat})")
+    for caso, r in resultado.items():
+        print(f"  {caso:<10} {r['ms']:>8.2f} ms {r['bytes']:>10} bytes")
+    print(f"  ganho do 304: {resultado['200']['ms'] / max(resultado['304']['ms'], 0.001):.0f}x")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"linhas": args.rows, "encoding": args.encoding, **resultado}, f, indent=2)
+        print(f"\nResultado em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
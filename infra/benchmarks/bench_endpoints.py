@@ -0,0 +1,420 @@
+"""
+Benchmark de carga dos endpoints de leitura do CRM
+
+Carrega o dataset sintético (synthetic_crm.py) em cada escala pedida e
+chama, com requisições concorrentes e pela aplicação real (ASGI, sem rede),
+todos os GET de:
+
+- roi_api.py (/api/roi/*), lendo crm_negocio
+- main.py: /api/roi/*, /api/crm-sync/realtime/* e /api/analytics/*
+
+O CRM externo é um SQLite com a interface do pymysql (ou um MySQL de
+verdade com --mysql-host); o banco local do Analytics é populado como no
+check_query_plans.py. Por endpoint: p50/p95/p99, vazão, consultas e linhas
+do CRM por requisição (query_metrics) e tempo médio por fase (profiling).
+Endpoint que falha na primeira chamada (ex.: resumo/snapshot sem snapshot
+publicado no Redis) é registrado como ignorado, com o motivo.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/bench_endpoints.py --output base.json
+    PYTHONPATH=packages python infra/benchmarks/bench_endpoints.py --scales 10k,100k,1m \\
+        --concurrency 16 --output novo.json
+    PYTHONPATH=packages python infra/benchmarks/bench_endpoints.py --compare base.json novo.json
+
+A comparação sai com código 1 se algum endpoint regrediu: p95 acima do
+limite (--threshold, padrão 20%), vazão abaixo dele, mais consultas ao CRM
+por requisição ou endpoint que passou a falhar.
+
+ATENÇÃO: com --mysql-host as tabelas crm_negocio e users do banco
+informado são recriadas.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(AQUI, '..', '..', 'apps', 'api'))
+sys.path.insert(0, AQUI)
+
+ESCALAS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+PATH_PARAMS = {"ano": 2025, "mes": 11}
+
+# (app, prefixo): todos os GET da aplicação com esse prefixo
+GRUPOS = [
+    ("roi_api", "/api/roi/"),
+    ("main", "/api/roi/"),
+    ("main", "/api/crm-sync/realtime/"),
+    ("main", "/api/analytics/"),
+]
+
+# Variações com parâmetro que muda o caminho da consulta
+VARIANTES = [
+    ("roi_api", "/api/roi/dashboard/{ano}/{mes}", {"leads_unicos": True}),
+    ("roi_api", "/api/roi/consolidado", {"leads_unicos": True}),
+    ("main", "/api/analytics/campaigns/roi", {"leads_unicos": True}),
+    ("main", "/api/crm-sync/realtime/vendedores", {"dias": 365}),
+]
+
+MIN_DELTA_MS = 2.0  # Abaixo disso a variação de p95 é ruído
+
+
+# =============================================================================
+# MEDIDAS
+# =============================================================================
+
+def _percentile(valores: list, pct: float) -> float:
+    """Percentil por posição mais próxima (mesmo critério de queue_metrics)"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(pct / 100 * (len(ordenados) - 1))))
+    return ordenados[idx]
+
+
+def _consultas_crm(registry) -> tuple:
+    """(consultas, linhas) acumuladas no registro de query_metrics"""
+    snap = registry.snapshot()
+    consultas = sum(s["count"] + s["errors"] for s in snap.values())
+    linhas = sum(s["rows"] for s in snap.values())
+    return consultas, linhas
+
+
+def _fases(route_timings, chave: str) -> dict:
+    """Segundos acumulados por fase de uma rota (profiling.ROUTE_TIMINGS)"""
+    return route_timings.snapshot().get(chave, {})
+
+
+async def carga(client, url: str, params: dict, total: int, concorrencia: int, max_segundos: float) -> dict:
+    """`total` requisições com `concorrencia` em paralelo (ou até `max_segundos`)"""
+    latencias = []
+    erros = 0
+    restantes = total
+    limite = time.perf_counter() + max_segundos
+
+    async def worker():
+        nonlocal restantes, erros
+        while restantes > 0 and time.perf_counter() < limite:
+            restantes -= 1
+            t = time.perf_counter()
+            resp = await client.get(url, params=params)
+            latencias.append((time.perf_counter() - t) * 1000)
+            if resp.status_code >= 400:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+    return {
+        "requests": len(latencias),
+        "errors": erros,
+        "p50_ms": round(_percentile(latencias, 50), 2),
+        "p95_ms": round(_percentile(latencias, 95), 2),
+        "p99_ms": round(_percentile(latencias, 99), 2),
+        "throughput_rps": round(len(latencias) / duracao, 2) if duracao else 0.0,
+    }
+
+
+# =============================================================================
+# AMBIENTE
+# =============================================================================
+
+def _escalas(valor: str) -> list:
+    escalas = []
+    for item in valor.split(","):
+        item = item.strip().lower()
+        if item in ESCALAS:
+            escalas.append((item, ESCALAS[item]))
+        elif item.isdigit():
+            escalas.append((item, int(item)))
+        else:
+            raise SystemExit(f"Escala inválida: {item} (use 10k, 100k, 1m ou um número)")
+    return escalas
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=AQUI, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _endpoints(apps: dict) -> list:
+    """(app, rota, params) de cada GET dos grupos, mais as variantes"""
+    from fastapi.routing import APIRoute
+
+    endpoints = []
+    for nome, prefixo in GRUPOS:
+        for route in apps[nome].routes:
+            if isinstance(route, APIRoute) and "GET" in route.methods and route.path.startswith(prefixo):
+                endpoints.append((nome, route.path, {}))
+    vistos = set()
+    unicos = []
+    for nome, path, params in endpoints + VARIANTES:
+        chave = (nome, path, json.dumps(params, sort_keys=True))
+        if chave not in vistos:
+            vistos.add(chave)
+            unicos.append((nome, path, params))
+    return unicos
+
+
+def _chave(nome: str, path: str, params: dict) -> str:
+    sufixo = "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items())) if params else ""
+    return f"{nome} GET {path}{sufixo}"
+
+
+async def _banco_local(deals: int):
+    """Banco do Analytics em SQLite temporário, populado como no check_query_plans"""
+    from sqlalchemy import event
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from check_query_plans import seed
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench_local.db")
+
+    # Analytics usa date_trunc (PostgreSQL); equivalente para rodar no SQLite
+    @event.listens_for(engine.sync_engine, "connect")
+    def _funcoes(dbapi_conn, _):
+        dbapi_conn.create_function("date_trunc", 2, lambda _, v: v[:10] if v else None)
+
+    await seed(engine, deals, 60, 730)
+    return engine
+
+
+def _conexao_crm(args, path: str):
+    """Fábrica de conexões do CRM: SQLite do dataset ou MySQL de --mysql-host"""
+    if args.mysql_host:
+        import pymysql
+        from pymysql.cursors import DictCursor
+        return lambda: pymysql.connect(
+            host=args.mysql_host, port=args.mysql_port, user=args.mysql_user,
+            password=args.mysql_password, database=args.mysql_database,
+            charset="utf8mb4", cursorclass=DictCursor,
+        )
+    from synthetic_crm import SQLiteCRMConnection
+    return lambda: SQLiteCRMConnection(path)
+
+
+# =============================================================================
+# EXECUÇÃO
+# =============================================================================
+
+async def rodar_escala(args, rotulo: str, linhas: int) -> dict:
+    import httpx
+    from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+    import main
+    import profiling
+    import roi_api
+    from database import get_db
+    from routers.auth import get_current_user
+    from services import external_crm
+    from shared import query_metrics
+    from synthetic_crm import generate, load_sqlite, load_mysql
+
+    print(f"\n=== {rotulo}: {linhas} negócios ===")
+    t = time.perf_counter()
+    dataset = generate(linhas)
+    t_gerar = time.perf_counter() - t
+    path = os.path.join(tempfile.mkdtemp(), "crm.db")
+    conectar = _conexao_crm(args, path)
+    t = time.perf_counter()
+    if args.mysql_host:
+        conn = conectar()
+        try:
+            load_mysql(conn, dataset)
+        finally:
+            conn.close()
+    else:
+        load_sqlite(path, dataset)
+    t_carga = time.perf_counter() - t
+    del dataset
+    print(f"CRM: gerado em {t_gerar:.1f}s, carregado em {t_carga:.1f}s")
+
+    # Só no harness: as apps abrem conexões com o CRM configurado no ambiente
+    def _get_crm_connection():
+        inicio = time.perf_counter()
+        conn = conectar()
+        query_metrics.mark_wait(conn, time.perf_counter() - inicio)
+        return conn
+
+    roi_api.get_crm_connection = _get_crm_connection
+    cliente_crm = external_crm.get_external_crm()
+    cliente_crm.close()
+    cliente_crm._connection = conectar()
+
+    t = time.perf_counter()
+    engine = await _banco_local(min(linhas, args.local_deals))
+    print(f"Banco local populado em {time.perf_counter() - t:.1f}s")
+    profiling.instrument_engine_phases(engine.sync_engine)
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _db():
+        async with sessions() as session:
+            yield session
+
+    main.app.dependency_overrides[get_db] = _db
+    main.app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(
+        id=uuid.uuid4(), email="bench@local", is_active=True, is_admin=True
+    )
+
+    apps = {"roi_api": roi_api.app, "main": main.app}
+    resultados = {}
+    clientes = {
+        nome: httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+            base_url="http://bench", timeout=None,
+        )
+        for nome, app in apps.items()
+    }
+    try:
+        for nome, path, params in _endpoints(apps):
+            chave = _chave(nome, path, params)
+            url = path.format(**PATH_PARAMS)
+            cliente = clientes[nome]
+
+            resp = await cliente.get(url, params=params)
+            if resp.status_code >= 400:
+                motivo = f"HTTP {resp.status_code}: {resp.text[:120]}"
+                resultados[chave] = {"skipped": motivo}
+                print(f"  {'ignorado':>9}  {chave}  ({motivo})")
+                continue
+
+            consultas0, linhas0 = _consultas_crm(query_metrics.REGISTRY)
+            fases0 = _fases(profiling.ROUTE_TIMINGS, f"GET {path}")
+            medida = await carga(cliente, url, params, args.requests, args.concurrency, args.max_seconds)
+            consultas1, linhas1 = _consultas_crm(query_metrics.REGISTRY)
+            fases1 = _fases(profiling.ROUTE_TIMINGS, f"GET {path}")
+
+            n = medida["requests"] or 1
+            medida["crm_queries_per_request"] = round((consultas1 - consultas0) / n, 2)
+            medida["crm_rows_per_request"] = round((linhas1 - linhas0) / n, 1)
+            medida["phases_ms"] = {
+                fase: round((fases1.get(fase, 0.0) - fases0.get(fase, 0.0)) * 1000 / n, 2)
+                for fase in profiling.PHASES
+            }
+            resultados[chave] = medida
+            print(f"  {medida['p95_ms']:>7.1f}ms  {chave}  p50 {medida['p50_ms']:.1f}  "
+                  f"{medida['throughput_rps']:.0f} req/s  {medida['crm_queries_per_request']} consultas/req")
+    finally:
+        for cliente in clientes.values():
+            await cliente.aclose()
+        main.app.dependency_overrides.clear()
+        cliente_crm.close()
+        await engine.dispose()
+
+    return {"dataset": {"rows": linhas, "generate_seconds": round(t_gerar, 2), "load_seconds": round(t_carga, 2)},
+            "endpoints": resultados}
+
+
+async def benchmark(args) -> dict:
+    if args.mysql_host:
+        # roi_api lê a configuração do CRM na importação
+        os.environ.update({
+            "EXTERNAL_CRM_HOST": args.mysql_host, "EXTERNAL_CRM_PORT": str(args.mysql_port),
+            "EXTERNAL_CRM_USER": args.mysql_user, "EXTERNAL_CRM_PASSWORD": args.mysql_password,
+            "EXTERNAL_CRM_DATABASE": args.mysql_database,
+        })
+    resultado = {
+        "meta": {
+            "backend": "mysql" if args.mysql_host else "sqlite",
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "max_seconds": args.max_seconds,
+            "commit": _commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+        },
+        "scales": {},
+    }
+    for rotulo, linhas in _escalas(args.scales):
+        resultado["scales"][rotulo] = await rodar_escala(args, rotulo, linhas)
+    return resultado
+
+
+# =============================================================================
+# COMPARAÇÃO
+# =============================================================================
+
+def compare(base: dict, novo: dict, threshold: float) -> list:
+    """Regressões de `novo` em relação a `base` (lista de descrições)"""
+    regressoes = []
+    for escala, dados in novo.get("scales", {}).items():
+        anteriores = base.get("scales", {}).get(escala, {}).get("endpoints", {})
+        for chave, atual in dados.get("endpoints", {}).items():
+            antes = anteriores.get(chave)
+            if antes is None or "skipped" in antes:
+                continue
+            onde = f"[{escala}] {chave}"
+            if "skipped" in atual:
+                regressoes.append(f"{onde}: passou a falhar ({atual['skipped']})")
+                continue
+            if atual["errors"] > antes["errors"]:
+                regressoes.append(f"{onde}: erros {antes['errors']} -> {atual['errors']}")
+            if (atual["p95_ms"] > antes["p95_ms"] * (1 + threshold)
+                    and atual["p95_ms"] - antes["p95_ms"] > MIN_DELTA_MS):
+                regressoes.append(f"{onde}: p95 {antes['p95_ms']:.1f}ms -> {atual['p95_ms']:.1f}ms")
+            if atual["throughput_rps"] < antes["throughput_rps"] * (1 - threshold):
+                regressoes.append(
+                    f"{onde}: vazão {antes['throughput_rps']:.0f} -> {atual['throughput_rps']:.0f} req/s"
+                )
+            if atual["crm_queries_per_request"] > antes["crm_queries_per_request"]:
+                regressoes.append(
+                    f"{onde}: consultas ao CRM por requisição "
+                    f"{antes['crm_queries_per_request']} -> {atual['crm_queries_per_request']}"
+                )
+    return regressoes
+
+
+def _carregar(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga nos endpoints de leitura do CRM")
+    parser.add_argument("--scales", default="10k,100k", help="10k, 100k, 1m ou número de negócios")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Requisições por endpoint")
+    parser.add_argument("--max-seconds", type=float, default=20.0, help="Teto de tempo por endpoint")
+    parser.add_argument("--local-deals", type=int, default=100000, help="Teto de deals no banco local")
+    parser.add_argument("--output", help="Arquivo JSON com o resultado")
+    parser.add_argument("--baseline", help="JSON anterior para comparar ao final")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NOVO"), help="Só compara dois JSON")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--mysql-host")
+    parser.add_argument("--mysql-port", type=int, default=3306)
+    parser.add_argument("--mysql-user", default="root")
+    parser.add_argument("--mysql-password", default="")
+    parser.add_argument("--mysql-database", default="crm_bench")
+    args = parser.parse_args()
+
+    if args.compare:
+        base, novo = (_carregar(p) for p in args.compare)
+    else:
+        novo = asyncio.run(benchmark(args))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(novo, f, indent=2, ensure_ascii=False)
+            print(f"\nResultado em {args.output}")
+        if not args.baseline:
+            return
+        base = _carregar(args.baseline)
+
+    regressoes = compare(base, novo, args.threshold)
+    for r in regressoes:
+        print(f"REGRESSÃO {r}")
+    print(f"\n{len(regressoes)} regressão(ões) (limite {args.threshold:.0%})")
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
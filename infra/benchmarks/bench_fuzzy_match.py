@@ -0,0 +1,86 @@
+"""
+Benchmark do casamento aproximado de nomes de campanha (shared/fuzzy.py)
+
+Gera campanhas com vocabulário parecido (o pior caso: quase todos os
+nomes dividem trigramas) e utm_campaign com separadores trocados e erros
+de digitação, e compara:
+
+- indice: FuzzyIndex (n-gramas + memo) para todos os deals
+- pares: comparação par a par de uma amostra, extrapolada para as strings
+  distintas (o que o índice evita)
+
+Confere também, numa amostra, que o índice devolve o mesmo melhor score da
+comparação par a par.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/bench_fuzzy_match.py
+    PYTHONPATH=packages python infra/benchmarks/bench_fuzzy_match.py --deals 100000 --campaigns 5000 --utms 3000
+"""
+import argparse
+import random
+import time
+
+from shared.fuzzy import FuzzyIndex, dice, ngrams, match_key
+
+WORDS = (
+    "busca display remarketing seminovos usados premium financiamento suv sedan hatch "
+    "promo black friday outubro novembro sp rj bh poa leads conversao catalogo stories "
+    "alcance branding pmax geral marca concorrentes"
+).split()
+
+
+def campaign_names(n: int, rnd: random.Random) -> list:
+    return [
+        " - ".join(" ".join(rnd.sample(WORDS, rnd.randint(2, 4))) for _ in range(2)) + f" {i % 97}"
+        for i in range(n)
+    ]
+
+
+def utm_from(name: str, rnd: random.Random) -> str:
+    """Nome como aparece em UTM: minúsculo, com hífens e até 2 erros"""
+    chars = list(name.lower().replace(" - ", "_").replace(" ", "-"))
+    for _ in range(rnd.randint(0, 2)):
+        chars[rnd.randrange(len(chars))] = rnd.choice("abcdefghij")
+    return "".join(chars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FuzzyIndex vs comparação par a par")
+    parser.add_argument("--deals", type=int, default=100000)
+    parser.add_argument("--campaigns", type=int, default=5000)
+    parser.add_argument("--utms", type=int, default=3000, help="utm_campaign distintos entre os deals")
+    parser.add_argument("--sample", type=int, default=200, help="Strings comparadas par a par")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    nomes = campaign_names(args.campaigns, rnd)
+    utms = [utm_from(rnd.choice(nomes), rnd) for _ in range(args.utms)]
+    deals = [rnd.choice(utms) for _ in range(args.deals)]
+
+    t = time.perf_counter()
+    index = FuzzyIndex(list(enumerate(nomes)))
+    montagem = time.perf_counter() - t
+
+    t = time.perf_counter()
+    casados = sum(1 for u in deals if index.best(u))
+    indice = time.perf_counter() - t
+    print(f"{args.campaigns} campanhas, {args.deals} deals, {args.utms} utm distintos")
+    print(f"indice   montagem {montagem:6.2f}s  casamento {indice:6.2f}s  "
+          f"({casados} casados, {index.cache_info().hits} do memo)")
+
+    grams = [ngrams(match_key(n)) for n in nomes]
+    amostra = rnd.sample(utms, min(args.sample, len(utms)))
+    iguais = 0
+    t = time.perf_counter()
+    for u in amostra:
+        g = ngrams(match_key(u))
+        melhor = max(dice(g, b) for b in grams)
+        achado = index.best(u)
+        iguais += (achado.score if achado else 0.0) == round(melhor, 4) or (not achado and melhor < index.min_score)
+    pares = (time.perf_counter() - t) / len(amostra) * len(set(utms))
+    print(f"pares    ~{pares:6.1f}s estimados para as strings distintas")
+    print(f"mesmo melhor score que par a par: {iguais}/{len(amostra)}")
+
+
+if __name__ == "__main__":
+    main()
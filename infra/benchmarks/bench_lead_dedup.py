@@ -0,0 +1,82 @@
+"""
+Benchmark da de-duplicação de leads (shared/dedup.py)
+
+Gera negócios de clientes recorrentes, com telefone em formatos variados
+((51) 9..., +55 51 9..., só dígitos) e e-mail às vezes ausente, e mede:
+
+- cluster: normalização + hash join + union-find para todos os registros
+- pares: comparação par a par de uma amostra, extrapolada para n²/2 (o
+  que o hash join evita)
+
+Confere os clusters contra os clientes gerados: nenhum cluster mistura
+clientes, e cada cliente fica em um cluster, ou em dois quando nenhum
+negócio dele tem telefone e e-mail juntos (não há como ligá-los).
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/bench_lead_dedup.py
+    PYTHONPATH=packages python infra/benchmarks/bench_lead_dedup.py --records 3000000 --customers 1000000
+"""
+import argparse
+import random
+import time
+
+from shared.dedup import cluster, record_keys
+
+FORMATOS = ["({ddd}) {n}", "+55 {ddd} {n}", "55{ddd}{n}", "{ddd}{n}", "0{ddd} {n}"]
+
+
+def generate(records: int, customers: int, rnd: random.Random):
+    """(id, telefone, email) e (cliente verdadeiro, chaves presentes) de cada registro"""
+    linhas, clientes = [], []
+    for i in range(records):
+        c = rnd.randrange(customers)
+        ddd, n = 51 + c % 3, f"9{c:08d}"
+        # Todo cliente tem telefone ou e-mail em cada negócio; às vezes só um
+        sorteio = rnd.random()
+        telefone = rnd.choice(FORMATOS).format(ddd=ddd, n=n) if sorteio < 0.85 else None
+        email = f"Cliente{c}@Mail.com " if sorteio > 0.6 else None
+        linhas.append((i, telefone, email))
+        clientes.append((c, (telefone is not None, email is not None)))
+    return linhas, clientes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="De-duplicação: hash join + union-find vs pares")
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--customers", type=int, default=350000)
+    parser.add_argument("--sample", type=int, default=2000, help="Registros comparados par a par")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    linhas, clientes = generate(args.records, args.customers, rnd)
+
+    t = time.perf_counter()
+    clusters = cluster(linhas)
+    tempo = time.perf_counter() - t
+    print(f"{args.records} registros, {len({c for c, _ in clientes})} clientes")
+    print(f"cluster  {tempo:7.2f}s  {len(set(clusters.values()))} clusters")
+
+    por_cliente, por_cluster, chaves = {}, {}, {}
+    for (i, _, _), (c, tipo) in zip(linhas, clientes):
+        por_cliente.setdefault(c, set()).add(clusters[i])
+        por_cluster.setdefault(clusters[i], set()).add(c)
+        chaves.setdefault(c, set()).add(tipo)
+    # Só telefone + só e-mail, sem negócio com os dois: dois clusters
+    esperado = {c: 2 if {(True, False), (False, True)} <= t and (True, True) not in t else 1 for c, t in chaves.items()}
+    corretos = all(len(v) == 1 for v in por_cluster.values()) and all(
+        len(por_cliente[c]) == n for c, n in esperado.items()
+    )
+    print(f"clusters = clientes: {'ok' if corretos else 'DIVERGE'}")
+
+    amostra = record_keys(linhas[:args.sample])
+    t = time.perf_counter()
+    for i, a in enumerate(amostra):
+        for b in amostra[i + 1:]:
+            bool(set(a) & set(b))
+    pares = len(amostra) * (len(amostra) - 1) / 2
+    estimado = (time.perf_counter() - t) / pares * args.records * (args.records - 1) / 2
+    print(f"pares    ~{estimado / 3600:7.1f}h estimadas (sem contar o fecho transitivo)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark dos modelos multi-touch (shared/multitouch.py)
+
+Gera um ano de contatos (leads com vários negócios e cliques) e compara:
+
+- lote: compare_models (NumPy, todos os leads de uma vez, 5 modelos)
+- laço: implementação direta por lead em Python puro
+
+Confere que os dois dão o mesmo crédito por canal em todos os modelos.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/bench_multitouch.py
+    PYTHONPATH=packages python infra/benchmarks/bench_multitouch.py --leads 100000 --touches 4
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from shared.multitouch import MODELS, DAY, POSITION_ENDS, compare_models
+
+CANAIS = ["Meta", "Google", "Site", "Portais", "Presencial", "Direto", "Indicação"]
+
+
+def generate(leads: int, touches: float, seed: int = 42):
+    rnd = np.random.default_rng(seed)
+    n = int(leads * touches)
+    lead = rnd.integers(0, leads, n)
+    ts = 1_700_000_000 + rnd.integers(0, 365 * DAY, n)
+    canal = rnd.integers(0, len(CANAIS), n)
+    convertido = rnd.random(n) < 0.12
+    valor = np.where(convertido, rnd.uniform(30_000, 250_000, n).round(2), 0.0)
+    return lead, ts, canal, convertido, valor
+
+
+def reference(lead, ts, canal, convertido, valor, lookback_days, half_life_days):
+    """Por lead, em Python: o que o lote precisa reproduzir"""
+    por_lead = defaultdict(list)
+    for i in sorted(range(len(lead)), key=lambda i: (lead[i], ts[i])):
+        por_lead[lead[i]].append(i)
+
+    credito = {m: [np.zeros(len(CANAIS)), np.zeros(len(CANAIS))] for m in MODELS}
+    for indices in por_lead.values():
+        anterior = -1
+        for k, i in enumerate(indices):
+            if not convertido[i]:
+                continue
+            caminho = [j for j in indices[anterior + 1:k + 1] if ts[i] - ts[j] <= lookback_days * DAY]
+            anterior = k
+            n = len(caminho)
+            decay = [0.5 ** ((ts[i] - ts[j]) / DAY / half_life_days) for j in caminho]
+            for modelo in MODELS:
+                for p, j in enumerate(caminho):
+                    if modelo == "first_touch":
+                        w = float(p == 0)
+                    elif modelo == "last_touch":
+                        w = float(p == n - 1)
+                    elif modelo == "linear":
+                        w = 1 / n
+                    elif modelo == "time_decay":
+                        w = decay[p] / sum(decay)
+                    elif n <= 2:
+                        w = 1 / n
+                    else:
+                        w = POSITION_ENDS if p in (0, n - 1) else (1 - 2 * POSITION_ENDS) / (n - 2)
+                    credito[modelo][0][canal[j]] += w
+                    credito[modelo][1][canal[j]] += w * valor[i]
+    return credito
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Modelos multi-touch: lote NumPy vs laço por lead")
+    parser.add_argument("--leads", type=int, default=50000)
+    parser.add_argument("--touches", type=float, default=3.0, help="Contatos médios por lead")
+    parser.add_argument("--lookback", type=int, default=90)
+    parser.add_argument("--half-life", type=float, default=7.0)
+    args = parser.parse_args()
+
+    dados = generate(args.leads, args.touches)
+    print(f"{len(dados[0])} contatos, {args.leads} leads, {int(dados[3].sum())} conversões (1 ano)")
+
+    t = time.perf_counter()
+    lote = compare_models(*dados, len(CANAIS), args.lookback, args.half_life)
+    print(f"lote  {time.perf_counter() - t:7.3f}s  (5 modelos)")
+
+    listas = [d.tolist() for d in dados]
+    t = time.perf_counter()
+    laco = reference(*listas, args.lookback, args.half_life)
+    print(f"laço  {time.perf_counter() - t:7.3f}s")
+
+    for modelo in MODELS:
+        iguais = all(np.allclose(lote[modelo][k], laco[modelo][k]) for k in (0, 1))
+        print(f"{modelo:15s} {'ok' if iguais else 'DIVERGE'}  "
+              + "  ".join(f"{c}={v:.0f}" for c, v in zip(CANAIS, lote[modelo][0])))
+
+
+if __name__ == "__main__":
+    main()
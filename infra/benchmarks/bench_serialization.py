@@ -0,0 +1,177 @@
+"""
+Serialização e bytes na rede das listas de vendas (10k linhas)
+
+Gera linhas como as do DictCursor em get_vendas_midia_range (Decimal,
+datetime, int, texto) e mede, na mediana de --repeat rodadas:
+
+- "lista de vendas" (/api/roi/vendas/*): o dicionário montado pelo endpoint
+  pelo caminho antigo (jsonable_encoder + JSONResponse/json.dumps) e pelo
+  novo (FastJSONResponse/orjson, resposta devolvida direto)
+- "linhas do CRM" (/api/crm-sync/realtime/*): as linhas cruas, com
+  Decimal e datetime, pelos mesmos dois caminhos
+- Bytes na rede sem compressão, com gzip e com brotli (se instalado), e o
+  tempo de cada compressão
+- Ponta a ponta: GET /api/roi/vendas/consolidado do roi_api (ASGI, sem
+  rede) com cada Accept-Encoding
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/bench_serialization.py
+    PYTHONPATH=packages python infra/benchmarks/bench_serialization.py --rows 50000 --output serial.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(AQUI, '..', '..', 'apps', 'api'))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+import responses
+from responses import FastJSONResponse
+
+PLATAFORMAS = ["INSTAGRAM", "FACEBOOK", "GOOGLE"]
+VEICULOS = ["Onix 1.0 LT", "HB20 Comfort", "Corolla XEi", "Compass Longitude", "Hilux SRV", "Kicks SV"]
+VENDEDORES = ["Ana Souza", "Bruno Lima", "Carla Dias", "Diego Alves", "Elisa Rocha", "Fábio Melo"]
+
+
+def linhas_vendas(n: int, seed: int = 42) -> list:
+    """Linhas no formato do DictCursor de get_vendas_midia_range"""
+    rng = random.Random(seed)
+    inicio = datetime(2025, 10, 1, 8, 0, 0)
+    linhas = []
+    for i in range(n):
+        entrada = inicio + timedelta(minutes=rng.randint(0, 150_000))
+        dias = rng.randint(0, 60)
+        plataforma = rng.choice(PLATAFORMAS)
+        linhas.append({
+            "id": 500_000 + i,
+            "origem": plataforma if rng.random() < 0.7 else "SITE",
+            "canal": plataforma,
+            "plataforma": plataforma,
+            "veiculo": rng.choice(VEICULOS),
+            "cliente": f"Cliente {rng.randint(1, 10**6):07d}",
+            "vendedor": rng.choice(VENDEDORES),
+            "valor": Decimal(rng.randint(3_000_000, 25_000_000)) / 100,
+            "entrada": entrada,
+            "fechamento": entrada + timedelta(days=dias, minutes=rng.randint(0, 600)),
+            "dias": dias,
+        })
+    return linhas
+
+
+def resposta_vendas(linhas: list) -> dict:
+    """O dicionário que /api/roi/vendas/consolidado monta"""
+    resultado = [
+        {
+            "id": v["id"], "plataforma": v["plataforma"], "origem": v["origem"], "canal": v["canal"],
+            "veiculo": v["veiculo"], "cliente": v["cliente"], "vendedor": v["vendedor"],
+            "valor": float(v["valor"] or 0), "dias": v["dias"],
+            "entrada": str(v["entrada"]), "fechamento": str(v["fechamento"]),
+        }
+        for v in linhas
+    ]
+    return {"periodo": "01/10/2025 a 14/01/2026", "total_vendas": len(resultado),
+            "valor_total": sum(r["valor"] for r in resultado), "vendas": resultado}
+
+
+def antigo(conteudo) -> bytes:
+    """Caminho padrão do FastAPI sem response_model"""
+    return JSONResponse(jsonable_encoder(conteudo)).body
+
+
+def novo(conteudo) -> bytes:
+    return FastJSONResponse(conteudo).body
+
+
+def medir(fn, arg, repeat: int) -> tuple:
+    tempos = []
+    for _ in range(repeat):
+        inicio = time.perf_counter()
+        saida = fn(arg)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), saida
+
+
+def comprimir(corpo: bytes, repeat: int) -> dict:
+    resultado = {"identity": {"bytes": len(corpo), "ms": 0.0}}
+    codificacoes = ["gzip"] + (["br"] if responses.brotli is not None else [])
+    for codificacao in codificacoes:
+        ms, saida = medir(lambda c: responses.compress(c, codificacao), corpo, repeat)
+        resultado[codificacao] = {"bytes": len(saida), "ms": round(ms, 2)}
+    return resultado
+
+
+async def ponta_a_ponta(linhas: list, repeat: int) -> dict:
+    import httpx
+    import roi_api
+
+    # Só no harness: o endpoint lê as linhas sintéticas em vez do CRM
+    roi_api.get_vendas_midia_range = lambda start, end: linhas
+    transport = httpx.ASGITransport(app=roi_api.app)
+    resultado = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://serial") as client:
+        for codificacao in ["identity", "gzip"] + (["br"] if responses.brotli is not None else []):
+            tempos, wire = [], 0
+            for _ in range(repeat):
+                inicio = time.perf_counter()
+                resposta = await client.get("/api/roi/vendas/consolidado",
+                                            headers={"accept-encoding": codificacao})
+                tempos.append((time.perf_counter() - inicio) * 1000)
+                wire = int(resposta.headers["content-length"])
+                assert resposta.headers.get("content-encoding", "identity") == codificacao, resposta.headers
+            resultado[codificacao] = {"ms": round(statistics.median(tempos), 1), "bytes": wire}
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialização JSON e compressão das listas de vendas")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="Arquivo JSON com o resultado")
+    args = parser.parse_args()
+
+    linhas = linhas_vendas(args.rows)
+    resultado = {"linhas": args.rows, "brotli": responses.brotli is not None, "serializacao": {}}
+
+    casos = [("lista de vendas", resposta_vendas(linhas)), ("linhas do CRM", linhas)]
+    print(f"{args.rows} linhas, mediana de {args.repeat} rodadas\n")
+    print(f"{'caso':<17} {'jsonable+json':>14} {'orjson':>9} {'ganho':>7}")
+    for nome, conteudo in casos:
+        ms_antigo, corpo_antigo = medir(antigo, conteudo, args.repeat)
+        ms_novo, corpo_novo = medir(novo, conteudo, args.repeat)
+        if json.loads(corpo_antigo) != json.loads(corpo_novo):
+            raise SystemExit(f"{nome}: JSON do orjson difere do caminho antigo")
+        resultado["serializacao"][nome] = {
+            "jsonable_json_ms": round(ms_antigo, 1), "orjson_ms": round(ms_novo, 1),
+            "bytes_antigo": len(corpo_antigo), "bytes_novo": len(corpo_novo),
+        }
+        print(f"{nome:<17} {ms_antigo:>11.1f} ms {ms_novo:>6.1f} ms {ms_antigo / ms_novo:>6.1f}x")
+
+    corpo = novo(casos[0][1])
+    resultado["compressao"] = comprimir(corpo, args.repeat)
+    print(f"\n{'codificação':<12} {'bytes':>10} {'% do JSON':>10} {'tempo':>9}")
+    for codificacao, r in resultado["compressao"].items():
+        print(f"{codificacao:<12} {r['bytes']:>10} {r['bytes'] / len(corpo):>9.1%} {r['ms']:>6.1f} ms")
+
+    resultado["ponta_a_ponta"] = asyncio.run(ponta_a_ponta(linhas, args.repeat))
+    print("\nGET /api/roi/vendas/consolidado (roi_api, ASGI)")
+    for codificacao, r in resultado["ponta_a_ponta"].items():
+        print(f"  {codificacao:<10} {r['ms']:>7.1f} ms {r['bytes']:>10} bytes")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultado em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
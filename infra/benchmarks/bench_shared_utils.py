@@ -0,0 +1,109 @@
+"""
+Benchmark das versões em lote de shared/utils.py
+
+Colunas de 1M valores com a repetição típica de importações/syncs:
+
+- telefones: ~300k clientes (~3 negócios cada), formatos variados
+- nomes de campanha: ~5k distintos (um por campanha)
+- URLs de landing page: ~20k bases; 30% com gclid/fbclid único por clique
+- métricas: 1M linhas campanha/dia
+
+Compara a função escalar chamada por valor com a versão em lote e confere
+que o resultado é idêntico (métricas: diferença só de arredondamento).
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/bench_shared_utils.py
+    PYTHONPATH=packages python infra/benchmarks/bench_shared_utils.py --values 200000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from shared.utils import (
+    normalize_campaign_name, format_phone_br, extract_utm_params, calculate_metrics,
+    normalize_campaign_names, format_phones_br, extract_utm_params_batch, calculate_metrics_batch,
+)
+
+FORMATOS = ["({ddd}) {a}-{b}", "+55 {ddd} {a}{b}", "{ddd}{a}{b}", "{a}-{b}", "0{ddd} {a} {b}"]
+
+
+def phones(n, rnd):
+    """Cada cliente com um formato (máscara de quem cadastrou), ~3 negócios por cliente"""
+    clientes = [
+        rnd.choice(FORMATOS).format(ddd=rnd.randint(11, 99), a=f"9{c % 10000:04d}", b=f"{c // 10000:04d}")
+        for c in range(n // 3)
+    ]
+    return [rnd.choice(clientes) for _ in range(n)]
+
+
+def names(n, rnd):
+    base = [f"[{rnd.choice(['Busca', 'PMAX', 'Display'])}] Seminovos - Promoção {i} / SP" for i in range(5000)]
+    return [rnd.choice(base) for _ in range(n)]
+
+
+def urls(n, rnd):
+    base = [
+        f"https://loja.com.br/veiculos/{i}?utm_source={rnd.choice(['google', 'facebook'])}"
+        f"&utm_medium=cpc&utm_campaign=black+friday+{i % 300}&utm_content=anuncio%20{i % 7}&ref="
+        for i in range(20000)
+    ]
+    saida = []
+    for i in range(n):
+        url = rnd.choice(base)
+        if rnd.random() < 0.3:
+            url += f"&{rnd.choice(['gclid', 'fbclid'])}=Cj0KCQ{i:010d}#topo"
+        saida.append(url)
+    return saida
+
+
+def medir(nome, escalar, lote, valores, iguais=lambda a, b: a == b):
+    t = time.perf_counter()
+    esperado = [escalar(v) for v in valores]
+    t_escalar = time.perf_counter() - t
+    t = time.perf_counter()
+    obtido = lote(valores)
+    t_lote = time.perf_counter() - t
+    ok = iguais(esperado, obtido)
+    print(f"{nome:24s} escalar {t_escalar:6.2f}s  lote {t_lote:6.2f}s  "
+          f"{t_escalar / t_lote:5.1f}x  {'ok' if ok else 'DIVERGE'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="shared.utils: escalar vs lote")
+    parser.add_argument("--values", type=int, default=1000000)
+    args = parser.parse_args()
+    rnd = random.Random(42)
+    n = args.values
+    print(f"{n} valores por coluna")
+
+    medir("format_phone_br", format_phone_br, format_phones_br, phones(n, rnd))
+    medir("normalize_campaign_name", normalize_campaign_name, normalize_campaign_names, names(n, rnd))
+    medir("extract_utm_params", extract_utm_params, extract_utm_params_batch, urls(n, rnd))
+
+    np_rnd = np.random.default_rng(42)
+    linhas = {
+        "spend": np_rnd.uniform(0, 500, n).round(2),
+        "impressions": np_rnd.integers(0, 20000, n),
+        "clicks": np_rnd.integers(0, 500, n),
+        "leads": np_rnd.integers(0, 40, n),
+    }
+    colunas = ("cpc", "cpm", "ctr", "cpl")
+
+    def escalar(i):
+        return calculate_metrics(*(linhas[k][i].item() for k in linhas))
+
+    def lote(indices):
+        return calculate_metrics_batch(*(linhas[k][indices] for k in linhas))
+
+    def iguais(esperado, obtido):
+        return all(
+            np.allclose([m[c] for m in esperado], obtido[c], rtol=0, atol=1.0001e-4) for c in colunas
+        )
+
+    medir("calculate_metrics", escalar, lambda idx: lote(np.asarray(idx)), list(range(n)), iguais)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Tempo até a primeira requisição da API principal (cold start)
+
+Sobe a aplicação em um processo Python novo a cada rodada (como um
+container reiniciando), roda o lifespan e faz o primeiro GET pela própria
+aplicação (httpx.ASGITransport, sem uvicorn). Mede o relógio do spawn até a
+resposta e lê do processo as fases do startup (main.TIMER). Compara o modo
+padrão (routers no import + create_all) com FAST_STARTUP=1 e com um app
+FastAPI vazio (referência da máquina).
+
+Os critérios principais são razões, que não dependem da máquina, mais um
+teto absoluto com folga; falha (exit 1) se:
+- a mediana do modo rápido passar de --max-ratio x a do modo padrão
+- a fase imports do modo rápido passar de --max-imports-ratio x o import
+  do FastAPI no app vazio
+- a mediana do modo rápido passar do teto absoluto --target-ms (padrão
+  COLD_START_TARGET_MS ou 2500 ms; em CI lento, aumente pela variável;
+  0 desliga)
+
+O banco é um SQLite temporário criado uma vez e carimbado com o head do
+Alembic (alembic_version), então o modo rápido exercita o caminho que pula
+o create_all. O teste do CRM externo fica desligado (STARTUP_CRM_CHECK=0)
+para não depender de rede; --crm-check liga.
+
+Uso (a partir da raiz do repositório):
+    PYTHONPATH=packages python infra/benchmarks/check_cold_start.py
+    PYTHONPATH=packages python infra/benchmarks/check_cold_start.py --runs 7 --max-ratio 0.8
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+API_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'apps', 'api'))
+PACKAGES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'packages'))
+sys.path.insert(0, API_DIR)
+
+# Teto absoluto da mediana do modo rápido (ms); folga para máquinas comuns
+TARGET_MS = float(os.getenv("COLD_START_TARGET_MS", "2500"))
+
+# Processo filho: importa o main, roda o lifespan e faz a primeira requisição.
+# O banco é o SQLite ./crm_ia.db (DATABASE_BACKEND=sqlite), então o cwd do
+# filho é o diretório temporário.
+CHILD = """
+import asyncio, json, sys, time
+import httpx
+import main
+
+async def primeira(path, api_path):
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            resposta = await client.get(path)
+            pronto = time.time()
+            inicio = time.perf_counter()
+            api = await client.get(api_path)
+            api_ms = (time.perf_counter() - inicio) * 1000
+    print(json.dumps({
+        "pronto": pronto,
+        "status": resposta.status_code,
+        "api_status": api.status_code,
+        "api_ms": api_ms,
+        "phases": main.TIMER.snapshot(),
+    }), flush=True)
+
+asyncio.run(primeira(sys.argv[1], sys.argv[2]))
+"""
+
+# Referência: app FastAPI vazio, mesma sequência do CHILD. "imports" cobre o
+# mesmo trecho da fase imports do main (httpx já importado antes)
+BARE = """
+import asyncio, json, sys, time
+import httpx
+inicio = time.perf_counter()
+from fastapi import FastAPI
+app = FastAPI()
+imports = time.perf_counter() - inicio
+
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
+async def primeira(path, api_path):
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            resposta = await client.get(path)
+            pronto = time.time()
+    print(json.dumps({
+        "pronto": pronto,
+        "status": resposta.status_code,
+        "api_status": None,
+        "api_ms": 0.0,
+        "phases": {"imports": imports},
+    }), flush=True)
+
+asyncio.run(primeira(sys.argv[1], sys.argv[2]))
+"""
+
+
+def preparar_banco(pasta: str):
+    """Cria as tabelas (modo padrão, uma vez) e carimba o head do Alembic"""
+    from startup import alembic_heads
+
+    rodada(pasta, fast=False, path="/health", api_path="/health", crm_check=False)
+    heads = alembic_heads()
+    conn = sqlite3.connect(os.path.join(pasta, "crm_ia.db"))
+    conn.execute("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)")
+    conn.execute("DELETE FROM alembic_version")
+    conn.executemany("INSERT INTO alembic_version VALUES (?)", [(h,) for h in heads])
+    conn.commit()
+    conn.close()
+    return heads
+
+
+def rodada(pasta: str, fast: bool, path: str, api_path: str, crm_check: bool, child: str = CHILD) -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([API_DIR, PACKAGES_DIR, env.get("PYTHONPATH", "")])
+    env["DATABASE_BACKEND"] = "sqlite"
+    env["SQLITE_PATH"] = "./crm_ia.db"
+    env["FAST_STARTUP"] = "1" if fast else "0"
+    env["STARTUP_CRM_CHECK"] = "1" if crm_check else "0"
+    env["ENVIRONMENT"] = "production"  # sem echo do SQL
+    inicio = time.time()
+    proc = subprocess.run(
+        [sys.executable, "-c", child, path, api_path],
+        cwd=pasta, env=env, capture_output=True, text=True, timeout=120,
+    )
+    linhas = [l for l in proc.stdout.splitlines() if l.startswith("{\"pronto\"")]
+    if proc.returncode != 0 or not linhas:
+        raise RuntimeError(f"Processo filho falhou (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+    resultado = json.loads(linhas[-1])
+    resultado["ms"] = (resultado["pronto"] - inicio) * 1000
+    if resultado["status"] >= 500:
+        raise RuntimeError(f"GET {path} respondeu {resultado['status']}")
+    return resultado
+
+
+def medir(pasta: str, fast: bool, args, child: str = CHILD) -> dict:
+    rodadas = [rodada(pasta, fast, args.path, args.api_path, args.crm_check, child) for _ in range(args.runs)]
+    fases = {}
+    for r in rodadas:
+        for fase, segundos in r["phases"].items():
+            fases.setdefault(fase, []).append(segundos * 1000)
+    return {
+        "ms": statistics.median(r["ms"] for r in rodadas),
+        "min_ms": min(r["ms"] for r in rodadas),
+        "api_ms": statistics.median(r["api_ms"] for r in rodadas),
+        "api_status": rodadas[-1]["api_status"],
+        "fases_ms": {fase: round(statistics.median(v), 1) for fase, v in fases.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo até a primeira requisição da API")
+    parser.add_argument("--runs", type=int, default=5, help="Processos por modo (mediana)")
+    parser.add_argument("--max-ratio", type=float, default=0.85,
+                        help="Máximo de (mediana do modo rápido / mediana do modo padrão)")
+    parser.add_argument("--max-imports-ratio", type=float, default=2.5,
+                        help="Máximo de (fase imports do modo rápido / import do FastAPI no app vazio)")
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS,
+                        help="Teto absoluto da mediana do modo rápido em ms (0 desliga)")
+    parser.add_argument("--path", default="/health", help="Primeira requisição")
+    parser.add_argument("--api-path", default="/api/crm/vendedores",
+                        help="Segunda requisição, num router carregado sob demanda")
+    parser.add_argument("--crm-check", action="store_true", help="Testa o CRM externo em segundo plano")
+    parser.add_argument("--output", help="Grava o resultado em JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="cold-start-") as pasta:
+        heads = preparar_banco(pasta)
+        print(f"Banco temporário carimbado com {', '.join(sorted(heads)) or '(sem migrations)'}")
+        resultado = {
+            "fastapi_vazio": medir(pasta, True, args, child=BARE),
+            "padrao": medir(pasta, False, args),
+            "fast_startup": medir(pasta, True, args),
+        }
+
+    print(f"\n{'modo':<14} {'mediana':>9} {'mínimo':>9} {args.api_path + ' (1ª)':>28}")
+    for modo, r in resultado.items():
+        api = f"{r['api_ms']:.0f} ms ({r['api_status']})" if r["api_status"] else "-"
+        print(f"{modo:<14} {r['ms']:>6.0f} ms {r['min_ms']:>6.0f} ms {api:>28}")
+        print("    fases: " + ", ".join(f"{fase}={ms:.0f}ms" for fase, ms in r["fases_ms"].items()))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+    rapido, padrao = resultado["fast_startup"]["ms"], resultado["padrao"]["ms"]
+    razao = rapido / padrao
+    imports = resultado["fast_startup"]["fases_ms"]["imports"] / resultado["fastapi_vazio"]["fases_ms"]["imports"]
+    print(f"\nFAST_STARTUP / padrão: {razao:.2f} (máximo {args.max_ratio:.2f})")
+    print(f"imports / FastAPI vazio: {imports:.2f}x (máximo {args.max_imports_ratio:.2f}x)")
+    if args.target_ms:
+        print(f"FAST_STARTUP: {rapido:.0f} ms (teto {args.target_ms:.0f} ms)")
+
+    falhas = []
+    if razao > args.max_ratio:
+        falhas.append(f"FAST_STARTUP ({rapido:.0f} ms) levou {razao:.2f} do modo padrão ({padrao:.0f} ms)")
+    if imports > args.max_imports_ratio:
+        falhas.append(f"fase imports {imports:.2f}x o import do FastAPI vazio")
+    if args.target_ms and rapido > args.target_ms:
+        falhas.append(f"FAST_STARTUP levou {rapido:.0f} ms até a primeira resposta (alvo {args.target_ms:.0f} ms)")
+    if falhas:
+        for falha in falhas:
+            print(f"FALHOU: {falha}")
+        sys.exit(1)
+    print(f"\nOK: FAST_STARTUP em {rapido:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Dataset sintético do CRM externo (crm_negocio / users) para benchmarks
+
+Distribuições modeladas no MAPA_BANCO_DADOS.md:
+
+- origem: top 10 com as proporções medidas (SITE 30,4%, SHOWROOM 13,4%...)
+  e o resto (15,5%) nas origens que as consultas agrupam (INSTAGRAM, GOOGLE,
+  portais, presencial, indicação)
+- canal: SITE/WHATSAPP/TELEFONE chegam às vezes por mídia paga no canal
+  (o caso "origem OU canal" do roi_api)
+- id_state: ~17% ganho / ~82% perdido nos fechados; 1-5 quase só nos
+  negócios recentes; conversão maior em indicação/presencial que em mídia
+- id_user: 18 usuários, negócios concentrados nos vendedores do mapa
+- clientes recorrentes (telefone em formatos variados, e-mail às vezes)
+
+Gerado em colunas com NumPy (semente fixa: mesmo dataset a cada execução)
+e carregado em SQLite ou MySQL. `SQLiteCRMConnection` imita a interface do
+pymysql usada no projeto (cursor dict, %s, YEAR/MONTH/DATEDIFF/NOW) para
+rodar as consultas do roi_api/ExternalCRMClient sem um MySQL.
+"""
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List
+
+import numpy as np
+
+# Top 10 do mapa + cauda até 100%
+ORIGENS = [
+    ("SITE", 30.4), ("SHOWROOM", 13.4), ("WHATSAPP", 8.6), ("Autocarro", 8.0),
+    ("OFERTA VENDEDOR", 7.2), ("WEBMOTORS", 5.2), ("FACEBOOK", 3.4), ("ICARROS", 2.9),
+    ("INDICACAO", 2.9), ("TELEMARKETING", 2.5),
+    ("INSTAGRAM", 3.5), ("GOOGLE", 3.0), ("NA PISTA", 1.5), ("TELEFONE", 1.5),
+    ("MERCADO LIVRE", 1.0), ("MEUCARRONOVO", 0.8), ("MOBIAUTO", 0.6), ("FEIRÃO", 0.6),
+    ("REDE RELACIONAMENTO", 0.6), ("INDICAÇÃO CAMPANHA", 0.5), ("AUTOLINE", 0.4),
+    ("POACARROS", 0.3), ("SOCARRAO", 0.3), ("Google", 0.2), ("OUTROS", 0.7),
+]
+MIDIA_PAGA = ("INSTAGRAM", "FACEBOOK", "GOOGLE")
+# Canal pago para leads que chegam pelo site/WhatsApp/telefone
+CANAL_PAGO = {"SITE": 0.45, "WHATSAPP": 0.35, "TELEFONE": 0.2}
+CANAL_PAGO_PESOS = [0.45, 0.2, 0.35]
+
+# Taxa de ganho entre os fechados, por grupo de origem
+CONVERSAO = {
+    "INDICACAO": 0.45, "INDICAÇÃO CAMPANHA": 0.4, "REDE RELACIONAMENTO": 0.45,
+    "SHOWROOM": 0.3, "NA PISTA": 0.3, "FEIRÃO": 0.25, "OFERTA VENDEDOR": 0.25,
+    "WEBMOTORS": 0.1, "ICARROS": 0.1, "MEUCARRONOVO": 0.1, "MERCADO LIVRE": 0.08,
+    "MOBIAUTO": 0.1, "Autocarro": 0.12,
+}
+CONVERSAO_MIDIA = 0.08
+CONVERSAO_PADRAO = 0.16
+
+# id_users, nome, negócios no mapa, perfil (1 admin, 2 gerente, 3 vendedor), ativo
+USUARIOS_MAPA = [
+    (8, "Tiago", 6369, 3, 1), (15, "Bruno", 5441, 3, 1), (7, "Carlos", 3236, 3, 1),
+    (3, "Marcelo", 1884, 1, 1), (18, "Herick", 1107, 2, 1), (21, "Gilnei", 917, 3, 0),
+]
+OUTROS_USUARIOS = 12  # 18 no total; dividem ~1% dos negócios
+
+# Estados abertos 1-5 na proporção do mapa (31, 9, 6, 9, 8)
+ABERTOS = np.array([1, 2, 3, 4, 5])
+ABERTOS_PESOS = np.array([31, 9, 6, 9, 8]) / 63
+
+MOTIVOS_PERDA = [
+    ("Vai Esperar", 3750), ("Desistência Sem Motivo", 3526), ("Sem Interesse", 2455),
+    ("Cliente Não Responde", 1439), ("Crédito Negado", 935), ("Veículo Já Foi Vendido", 875),
+    ("Veículo da troca não interessa", 662), ("Concorrência", 660), ("Avaliação da Troca", 581),
+    ("Produto não disponível", 323),
+]
+VEICULOS = ["Onix 1.0 LT", "HB20 Comfort", "Corolla XEi", "Compass Longitude", "Gol 1.6",
+            "Hilux SRV", "T-Cross 200 TSI", "Kicks SV", "Civic EXL", "Strada Freedom"]
+FORMATOS_TELEFONE = ["({ddd}) {n}", "+55 {ddd} {n}", "{ddd}{n}", "0{ddd} {n}"]
+
+NEGOCIO_COLUNAS = [
+    "id_crm_negocio", "titulo", "origem", "canal", "cliente", "celular", "email", "valor",
+    "id_user", "id_state", "date_create", "date_update", "motivo_perda", "id_group",
+]
+USER_COLUNAS = ["id_users", "name", "email", "perfil", "status"]
+
+
+@dataclass
+class Dataset:
+    """Colunas de crm_negocio e linhas de users"""
+    negocios: Dict[str, list]
+    users: List[dict]
+
+    @property
+    def rows(self) -> int:
+        return len(self.negocios["id_crm_negocio"])
+
+
+def _users() -> List[dict]:
+    users = [
+        {"id_users": uid, "name": nome, "email": f"{nome.lower()}@revenda.com", "perfil": perfil, "status": ativo}
+        for uid, nome, _, perfil, ativo in USUARIOS_MAPA
+    ]
+    livres = [i for i in range(1, 40) if i not in {u["id_users"] for u in users}]
+    users += [
+        {"id_users": uid, "name": f"Usuário {uid}", "email": f"usuario{uid}@revenda.com", "perfil": 3, "status": 1}
+        for uid in livres[:OUTROS_USUARIOS]
+    ]
+    return users
+
+
+def generate(rows: int, seed: int = 42, start: date = date(2025, 1, 1), end: date = None) -> Dataset:
+    """
+    `rows` negócios entre `start` e `end` (padrão: hoje)
+
+    Dias úteis pesam mais que fim de semana, com sazonalidade anual leve;
+    negócios dos últimos 30 dias ainda estão em boa parte abertos.
+    """
+    end = end or date.today()
+    rnd = np.random.default_rng(seed)
+    users = _users()
+
+    # Datas: peso por dia (semana + sazonalidade), hora comercial
+    dias = np.arange((end - start).days + 1)
+    dia_semana = (start.weekday() + dias) % 7
+    pesos = np.select([dia_semana == 6, dia_semana == 5], [0.3, 0.8], 1.0)
+    pesos = pesos * (1 + 0.15 * np.sin(2 * np.pi * dias / 365))
+    dia = rnd.choice(dias, rows, p=pesos / pesos.sum())
+    segundos = rnd.integers(8 * 3600, 20 * 3600, rows)
+    base = np.datetime64(start, "s")
+    criacao = base + dia.astype("timedelta64[D]") + segundos.astype("timedelta64[s]")
+    agora = np.datetime64(datetime.combine(end, datetime.max.time()).replace(microsecond=0), "s")
+    atualizacao = np.minimum(criacao + rnd.exponential(10 * 86400, rows).astype("timedelta64[s]"), agora)
+
+    # Origem e canal
+    nomes_origem = np.array([o for o, _ in ORIGENS], dtype=object)
+    p_origem = np.array([p for _, p in ORIGENS])
+    origem = rnd.choice(nomes_origem, rows, p=p_origem / p_origem.sum())
+    canal = origem.copy()
+    for nome, prob in CANAL_PAGO.items():
+        pago = (origem == nome) & (rnd.random(rows) < prob)
+        canal[pago] = rnd.choice(np.array(MIDIA_PAGA, dtype=object), pago.sum(), p=CANAL_PAGO_PESOS)
+
+    # Estado: recentes abertos; fechados ganham pela taxa do grupo de origem
+    p_ganho = np.full(rows, CONVERSAO_PADRAO)
+    for nome, taxa in CONVERSAO.items():
+        p_ganho[origem == nome] = taxa
+    midia = np.isin(origem, MIDIA_PAGA) | np.isin(canal, MIDIA_PAGA)
+    p_ganho[midia] = CONVERSAO_MIDIA
+    idade = (agora - criacao).astype("timedelta64[D]").astype(int)
+    p_aberto = np.where(idade < 30, 0.5, 0.003)
+    sorteio = rnd.random(rows)
+    estado = np.where(rnd.random(rows) < p_ganho, 6, 7)
+    estado = np.where(sorteio < p_aberto, rnd.choice(ABERTOS, rows, p=ABERTOS_PESOS), estado)
+    estado = np.where((sorteio >= p_aberto) & (sorteio < p_aberto + 0.0003), 8, estado)
+
+    # Vendedor
+    ids = np.array([u["id_users"] for u in users])
+    p_user = np.array([n for _, _, n, _, _ in USUARIOS_MAPA] + [19] * OUTROS_USUARIOS, dtype=float)
+    id_user = rnd.choice(ids, rows, p=p_user / p_user.sum())
+
+    # Clientes recorrentes (~1,3 negócio por cliente)
+    clientes = max(rows * 10 // 13, 1)
+    cliente = rnd.integers(0, clientes, rows)
+    formato = rnd.integers(0, len(FORMATOS_TELEFONE), rows)
+    tem_email = (cliente % 10 < 4) & (rnd.random(rows) < 0.7)
+    celular = [
+        FORMATOS_TELEFONE[f].format(ddd=51 + c % 3, n=f"9{c % 100000000:08d}")
+        for c, f in zip(cliente.tolist(), formato.tolist())
+    ]
+    email = [f"cliente{c}@mail.com" if e else None for c, e in zip(cliente.tolist(), tem_email.tolist())]
+
+    valor = np.round(rnd.lognormal(np.log(65000), 0.45, rows), -2)
+    motivos = np.array([m for m, _ in MOTIVOS_PERDA], dtype=object)
+    p_motivo = np.array([n for _, n in MOTIVOS_PERDA], dtype=float)
+    motivo = np.where(estado == 7, rnd.choice(motivos, rows, p=p_motivo / p_motivo.sum()), None)
+    titulo = rnd.choice(np.array(VEICULOS, dtype=object), rows)
+
+    negocios = {
+        "id_crm_negocio": list(range(1, rows + 1)),
+        "titulo": titulo.tolist(),
+        "origem": origem.tolist(),
+        "canal": canal.tolist(),
+        "cliente": [f"Cliente {c}" for c in cliente.tolist()],
+        "celular": celular,
+        "email": email,
+        "valor": valor.tolist(),
+        "id_user": id_user.tolist(),
+        "id_state": estado.tolist(),
+        "date_create": criacao.astype(str).tolist(),
+        "date_update": atualizacao.astype(str).tolist(),
+        "motivo_perda": motivo.tolist(),
+        "id_group": [1] * rows,
+    }
+    # datetime64 -> "2025-01-01T08:00:00"; o CRM usa espaço
+    for col in ("date_create", "date_update"):
+        negocios[col] = [v.replace("T", " ") for v in negocios[col]]
+    return Dataset(negocios=negocios, users=users)
+
+
+# ============================================
+# CARGA
+# ============================================
+
+DDL_SQLITE = [
+    """CREATE TABLE crm_negocio (
+        id_crm_negocio INTEGER PRIMARY KEY, titulo TEXT, origem TEXT, canal TEXT, cliente TEXT,
+        celular TEXT, email TEXT, valor REAL, id_user INTEGER, id_state INTEGER,
+        date_create TEXT, date_update TEXT, motivo_perda TEXT, id_group INTEGER
+    )""",
+    """CREATE TABLE users (
+        id_users INTEGER PRIMARY KEY, name TEXT, email TEXT, perfil INTEGER, status INTEGER
+    )""",
+]
+DDL_MYSQL = [
+    """CREATE TABLE crm_negocio (
+        id_crm_negocio INT PRIMARY KEY, titulo VARCHAR(100), origem VARCHAR(100), canal VARCHAR(100),
+        cliente VARCHAR(100), celular VARCHAR(100), email VARCHAR(100), valor DOUBLE, id_user INT,
+        id_state INT, date_create DATETIME, date_update DATETIME, motivo_perda VARCHAR(200), id_group INT
+    ) DEFAULT CHARSET=utf8mb4""",
+    """CREATE TABLE users (
+        id_users INT PRIMARY KEY, name VARCHAR(100), email VARCHAR(100), perfil INT, status INT
+    ) DEFAULT CHARSET=utf8mb4""",
+]
+# Índices que o CRM de produção tem nas colunas filtradas
+INDICES = [
+    "CREATE INDEX ix_negocio_date_create ON crm_negocio (date_create)",
+    "CREATE INDEX ix_negocio_id_user ON crm_negocio (id_user)",
+    "CREATE INDEX ix_negocio_date_update ON crm_negocio (date_update)",
+]
+
+
+def _linhas(dataset: Dataset, inicio: int, fim: int) -> list:
+    colunas = [dataset.negocios[c][inicio:fim] for c in NEGOCIO_COLUNAS]
+    return list(zip(*colunas))
+
+
+def load_sqlite(path: str, dataset: Dataset, chunk: int = 50000):
+    """Recria as tabelas num arquivo SQLite e carrega o dataset"""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("DROP TABLE IF EXISTS crm_negocio")
+        conn.execute("DROP TABLE IF EXISTS users")
+        for ddl in DDL_SQLITE:
+            conn.execute(ddl)
+        marcadores = ", ".join("?" * len(NEGOCIO_COLUNAS))
+        for i in range(0, dataset.rows, chunk):
+            conn.executemany(f"INSERT INTO crm_negocio VALUES ({marcadores})", _linhas(dataset, i, i + chunk))
+        conn.executemany(
+            "INSERT INTO users VALUES (?, ?, ?, ?, ?)",
+            [tuple(u[c] for c in USER_COLUNAS) for u in dataset.users]
+        )
+        for ddl in INDICES:
+            conn.execute(ddl)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_mysql(conn, dataset: Dataset, chunk: int = 5000):
+    """Recria as tabelas no MySQL da conexão (pymysql) e carrega o dataset"""
+    with conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS crm_negocio")
+        cursor.execute("DROP TABLE IF EXISTS users")
+        for ddl in DDL_MYSQL:
+            cursor.execute(ddl)
+        marcadores = ", ".join(["%s"] * len(NEGOCIO_COLUNAS))
+        # executemany do pymysql agrupa em INSERT multi-linha
+        for i in range(0, dataset.rows, chunk):
+            cursor.executemany(f"INSERT INTO crm_negocio VALUES ({marcadores})", _linhas(dataset, i, i + chunk))
+        cursor.executemany(
+            "INSERT INTO users VALUES (%s, %s, %s, %s, %s)",
+            [tuple(u[c] for c in USER_COLUNAS) for u in dataset.users]
+        )
+        for ddl in INDICES:
+            cursor.execute(ddl)
+        cursor.execute("ANALYZE TABLE crm_negocio, users")
+    conn.commit()
+
+
+# ============================================
+# STAND-IN DO PYMYSQL SOBRE SQLITE
+# ============================================
+
+def _year(v):
+    return int(v[:4]) if v else None
+
+
+def _month(v):
+    return int(v[5:7]) if v else None
+
+
+def _datediff(a, b):
+    if not a or not b:
+        return None
+    return (date.fromisoformat(a[:10]) - date.fromisoformat(b[:10])).days
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _param(v):
+    if isinstance(v, datetime):
+        return v.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(v, date):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+
+class SQLiteDictCursor:
+    """Cursor com execute(%s)/fetchone/fetchall devolvendo dicts"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._cursor = conn.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query: str, params=None):
+        params = tuple(_param(p) for p in (params or ()))
+        self._cursor.execute(re.sub(r"%s", "?", query), params)
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(row) if row is not None else None
+
+    def fetchall(self):
+        return [dict(r) for r in self._cursor.fetchall()]
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteCRMConnection:
+    """Conexão SQLite com a parte da interface do pymysql que o projeto usa"""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("YEAR", 1, _year, deterministic=True)
+        self._conn.create_function("MONTH", 1, _month, deterministic=True)
+        self._conn.create_function("DATEDIFF", 2, _datediff, deterministic=True)
+        self._conn.create_function("NOW", 0, _now)
+        self.open = True
+
+    def cursor(self) -> SQLiteDictCursor:
+        return SQLiteDictCursor(self._conn)
+
+    def ping(self, reconnect: bool = False):
+        pass
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        if self.open:
+            self._conn.close()
+            self.open = False
@@ -16,17 +16,10 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'apps', '
 from config import get_settings
 from database import Base
 
-# Importar todos os modelos para metadata
-from models import (
-    CRMDeal,
-    AdPlatformAccount,
-    AdCampaign,
-    AdSpendDaily,
-    AttributionLink,
-    KPISnapshot,
-    AIRecommendation,
-    User
-)
+# Importar todos os modelos para metadata (ad_campaigns/ad_spend_daily da 001
+# não têm modelo ORM)
+import models  # noqa: F401
+from models import agency, campaigns  # noqa: F401
 
 # this is the Alembic Config object
 config = context.config
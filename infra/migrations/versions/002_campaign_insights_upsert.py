@@ -0,0 +1,61 @@
+"""campaign_insights: platform + unique (campaign_id, date) for upserts
+
+Revision ID: 002_campaign_insights_upsert
+Revises: 001_initial
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '002_campaign_insights_upsert'
+down_revision: Union[str, None] = '001_initial'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = 'campaign_insights'
+UNIQUE = 'uq_campaign_insights_campaign_date'
+
+
+def upgrade() -> None:
+    # campaign_insights pode ter sido criada por create_all (init_db) ou ainda
+    # não existir; cada passo confere o estado atual antes de alterar
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if TABLE not in inspector.get_table_names():
+        return
+
+    columns = {c['name'] for c in inspector.get_columns(TABLE)}
+    if 'platform' not in columns:
+        platform = sa.Enum('META', 'GOOGLE', name='platformenum')
+        platform.create(bind, checkfirst=True)
+        op.add_column(TABLE, sa.Column('platform', platform, nullable=True))
+        op.create_index('ix_campaign_insights_platform', TABLE, ['platform'])
+
+    uniques = {u['name'] for u in inspector.get_unique_constraints(TABLE)}
+    indexes = {i['name'] for i in inspector.get_indexes(TABLE)}
+    if UNIQUE not in uniques and UNIQUE not in indexes:
+        # Mantém a linha mais recente de cada campanha/dia antes do índice único
+        op.execute(f"""
+            DELETE FROM {TABLE}
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM {TABLE} GROUP BY campaign_id, date
+            )
+        """)
+        op.create_index(UNIQUE, TABLE, ['campaign_id', 'date'], unique=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if TABLE not in inspector.get_table_names():
+        return
+
+    if UNIQUE in {i['name'] for i in inspector.get_indexes(TABLE)}:
+        op.drop_index(UNIQUE, table_name=TABLE)
+    if 'platform' in {c['name'] for c in inspector.get_columns(TABLE)}:
+        op.drop_index('ix_campaign_insights_platform', table_name=TABLE)
+        op.drop_column(TABLE, 'platform')
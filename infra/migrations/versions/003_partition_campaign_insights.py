@@ -0,0 +1,120 @@
+"""campaign_insights: monthly RANGE partitions on date (PostgreSQL)
+
+Revision ID: 003_partition_campaign_insights
+Revises: 002_campaign_insights_upsert
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '003_partition_campaign_insights'
+down_revision: Union[str, None] = '002_campaign_insights_upsert'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = 'campaign_insights'
+LEGACY = 'campaign_insights_legacy'
+UNIQUE = 'uq_campaign_insights_campaign_date'
+INDEXES = ['campaign_id', 'external_campaign_id', 'platform', 'date']
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, n: int) -> date:
+    total = d.year * 12 + d.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _relkind(bind, table: str):
+    return bind.execute(
+        sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {"t": table}
+    ).scalar()
+
+
+def _create_indexes(unique_index: bool):
+    op.create_index(UNIQUE, TABLE, ['campaign_id', 'date'], unique=unique_index)
+    for col in INDEXES:
+        op.create_index(f'ix_{TABLE}_{col}', TABLE, [col])
+
+
+def upgrade() -> None:
+    # SQLite (dev) continua com tabela única; a retenção do worker usa DELETE
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+    if _relkind(bind, TABLE) == 'p':
+        return
+
+    if _relkind(bind, TABLE) is None:
+        platform = sa.Enum('META', 'GOOGLE', name='platformenum')
+        platform.create(bind, checkfirst=True)
+        op.execute(f"""
+            CREATE TABLE {TABLE} (
+                id SERIAL,
+                campaign_id INTEGER,
+                external_campaign_id VARCHAR(100),
+                platform platformenum,
+                date TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                impressions INTEGER,
+                clicks INTEGER,
+                spend DOUBLE PRECISION,
+                leads INTEGER,
+                sales INTEGER,
+                revenue DOUBLE PRECISION,
+                created_at TIMESTAMP WITHOUT TIME ZONE
+            ) PARTITION BY RANGE (date)
+        """)
+        source = None
+    else:
+        # Tabela comum -> particionada: copia para a nova e remove a antiga.
+        # Índices só depois da carga (mais rápido que manter durante o INSERT)
+        op.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+        op.execute(f"CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS) PARTITION BY RANGE (date)")
+        source = LEGACY
+
+    inicio, fim = date.today().replace(day=1), date.today().replace(day=1)
+    if source:
+        menor, maior = bind.execute(sa.text(f"SELECT MIN(date), MAX(date) FROM {source}")).one()
+        if menor:
+            inicio = min(inicio, menor.date().replace(day=1))
+            fim = max(fim, maior.date().replace(day=1))
+
+    mes = inicio
+    while mes <= _add_months(fim, MONTHS_AHEAD):
+        proximo = _add_months(mes, 1)
+        op.execute(
+            f"CREATE TABLE {TABLE}_p{mes:%Y_%m} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{mes}') TO ('{proximo}')"
+        )
+        mes = proximo
+    op.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+    if source:
+        op.execute(f"INSERT INTO {TABLE} SELECT * FROM {source}")
+        # A sequência do id pertence à tabela antiga; sem isso o DROP a levaria junto
+        op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+        op.execute(f"DROP TABLE {source}")
+
+    # Chaves de tabela particionada precisam incluir a coluna de partição
+    op.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, date)")
+    _create_indexes(unique_index=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or _relkind(bind, TABLE) != 'p':
+        return
+
+    op.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+    op.execute(f"CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {TABLE} SELECT * FROM {LEGACY}")
+    op.execute(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id")
+    op.execute(f"DROP TABLE {LEGACY} CASCADE")
+
+    op.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)")
+    op.create_index(f'ix_{TABLE}_id', TABLE, ['id'])
+    _create_indexes(unique_index=True)
@@ -0,0 +1,92 @@
+"""Composite/covering indexes for the analytics and CRM query shapes
+
+Revision ID: 004_analytics_composite_indexes
+Revises: 003_partition_campaign_insights
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004_analytics_composite_indexes'
+down_revision: Union[str, None] = '003_partition_campaign_insights'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, nome, colunas, INCLUDE no PostgreSQL)
+CRM_INDEXES = [
+    ('crm_deals', 'ix_crm_deals_data_criacao_status', ['data_criacao', 'status'],
+     ['vendedor', 'canal', 'valor', 'lucro_bruto']),
+    ('crm_deals', 'ix_crm_deals_status_data_criacao', ['status', 'data_criacao'],
+     ['motivo_perda', 'valor', 'lucro_bruto']),
+]
+
+# ad_spend_daily (001) e campaign_insights (models) têm o mesmo formato
+AD_INDEXES = [
+    ('{t}_date_cover', ['date'], ['platform', 'spend', 'impressions', 'clicks', 'leads']),
+    ('{t}_platform_date', ['platform', 'date'], ['spend', 'impressions', 'clicks', 'leads']),
+]
+AD_TABLES = ['campaign_insights', 'ad_spend_daily']
+
+# Prefixos dos compostos acima: só custam escrita
+REDUNDANT = {
+    'crm_deals': {'ix_crm_deals_status': ['status'], 'ix_crm_deals_data_criacao': ['data_criacao']},
+    'campaign_insights': {'ix_campaign_insights_date': ['date'], 'ix_campaign_insights_platform': ['platform']},
+    'ad_spend_daily': {'ix_ad_spend_daily_date': ['date'], 'ix_ad_spend_daily_platform': ['platform']},
+}
+
+
+def _planned():
+    """(tabela, nome, colunas, include) de todos os índices novos"""
+    indexes = list(CRM_INDEXES)
+    for table in AD_TABLES:
+        for name, columns, include in AD_INDEXES:
+            indexes.append((table, 'ix_' + name.format(t=table), columns, include))
+    return indexes
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, name, columns, include in _planned():
+        if table not in tables:
+            continue
+        existing = {i['name'] for i in inspector.get_indexes(table)}
+        present = {c['name'] for c in inspector.get_columns(table)}
+        if name in existing or not set(columns) <= present:
+            continue
+        op.create_index(
+            name, table, columns,
+            postgresql_include=[c for c in include if c in present],
+        )
+
+    for table, names in REDUNDANT.items():
+        if table not in tables:
+            continue
+        existing = {i['name'] for i in inspector.get_indexes(table)}
+        for name in names:
+            if name in existing:
+                op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    for table, names in REDUNDANT.items():
+        if table not in tables:
+            continue
+        existing = {i['name'] for i in inspector.get_indexes(table)}
+        for name, columns in names.items():
+            if name not in existing:
+                op.create_index(name, table, columns)
+
+    for table, name, _, _ in _planned():
+        if table in tables and name in {i['name'] for i in inspector.get_indexes(table)}:
+            op.drop_index(name, table_name=table)
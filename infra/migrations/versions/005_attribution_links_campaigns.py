@@ -0,0 +1,162 @@
+"""attribution_links -> campaigns (integer id) and ad_clicks
+
+Em banco novo nenhuma migration anterior cria `campaigns` (só o create_all
+do boot), então ela é criada aqui antes das FKs.
+
+Revision ID: 005_attribution_links_campaigns
+Revises: 004_analytics_composite_indexes
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '005_attribution_links_campaigns'
+down_revision: Union[str, None] = '004_analytics_composite_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = 'attribution_links'
+CLICKS = 'ad_clicks'
+CAMPAIGNS = 'campaigns'
+FK = 'fk_attribution_links_campaign_id'
+INDEXES = {'ix_attribution_links_deal_id': 'deal_id', 'ix_attribution_links_campaign_id': 'campaign_id'}
+# O ORM grava o nome do enum; a 001 criou o tipo com os valores minúsculos
+METHODS = ['UTM', 'GCLID', 'FBCLID', 'MANUAL', 'RULE', 'AI']
+
+
+def _method_names(bind):
+    if bind.dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for name in METHODS:
+            op.execute(f"ALTER TYPE attributionmethod ADD VALUE IF NOT EXISTS '{name}'")
+    op.execute(f"UPDATE {TABLE} SET method = upper(method::text)::attributionmethod")
+
+
+def _create_campaigns(bind):
+    """Mesmo formato de models.campaigns.Campaign"""
+    sa.Enum('META', 'GOOGLE', name='platformenum').create(bind, checkfirst=True)
+    sa.Enum('ACTIVE', 'PAUSED', 'COMPLETED', name='statusenum').create(bind, checkfirst=True)
+    op.create_table(CAMPAIGNS,
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('external_id', sa.String(length=100), nullable=True),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('platform', postgresql.ENUM('META', 'GOOGLE', name='platformenum', create_type=False), nullable=False),
+        sa.Column('status', postgresql.ENUM('ACTIVE', 'PAUSED', 'COMPLETED', name='statusenum', create_type=False), nullable=False),
+        sa.Column('impressions', sa.Integer(), nullable=True),
+        sa.Column('clicks', sa.Integer(), nullable=True),
+        sa.Column('spend', sa.Float(), nullable=True),
+        sa.Column('cpc', sa.Float(), nullable=True),
+        sa.Column('ctr', sa.Float(), nullable=True),
+        sa.Column('leads_generated', sa.Integer(), nullable=True),
+        sa.Column('sales_closed', sa.Integer(), nullable=True),
+        sa.Column('revenue', sa.Float(), nullable=True),
+        sa.Column('cpl', sa.Float(), nullable=True),
+        sa.Column('conversion_rate', sa.Float(), nullable=True),
+        sa.Column('roi', sa.Float(), nullable=True),
+        sa.Column('roas', sa.Float(), nullable=True),
+        sa.Column('start_date', sa.DateTime(), nullable=True),
+        sa.Column('end_date', sa.DateTime(), nullable=True),
+        sa.Column('last_sync', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('extra_data', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_campaigns_id', CAMPAIGNS, ['id'])
+    op.create_index('ix_campaigns_external_id', CAMPAIGNS, ['external_id'], unique=True)
+    op.create_index('ix_campaigns_platform', CAMPAIGNS, ['platform'])
+
+
+def _create_links():
+    op.create_table(TABLE,
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('deal_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('campaign_id', sa.Integer(), nullable=False),
+        sa.Column('method', sa.Enum(*METHODS, name='attributionmethod'), nullable=False),
+        sa.Column('confidence', sa.Numeric(precision=5, scale=4), nullable=False),
+        sa.Column('match_details', sa.String(length=500), nullable=True),
+        sa.Column('created_by', sa.String(length=255), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['deal_id'], ['crm_deals.id'], ),
+        sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], name=FK),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if CAMPAIGNS not in tables:
+        _create_campaigns(bind)
+        tables.add(CAMPAIGNS)
+
+    if TABLE not in tables:
+        _create_links()
+    else:
+        columns = {c['name']: c for c in inspector.get_columns(TABLE)}
+        # SQLite (dev) recebe a tabela já no formato novo via create_all
+        if bind.dialect.name == 'postgresql' and not isinstance(columns['campaign_id']['type'], sa.Integer):
+            # Ligações antigas apontavam para ad_campaigns (UUID); a campanha
+            # equivalente em campaigns é a de mesmo id externo
+            op.add_column(TABLE, sa.Column('campaign_ref', sa.Integer(), nullable=True))
+            if {'ad_campaigns', 'campaigns'} <= tables:
+                op.execute(f"""
+                    UPDATE {TABLE} l SET campaign_ref = c.id
+                    FROM ad_campaigns a JOIN campaigns c ON c.external_id = a.campaign_id
+                    WHERE a.id = l.campaign_id
+                """)
+            op.execute(f"DELETE FROM {TABLE} WHERE campaign_ref IS NULL")
+            op.drop_column(TABLE, 'campaign_id')
+            op.alter_column(TABLE, 'campaign_ref', new_column_name='campaign_id', nullable=False)
+            op.create_foreign_key(FK, TABLE, 'campaigns', ['campaign_id'], ['id'])
+        _method_names(bind)
+
+    existing = {i['name'] for i in sa.inspect(bind).get_indexes(TABLE)}
+    for name, column in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, TABLE, [column])
+
+    if CLICKS not in tables:
+        sa.Enum('META', 'GOOGLE', name='platformenum').create(bind, checkfirst=True)
+        op.create_table(CLICKS,
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('click_id', sa.String(length=255), nullable=False),
+            sa.Column('platform', postgresql.ENUM('META', 'GOOGLE', name='platformenum', create_type=False), nullable=False),
+            sa.Column('campaign_id', sa.Integer(), nullable=True),
+            sa.Column('external_campaign_id', sa.String(length=100), nullable=True),
+            sa.Column('clicked_at', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['campaign_id'], ['campaigns.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('click_id', name='uq_ad_clicks_click_id')
+        )
+        op.create_index('ix_ad_clicks_campaign_id', CLICKS, ['campaign_id'])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    tables = set(sa.inspect(bind).get_table_names())
+
+    if CLICKS in tables:
+        op.drop_table(CLICKS)
+    if TABLE not in tables:
+        return
+
+    # Não há caminho de volta para ad_campaigns: ligações automáticas são
+    # recriadas pelo worker, então a tabela volta vazia. campaigns fica (pode
+    # ter vindo do create_all, com dados)
+    for name in INDEXES:
+        op.drop_index(name, table_name=TABLE)
+    op.execute(f"DELETE FROM {TABLE}")
+    op.drop_constraint(FK, TABLE, type_='foreignkey')
+    op.drop_column(TABLE, 'campaign_id')
+    op.add_column(TABLE, sa.Column('campaign_id', postgresql.UUID(as_uuid=True), nullable=False))
+    op.create_foreign_key(None, TABLE, 'ad_campaigns', ['campaign_id'], ['id'])
@@ -0,0 +1,45 @@
+"""crm_deals.lead_cluster_id (de-duplicated leads)
+
+Revision ID: 006_crm_deals_lead_cluster
+Revises: 005_attribution_links_campaigns
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '006_crm_deals_lead_cluster'
+down_revision: Union[str, None] = '005_attribution_links_campaigns'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = 'crm_deals'
+COLUMN = 'lead_cluster_id'
+INDEX = 'ix_crm_deals_lead_cluster_id'
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return
+
+    # Coluna nula: o worker (tasks.leads.dedup_leads) preenche na primeira execução
+    if COLUMN not in {c['name'] for c in inspector.get_columns(TABLE)}:
+        op.add_column(TABLE, sa.Column(COLUMN, postgresql.UUID(as_uuid=True), nullable=True))
+    if INDEX not in {i['name'] for i in inspector.get_indexes(TABLE)}:
+        op.create_index(INDEX, TABLE, [COLUMN])
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if TABLE not in inspector.get_table_names():
+        return
+
+    if INDEX in {i['name'] for i in inspector.get_indexes(TABLE)}:
+        op.drop_index(INDEX, table_name=TABLE)
+    if COLUMN in {c['name'] for c in inspector.get_columns(TABLE)}:
+        op.drop_column(TABLE, COLUMN)
@@ -0,0 +1,83 @@
+"""kpi_dirty_days (dias com KPIs a recalcular) e chave única de kpi_snapshots
+
+Revision ID: 007_kpi_dirty_days
+Revises: 006_crm_deals_lead_cluster
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007_kpi_dirty_days'
+down_revision: Union[str, None] = '006_crm_deals_lead_cluster'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLE = 'kpi_dirty_days'
+SNAPSHOTS = 'kpi_snapshots'
+SNAPSHOTS_KEY = 'uq_kpi_snapshots_recorte'
+
+# Dimensões nulas (recorte geral) comparadas como '' na chave única
+_KEY_COLUMNS = (
+    "agregacao, periodo_inicio, coalesce(canal, ''), "
+    "coalesce(campaign_id, ''), coalesce(vendedor, '')"
+)
+
+
+def _create_snapshots_key(bind) -> None:
+    """Remove duplicatas (mantém a gravação mais recente) e cria o índice único"""
+    if bind.dialect.name == 'postgresql':
+        # O ORM grava o nome do membro (DAILY); a 001 criou o enum com os valores
+        for valor in ('DAILY', 'WEEKLY', 'MONTHLY', 'CUSTOM'):
+            op.execute(f"ALTER TYPE aggregationtype ADD VALUE IF NOT EXISTS '{valor}'")
+
+    op.execute(f"""
+        DELETE FROM {SNAPSHOTS} WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY {_KEY_COLUMNS} ORDER BY created_at DESC
+                ) AS rn
+                FROM {SNAPSHOTS}
+            ) AS d
+            WHERE rn > 1
+        )
+    """)
+    op.create_index(
+        SNAPSHOTS_KEY, SNAPSHOTS,
+        ['agregacao', 'periodo_inicio',
+         sa.text("coalesce(canal, '')"), sa.text("coalesce(campaign_id, '')"),
+         sa.text("coalesce(vendedor, '')")],
+        unique=True,
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if TABLE not in inspector.get_table_names():
+        # Fila de dias sujos: a API marca, o worker (kpi_store) recalcula e limpa
+        op.create_table(TABLE,
+            sa.Column('dia', sa.Date(), nullable=False),
+            sa.Column('marked_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('dia')
+        )
+
+    # backfill e calculate_daily_kpis gravam com upsert nessa chave
+    if SNAPSHOTS in inspector.get_table_names():
+        indices = {i['name'] for i in inspector.get_indexes(SNAPSHOTS)}
+        if SNAPSHOTS_KEY not in indices:
+            _create_snapshots_key(bind)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if SNAPSHOTS in inspector.get_table_names():
+        indices = {i['name'] for i in inspector.get_indexes(SNAPSHOTS)}
+        if SNAPSHOTS_KEY in indices:
+            op.drop_index(SNAPSHOTS_KEY, table_name=SNAPSHOTS)
+    if TABLE in inspector.get_table_names():
+        op.drop_table(TABLE)
@@ -1,12 +1,19 @@
 """
 Script para popular o banco com dados de exemplo
-Uso: python -m infra.seeds.run_seeds
+Uso: python -m infra.seeds.run_seeds [--deals 2000 --campaigns 10 --days 90] [--replace]
+
+Deals, campanhas e gastos vêm do gerador sintético (apps/api/seeds/synthetic.py),
+carregados em massa; para teste de carga basta aumentar a escala:
+    python -m infra.seeds.run_seeds --deals 5000000 --campaigns 200 --days 730 --replace
+
+Sem --replace o script recusa (antes de gravar qualquer coisa) se crm_deals,
+campaigns, campaign_insights, agency_*, attribution_links, os vendedores
+sintéticos ou as contas sintéticas já tiverem linhas. Com --replace essas
+tabelas são esvaziadas e recarregadas; usuários e contas de anúncio reais são
+mantidos e os cliques (ad_clicks) só perdem o campaign_id.
 """
+import argparse
 import asyncio
-import random
-from datetime import datetime, timedelta
-from decimal import Decimal
-import uuid
 
 from passlib.context import CryptContext
 
@@ -15,61 +22,15 @@ import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'apps', 'api'))
 
-from sqlalchemy import select
-from database import async_session_maker, init_db
+from sqlalchemy import create_engine, select
+from config import get_settings
+from database import async_session_maker
 from models import User
-from models.crm import CRMDeal, DealStatus
-from models.campaigns import AdPlatformAccount, AdCampaign, AdSpendDaily, AdPlatform, CampaignStatus
 from models.ai import AIRecommendation, RecommendationPriority, RecommendationScope, RecommendationStatus
+from seeds.synthetic import ExistingDataError, SyntheticConfig, load
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Dados fake
-VENDEDORES = [
-    "Carlos Silva",
-    "Maria Santos",
-    "João Oliveira",
-    "Ana Costa",
-    "Pedro Souza"
-]
-
-ORIGENS = ["Site", "Telefone", "WhatsApp", "Indicação", "Feira", "Instagram", "Facebook"]
-
-CANAIS = ["Google", "Meta", "Orgânico", "Direto", "Referral"]
-
-VEICULOS = [
-    "Honda Civic 2022", "Toyota Corolla 2023", "VW Golf 2021",
-    "Hyundai HB20 2023", "Chevrolet Onix 2022", "Fiat Argo 2023",
-    "Jeep Compass 2022", "Ford Ranger 2023", "Nissan Kicks 2022",
-    "Renault Kwid 2023", "Peugeot 208 2022", "Citroën C3 2023"
-]
-
-MOTIVOS_PERDA = [
-    "Preço alto",
-    "Cliente não retornou",
-    "Comprou em outro lugar",
-    "Sem condições financeiras",
-    "Desistiu da compra",
-    "Veículo vendido",
-    "Demora no atendimento"
-]
-
-CAMPANHAS_GOOGLE = [
-    ("Busca - Carros Usados SP", "campaign_g1"),
-    ("Busca - Seminovos Premium", "campaign_g2"),
-    ("Display - Remarketing", "campaign_g3"),
-    ("Busca - Financiamento", "campaign_g4"),
-    ("Performance Max - Geral", "campaign_g5")
-]
-
-CAMPANHAS_META = [
-    ("Leads - Ofertas Especiais", "campaign_m1"),
-    ("Conversões - Catálogo", "campaign_m2"),
-    ("Engajamento - Stories", "campaign_m3"),
-    ("Remarketing - Visitantes", "campaign_m4"),
-    ("Alcance - Branding", "campaign_m5")
-]
-
 
 async def create_admin_user(session):
     """Cria usuário admin padrão"""
@@ -92,159 +53,16 @@ async def create_admin_user(session):
     print("✓ Usuário admin criado (admin@revenda.com / admin123)")
 
 
-async def create_deals(session, count=50):
-    """Cria deals de exemplo"""
-    print(f"Criando {count} deals de exemplo...")
-    
-    deals = []
-    for i in range(count):
-        # Data de criação nos últimos 60 dias
-        days_ago = random.randint(0, 60)
-        data_criacao = datetime.now() - timedelta(days=days_ago, hours=random.randint(0, 23))
-        
-        # Status com distribuição realista
-        status_choice = random.random()
-        if status_choice < 0.25:
-            status = DealStatus.GANHO
-            data_fechamento = data_criacao + timedelta(days=random.randint(1, 14))
-            motivo = None
-        elif status_choice < 0.70:
-            status = DealStatus.PERDIDO
-            data_fechamento = data_criacao + timedelta(days=random.randint(1, 7))
-            motivo = random.choice(MOTIVOS_PERDA)
-        else:
-            status = DealStatus.ABERTO
-            data_fechamento = None
-            motivo = None
-        
-        # Valores
-        valor = Decimal(str(random.randint(25000, 180000)))
-        lucro = valor * Decimal(str(random.uniform(0.05, 0.15))) if status == DealStatus.GANHO else Decimal(0)
-        
-        # Canal e UTMs
-        canal = random.choice(CANAIS)
-        utm_source = None
-        utm_campaign = None
-        
-        if canal == "Google":
-            utm_source = "google"
-            utm_campaign = random.choice(CAMPANHAS_GOOGLE)[0]
-        elif canal == "Meta":
-            utm_source = "facebook"
-            utm_campaign = random.choice(CAMPANHAS_META)[0]
-        
-        deal = CRMDeal(
-            data_criacao=data_criacao,
-            data_fechamento=data_fechamento,
-            status=status,
-            motivo_perda=motivo,
-            valor=valor,
-            lucro_bruto=lucro.quantize(Decimal("0.01")),
-            vendedor=random.choice(VENDEDORES),
-            telefone=f"11 9{random.randint(1000, 9999)}-{random.randint(1000, 9999)}",
-            email=f"cliente{i}@email.com",
-            nome_cliente=f"Cliente {i+1}",
-            origem=random.choice(ORIGENS),
-            canal=canal,
-            utm_source=utm_source,
-            utm_campaign=utm_campaign,
-            veiculo_interesse=random.choice(VEICULOS),
-            observacoes="Lead gerado automaticamente para testes" if random.random() > 0.7 else None
-        )
-        deals.append(deal)
-    
-    session.add_all(deals)
-    await session.commit()
-    print(f"✓ {count} deals criados")
-
-
-async def create_campaigns_and_spend(session):
-    """Cria campanhas e gastos de exemplo"""
-    print("Criando campanhas e gastos...")
-    
-    # Criar contas
-    google_account = AdPlatformAccount(
-        platform=AdPlatform.GOOGLE,
-        account_id="123-456-7890",
-        account_name="Revenda Autos - Google Ads",
-        is_active=True
-    )
-    meta_account = AdPlatformAccount(
-        platform=AdPlatform.META,
-        account_id="act_1234567890",
-        account_name="Revenda Autos - Meta Ads",
-        is_active=True
-    )
-    session.add_all([google_account, meta_account])
-    await session.flush()
-    
-    # Criar campanhas Google
-    google_campaigns = []
-    for name, ext_id in CAMPANHAS_GOOGLE:
-        campaign = AdCampaign(
-            account_id=google_account.id,
-            platform=AdPlatform.GOOGLE,
-            campaign_id=ext_id,
-            campaign_name=name,
-            campaign_name_normalized=name.lower().replace(" ", "_"),
-            status=CampaignStatus.ACTIVE,
-            objective="LEADS"
-        )
-        google_campaigns.append(campaign)
-    
-    # Criar campanhas Meta
-    meta_campaigns = []
-    for name, ext_id in CAMPANHAS_META:
-        campaign = AdCampaign(
-            account_id=meta_account.id,
-            platform=AdPlatform.META,
-            campaign_id=ext_id,
-            campaign_name=name,
-            campaign_name_normalized=name.lower().replace(" ", "_"),
-            status=CampaignStatus.ACTIVE,
-            objective="LEAD_GENERATION"
-        )
-        meta_campaigns.append(campaign)
-    
-    session.add_all(google_campaigns + meta_campaigns)
-    await session.flush()
-    
-    # Criar gastos diários (últimos 30 dias)
-    spends = []
-    all_campaigns = google_campaigns + meta_campaigns
-    
-    for day_offset in range(30):
-        spend_date = (datetime.now() - timedelta(days=day_offset)).date()
-        
-        for campaign in all_campaigns:
-            # Variação diária
-            base_spend = random.uniform(50, 300)
-            impressions = random.randint(1000, 10000)
-            clicks = int(impressions * random.uniform(0.01, 0.05))
-            leads = int(clicks * random.uniform(0.05, 0.20))
-            
-            spend = AdSpendDaily(
-                date=spend_date,
-                platform=campaign.platform,
-                campaign_id_ref=campaign.id,
-                campaign_external_id=campaign.campaign_id,
-                spend=Decimal(str(round(base_spend, 2))),
-                impressions=impressions,
-                reach=int(impressions * 0.8),
-                clicks=clicks,
-                link_clicks=int(clicks * 0.9),
-                leads=leads,
-                conversions=leads,
-                cpc=Decimal(str(round(base_spend / clicks, 4))) if clicks > 0 else Decimal(0),
-                cpm=Decimal(str(round((base_spend / impressions) * 1000, 4))) if impressions > 0 else Decimal(0),
-                ctr=Decimal(str(round((clicks / impressions) * 100, 4))) if impressions > 0 else Decimal(0),
-                cpl=Decimal(str(round(base_spend / leads, 4))) if leads > 0 else Decimal(0)
-            )
-            spends.append(spend)
-    
-    session.add_all(spends)
-    await session.commit()
-    print(f"✓ {len(all_campaigns)} campanhas e {len(spends)} registros de gasto criados")
+def create_synthetic_data(config: SyntheticConfig, replace: bool = False):
+    """Deals, vendedores, campanhas, gasto diário e relatórios da agência (carga em massa)"""
+    print(f"Gerando {config.deals} deals, {config.campaigns} campanhas x {config.days} dias...")
+    engine = create_engine(get_settings().database_url_sync)
+    try:
+        contagem = load(engine, config, pwd_context.hash("vendedor123"), replace=replace)
+    finally:
+        engine.dispose()
+    print(f"✓ {contagem['crm_deals']} deals, {contagem['campaigns']} campanhas e "
+          f"{contagem['campaign_insights']} registros de gasto criados")
 
 
 async def create_recommendations(session):
@@ -342,7 +160,7 @@ async def create_recommendations(session):
     print(f"✓ {len(recommendations)} recomendações criadas")
 
 
-async def main():
+async def main(config: SyntheticConfig, replace: bool = False):
     """Executa todos os seeds"""
     print("\n" + "="*50)
     print("POPULANDO BANCO COM DADOS DE EXEMPLO")
@@ -350,8 +168,8 @@ async def main():
     
     async with async_session_maker() as session:
         await create_admin_user(session)
-        await create_deals(session, count=50)
-        await create_campaigns_and_spend(session)
+    create_synthetic_data(config, replace)
+    async with async_session_maker() as session:
         await create_recommendations(session)
     
     print("\n" + "="*50)
@@ -360,5 +178,20 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Popula o banco com dados de exemplo")
+    parser.add_argument("--deals", type=int, default=2000)
+    parser.add_argument("--campaigns", type=int, default=10)
+    parser.add_argument("--vendedores", type=int, default=5)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--replace", action="store_true",
+                        help="Substitui os dados existentes (usuários/contas reais e cliques são mantidos)")
+    args = parser.parse_args()
+    config = SyntheticConfig(
+        deals=args.deals, campaigns=args.campaigns, vendedores=args.vendedores, days=args.days, seed=args.seed
+    )
+    try:
+        asyncio.run(main(config, args.replace))
+    except ExistingDataError as e:
+        sys.exit(f"✗ {e}")
 
@@ -0,0 +1,195 @@
+"""
+Atribuição determinística deal -> campanha
+
+Monta índices em memória (dicts) uma vez por execução e casa cada deal em
+O(1), então um lote de n deals custa O(n):
+
+- gclid / fbclid -> campanha (ad_clicks), confiança 1.0
+- utm_campaign igual ao id externo da campanha ({{campaign.id}}), 0.95
+- utm_campaign normalizado igual ao nome normalizado da campanha, 0.85 com
+  plataforma confirmada (utm_source/click id) ou 0.7 sem; nomes repetidos
+  dividem a confiança entre as candidatas
+- sem nome exato: nome mais parecido (shared/fuzzy.py), com a mesma base
+  multiplicada pela similaridade
+
+Usado pelo worker (gravação em attribution_links) e sem dependência de
+banco, para poder ser testado com dicts.
+"""
+import copy
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from shared.fuzzy import FuzzyIndex, match_key, match_keys
+
+# Candidatas aproximadas consideradas por deal (filtradas pela plataforma)
+FUZZY_CANDIDATES = 3
+
+# Valores de AttributionMethod gravados pelo motor (nomes do enum)
+GCLID = "GCLID"
+FBCLID = "FBCLID"
+UTM = "UTM"
+AUTOMATIC_METHODS = (GCLID, FBCLID, UTM)
+
+# Plataformas (nomes do PlatformEnum)
+META = "META"
+GOOGLE = "GOOGLE"
+
+CONFIDENCE_CLICK_ID = Decimal("1.0")
+CONFIDENCE_EXTERNAL_ID = Decimal("0.95")
+CONFIDENCE_NAME_PLATFORM = Decimal("0.85")
+CONFIDENCE_NAME = Decimal("0.7")
+
+# utm_source -> plataforma
+SOURCE_PLATFORMS = {
+    "google": GOOGLE, "googleads": GOOGLE, "adwords": GOOGLE, "gads": GOOGLE,
+    "facebook": META, "fb": META, "instagram": META, "ig": META, "meta": META,
+}
+
+
+def campaign_key(name: Optional[str]) -> str:
+    """
+    Chave de nome para o índice
+
+    shared.utils.normalize_campaign_name sem os separadores, para "Busca - Carros SP",
+    "busca-carros-sp" e "busca_carros_sp" caírem na mesma chave.
+    """
+    return match_key(name)
+
+
+def platform_hint(
+    utm_source: Optional[str], gclid: Optional[str], fbclid: Optional[str], source_key: Optional[str] = None
+) -> Optional[str]:
+    """Plataforma indicada pelo deal (click id tem precedência sobre utm_source)"""
+    if gclid:
+        return GOOGLE
+    if fbclid:
+        return META
+    return SOURCE_PLATFORMS.get(match_key(utm_source) if source_key is None else source_key)
+
+
+@dataclass(frozen=True)
+class Match:
+    """Uma ligação deal -> campanha proposta pelo motor"""
+    deal_id: object
+    campaign_id: int
+    method: str
+    confidence: Decimal
+    details: str
+
+
+class CampaignIndex:
+    """
+    Índices hash de campanhas e cliques
+
+    campaigns: iterável de (id, external_id, name, platform)
+    clicks: iterável de (click_id, campaign_id)
+    """
+
+    def __init__(self, campaigns: Iterable[Tuple], clicks: Iterable[Tuple] = (), fuzzy: bool = True):
+        self.by_external_id: Dict[str, int] = {}
+        self.by_name: Dict[str, List[Tuple[int, Optional[str]]]] = {}
+        self.platforms: Dict[int, Optional[str]] = {}
+        nomes = []
+        campaigns = list(campaigns)
+        chaves = match_keys(c[2] for c in campaigns)
+        for (campaign_id, external_id, name, platform), key in zip(campaigns, chaves):
+            self.platforms[campaign_id] = platform
+            if external_id:
+                self.by_external_id[str(external_id).strip()] = campaign_id
+            if key:
+                self.by_name.setdefault(key, []).append((campaign_id, platform))
+                nomes.append((campaign_id, name))
+        # Uma instância por execução: o memo vale para todos os lotes
+        self.fuzzy = FuzzyIndex(nomes) if fuzzy else None
+
+        self.by_click: Dict[str, int] = {}
+        for click_id, campaign_id in clicks:
+            if click_id and campaign_id is not None:
+                self.by_click[click_id.strip()] = campaign_id
+
+    def with_clicks(self, clicks: Iterable[Tuple]) -> "CampaignIndex":
+        """Cópia com outro conjunto de cliques (índices de campanha compartilhados)"""
+        index = copy.copy(self)
+        index.by_click = {c.strip(): cid for c, cid in clicks if c and cid is not None}
+        return index
+
+    def __len__(self) -> int:
+        return len(self.platforms)
+
+    def match(self, deal: Dict, keys: Optional[Tuple[str, str]] = None) -> List[Match]:
+        """
+        Ligações de um deal (dict com id, utm_source, utm_campaign, gclid, fbclid)
+
+        Click id conhecido decide sozinho; senão tenta utm_campaign.
+        keys: (chave do utm_campaign, chave do utm_source) já normalizadas
+        em lote por attribute(); sem elas, normaliza aqui.
+        """
+        deal_id = deal["id"]
+        for method, campo in ((GCLID, "gclid"), (FBCLID, "fbclid")):
+            click_id = (deal.get(campo) or "").strip()
+            campaign_id = self.by_click.get(click_id) if click_id else None
+            if campaign_id is not None:
+                return [Match(deal_id, campaign_id, method, CONFIDENCE_CLICK_ID, f"{campo}={click_id[:80]}")]
+
+        utm = (deal.get("utm_campaign") or "").strip()
+        if not utm:
+            return []
+
+        campaign_id = self.by_external_id.get(utm)
+        if campaign_id is not None:
+            return [Match(deal_id, campaign_id, UTM, CONFIDENCE_EXTERNAL_ID, f"utm_campaign=id:{utm[:80]}")]
+
+        utm_key, source_key = keys if keys is not None else (campaign_key(utm), None)
+        hint = platform_hint(deal.get("utm_source"), deal.get("gclid"), deal.get("fbclid"), source_key)
+        candidatas = self.by_name.get(utm_key, [])
+        similaridade, detalhe = Decimal(1), f"utm_campaign={utm[:80]}"
+        if not candidatas and self.fuzzy is not None:
+            candidatas, similaridade = self._fuzzy_candidates(utm, hint)
+            detalhe = f"utm_campaign~{utm[:80]} ({similaridade})"
+        if not candidatas:
+            return []
+
+        confirmadas = [c for c in candidatas if hint and c[1] == hint]
+        if confirmadas:
+            candidatas, base = confirmadas, CONFIDENCE_NAME_PLATFORM
+        else:
+            base = CONFIDENCE_NAME
+
+        # Nome repetido: cada candidata fica com uma fração (soma = base)
+        confianca = (base * similaridade / len(candidatas)).quantize(Decimal("0.0001"))
+        if len(candidatas) > 1:
+            detalhe += f" ({len(candidatas)} candidatas)"
+        return [Match(deal_id, cid, UTM, confianca, detalhe) for cid, _ in candidatas]
+
+    def _fuzzy_candidates(self, utm: str, hint: Optional[str]) -> Tuple[List[Tuple[int, Optional[str]]], Decimal]:
+        """
+        Campanhas do nome mais parecido; com plataforma indicada, o mais
+        parecido entre os nomes que têm campanha dessa plataforma
+        """
+        matches = self.fuzzy.match(utm, limit=FUZZY_CANDIDATES)
+        if hint:
+            matches = [m for m in matches if self.platforms.get(m.item) == hint] or matches
+        if not matches:
+            return [], Decimal(0)
+        melhor = matches[0].name
+        return (
+            [(m.item, self.platforms.get(m.item)) for m in matches if m.name == melhor],
+            Decimal(str(matches[0].score)),
+        )
+
+
+def attribute(deals: Iterable[Dict], index: CampaignIndex) -> List[Match]:
+    """
+    Casa um lote de deals contra o índice (O(n) no tamanho do lote)
+
+    utm_campaign e utm_source do lote são normalizados em coluna
+    (normalize_campaign_names), uma vez por valor distinto.
+    """
+    deals = deals if isinstance(deals, list) else list(deals)
+    utm_keys = match_keys((d.get("utm_campaign") or "").strip() for d in deals)
+    source_keys = match_keys(d.get("utm_source") for d in deals)
+    matches = []
+    for deal, keys in zip(deals, zip(utm_keys, source_keys)):
+        matches.extend(index.match(deal, keys))
+    return matches
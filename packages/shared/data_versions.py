@@ -0,0 +1,69 @@
+"""
+Contrato das versões de dados por domínio (ETag / GET condicional)
+
+Quem escreve (sync do CRM, importações, relatórios da agência, ingestão de
+Ads) incrementa a versão do domínio no Redis depois do commit; a API monta
+o ETag das rotas de leitura com as versões dos domínios que elas leem.
+Enquanto nenhuma versão muda, o dashboard que faz polling recebe 304 sem
+nenhuma consulta ao banco.
+
+A versão é max(atual + 1, agora em ms): continua crescendo mesmo se o
+Redis perder a chave, então um ETag antigo nunca volta a valer.
+"""
+import hashlib
+import json
+import time
+from typing import Dict, Iterable, Optional
+
+CRM = "crm"          # Negócios (CRM externo, crm_deals, clusters de leads)
+ADS = "ads"          # Campanhas, gasto diário e atribuição
+AGENCY = "agency"    # Relatórios mensais da agência
+DOMAINS = (CRM, ADS, AGENCY)
+
+# KEYS[1] = chave da versão, ARGV[1] = agora em ms
+BUMP_SCRIPT = """
+local v = redis.call('INCR', KEYS[1])
+local agora = tonumber(ARGV[1])
+if v < agora then
+    redis.call('SET', KEYS[1], agora)
+    v = agora
+end
+return v
+"""
+
+
+def version_key(domain: str) -> str:
+    """Versão atual do domínio (inteiro monotônico)"""
+    return f"data:version:{domain}"
+
+
+def digest_key(source: str) -> str:
+    """Resumo do último resultado de uma fonte sem evento de escrita (ex: CRM externo)"""
+    return f"data:digest:{source}"
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def digest(payload) -> str:
+    """Resumo estável de um resultado (para bump só quando ele muda)"""
+    bruto = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha1(bruto.encode()).hexdigest()
+
+
+def etag(versions: Dict[str, int], method: str, path: str, query: Iterable, extra: Optional[str] = None) -> str:
+    """
+    ETag fraco das versões + requisição
+
+    `query` são os pares (nome, valor); a ordem não importa. `extra` entra
+    no hash para o que muda sem escrita (ex: o dia, por causa dos períodos
+    relativos a hoje).
+    """
+    partes = [
+        method.upper(), path,
+        "&".join(f"{k}={v}" for k, v in sorted(query)),
+        ",".join(f"{d}={versions[d]}" for d in sorted(versions)),
+        extra or "",
+    ]
+    return f'W/"{hashlib.sha1("|".join(partes).encode()).hexdigest()[:24]}"'
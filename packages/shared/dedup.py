@@ -0,0 +1,134 @@
+"""
+De-duplicação de leads (vários negócios do mesmo cliente)
+
+O mesmo cliente aparece em vários crm_negocio (um por origem/canal). Os
+negócios são agrupados quando dividem telefone ou e-mail normalizado, de
+forma transitiva (A-B pelo telefone, B-C pelo e-mail => A, B e C juntos):
+
+- Normalização uma vez por valor distinto (telefones se repetem muito),
+  com os telefones distintos formatados de uma vez (format_phones_br)
+- Hash join: dicionário chave normalizada -> primeiro registro com ela;
+  cada registro seguinte com a mesma chave é unido a esse
+- Union-find com compressão de caminho e união por tamanho: O(n α(n)),
+  sem comparar pares
+
+Chaves compartilhadas por muitos registros (telefone da loja, e-mail
+genérico digitado pelo vendedor) são ignoradas; senão juntariam clientes
+diferentes num cluster gigante.
+"""
+import re
+from collections import Counter
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from shared.utils import format_phones_br
+
+MAX_KEY_RECORDS = 50  # Acima disso a chave é placeholder, não cliente
+
+_NON_DIGIT = re.compile(r"\D")
+
+
+def normalize_phones(phones: Sequence[Optional[str]]) -> List[Optional[str]]:
+    """
+    Telefones como dígitos com DDI/DDD (5551999998888), None se inválido
+
+    Coluna inteira: a formatação sai de uma chamada a format_phones_br.
+    """
+    # Zero de longa distância (051 9...) não é reconhecido por format_phone_br
+    digitos = [_NON_DIGIT.sub("", p or "").lstrip("0") for p in phones]
+    formatados = format_phones_br(digitos)
+    saida = []
+    for d in formatados:
+        # format_phone_br devolve o original quando não reconhece o formato
+        d = _NON_DIGIT.sub("", d) if d else ""
+        if not (d.startswith("55") and len(d) in (12, 13)) or len(set(d[4:])) == 1:  # 999999999, 00000000...
+            saida.append(None)
+        else:
+            saida.append(d)
+    return saida
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Telefone como dígitos com DDI/DDD (5551999998888) ou None se inválido"""
+    return normalize_phones([phone])[0]
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """E-mail minúsculo sem espaços, ou None se não parece e-mail"""
+    if not email:
+        return None
+    email = email.strip().lower()
+    usuario, _, dominio = email.partition("@")
+    if not usuario or "." not in dominio:
+        return None
+    return email
+
+
+class UnionFind:
+    """Conjuntos disjuntos sobre 0..n-1"""
+
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]  # Compressão por halving
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> int:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+
+def record_keys(records: Sequence[Tuple[Hashable, Optional[str], Optional[str]]]) -> List[Tuple[str, ...]]:
+    """Chaves normalizadas de cada (id, telefone, email)"""
+    distintos = list(dict.fromkeys(telefone for _, telefone, _ in records))
+    telefones: Dict[str, Optional[str]] = dict(zip(distintos, normalize_phones(distintos)))
+    emails: Dict[str, Optional[str]] = {}
+    chaves = []
+    for _, telefone, email in records:
+        if email not in emails:
+            emails[email] = normalize_email(email)
+        t, e = telefones[telefone], emails[email]
+        chaves.append(tuple(k for k in (t and f"t:{t}", e and f"e:{e}") if k))
+    return chaves
+
+
+def cluster(
+    records: Sequence[Tuple[Hashable, Optional[str], Optional[str]]],
+    max_key_records: int = MAX_KEY_RECORDS
+) -> Dict[Hashable, Hashable]:
+    """
+    id -> id do cluster, para registros (id, telefone, email)
+
+    O id do cluster é o do primeiro registro do grupo na ordem recebida
+    (ordene por data de criação para ele ser o primeiro negócio do cliente).
+    Registro sem chave válida é um cluster de um só.
+    """
+    chaves = record_keys(records)
+    frequencia = Counter(k for ks in chaves for k in ks)
+
+    uf = UnionFind(len(records))
+    primeiro: Dict[str, int] = {}
+    for i, ks in enumerate(chaves):
+        for k in ks:
+            if frequencia[k] > max_key_records:
+                continue
+            j = primeiro.setdefault(k, i)
+            if j != i:
+                uf.union(i, j)
+
+    # Índices crescentes: o primeiro visto de cada raiz é o menor do grupo
+    representante: Dict[int, int] = {}
+    return {
+        records[i][0]: records[representante.setdefault(uf.find(i), i)][0]
+        for i in range(len(records))
+    }
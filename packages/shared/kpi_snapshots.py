@@ -0,0 +1,64 @@
+"""
+Contrato dos snapshots de KPIs em tempo real
+
+O worker (`get_realtime_kpis`) publica os snapshots no Redis e a API apenas
+lê: uma leitura é um GET do ponteiro da versão atual + um HGET do campo.
+"""
+from typing import Optional
+
+ALL = "all"
+
+# Cada versão expira sozinha; a atual é sempre reescrita a cada 3 minutos
+SNAPSHOT_TTL_SECONDS = 3600
+
+VERSION_KEY = "kpi:realtime:version"
+
+
+def current_key(periodo: str) -> str:
+    """Ponteiro para a versão atual do período (ex: 2026-01)"""
+    return f"kpi:realtime:{periodo}:current"
+
+
+def snapshot_key(periodo: str, version: int) -> str:
+    """Hash com todos os recortes de uma versão"""
+    return f"kpi:realtime:{periodo}:v{version}"
+
+
+def field(grupo: Optional[str] = None, vendedor_id: Optional[int] = None) -> str:
+    """Campo do hash para um recorte grupo de origem x vendedor"""
+    grupo = grupo.upper() if grupo else ALL
+    vendedor = str(vendedor_id) if vendedor_id is not None else ALL
+    return f"{grupo}|{vendedor}"
+
+
+# Painéis por janela móvel (dias até hoje), publicados na mesma versão.
+# Só essas janelas existem: são as dos filtros do dashboard
+PANEL_WINDOWS = (7, 30, 90, 365)
+STALLED_WINDOWS = (3, 7, 14, 30)
+PANELS = {
+    "vendedores": PANEL_WINDOWS,
+    "origens": PANEL_WINDOWS,
+    "meta-vs-google": PANEL_WINDOWS,
+    "motivos-perda": PANEL_WINDOWS,
+    "leads-parados": STALLED_WINDOWS,
+    "funil": (),
+}
+
+
+def panel_field(nome: str, dias: Optional[int] = None) -> str:
+    """Campo do hash para um painel (funil não tem janela)"""
+    return f"painel:{nome}:{dias if dias is not None else ALL}"
+
+
+def finalize_metrics(metricas: dict) -> dict:
+    """Calcula taxa de conversão e ticket médio a partir das somas"""
+    ganhos = metricas.get("ganhos", 0)
+    perdidos = metricas.get("perdidos", 0)
+    finalizados = ganhos + perdidos
+    valor = float(metricas.get("valor_vendido", 0) or 0)
+    return {
+        **metricas,
+        "valor_vendido": round(valor, 2),
+        "taxa_conversao": round(ganhos / finalizados * 100, 2) if finalizados > 0 else 0,
+        "ticket_medio": round(valor / ganhos, 2) if ganhos > 0 else 0,
+    }
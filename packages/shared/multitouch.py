@@ -0,0 +1,181 @@
+"""
+Modelos de atribuição multi-touch em lote (NumPy)
+
+Entrada: um array por campo, uma posição por ponto de contato (deal do CRM
+ou clique) — lead, instante, canal, se converteu e valor. Todos os leads são
+processados de uma vez, sem laço Python por lead:
+
+1. Ordena por (lead, instante) e localiza as conversões
+2. O caminho de cada conversão são os contatos do mesmo lead desde a
+   conversão anterior (ou o início da janela de lookback) até ela,
+   achados com searchsorted numa chave composta lead+instante
+3. Os caminhos viram arrays achatados (np.repeat) com posição, tamanho e
+   idade de cada contato; cada modelo é só um vetor de pesos
+4. Crédito por canal = np.bincount dos pesos (conversões) e dos pesos x
+   valor da conversão (receita)
+
+Modelos: first_touch, last_touch, linear, time_decay (meia-vida em dias) e
+position_based (40% primeiro, 40% último, 20% dividido entre os do meio).
+"""
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+FIRST_TOUCH = "first_touch"
+LAST_TOUCH = "last_touch"
+LINEAR = "linear"
+TIME_DECAY = "time_decay"
+POSITION_BASED = "position_based"
+MODELS = (FIRST_TOUCH, LAST_TOUCH, LINEAR, TIME_DECAY, POSITION_BASED)
+
+DAY = 86400
+POSITION_ENDS = 0.4  # Primeiro e último no position_based
+
+
+UNKNOWN_CHANNEL = "Desconhecido"
+
+
+def lead_key(telefone: Optional[str], email: Optional[str], fallback) -> str:
+    """
+    Identidade do lead: telefone (últimos 11 dígitos, sem DDI), senão e-mail,
+    senão o próprio deal (lead sem contato = caminho de um toque só)
+    """
+    digitos = re.sub(r"\D", "", telefone or "")[-11:]
+    if len(digitos) >= 8:
+        return f"t:{digitos}"
+    if email and email.strip():
+        return f"e:{email.strip().lower()}"
+    return f"d:{fallback}"
+
+
+def touch_channel(gclid: Optional[str], fbclid: Optional[str], canal: Optional[str], origem: Optional[str]) -> str:
+    """Canal do contato: click id manda (pago), senão canal/origem do CRM"""
+    if gclid:
+        return "Google"
+    if fbclid:
+        return "Meta"
+    return canal or origem or UNKNOWN_CHANNEL
+
+
+def encode(values: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+    """Rótulos -> (códigos inteiros, rótulos únicos)"""
+    labels, codes = np.unique(np.asarray(list(values), dtype=object).astype(str), return_inverse=True)
+    return codes.astype(np.int64), labels
+
+
+@dataclass
+class Paths:
+    """Caminhos achatados: uma posição por (conversão, contato)"""
+    conversion: np.ndarray  # Índice da conversão (0..C-1) de cada contato
+    touch: np.ndarray       # Índice do contato (nos arrays de entrada)
+    position: np.ndarray    # Posição no caminho (0 = primeiro)
+    length: np.ndarray      # Tamanho do caminho
+    age_days: np.ndarray    # Dias entre o contato e a conversão
+    conversions: np.ndarray  # Índice de entrada de cada conversão
+
+    def __len__(self) -> int:
+        return len(self.conversions)
+
+
+def build_paths(lead: np.ndarray, ts: np.ndarray, converted: np.ndarray, lookback_days: float = 90) -> Paths:
+    """
+    Caminho de cada conversão (contatos do lead em ordem de tempo)
+
+    lead: códigos inteiros; ts: segundos (epoch); converted: bool.
+    Contatos da conversão anterior para trás pertencem a ela, não à próxima.
+    """
+    lead = np.asarray(lead, dtype=np.int64)
+    ts = np.asarray(ts, dtype=np.int64)
+    converted = np.asarray(converted, dtype=bool)
+    vazio = np.empty(0, dtype=np.int64)
+    if not converted.any():
+        return Paths(vazio, vazio, vazio, vazio, np.empty(0), vazio)
+
+    order = np.lexsort((ts, lead))
+    lead_s, ts_s = lead[order], ts[order]
+    lookback = int(lookback_days * DAY)
+
+    # Chave composta crescente; o espaçamento entre leads impede que a janela
+    # de um lead alcance o anterior
+    ts_rel = ts_s - ts_s.min()
+    chave = lead_s * (int(ts_rel.max()) + lookback + 1) + ts_rel
+
+    conv = np.flatnonzero(converted[order])
+    inicio = np.searchsorted(chave, chave[conv] - lookback, side="left")
+    anterior = np.r_[-1, conv[:-1]]
+    mesmo_lead = (anterior >= 0) & (lead_s[np.maximum(anterior, 0)] == lead_s[conv])
+    inicio = np.where(mesmo_lead, np.maximum(inicio, anterior + 1), inicio)
+
+    tamanho = conv - inicio + 1
+    conversao = np.repeat(np.arange(len(conv)), tamanho)
+    deslocamento = np.cumsum(tamanho) - tamanho
+    posicao = np.arange(int(tamanho.sum())) - np.repeat(deslocamento, tamanho)
+    contato_s = np.repeat(inicio, tamanho) + posicao
+
+    return Paths(
+        conversion=conversao,
+        touch=order[contato_s],
+        position=posicao,
+        length=np.repeat(tamanho, tamanho),
+        age_days=(ts_s[conv][conversao] - ts_s[contato_s]) / DAY,
+        conversions=order[conv],
+    )
+
+
+def weights(paths: Paths, model: str, half_life_days: float = 7.0) -> np.ndarray:
+    """Peso de cada contato no seu caminho (soma 1 por conversão)"""
+    pos, n = paths.position, paths.length
+    if model == FIRST_TOUCH:
+        return (pos == 0).astype(float)
+    if model == LAST_TOUCH:
+        return (pos == n - 1).astype(float)
+    if model == LINEAR:
+        return 1.0 / n
+    if model == TIME_DECAY:
+        w = np.power(0.5, paths.age_days / half_life_days)
+        return w / np.bincount(paths.conversion, weights=w)[paths.conversion]
+    if model == POSITION_BASED:
+        pontas = (pos == 0) | (pos == n - 1)
+        meio = (1 - 2 * POSITION_ENDS) / np.maximum(n - 2, 1)
+        w = np.where(pontas, POSITION_ENDS, meio)
+        w = np.where(n == 2, 0.5, w)
+        return np.where(n == 1, 1.0, w)
+    raise ValueError(f"Modelo desconhecido: {model}")
+
+
+def channel_credit(
+    paths: Paths,
+    channel: np.ndarray,
+    value: np.ndarray,
+    n_channels: int,
+    model: str,
+    half_life_days: float = 7.0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(conversões, receita) creditadas a cada canal pelo modelo"""
+    if not len(paths):
+        return np.zeros(n_channels), np.zeros(n_channels)
+    w = weights(paths, model, half_life_days)
+    canais = np.asarray(channel)[paths.touch]
+    valor = np.asarray(value, dtype=float)[paths.conversions][paths.conversion]
+    return (
+        np.bincount(canais, weights=w, minlength=n_channels),
+        np.bincount(canais, weights=w * valor, minlength=n_channels),
+    )
+
+
+def compare_models(
+    lead: np.ndarray,
+    ts: np.ndarray,
+    channel: np.ndarray,
+    converted: np.ndarray,
+    value: np.ndarray,
+    n_channels: int,
+    lookback_days: float = 90,
+    half_life_days: float = 7.0,
+    models: Iterable[str] = MODELS
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """Todos os modelos sobre os mesmos caminhos (montados uma vez)"""
+    paths = build_paths(lead, ts, converted, lookback_days)
+    return {m: channel_credit(paths, channel, value, n_channels, m, half_life_days) for m in models}
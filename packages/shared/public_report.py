@@ -0,0 +1,357 @@
+"""
+Relatório público (/publico) gerado a partir da roi_api
+
+Usado pela task tasks.public_report do worker e pelo script
+apps/web/scripts/generate_public_report.py. Cada variante (período e
+marca) vira um JSON sanitizado, sem vendas, clientes ou IDs do CRM:
+
+- As fontes de todas as variantes são buscadas juntas e em paralelo;
+  uma URL pedida por várias variantes (ex: qualidade-leads) sai uma vez só
+- Cada busca manda If-None-Match com o ETag da rodada anterior: com 304
+  (versão de dados igual, ver shared.data_versions) o trecho sanitizado
+  guardado no estado é reaproveitado; variante sem fonte alterada não é
+  remontada
+- O arquivo da variante tem a versão no nome (<slug>.<versão>.json,
+  versão = resumo do conteúdo) e é escrito num temporário + os.replace;
+  depois o alias <slug>.json e o manifest.json são trocados do mesmo jeito.
+  Quem lê nunca vê um arquivo pela metade e as últimas versões ficam para
+  rollback
+
+O estado (ETags e trechos sanitizados) fica fora da pasta pública.
+"""
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import structlog
+
+from shared.data_versions import digest
+
+logger = structlog.get_logger()
+
+DEFAULT_SLUG = "padrao"
+MANIFEST = "manifest.json"
+KEEP_VERSIONS = 5  # Versões antigas mantidas por variante
+SLUG_RE = re.compile(r"^[a-z0-9][a-z0-9-]{0,63}$")
+
+CONSOLIDADO = "/api/roi/consolidado"
+QUALIDADE = "/api/roi/qualidade-leads"
+
+PROPOSTA = {
+    "decisao": "Manter por 14–30 dias com condição (qualidade), ou reduzir e realocar.",
+    "cobrancas_7_dias": [
+        "Separar campanhas por intenção (Search alta intenção + remarketing).",
+        "Filtrar curioso no anúncio (preço/entrada/análise de crédito).",
+        "Relatório de qualidade: % válidos, % respondidos, % qualificados, % agendamentos, % vendas.",
+        "UTMs e padrão no CRM (origem e canal).",
+    ],
+    "realocacao": [
+        "Google Search (alta intenção) + remarketing",
+        "Meta remarketing + criativos com filtro",
+        "Programa de indicação + parcerias",
+    ],
+    "kpis_para_decidir": [
+        "% Qualificados (SDR) / total leads",
+        "% Agendamentos / qualificados",
+        "Custo por venda (CRM) por canal",
+        "\"Não responde\" + SLA de 1ª resposta",
+    ],
+}
+
+
+# ============================================
+# VARIANTES
+# ============================================
+
+@dataclass(frozen=True)
+class Variant:
+    """
+    Uma página de /publico: período da roi_api e marca exibida
+
+    Sem `start`/`end`, vale o período padrão da roi_api.
+    """
+    slug: str = DEFAULT_SLUG
+    start: Optional[str] = None
+    end: Optional[str] = None
+    brand: str = ""
+
+    def __post_init__(self):
+        if not SLUG_RE.match(self.slug):
+            raise ValueError(f"Slug de variante inválido: {self.slug!r}")
+
+    @classmethod
+    def from_dict(cls, dados: Dict) -> "Variant":
+        return cls(**{k: dados[k] for k in ("slug", "start", "end", "brand") if dados.get(k) is not None})
+
+    def sources(self) -> Dict[str, Tuple[str, Tuple]]:
+        """Fonte -> (caminho, parâmetros) na roi_api"""
+        params = tuple((k, v) for k, v in (("start", self.start), ("end", self.end)) if v)
+        return {"consolidado": (CONSOLIDADO, params), "qualidade": (QUALIDADE, ())}
+
+
+def variants_from_config(variantes: Iterable[Dict], brand: str = "") -> List[Variant]:
+    """Variante padrão (public-report.json) + as configuradas, sem slug repetido"""
+    resultado = {DEFAULT_SLUG: Variant(brand=brand)}
+    for dados in variantes:
+        variante = Variant.from_dict(dados)
+        resultado[variante.slug] = variante
+    return list(resultado.values())
+
+
+# ============================================
+# SANITIZAÇÃO
+# ============================================
+
+def sanitize_consolidado(c: Dict) -> Dict:
+    """Só os agregados de ROI (a roi_api também devolve alertas e insights)"""
+    meta = c.get("meta") or {}
+    google = c.get("google") or {}
+    return {
+        "periodo": c.get("periodo"),
+        "roi": {
+            "investimento_total": c.get("investimento_total", 0),
+            "leads_agencia": c.get("leads_agencia", 0),
+            "leads_crm": c.get("leads_crm", 0),
+            "vendas_crm": c.get("vendas_crm", 0),
+            "valor_vendido": c.get("valor_vendido", 0),
+            "custo_por_lead_real": c.get("custo_por_lead_real", 0),
+            "custo_por_venda": c.get("custo_por_venda", 0),
+            "roi_percentual": c.get("roi_percentual", 0),
+            "meta": {k: meta.get(k, 0) for k in ("investimento", "leads_crm", "vendas", "valor_vendido", "roi")},
+            "google": {k: google.get(k, 0) for k in ("investimento", "leads_crm", "vendas", "valor_vendido", "roi")},
+        },
+    }
+
+
+def sanitize_qualidade(q: Dict) -> Dict:
+    """Resumo de mídia e os dois principais motivos de perda"""
+    resumo = q.get("resumo_midia") or {}
+    return {
+        "resumo_midia": {
+            k: resumo.get(k, 0)
+            for k in ("total_leads", "ganhos", "perdidos", "taxa_conversao", "custo_por_venda")
+        },
+        "leads_frios_percentual": q.get("leads_frios_percentual", 0),
+        "top_motivos_perda": [
+            {"motivo": m.get("motivo"), "percentual": m.get("percentual")}
+            for m in (q.get("motivos_perda") or [])[:2]
+        ],
+    }
+
+
+SANITIZERS = {"consolidado": sanitize_consolidado, "qualidade": sanitize_qualidade}
+
+
+def build_report(variant: Variant, trechos: Dict[str, Dict]) -> Dict:
+    """Relatório da variante (sem generated_at/versao, que dependem da escrita)"""
+    consolidado = trechos["consolidado"]
+    report = {
+        "variante": variant.slug,
+        "periodo": consolidado["periodo"],
+        "roi": consolidado["roi"],
+        "qualidade": trechos["qualidade"],
+        "proposta": PROPOSTA,
+    }
+    if variant.brand:
+        report["brand"] = variant.brand
+    return report
+
+
+# ============================================
+# BUSCA CONDICIONAL
+# ============================================
+
+@dataclass
+class SourceResult:
+    trecho: Optional[Dict] = None
+    changed: bool = False
+    status: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class State:
+    """ETag + trecho sanitizado por URL e versão publicada por variante"""
+    path: str
+    sources: Dict[str, Dict] = field(default_factory=dict)
+    variants: Dict[str, Dict] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "State":
+        try:
+            with open(path, encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return cls(path)
+        return cls(path, dados.get("sources", {}), dados.get("variants", {}))
+
+    def save(self):
+        write_atomic(self.path, json.dumps(
+            {"sources": self.sources, "variants": self.variants}, ensure_ascii=False
+        ).encode("utf-8"))
+
+
+def source_url(caminho: str, params: Tuple) -> str:
+    return str(httpx.URL(caminho, params=list(params)))
+
+
+async def fetch_source(client: httpx.AsyncClient, fonte: str, url: str, state: State,
+                       semaforo: asyncio.Semaphore) -> SourceResult:
+    anterior = state.sources.get(url) or {}
+    headers = {"Accept": "application/json"}
+    if anterior.get("etag") and anterior.get("trecho") is not None:
+        headers["If-None-Match"] = anterior["etag"]
+    try:
+        async with semaforo:
+            resposta = await client.get(url, headers=headers)
+        if resposta.status_code == 304:
+            return SourceResult(anterior["trecho"], changed=False, status=304)
+        resposta.raise_for_status()
+        trecho = SANITIZERS[fonte](resposta.json())
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Falha ao buscar fonte do relatório público", url=url, error=str(e))
+        return SourceResult(error=str(e))
+
+    state.sources[url] = {"etag": resposta.headers.get("etag"), "trecho": trecho}
+    return SourceResult(trecho, changed=trecho != anterior.get("trecho"), status=resposta.status_code)
+
+
+# ============================================
+# ESCRITA ATÔMICA E VERSIONADA
+# ============================================
+
+def write_atomic(path: str, data: bytes):
+    """Temporário na mesma pasta + os.replace (leitor vê o antigo ou o novo)"""
+    pasta = os.path.dirname(os.path.abspath(path))
+    os.makedirs(pasta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=pasta, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def publish(out_dir: str, variant: Variant, report: Dict, versao: str, manifest: Dict,
+            legacy_file: Optional[str] = None) -> str:
+    """Grava <slug>.<versão>.json, troca o alias <slug>.json e registra no manifest"""
+    generated_at = datetime.now(timezone.utc).isoformat()
+    corpo = json.dumps(
+        {"generated_at": generated_at, "versao": versao, **report}, ensure_ascii=False, indent=2
+    ).encode("utf-8")
+
+    arquivo = f"{variant.slug}.{versao}.json"
+    write_atomic(os.path.join(out_dir, arquivo), corpo)
+    write_atomic(os.path.join(out_dir, f"{variant.slug}.json"), corpo)
+    if legacy_file and variant.slug == DEFAULT_SLUG:
+        write_atomic(legacy_file, corpo)
+
+    entrada = manifest.setdefault(variant.slug, {"historico": []})
+    historico = [a for a in entrada.get("historico", []) if a != arquivo] + [arquivo]
+    for antigo in historico[:-KEEP_VERSIONS]:
+        try:
+            os.unlink(os.path.join(out_dir, antigo))
+        except FileNotFoundError:
+            pass
+    entrada.update({
+        "arquivo": arquivo, "versao": versao, "generated_at": generated_at,
+        "periodo": report["periodo"], "historico": historico[-KEEP_VERSIONS:],
+    })
+    return arquivo
+
+
+def _load_manifest(out_dir: str) -> Dict:
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# ============================================
+# GERAÇÃO
+# ============================================
+
+async def generate(api_base: str, out_dir: str, variants: List[Variant], state_file: str,
+                   legacy_file: Optional[str] = None, concurrency: int = 4,
+                   force: bool = False, timeout: float = 30.0,
+                   transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict:
+    """
+    Busca as fontes de todas as variantes e publica as que mudaram
+
+    Returns:
+        {"variantes": {slug: "publicado" | "inalterado" | "erro"},
+         "fontes": {"200", "304", "erro"}, "seconds"}
+    """
+    inicio = time.monotonic()
+    state = State.load(state_file)
+    manifest = _load_manifest(out_dir)
+
+    urls = {}
+    for variant in variants:
+        for fonte, (caminho, params) in variant.sources().items():
+            urls[source_url(caminho, params)] = fonte
+
+    semaforo = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=api_base, timeout=timeout, transport=transport) as client:
+        resultados = await asyncio.gather(*(
+            fetch_source(client, fonte, url, state, semaforo) for url, fonte in urls.items()
+        ))
+    por_url = dict(zip(urls, resultados))
+
+    status = {}
+    for variant in variants:
+        fontes = {f: por_url[source_url(c, p)] for f, (c, p) in variant.sources().items()}
+        if any(r.error for r in fontes.values()):
+            status[variant.slug] = "erro"
+            continue
+        publicado = state.variants.get(variant.slug, {})
+        existe = (
+            publicado.get("config") == asdict(variant)
+            and variant.slug in manifest
+            and os.path.exists(os.path.join(out_dir, manifest[variant.slug]["arquivo"]))
+            and not (legacy_file and variant.slug == DEFAULT_SLUG and not os.path.exists(legacy_file))
+        )
+        if existe and not force and not any(r.changed for r in fontes.values()):
+            status[variant.slug] = "inalterado"
+            continue
+
+        report = build_report(variant, {f: r.trecho for f, r in fontes.items()})
+        versao = digest(report)[:12]
+        if existe and not force and publicado.get("versao") == versao:
+            status[variant.slug] = "inalterado"
+            continue
+        publish(out_dir, variant, report, versao, manifest, legacy_file)
+        state.variants[variant.slug] = {"versao": versao, "config": asdict(variant)}
+        status[variant.slug] = "publicado"
+
+    if "publicado" in status.values():
+        write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(
+            manifest, ensure_ascii=False, indent=2
+        ).encode("utf-8"))
+    state.save()
+
+    resultado = {
+        "variantes": status,
+        "fontes": {
+            "200": sum(r.status == 200 for r in resultados),
+            "304": sum(r.status == 304 for r in resultados),
+            "erro": sum(r.error is not None for r in resultados),
+        },
+        "seconds": round(time.monotonic() - inicio, 2),
+    }
+    logger.info("Relatório público gerado", **resultado)
+    return resultado
@@ -0,0 +1,344 @@
+"""
+Instrumentação das consultas ao CRM externo (MySQL)
+
+Toda consulta ao CRM passa por `instrumented_cursor(conn, nome)`, com o
+nome lógico da consulta (ex: "roi.resumo_mes"). Por nome, em memória do
+processo:
+
+- Histograma de latência (execute até o último fetch)
+- Histograma de espera pela conexão (connect / ping + reconnect)
+- Linhas e bytes devolvidos (bytes estimados pelo tamanho dos valores)
+- Erros e consultas lentas
+
+Consultas acima de CRM_SLOW_QUERY_MS (padrão 500) vão para o log de
+consultas lentas com os parâmetros; com CRM_SLOW_QUERY_EXPLAIN=1 o plano
+(`EXPLAIN`) é capturado na mesma conexão. `render_prometheus()` gera o
+texto do endpoint /metrics.
+"""
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import structlog
+
+logger = structlog.get_logger()
+
+SLOW_QUERY_MS = float(os.getenv("CRM_SLOW_QUERY_MS", "500"))
+SLOW_QUERY_EXPLAIN = os.getenv("CRM_SLOW_QUERY_EXPLAIN", "").lower() in ("1", "true", "yes")
+
+# Limites (segundos) dos buckets; +Inf é implícito
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+MAX_PARAMS_LOG = 500  # Caracteres de repr(params) no log de lentas
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+# ============================================
+# REGISTRO
+# ============================================
+
+class Histogram:
+    """Histograma cumulativo no formato do Prometheus"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, limite in enumerate(self.buckets):
+            if value <= limite:
+                self.counts[i] += 1
+
+
+class QueryStats:
+    """Métricas acumuladas de um nome de consulta"""
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.wait = Histogram(WAIT_BUCKETS)
+        self.rows = 0
+        self.bytes = 0
+        self.errors = 0
+        self.slow = 0
+
+
+class QueryMetrics:
+    """Registro por processo, protegido por lock (threads do uvicorn/celery)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, QueryStats] = {}
+        # Espera pela conexão ainda não atribuída a nenhuma consulta
+        self._pending_wait: "weakref.WeakKeyDictionary[Any, float]" = weakref.WeakKeyDictionary()
+        self._listeners: List[Callable[[str, float], None]] = []
+
+    def add_listener(self, fn: Callable[[str, float], None]):
+        """`fn(nome, segundos)` a cada consulta (espera pela conexão incluída)"""
+        self._listeners.append(fn)
+
+    def _notify(self, name: str, seconds: float):
+        for fn in self._listeners:
+            fn(name, seconds)
+
+    def _get(self, name: str) -> QueryStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = QueryStats()
+        return stats
+
+    def mark_wait(self, conn, seconds: float):
+        """Registra o tempo gasto para obter `conn`; vai para a próxima consulta nela"""
+        with self._lock:
+            self._pending_wait[conn] = self._pending_wait.get(conn, 0.0) + seconds
+
+    def take_wait(self, conn) -> float:
+        with self._lock:
+            return self._pending_wait.pop(conn, 0.0)
+
+    def observe(self, name: str, seconds: float, rows: int, size: int, wait: float, slow: bool):
+        with self._lock:
+            stats = self._get(name)
+            stats.latency.observe(seconds)
+            stats.wait.observe(wait)
+            stats.rows += rows
+            stats.bytes += size
+            stats.slow += slow
+        self._notify(name, seconds + wait)
+
+    def observe_error(self, name: str, wait: float, seconds: float = 0.0):
+        with self._lock:
+            stats = self._get(name)
+            stats.wait.observe(wait)
+            stats.errors += 1
+        self._notify(name, seconds + wait)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Cópia das métricas por nome (para logs/diagnóstico)"""
+        with self._lock:
+            return {
+                name: {
+                    "count": s.latency.count,
+                    "seconds": round(s.latency.sum, 6),
+                    "wait_seconds": round(s.wait.sum, 6),
+                    "rows": s.rows,
+                    "bytes": s.bytes,
+                    "errors": s.errors,
+                    "slow": s.slow,
+                }
+                for name, s in self._stats.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """Exposição em texto (text/plain; version=0.0.4)"""
+        with self._lock:
+            itens = sorted(self._stats.items())
+            linhas: List[str] = []
+
+            def histograma(metrica: str, ajuda: str, attr: str):
+                linhas.append(f"# HELP {metrica} {ajuda}")
+                linhas.append(f"# TYPE {metrica} histogram")
+                for name, stats in itens:
+                    h: Histogram = getattr(stats, attr)
+                    label = escape_label(name)
+                    for limite, n in zip(h.buckets, h.counts):
+                        linhas.append(f'{metrica}_bucket{{query="{label}",le="{limite}"}} {n}')
+                    linhas.append(f'{metrica}_bucket{{query="{label}",le="+Inf"}} {h.count}')
+                    linhas.append(f'{metrica}_sum{{query="{label}"}} {h.sum:.6f}')
+                    linhas.append(f'{metrica}_count{{query="{label}"}} {h.count}')
+
+            def contador(metrica: str, ajuda: str, attr: str):
+                linhas.append(f"# HELP {metrica} {ajuda}")
+                linhas.append(f"# TYPE {metrica} counter")
+                for name, stats in itens:
+                    linhas.append(f'{metrica}{{query="{escape_label(name)}"}} {getattr(stats, attr)}')
+
+            histograma("crm_query_duration_seconds", "Latência das consultas ao CRM externo", "latency")
+            histograma("crm_query_connection_wait_seconds", "Espera pela conexão com o CRM externo", "wait")
+            contador("crm_query_rows_total", "Linhas devolvidas pelo CRM externo", "rows")
+            contador("crm_query_bytes_total", "Bytes devolvidos pelo CRM externo (estimados)", "bytes")
+            contador("crm_query_errors_total", "Consultas ao CRM externo com erro", "errors")
+            contador("crm_query_slow_total", f"Consultas acima de {SLOW_QUERY_MS:g} ms", "slow")
+        return "\n".join(linhas) + "\n"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = QueryMetrics()
+
+
+def mark_wait(conn, seconds: float):
+    """Atalho para REGISTRY.mark_wait"""
+    REGISTRY.mark_wait(conn, seconds)
+
+
+def render_prometheus() -> str:
+    """Atalho para REGISTRY.render_prometheus"""
+    return REGISTRY.render_prometheus()
+
+
+# ============================================
+# CURSOR INSTRUMENTADO
+# ============================================
+
+def _row_size(row) -> int:
+    """Bytes aproximados de uma linha (dict do DictCursor ou tupla)"""
+    valores = row.values() if isinstance(row, dict) else row
+    return sum(len(v) if isinstance(v, (str, bytes)) else 8 for v in valores if v is not None)
+
+
+class InstrumentedCursor:
+    """
+    Cursor do pymysql que mede execute + fetch
+
+    Mesma interface usada no projeto (execute, fetchone, fetchall); cada
+    execute é uma observação, fechada no execute seguinte ou na saída do
+    `with`.
+    """
+
+    def __init__(self, conn, cursor, name: str, wait: float, registry: QueryMetrics):
+        self._conn = conn
+        self._cursor = cursor
+        self._name = name
+        self._wait = wait
+        self._registry = registry
+        self._pending: Optional[Tuple[str, Any]] = None
+        self._start = self._end = 0.0
+        self._rows = self._bytes = 0
+        self._wait_pending = 0.0
+
+    def __getattr__(self, attr):
+        return getattr(self._cursor, attr)
+
+    def execute(self, query: str, params=None):
+        self._finish()
+        # A espera pela conexão conta só para a primeira consulta
+        wait, self._wait = self._wait, 0.0
+        inicio = time.perf_counter()
+        try:
+            result = self._cursor.execute(query, params)
+        except Exception:
+            self._registry.observe_error(self._name, wait, time.perf_counter() - inicio)
+            raise
+        self._pending = (query, params)
+        self._start, self._end = inicio, time.perf_counter()
+        self._rows = self._bytes = 0
+        self._wait_pending = wait
+        return result
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._account([row] if row is not None else [])
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._account(rows)
+        return rows
+
+    def _account(self, rows):
+        if self._pending is None:
+            return
+        self._end = time.perf_counter()
+        self._rows += len(rows)
+        self._bytes += sum(_row_size(r) for r in rows)
+
+    def _finish(self):
+        if self._pending is None:
+            return
+        query, params = self._pending
+        self._pending = None
+        segundos = self._end - self._start
+        lenta = segundos * 1000 >= SLOW_QUERY_MS
+        self._registry.observe(self._name, segundos, self._rows, self._bytes, self._wait_pending, lenta)
+        if lenta:
+            _log_slow(self._conn, self._name, query, params, segundos, self._rows, self._wait_pending)
+
+
+def _log_slow(conn, name: str, query: str, params, segundos: float, rows: int, wait: float):
+    """Log de consulta lenta, com o plano quando CRM_SLOW_QUERY_EXPLAIN está ligado"""
+    campos = {
+        "query_name": name,
+        "duration_ms": round(segundos * 1000, 1),
+        "rows": rows,
+        "connection_wait_ms": round(wait * 1000, 1),
+        "params": repr(params)[:MAX_PARAMS_LOG],
+        "sql": " ".join(query.split()),
+    }
+    if SLOW_QUERY_EXPLAIN and query.lstrip().upper().startswith("SELECT"):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("EXPLAIN " + query, params)
+                campos["explain"] = [dict(r) if isinstance(r, dict) else list(r) for r in cursor.fetchall()]
+        except Exception as e:
+            campos["explain_error"] = str(e)
+    logger.warning("Consulta lenta no CRM externo", **campos)
+
+
+def instrument_engine(engine, name: str, registry: QueryMetrics = REGISTRY):
+    """
+    Métricas para um engine SQLAlchemy apontado para o CRM
+
+    Para quem consulta o CRM via Session em vez de cursor pymysql. As
+    linhas vêm do rowcount do cursor (resultado já bufferizado pelo
+    pymysql); bytes e espera pela conexão não são medidos.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        segundos = time.perf_counter() - conn.info["query_start"].pop()
+        lenta = segundos * 1000 >= SLOW_QUERY_MS
+        registry.observe(name, segundos, max(cursor.rowcount, 0), 0, 0.0, lenta)
+        if lenta:
+            _log_slow(cursor.connection, name, statement, parameters, segundos, cursor.rowcount, 0.0)
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(context):
+        inicios = context.connection.info.get("query_start") if context.connection is not None else None
+        segundos = time.perf_counter() - inicios.pop() if inicios else 0.0
+        registry.observe_error(name, 0.0, segundos)
+
+    return engine
+
+
+@contextmanager
+def instrumented_cursor(
+    conn,
+    name: str,
+    wait: Optional[float] = None,
+    registry: QueryMetrics = REGISTRY
+) -> Iterator[InstrumentedCursor]:
+    """
+    `with instrumented_cursor(conn, "roi.resumo_mes") as cursor:` no lugar
+    de `with conn.cursor() as cursor:`
+
+    Args:
+        conn: Conexão pymysql
+        name: Nome lógico da consulta (rótulo das métricas)
+        wait: Espera pela conexão; padrão: a registrada com mark_wait(conn)
+    """
+    if wait is None:
+        wait = registry.take_wait(conn)
+    cursor = InstrumentedCursor(conn, conn.cursor(), name, wait, registry)
+    try:
+        yield cursor
+    finally:
+        try:
+            cursor._finish()
+        finally:
+            cursor._cursor.close()
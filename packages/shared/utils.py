@@ -2,7 +2,9 @@
 Utilitários compartilhados
 """
 import re
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import unquote
 
 
 def normalize_campaign_name(name: str) -> str:
@@ -93,3 +95,154 @@ def calculate_metrics(spend: float, impressions: int, clicks: int, leads: int) -
         'cpl': round(spend / leads, 4) if leads > 0 else 0,
     }
 
+
+# ============================================================
+# VERSÕES EM LOTE (colunas inteiras)
+# ============================================================
+# Mesmo resultado das funções acima, para listas/arrays: padrões
+# pré-compilados, cada valor distinto processado uma vez (nomes e URLs se
+# repetem muito), telefones e métricas em NumPy.
+
+_NON_ALNUM = re.compile(r'[^a-z0-9\s]')
+_NON_DIGIT = re.compile(r'\D')
+_ASCII_NON_DIGIT = {c: None for c in range(128) if not 48 <= c <= 57}
+_URL_PARAMS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_content', 'utm_term', 'gclid', 'fbclid')
+# Um par de interesse, ou chave com %xx (grupos vazios => caminho original)
+_URL_PARAM = re.compile(r'&(?:(' + '|'.join(_URL_PARAMS) + r')=([^&]*)|\w*%)')
+
+
+def _map_distinct(values: Iterable, fn: Callable) -> list:
+    """fn aplicada uma vez por valor distinto, resultado na ordem original"""
+    values = values if isinstance(values, (list, tuple)) else list(values)
+    resultado = {v: fn(v) for v in dict.fromkeys(values)}
+    return [resultado[v] for v in values]
+
+
+@lru_cache(maxsize=65536)
+def _unquote_value(value: str) -> str:
+    return unquote(value.replace('+', ' '))
+
+
+def _normalize_campaign_name(name: str) -> str:
+    if not name:
+        return ""
+    return '_'.join(_NON_ALNUM.sub('', name.lower()).split())
+
+
+def _format_phone(phone: str) -> Optional[str]:
+    if not phone:
+        return None
+    # translate remove os não dígitos ASCII sem regex; fora do ASCII, \D
+    digits = phone.translate(_ASCII_NON_DIGIT) if phone.isascii() else _NON_DIGIT.sub('', phone)
+    n = len(digits)
+    if n == 11 or n == 10:
+        return f"+55{digits}"
+    if n == 9 or n == 8:
+        return f"+5511{digits}"
+    if n == 13 and digits.startswith('55'):
+        return f"+{digits}"
+    return phone
+
+
+def _extract_utm(url: str) -> dict:
+    # O que urlparse trataria diferente (IPv6, \t\r\n, bytes) vai pelo caminho original
+    if not isinstance(url, str) or '[' in url or ']' in url or '\t' in url or '\r' in url or '\n' in url:
+        return extract_utm_params(url)
+
+    # Mesma separação de urlsplit (fragmento, depois query) e de parse_qs:
+    # pares por '&', sem valor vazio, primeiro valor de cada chave
+    query = url.split('#', 1)[0].partition('?')[2]
+    if not query:
+        return {}
+    encontrados = {}
+    for key, value in _URL_PARAM.findall('&' + query):
+        if not key:
+            return extract_utm_params(url)  # Chave com %xx: parse_qs decodifica
+        if value and key not in encontrados:
+            encontrados[key] = _unquote_value(value) if '%' in value or '+' in value else value
+    if len(encontrados) > 1:
+        return {k: encontrados[k] for k in _URL_PARAMS if k in encontrados}
+    return encontrados
+
+
+def _format_phones(phones: list) -> list:
+    """
+    _format_phone da coluna inteira com NumPy: os dígitos de todos os valores
+    saem de uma passada sobre os bytes concatenados (separados por NUL)
+    """
+    import numpy as np
+
+    valores = [p or '' for p in phones]
+    juntos = '\x00'.join(valores)
+    try:
+        raw = juntos.encode('ascii')
+    except UnicodeEncodeError:
+        return [_format_phone(p) for p in phones]
+    if juntos.count('\x00') != len(valores) - 1:
+        return [_format_phone(p) for p in phones]
+
+    arr = np.frombuffer(raw, dtype=np.uint8)
+    mantidos = arr[((arr - 48) < 10) | (arr == 0)]
+    digitos = mantidos.tobytes().decode('ascii').split('\x00')
+
+    n = np.fromiter(map(len, digitos), dtype=np.int64, count=len(digitos))
+    inicio = np.cumsum(n + 1) - (n + 1)
+    ddi = np.zeros(len(n), dtype=bool)
+    treze = np.flatnonzero(n == 13)
+    ddi[treze] = (mantidos[inicio[treze]] == ord('5')) & (mantidos[inicio[treze] + 1] == ord('5'))
+
+    # 0 = devolve o original, 1 = +55, 2 = +5511, 3 = +
+    codigo = np.select([(n == 10) | (n == 11), (n == 8) | (n == 9), ddi], [1, 2, 3], 0)
+    prefixos = np.array(['', '+55', '+5511', '+'], dtype=object)[codigo]
+    saida = np.where(codigo > 0, prefixos + np.array(digitos, dtype=object), np.array(valores, dtype=object))
+    saida[np.fromiter(map(len, valores), dtype=np.int64, count=len(valores)) == 0] = None
+    return saida.tolist()
+
+
+def normalize_campaign_names(names: Iterable[str]) -> List[str]:
+    """normalize_campaign_name para uma coluna inteira"""
+    return _map_distinct(names, _normalize_campaign_name)
+
+
+def format_phones_br(phones: Iterable[str]) -> List[Optional[str]]:
+    """format_phone_br para uma coluna inteira"""
+    # Telefones quase não se repetem: vetorizar a coluna toda rende mais
+    # que processar por valor distinto
+    return _format_phones(phones if isinstance(phones, list) else list(phones))
+
+
+def extract_utm_params_batch(urls: Iterable[str]) -> List[dict]:
+    """
+    extract_utm_params para uma coluna inteira
+
+    URLs repetidas devolvem o mesmo dict (não altere o resultado in-place).
+    """
+    return _map_distinct(urls, _extract_utm)
+
+
+def calculate_metrics_batch(spend, impressions, clicks, leads) -> dict:
+    """
+    calculate_metrics para arrays (uma posição por campanha/dia)
+
+    Returns:
+        {"cpc", "cpm", "ctr", "cpl"}: arrays NumPy, 0 onde o denominador é 0
+    """
+    import numpy as np
+
+    spend = np.asarray(spend, dtype=float)
+    impressions = np.asarray(impressions, dtype=float)
+    clicks = np.asarray(clicks, dtype=float)
+    leads = np.asarray(leads, dtype=float)
+
+    def razao(num, den, escala=1):
+        out = np.zeros(np.broadcast(num, den).shape)
+        np.divide(num, den, out=out, where=den > 0)
+        # np.round pode diferir de round() na 4ª casa em empates (x.xxxx5)
+        return np.round(out * escala, 4)
+
+    return {
+        'cpc': razao(spend, clicks),
+        'cpm': razao(spend, impressions, 1000),
+        'ctr': razao(clicks, impressions, 100),
+        'cpl': razao(spend, leads),
+    }